@@ -0,0 +1,146 @@
+"""
+Бенчмарк пропускной способности рассылки
+
+Запускает фейковый Bot API (benchmarks.fake_bot_api) отдельным процессом,
+направляет на него бота через TelegramAPIServer и прогоняет конвейер
+рассылки (services.broadcast_service.run_broadcast) вместе с планировщиком
+исходящих запросов по синтетическим аудиториям.
+
+Запуск:
+    python -m benchmarks.broadcast_benchmark --audiences 1000,10000,100000 --rate 1000
+
+Отчет: сообщений в секунду, p50/p99 задержки отправки, пиковый RSS процесса.
+Аудитории прогоняются по возрастанию, поэтому пиковый RSS после каждого
+прогона относится к самой большой аудитории на тот момент.
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from typing import List
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from services.broadcast_service import run_broadcast
+from services.outbound_scheduler import OutboundScheduler, OutboundSchedulerMiddleware
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FAKE_TOKEN = "123456:FAKE-benchmark-token"
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS процесса в МБ (Linux отдает ru_maxrss в КБ)"""
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def wait_for_server(bot: Bot, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await bot.get_me()
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def run(args) -> None:
+    base_url = f"http://127.0.0.1:{args.port}"
+    session = AiohttpSession(api=TelegramAPIServer.from_base(base_url), limit=args.connections)
+    bot = Bot(FAKE_TOKEN, session=session)
+
+    scheduler = OutboundScheduler(
+        global_rate=args.rate,
+        global_burst=args.rate,
+        chat_interval=args.chat_interval,
+    )
+    session.middleware(OutboundSchedulerMiddleware(scheduler))
+
+    try:
+        await wait_for_server(bot)
+        print(f"{'аудитория':>10} | {'сообщ/с':>9} | {'p50, мс':>8} | {'p99, мс':>8} | "
+              f"{'ошибок':>7} | {'блок':>6} | {'RSS, МБ':>8}")
+        print("-" * 75)
+
+        offset = 1_000_000
+        for audience in args.audiences:
+            chat_ids = range(offset, offset + audience)
+            offset += audience
+
+            started = time.perf_counter()
+            result = await run_broadcast(bot, chat_ids, args.text, concurrency=args.concurrency)
+            elapsed = time.perf_counter() - started
+
+            print(f"{audience:>10} | {result.total / elapsed:>9.1f} | "
+                  f"{percentile(result.latencies, 50) * 1000:>8.1f} | "
+                  f"{percentile(result.latencies, 99) * 1000:>8.1f} | "
+                  f"{result.failed:>7} | {result.blocked:>6} | {peak_rss_mb():>8.1f}")
+
+        stats = scheduler.get_stats()
+        print(f"\nПланировщик: retry_after={stats['retry_after']}, "
+              f"среднее ожидание слота {stats['bulk']['avg_wait_ms']} мс, "
+              f"максимум {stats['bulk']['max_wait_ms']} мс")
+    finally:
+        await scheduler.stop()
+        await session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк рассылки на фейковом Bot API")
+    parser.add_argument("--audiences", default="1000,10000,100000",
+                        help="Размеры аудиторий через запятую")
+    parser.add_argument("--rate", type=float, default=1000.0,
+                        help="Глобальный лимит планировщика, запросов/с (в проде ~25)")
+    parser.add_argument("--chat-interval", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=50, help="Воркеров рассылки")
+    parser.add_argument("--connections", type=int, default=100, help="Лимит соединений aiohttp")
+    parser.add_argument("--text", default="Тестовая рассылка")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--no-server", action="store_true",
+                        help="Не запускать фейковый сервер (уже запущен отдельно)")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.001)
+    parser.add_argument("--blocked-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+    args.audiences = sorted(int(x) for x in args.audiences.split(",") if x.strip())
+
+    server = None
+    if not args.no_server:
+        server = subprocess.Popen([
+            sys.executable, "-m", "benchmarks.fake_bot_api",
+            "--port", str(args.port),
+            "--latency-ms", str(args.latency_ms),
+            "--jitter-ms", str(args.jitter_ms),
+            "--rate-limit-prob", str(args.rate_limit_prob),
+            "--blocked-ratio", str(args.blocked_ratio),
+            "--chat-interval", str(args.chat_interval),
+        ])
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Бенчмарк выбора хендлера callback_query: полный перебор против индекса
+
+Берет настоящее дерево роутеров (handlers.setup_handlers) и для набора
+callback data, собранного из фильтров хендлеров, ищет первый подходящий
+хендлер двумя способами:
+
+    before — как aiogram: роутеры по порядку, фильтры каждого хендлера;
+    after  — utils.callback_index.CallbackIndex: фильтры только у кандидатов.
+
+Сами хендлеры не вызываются, меряется только выбор.
+
+Запуск:
+    python -m benchmarks.callback_dispatch_benchmark --rounds 20
+
+Отчет: сколько хендлеров проверено и фильтров вычислено на одно нажатие
+(в среднем и в худшем случае) и время выбора в микросекундах.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from aiogram import Dispatcher
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import CallbackQuery
+
+from handlers import setup_handlers
+from utils.callback_index import CallbackIndex
+
+
+def callback_query(data: str) -> CallbackQuery:
+    return CallbackQuery.model_validate({
+        "id": "1",
+        "from": {"id": 42, "is_bot": False, "first_name": "User"},
+        "chat_instance": "c",
+        "data": data,
+    })
+
+
+def make_samples(index: CallbackIndex) -> List[str]:
+    """Значения из фильтров и префиксы с типичными хвостами"""
+    samples = set(index._exact)
+    for prefixes in index._prefixes.values():
+        for prefix in prefixes:
+            samples.update((prefix + "15", prefix + "approved:3"))
+    return sorted(samples)
+
+
+async def select(handlers: List[HandlerObject], event: CallbackQuery) -> Tuple[Any, int, int]:
+    """Первый подходящий хендлер, проверено хендлеров, вычислено фильтров"""
+    checked = filters = 0
+    for handler in handlers:
+        checked += 1
+        for event_filter in handler.filters or ():
+            filters += 1
+            if not await event_filter.call(event, raw_state=None):
+                break
+        else:
+            return handler, checked, filters
+    return None, checked, filters
+
+
+async def run(rounds: int, seed: int) -> None:
+    dispatcher = Dispatcher()
+    dispatcher.include_router(setup_handlers())
+    index = CallbackIndex(dispatcher)
+    all_handlers = [handler for observer in index.observers for handler in observer.handlers]
+
+    samples = make_samples(index)
+    events = [(data, callback_query(data)) for data in samples]
+    random.Random(seed).shuffle(events)
+    print(
+        f"хендлеров callback_query: {index.total}, в индексе: {index.indexed}, "
+        f"образцов data: {len(events)}"
+    )
+
+    results: Dict[str, Dict[str, List[float]]] = {}
+    for mode in ("before", "after"):
+        stats = results[mode] = {"checked": [], "filters": [], "us": []}
+        for _ in range(rounds):
+            for data, event in events:
+                started = time.perf_counter()
+                if mode == "before":
+                    handlers = all_handlers
+                else:
+                    handlers = [h for hs in index.lookup(data).values() for h in hs]
+                _, checked, filters = await select(handlers, event)
+                stats["us"].append((time.perf_counter() - started) * 1_000_000)
+                stats["checked"].append(checked)
+                stats["filters"].append(filters)
+
+    print(
+        f"{'способ':>6} | {'хендлеров':>9} | {'макс.':>5} | {'фильтров':>8} | {'макс.':>5} | "
+        f"{'мкс/нажатие':>11}"
+    )
+    for mode, stats in results.items():
+        count = len(stats["us"])
+        print(
+            f"{mode:>6} | {sum(stats['checked']) / count:9.1f} | {max(stats['checked']):5d} | "
+            f"{sum(stats['filters']) / count:8.1f} | {max(stats['filters']):5d} | "
+            f"{sum(stats['us']) / count:11.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20, help="сколько раз прогнать все образцы")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.rounds, args.seed))
+
+
+if __name__ == "__main__":
+    main()
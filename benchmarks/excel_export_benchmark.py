@@ -0,0 +1,155 @@
+"""
+Бенчмарк задержки event loop во время выгрузки Excel
+
+Сравнивает два способа собрать книгу из синтетических строк:
+  before — как раньше: обычный Workbook, ячейки заполняются прямо в
+           корутине, книга сохраняется в BytesIO на event loop;
+  after  — как сейчас: строки порциями пишутся в спул-файл, книга
+           собирается services.excel_worker в пуле процессов (write_only).
+
+Параллельно работает «тикер», который каждые --tick-ms засыпает и
+замеряет, насколько позже положенного проснулся: это задержка, которую
+в тот момент получил бы любой апдейт от пользователя.
+
+Запуск:
+    python -m benchmarks.excel_export_benchmark --rows 100000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import List
+
+from openpyxl import Workbook
+
+from benchmarks.broadcast_benchmark import peak_rss_mb, percentile
+from services.excel_worker import build_workbook, write_spool_frame
+
+HEADERS = [
+    'ID', 'Telegram ID', 'Имя пользователя', 'Полное имя', 'Роль',
+    'Регион', 'Язык', 'Заблокирован', 'Дата регистрации', 'Последнее обновление'
+]
+CHUNK_SIZE = 1000
+
+
+def synthetic_rows(count: int):
+    started = datetime(2025, 1, 1)
+    for index in range(1, count + 1):
+        created = started + timedelta(minutes=index)
+        yield (
+            index, 100_000_000 + index, f"user{index}", f"Пользователь {index}", "user",
+            "kg", "ru", index % 50 == 0, created, created + timedelta(days=1),
+        )
+
+
+class LagMonitor:
+    """Замер опозданий пробуждения корутины относительно расписания"""
+
+    def __init__(self, tick: float):
+        self.tick = tick
+        self.lags: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.tick
+            await asyncio.sleep(self.tick)
+            self.lags.append(max(0.0, loop.time() - expected))
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.sleep(self.tick * 2)
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.sleep(self.tick * 2)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+async def export_before(rows: int) -> int:
+    """Старый способ: обычная книга, все на event loop"""
+    wb = Workbook()
+    ws = wb.active
+    for col, header in enumerate(HEADERS, 1):
+        ws.cell(row=1, column=col, value=header)
+    for row, values in enumerate(synthetic_rows(rows), 2):
+        for col, value in enumerate(values, 1):
+            ws.cell(row=row, column=col, value=value)
+    output = BytesIO()
+    wb.save(output)
+    return len(output.getvalue())
+
+
+async def export_after(rows: int, pool: ProcessPoolExecutor) -> int:
+    """Новый способ: спул-файл порциями + сборка в процессе-воркере"""
+    fd, spool_path = tempfile.mkstemp(suffix=".spool")
+    fd_out, output_path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd_out)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            chunk = []
+            for values in synthetic_rows(rows):
+                chunk.append(values)
+                if len(chunk) == CHUNK_SIZE:
+                    await asyncio.to_thread(write_spool_frame, spool, 0, chunk)
+                    chunk = []
+            if chunk:
+                await asyncio.to_thread(write_spool_frame, spool, 0, chunk)
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(pool, build_workbook, spool_path, output_path, [("Пользователи", HEADERS)], [])
+        return os.path.getsize(output_path)
+    finally:
+        os.remove(spool_path)
+        os.remove(output_path)
+
+
+async def run(args) -> None:
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    # Прогреваем пул, чтобы в замер не попал запуск интерпретатора воркера
+    await asyncio.get_running_loop().run_in_executor(pool, int, "0")
+
+    print(f"{'способ':>7} | {'строк':>7} | {'время, с':>8} | {'макс. лаг, мс':>13} | "
+          f"{'p99 лаг, мс':>11} | {'файл, МБ':>8} | {'RSS, МБ':>8}")
+    print("-" * 82)
+    try:
+        for name in args.modes:
+            async with LagMonitor(args.tick_ms / 1000) as monitor:
+                started = time.perf_counter()
+                if name == "before":
+                    size = await export_before(args.rows)
+                else:
+                    size = await export_after(args.rows, pool)
+                elapsed = time.perf_counter() - started
+
+            print(f"{name:>7} | {args.rows:>7} | {elapsed:>8.2f} | "
+                  f"{max(monitor.lags, default=0) * 1000:>13.1f} | "
+                  f"{percentile(monitor.lags, 99) * 1000:>11.1f} | "
+                  f"{size / 1024 / 1024:>8.1f} | {peak_rss_mb():>8.1f}")
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка event loop при выгрузке Excel")
+    parser.add_argument("--rows", type=int, default=100_000, help="Строк в книге")
+    parser.add_argument("--tick-ms", type=float, default=10.0, help="Период тикера, мс")
+    parser.add_argument("--modes", default="after,before",
+                        help="Способы через запятую: after, before (after первым, чтобы RSS не смешивался)")
+    args = parser.parse_args()
+    args.modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Локальный фейковый сервер Telegram Bot API для нагрузочных тестов
+
+Принимает запросы aiogram (через TelegramAPIServer.from_base) и отвечает
+правдоподобными объектами, имитируя задержку сети, 429 с retry_after,
+403 для пользователей, заблокировавших бота, и лимит сообщений на чат.
+
+Запуск отдельным процессом:
+    python -m benchmarks.fake_bot_api --port 8081 --latency-ms 40
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+from aiohttp import web
+
+
+# Методы, которые отправляют сообщение в чат и подпадают под лимит на чат
+SEND_METHODS = {
+    "sendmessage", "sendphoto", "senddocument", "sendvideo", "sendaudio",
+    "sendmediagroup", "sendanimation", "sendvoice", "sendsticker",
+}
+
+
+@dataclass
+class FakeApiConfig:
+    """Параметры имитации"""
+    latency_ms: float = 40.0          # базовая задержка ответа
+    jitter_ms: float = 20.0           # случайная добавка к задержке
+    rate_limit_prob: float = 0.0      # вероятность случайного 429
+    retry_after: int = 1              # значение retry_after для 429
+    blocked_ratio: float = 0.0        # доля пользователей, заблокировавших бота
+    chat_interval: float = 1.0        # минимальный интервал между сообщениями в чат, сек (0 — без лимита)
+    seed: int = 42
+
+
+@dataclass
+class FakeApiStats:
+    """Счетчики сервера"""
+    requests: int = 0
+    ok: int = 0
+    rate_limited: int = 0
+    forbidden: int = 0
+    by_method: Dict[str, int] = field(default_factory=dict)
+
+
+class FakeBotApi:
+    """Фейковый Bot API на aiohttp"""
+
+    def __init__(self, config: FakeApiConfig):
+        self.config = config
+        self.stats = FakeApiStats()
+        self._random = random.Random(config.seed)
+        self._message_ids = itertools.count(1)
+        self._chat_last_sent: Dict[int, float] = {}
+
+    def is_blocked(self, chat_id: int) -> bool:
+        """Детерминированно решает, заблокировал ли пользователь бота"""
+        if self.config.blocked_ratio <= 0:
+            return False
+        return (chat_id * 2654435761 % 2 ** 32) / 2 ** 32 < self.config.blocked_ratio
+
+    def _message(self, chat_id: int, params: Dict[str, Any]) -> Dict[str, Any]:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": "User"},
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        return message
+
+    @staticmethod
+    def _error(code: int, description: str, retry_after: int = None) -> web.Response:
+        payload: Dict[str, Any] = {"ok": False, "error_code": code, "description": description}
+        if retry_after is not None:
+            payload["parameters"] = {"retry_after": retry_after}
+        return web.json_response(payload, status=code)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+
+        self.stats.requests += 1
+        self.stats.by_method[method] = self.stats.by_method.get(method, 0) + 1
+
+        delay = self.config.latency_ms + self._random.random() * self.config.jitter_ms
+        await asyncio.sleep(delay / 1000)
+
+        if self.config.rate_limit_prob and self._random.random() < self.config.rate_limit_prob:
+            self.stats.rate_limited += 1
+            return self._error(
+                429, f"Too Many Requests: retry after {self.config.retry_after}", self.config.retry_after
+            )
+
+        chat_id = int(params["chat_id"]) if "chat_id" in params else None
+
+        if method in SEND_METHODS and chat_id is not None:
+            if self.is_blocked(chat_id):
+                self.stats.forbidden += 1
+                return self._error(403, "Forbidden: bot was blocked by the user")
+
+            now = time.monotonic()
+            last_sent = self._chat_last_sent.get(chat_id)
+            if self.config.chat_interval and last_sent is not None and now - last_sent < self.config.chat_interval:
+                self.stats.rate_limited += 1
+                return self._error(
+                    429, f"Too Many Requests: retry after {self.config.retry_after}", self.config.retry_after
+                )
+            self._chat_last_sent[chat_id] = now
+
+        self.stats.ok += 1
+        return web.json_response({"ok": True, "result": self._result(method, chat_id, params)})
+
+    def _result(self, method: str, chat_id: int, params: Dict[str, Any]) -> Any:
+        if method == "getme":
+            return {"id": 123456, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+        if method == "sendmediagroup":
+            media = json.loads(params.get("media", "[]"))
+            return [self._message(chat_id, {}) for _ in media]
+        if method in SEND_METHODS:
+            return self._message(chat_id, params)
+        if method.startswith("edit") and chat_id is not None:
+            return self._message(chat_id, params)
+        return True
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats.__dict__)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_stats", self.handle_stats)
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        return app
+
+
+async def start_fake_server(config: FakeApiConfig, host: str = "127.0.0.1", port: int = 8081) -> web.AppRunner:
+    """Запустить сервер в текущем event loop"""
+    runner = web.AppRunner(FakeBotApi(config).make_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фейковый Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--blocked-ratio", type=float, default=0.0)
+    parser.add_argument("--chat-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    config = FakeApiConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_limit_prob=args.rate_limit_prob,
+        retry_after=args.retry_after,
+        blocked_ratio=args.blocked_ratio,
+        chat_interval=args.chat_interval,
+    )
+    web.run_app(FakeBotApi(config).make_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
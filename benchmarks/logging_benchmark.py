@@ -0,0 +1,120 @@
+"""
+Бенчмарк логирования: профиль development против production
+
+Настраивает логирование через utils.logger.setup_logger в каждом профиле
+(логи — во временный каталог, консоль — в /dev/null) и меряет:
+
+    info/s     — вызовов logger.info через стандартный logging в секунду;
+    debug/s    — вызовов logger.debug ниже порога LOG_LEVEL в секунду;
+    p50/p99    — время «хендлера», который делает 10 записей INFO
+                 вперемешку с await, при 200 одновременных хендлерах;
+    дозапись   — сколько после теста дописывается фоновая очередь
+                 (complete_logging).
+
+Запуск:
+    python -m benchmarks.logging_benchmark --calls 20000
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from loguru import logger as loguru_logger
+
+from config.settings import settings
+from utils.logger import complete_logging, setup_logger
+
+HANDLERS = 200
+LOGS_PER_HANDLER = 10
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def fake_handler(log: logging.Logger, user_id: int, durations: List[float]) -> None:
+    started = time.perf_counter()
+    data = {"tournament_id": 7, "team_name": f"Team {user_id}", "main_players": list(range(5))}
+    for step in range(LOGS_PER_HANDLER):
+        log.info(f"Шаг {step} регистрации команды пользователя {user_id}: {data['team_name']}")
+        await asyncio.sleep(0)
+    durations.append(time.perf_counter() - started)
+
+
+async def run_profile(profile: str, calls: int) -> Dict[str, float]:
+    log = logging.getLogger("handlers.user.team_registration")
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+        previous_cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with contextlib.redirect_stdout(devnull):
+                setup_logger(profile)
+
+                started = time.perf_counter()
+                for index in range(calls):
+                    log.info(f"Пользователь {index} открыл меню турниров")
+                info_rate = calls / (time.perf_counter() - started)
+
+                started = time.perf_counter()
+                for index in range(calls):
+                    log.debug(f"Состояние пользователя {index}: {{'step': 3}}")
+                debug_rate = calls / (time.perf_counter() - started)
+
+                durations: List[float] = []
+                await asyncio.gather(*(fake_handler(log, user_id, durations) for user_id in range(HANDLERS)))
+
+                started = time.perf_counter()
+                await complete_logging()
+                drain = time.perf_counter() - started
+                loguru_logger.remove()
+        finally:
+            os.chdir(previous_cwd)
+
+    return {
+        "info_rate": info_rate,
+        "debug_rate": debug_rate,
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p99_ms": percentile(durations, 99) * 1000,
+        "drain_ms": drain * 1000,
+    }
+
+
+async def run(calls: int) -> None:
+    settings.log_level = "INFO"
+    # Без выборки и лимита: сравнивается сама запись
+    settings.log_sample_rates = ""
+    settings.log_rate_limit_per_minute = 0
+
+    results = {profile: await run_profile(profile, calls) for profile in ("development", "production")}
+
+    print(
+        f"{'профиль':>11} | {'info/s':>9} | {'debug/s':>10} | {'p50, мс':>8} | {'p99, мс':>8} | "
+        f"{'дозапись, мс':>12}",
+        file=sys.stderr
+    )
+    for profile, result in results.items():
+        print(
+            f"{profile:>11} | {result['info_rate']:9.0f} | {result['debug_rate']:10.0f} | "
+            f"{result['p50_ms']:8.1f} | {result['p99_ms']:8.1f} | {result['drain_ms']:12.1f}",
+            file=sys.stderr
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000, help="вызовов логгера в замерах скорости")
+    args = parser.parse_args()
+    asyncio.run(run(args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Бенчмарк обработки апдейтов: задачи на каждый апдейт против полос
+
+Генерирует синтетические апдейты (по умолчанию 10 000 от 1 000
+пользователей, вперемешку) и скармливает их настоящему диспетчеру aiogram
+пачками, как это делает polling. Хендлер имитирует работу с FSM и базой:
+читает счетчик пользователя, ждет «запрос в базу» и записывает счетчик + 1.
+
+Способы:
+    tasks — как aiogram по умолчанию: задача на каждый апдейт;
+    lanes — LaneDispatcher из services.update_executor.
+
+Запуск:
+    python -m benchmarks.update_lanes_benchmark --updates 10000 --users 1000
+
+Отчет: апдейтов в секунду, p50/p99 от получения до конца обработки, пик
+одновременно работающих хендлеров, сколько раз хендлеры одного пользователя
+пересеклись и сколько инкрементов потерялось из-за гонки.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+
+from services.update_executor import LaneDispatcher
+
+FAKE_TOKEN = "123456:FAKE-benchmark-token"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_updates(count: int, users: int, seed: int) -> List[Update]:
+    rng = random.Random(seed)
+    updates = []
+    for update_id in range(count):
+        user_id = 1_000_000 + rng.randrange(users)
+        updates.append(Update.model_validate({
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1760000000,
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+                "text": "✅ Подтвердить",
+            },
+        }))
+    return updates
+
+
+class Workload:
+    """Хендлер с чтением-изменением-записью состояния пользователя"""
+
+    def __init__(self, min_ms: float, max_ms: float, seed: int):
+        self.rng = random.Random(seed)
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.counters: Dict[int, int] = {}
+        self.running: Dict[int, int] = {}
+        self.fed_at: Dict[int, float] = {}
+        self.latencies: List[float] = []
+        self.overlaps = 0
+        self.active = 0
+        self.peak = 0
+        self.done = asyncio.Event()
+        self.expected = 0
+
+    def router(self) -> Router:
+        router = Router()
+
+        @router.message()
+        async def on_message(message: Message):
+            user_id = message.from_user.id
+            if self.running.get(user_id):
+                self.overlaps += 1
+            self.running[user_id] = self.running.get(user_id, 0) + 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+            value = self.counters.get(user_id, 0)
+            await asyncio.sleep(self.rng.uniform(self.min_ms, self.max_ms) / 1000)
+            self.counters[user_id] = value + 1
+
+            self.active -= 1
+            self.running[user_id] -= 1
+            self.latencies.append(time.perf_counter() - self.fed_at[message.message_id])
+            if len(self.latencies) == self.expected:
+                self.done.set()
+
+        return router
+
+
+async def run_mode(mode: str, updates: List[Update], args) -> None:
+    bot = Bot(FAKE_TOKEN)
+    workload = Workload(args.min_ms, args.max_ms, args.seed)
+    workload.expected = len(updates)
+    dispatcher = LaneDispatcher() if mode == "lanes" else Dispatcher()
+    dispatcher.include_router(workload.router())
+    if mode == "lanes":
+        dispatcher.start_lanes(bot, args.lanes, args.concurrency, args.queue_size)
+
+    tasks = set()
+    started = time.perf_counter()
+    try:
+        for offset in range(0, len(updates), args.batch):
+            for update in updates[offset:offset + args.batch]:
+                workload.fed_at[update.update_id] = time.perf_counter()
+                if mode == "lanes":
+                    await dispatcher.feed_update(bot, update)
+                else:
+                    task = asyncio.create_task(dispatcher.feed_update(bot, update))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            # Пауза между ответами getUpdates
+            await asyncio.sleep(0)
+        await workload.done.wait()
+        elapsed = time.perf_counter() - started
+        stats = dispatcher.lane_executor.get_stats() if mode == "lanes" else None
+    finally:
+        if mode == "lanes":
+            await dispatcher.stop_lanes()
+        await bot.session.close()
+
+    lost = len(updates) - sum(workload.counters.values())
+    print(f"{mode:>6} | {len(updates) / elapsed:>9.1f} | "
+          f"{percentile(workload.latencies, 50) * 1000:>8.1f} | "
+          f"{percentile(workload.latencies, 99) * 1000:>8.1f} | "
+          f"{workload.peak:>6} | {workload.overlaps:>11} | {lost:>8}")
+    if stats:
+        print(f"         полосы: макс. глубина {stats['max_lane_depth']}, "
+              f"макс. ожидающих {stats['max_pending']}, среднее ожидание {stats['avg_wait_ms']} мс")
+
+
+async def run(args) -> None:
+    updates = make_updates(args.updates, args.users, args.seed)
+    print(f"{args.updates} апдейтов от {args.users} пользователей, хендлер {args.min_ms}-{args.max_ms} мс, "
+          f"полос {args.lanes}, одновременно {args.concurrency}")
+    print(f"{'способ':>6} | {'апд/с':>9} | {'p50, мс':>8} | {'p99, мс':>8} | {'пик':>6} | "
+          f"{'пересечений':>11} | {'потеряно':>8}")
+    print("-" * 70)
+    for mode in args.modes:
+        await run_mode(mode, updates, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задачи на апдейт против полос по пользователям")
+    parser.add_argument("--updates", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--lanes", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16, help="Одновременно обрабатываемых апдейтов")
+    parser.add_argument("--queue-size", type=int, default=1000, help="Предел ожидающих апдейтов")
+    parser.add_argument("--batch", type=int, default=100, help="Апдейтов в одном ответе getUpdates")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Минимальное время хендлера")
+    parser.add_argument("--max-ms", type=float, default=5.0, help="Максимальное время хендлера")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--modes", default="tasks,lanes", help="Способы через запятую: tasks, lanes")
+    args = parser.parse_args()
+    args.modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
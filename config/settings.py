@@ -26,11 +26,36 @@ class Settings:
         # Поддержка
         self.support_username = os.getenv("SUPPORT_USERNAME", "support")
         
+        # Режим получения апдейтов: polling или webhook
+        self.run_mode = os.getenv("RUN_MODE", "polling").lower()
+        self.webhook_url = os.getenv("WEBHOOK_URL", "")  # публичный адрес, например https://bot.example.com
+        self.webhook_path = os.getenv("WEBHOOK_PATH", "/webhook")
+        self.webhook_secret = os.getenv("WEBHOOK_SECRET", "")  # секретный токен для заголовка Telegram
+        self.webhook_host = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+        self.webhook_port = int(os.getenv("WEBHOOK_PORT", "8080"))
+        self.update_lanes = int(os.getenv("UPDATE_LANES", "64"))  # полос: апдейты пользователя идут по порядку
+        self.update_workers = int(os.getenv("UPDATE_WORKERS", "16"))  # апдейтов обрабатывается одновременно
+        self.update_queue_size = int(os.getenv("UPDATE_QUEUE_SIZE", "1000"))  # больше — ответ 503, Telegram повторит
+        # После перезапуска накопившиеся апдейты разбираются; true — отбрасывать их, как раньше
+        self.drop_pending_updates = os.getenv("DROP_PENDING_UPDATES", "false").lower() == "true"
+        self.update_cursor_save_seconds = int(os.getenv("UPDATE_CURSOR_SAVE_SECONDS", "10"))  # сохранение отметки update_id
+        self.callback_max_age_seconds = int(os.getenv("CALLBACK_MAX_AGE_SECONDS", "30"))  # старше — «нажмите еще раз»
+        # Ответ на нажатие, если хендлер не ответил сам, и список медленных хендлеров
+        self.callback_answer_budget_ms = int(os.getenv("CALLBACK_ANSWER_BUDGET_MS", "300"))
+        self.callback_slow_window = int(os.getenv("CALLBACK_SLOW_WINDOW", "100"))  # последних нажатий на хендлер
+        self.callback_slow_min_samples = int(os.getenv("CALLBACK_SLOW_MIN_SAMPLES", "20"))  # меньше — не оценивать
+        
         # База данных
         self.database_path = os.getenv("DATABASE_PATH", "tournament_bot.db")
         
         # Логирование
         self.log_level = os.getenv("LOG_LEVEL", "INFO")
+        # development — цветной текст и синхронная запись; production — JSON lines в фоновом потоке
+        self.log_profile = os.getenv("LOG_PROFILE", "development").lower()
+        # Доля записей DEBUG/INFO по логгерам (production), например "handlers.user=0.1,aiogram=0.01"
+        self.log_sample_rates = os.getenv("LOG_SAMPLE_RATES", "")
+        # Записей в минуту из одного места кода (production); остальные отбрасываются до ERROR
+        self.log_rate_limit_per_minute = int(os.getenv("LOG_RATE_LIMIT_PER_MINUTE", "60"))
         
         # Часовой пояс по умолчанию
         self.timezone_default = os.getenv("TIMEZONE_DEFAULT", "Asia/Bishkek")
@@ -53,6 +78,57 @@ class Settings:
         self.challonge_client_secret = os.getenv("CHALLONGE_CLIENT_SECRET", "")
         self.challonge_username = os.getenv("CHALLONGE_USERNAME", "")
 
+        # Лимиты исходящих запросов к Telegram (планировщик отправки)
+        self.outbound_global_rate = float(os.getenv("OUTBOUND_GLOBAL_RATE", "25"))  # запросов в секунду
+        self.outbound_chat_interval = float(os.getenv("OUTBOUND_CHAT_INTERVAL", "1.0"))  # секунд между сообщениями в один чат
+        self.broadcast_concurrency = int(os.getenv("BROADCAST_CONCURRENCY", "10"))  # параллельных воркеров рассылки
+
+        # Кэш статистики админ-панели
+        self.stats_cache_ttl = float(os.getenv("STATS_CACHE_TTL", "30"))  # секунд до фонового пересчета
+        self.stats_cache_max_stale = float(os.getenv("STATS_CACHE_MAX_STALE", "600"))  # старше — считать заново
+
+        # Учет активности пользователей
+        self.activity_flush_interval = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "60"))  # секунд между записями в базу
+
+        # Процессов для сборки тяжелых выгрузок (Excel)
+        self.export_process_workers = int(os.getenv("EXPORT_PROCESS_WORKERS", "1"))
+
+        # Снимки базы данных
+        self.backup_dir = os.getenv("BACKUP_DIR", "backups")
+        self.backup_keep = int(os.getenv("BACKUP_KEEP", "7"))  # сколько последних снимков хранить
+        self.backup_interval_hours = float(os.getenv("BACKUP_INTERVAL_HOURS", "24"))
+        self.backup_pages_per_step = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))  # страниц за шаг копирования
+
+        # Обслуживание базы данных
+        self.action_log_retention_days = int(os.getenv("ACTION_LOG_RETENTION_DAYS", "90"))
+        self.notification_retention_days = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "30"))
+        self.maintenance_hour_utc = int(os.getenv("MAINTENANCE_HOUR_UTC", "21"))  # 03:00 по Бишкеку
+        self.maintenance_chunk_size = int(os.getenv("MAINTENANCE_CHUNK_SIZE", "500"))  # строк за одно удаление
+
+        # Журнал действий администраторов
+        self.audit_flush_interval_ms = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "500"))  # период сброса в базу
+        self.audit_batch_size = int(os.getenv("AUDIT_BATCH_SIZE", "100"))  # сброс раньше, если накопилось столько
+        self.audit_queue_size = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))  # больше — записи отбрасываются
+
+        # Хранилище состояний FSM: database (переживает перезапуск) или memory
+        self.fsm_storage = os.getenv("FSM_STORAGE", "database").lower()
+        self.fsm_flush_interval_ms = int(os.getenv("FSM_FLUSH_INTERVAL_MS", "1000"))  # период записи в базу
+        self.fsm_batch_size = int(os.getenv("FSM_BATCH_SIZE", "200"))  # ключей в одной транзакции
+        self.fsm_state_ttl_hours = int(os.getenv("FSM_STATE_TTL_HOURS", "24"))  # брошенные состояния удаляются
+        self.fsm_cache_idle_minutes = int(os.getenv("FSM_CACHE_IDLE_MINUTES", "30"))  # вытеснение из памяти
+
+        # Метрики хендлеров в формате Prometheus на GET /metrics webhook-сервера
+        self.metrics_endpoint = os.getenv("METRICS_ENDPOINT", "false").lower() == "true"
+
+        # SQL-профилировщик (включается из /diag): на сколько минут, порог N+1 и медленного запроса
+        self.sql_profile_minutes = float(os.getenv("SQL_PROFILE_MINUTES", "5"))
+        self.sql_n_plus_one_threshold = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))  # одинаковых запросов за апдейт
+        self.sql_slow_query_ms = int(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+
+        # Монитор event loop: период замера задержки и порог блокировки (снимается стек)
+        self.loop_lag_interval_ms = int(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+        self.loop_lag_threshold_ms = int(os.getenv("LOOP_LAG_THRESHOLD_MS", "250"))
+
 
 # Глобальный экземпляр настроек
 settings = Settings()
\ No newline at end of file
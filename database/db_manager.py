@@ -3,6 +3,7 @@
 """
 
 from pathlib import Path
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -10,6 +11,19 @@ from config.settings import settings
 from database.models import Base
 
 
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Настройки соединения SQLite"""
+    cursor = dbapi_connection.cursor()
+    # Свободные страницы возвращаются обслуживанием (incremental_vacuum). Для новой базы
+    # действует сразу, для существующей — после VACUUM (миграция 005). Должно идти
+    # до journal_mode: переключение в WAL записывает заголовок пустой базы
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    # WAL: читатели не ждут писателя; журнал переносится в базу контрольными точками
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.close()
+
+
 class DatabaseManager:
     """Менеджер базы данных"""
     
@@ -29,6 +43,7 @@ class DatabaseManager:
                 "check_same_thread": False,
             }
         )
+        event.listen(self.engine.sync_engine, "connect", _configure_sqlite)
         
         # Создаем фабрику сессий
         self.async_session = async_sessionmaker(
@@ -0,0 +1,53 @@
+"""
+Миграция: Индекс (status, region) для списков турниров
+Дата: 2026-10-19
+"""
+import logging
+from sqlalchemy import text
+from database.db_manager import get_session
+
+logger = logging.getLogger(__name__)
+
+async def upgrade():
+    """Применение миграции"""
+    async with get_session() as session:
+        try:
+            # Списки турниров фильтруются по статусу и региону пользователя
+            create_sql = text("""
+                CREATE INDEX IF NOT EXISTS ix_tournaments_status_region
+                ON tournaments (status, region)
+            """)
+            await session.execute(create_sql)
+            await session.commit()
+            logger.info("✅ Создан индекс ix_tournaments_status_region")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка миграции: {e}")
+            await session.rollback()
+            raise
+
+async def downgrade():
+    """Откат миграции"""
+    async with get_session() as session:
+        try:
+            await session.execute(text("DROP INDEX IF EXISTS ix_tournaments_status_region"))
+            await session.commit()
+            logger.info("✅ Откат миграции выполнен - индекс ix_tournaments_status_region удален")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка отката миграции: {e}")
+            await session.rollback()
+            raise
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def main():
+        print("🔄 Применение миграции...")
+        try:
+            await upgrade()
+            print("✅ Миграция успешно применена!")
+        except Exception as e:
+            print(f"❌ Ошибка миграции: {e}")
+
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""
+Миграция: Индексы по updated_at для инкрементальных выгрузок
+Дата: 2026-10-19
+"""
+import logging
+from sqlalchemy import text
+from database.db_manager import get_session
+
+logger = logging.getLogger(__name__)
+
+INDEXES = (
+    ("ix_users_updated_at", "users"),
+    ("ix_teams_updated_at", "teams"),
+    ("ix_tournaments_updated_at", "tournaments"),
+)
+
+async def upgrade():
+    """Применение миграции"""
+    async with get_session() as session:
+        try:
+            # Дельта-выгрузки выбирают строки, измененные после отметки потребителя
+            for index_name, table in INDEXES:
+                await session.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} (updated_at)"
+                ))
+            await session.commit()
+            logger.info("✅ Созданы индексы по updated_at для users, teams, tournaments")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка миграции: {e}")
+            await session.rollback()
+            raise
+
+async def downgrade():
+    """Откат миграции"""
+    async with get_session() as session:
+        try:
+            for index_name, _ in INDEXES:
+                await session.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+            await session.commit()
+            logger.info("✅ Откат миграции выполнен - индексы по updated_at удалены")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка отката миграции: {e}")
+            await session.rollback()
+            raise
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def main():
+        print("🔄 Применение миграции...")
+        try:
+            await upgrade()
+            print("✅ Миграция успешно применена!")
+        except Exception as e:
+            print(f"❌ Ошибка миграции: {e}")
+
+    asyncio.run(main())
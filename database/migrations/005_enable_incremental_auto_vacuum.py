@@ -0,0 +1,60 @@
+"""
+Миграция: auto_vacuum = INCREMENTAL для существующей базы
+Дата: 2026-10-19
+
+Режим auto_vacuum существующей базы меняется только полным VACUUM,
+который переписывает файл целиком и на это время блокирует запись —
+применяйте при остановленном боте. Новые базы создаются сразу в этом
+режиме (см. database.db_manager).
+"""
+import logging
+from sqlalchemy import text
+from database.db_manager import db_manager
+
+logger = logging.getLogger(__name__)
+
+# Значения PRAGMA auto_vacuum
+AUTO_VACUUM_INCREMENTAL = 2
+
+async def _set_auto_vacuum(mode: str) -> None:
+    # VACUUM нельзя выполнять внутри транзакции
+    async with db_manager.engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"PRAGMA auto_vacuum = {mode}"))
+        await conn.execute(text("VACUUM"))
+        return (await conn.execute(text("PRAGMA auto_vacuum"))).scalar()
+
+async def upgrade():
+    """Применение миграции"""
+    try:
+        mode = await _set_auto_vacuum("INCREMENTAL")
+        if mode != AUTO_VACUUM_INCREMENTAL:
+            raise RuntimeError(f"auto_vacuum = {mode} после VACUUM")
+        logger.info("✅ Включен auto_vacuum = INCREMENTAL")
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка миграции: {e}")
+        raise
+
+async def downgrade():
+    """Откат миграции"""
+    try:
+        await _set_auto_vacuum("NONE")
+        logger.info("✅ Откат миграции выполнен - auto_vacuum = NONE")
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка отката миграции: {e}")
+        raise
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def main():
+        print("🔄 Применение миграции...")
+        try:
+            await upgrade()
+            print("✅ Миграция успешно применена!")
+        except Exception as e:
+            print(f"❌ Ошибка миграции: {e}")
+
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+Миграция: Даты одобрения команды и завершения матча для суточной статистики
+Дата: 2026-10-19
+"""
+import logging
+from sqlalchemy import text
+from database.db_manager import get_session
+
+logger = logging.getLogger(__name__)
+
+# (таблица, колонка, условие для заполнения по updated_at)
+COLUMNS = (
+    ("teams", "approved_at", "status = 'approved'"),
+    ("matches", "completed_at", "status = 'completed'"),
+)
+
+async def upgrade():
+    """Применение миграции"""
+    async with get_session() as session:
+        try:
+            for table, column, condition in COLUMNS:
+                result = await session.execute(text(
+                    f"SELECT COUNT(*) FROM pragma_table_info('{table}') WHERE name = '{column}'"
+                ))
+                if result.scalar() > 0:
+                    logger.info(f"ℹ️ Колонка {column} уже существует в таблице {table}")
+                    continue
+
+                await session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} DATETIME NULL"))
+                # Точной даты у старых записей нет: берем последнее изменение
+                await session.execute(text(f"UPDATE {table} SET {column} = updated_at WHERE {condition}"))
+                logger.info(f"✅ Добавлена колонка {column} в таблицу {table}")
+
+            # Агрегаты, посчитанные по updated_at, пересчитываются при запуске бота
+            await session.execute(text("DROP TABLE IF EXISTS daily_stats_cursor"))
+            await session.commit()
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка миграции: {e}")
+            await session.rollback()
+            raise
+
+async def downgrade():
+    """Откат миграции"""
+    async with get_session() as session:
+        try:
+            for table, column, _ in COLUMNS:
+                await session.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+            await session.commit()
+            logger.info("✅ Откат миграции выполнен - колонки approved_at и completed_at удалены")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка отката миграции: {e}")
+            await session.rollback()
+            raise
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def main():
+        print("🔄 Применение миграции...")
+        try:
+            await upgrade()
+            print("✅ Миграция успешно применена!")
+        except Exception as e:
+            print(f"❌ Ошибка миграции: {e}")
+
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Миграция: Индексы по датам, от которых считаются суточные агрегаты
+Дата: 2026-10-19
+"""
+import logging
+from sqlalchemy import text
+from database.db_manager import get_session
+
+logger = logging.getLogger(__name__)
+
+INDEXES = (
+    ("ix_users_created_at", "users", "created_at"),
+    ("ix_tournaments_created_at", "tournaments", "created_at"),
+    ("ix_teams_created_at", "teams", "created_at"),
+    ("ix_teams_approved_at", "teams", "approved_at"),
+    ("ix_matches_completed_at", "matches", "completed_at"),
+)
+
+async def upgrade():
+    """Применение миграции"""
+    async with get_session() as session:
+        try:
+            # Пересчет агрегатов за последние дни читает только строки этих дней
+            for index_name, table, column in INDEXES:
+                await session.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({column})"
+                ))
+            await session.commit()
+            logger.info("✅ Созданы индексы по created_at, approved_at и completed_at")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка миграции: {e}")
+            await session.rollback()
+            raise
+
+async def downgrade():
+    """Откат миграции"""
+    async with get_session() as session:
+        try:
+            for index_name, _, _ in INDEXES:
+                await session.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+            await session.commit()
+            logger.info("✅ Откат миграции выполнен - индексы по датам агрегатов удалены")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка отката миграции: {e}")
+            await session.rollback()
+            raise
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def main():
+        print("🔄 Применение миграции...")
+        try:
+            await upgrade()
+            print("✅ Миграция успешно применена!")
+        except Exception as e:
+            print(f"❌ Ошибка миграции: {e}")
+
+    asyncio.run(main())
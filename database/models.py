@@ -1,11 +1,11 @@
-from datetime import datetime
+from datetime import datetime, date
 from typing import List, Optional
 from enum import Enum as PyEnum
 import json
 
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime, Text, 
-    ForeignKey, UniqueConstraint, Index, JSON
+    Column, Integer, String, Boolean, DateTime, Date, Text, 
+    ForeignKey, UniqueConstraint, Index, JSON, LargeBinary
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, Mapped, mapped_column
@@ -29,6 +29,7 @@ class TeamStatus(PyEnum):
 
 class TournamentStatus(PyEnum):
     REGISTRATION = "registration"
+    REGISTRATION_CLOSED = "registration_closed"
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
     CANCELLED = "cancelled"
@@ -47,6 +48,22 @@ class MatchStatus(PyEnum):
     CANCELLED = "cancelled"
 
 
+class JobStatus(PyEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class DailyMetric(PyEnum):
+    NEW_USERS = "new_users"
+    NEW_TEAMS = "new_teams"
+    NEW_TOURNAMENTS = "new_tournaments"
+    TEAM_APPROVALS = "team_approvals"
+    MATCHES_COMPLETED = "matches_completed"
+
+
 class User(Base):
     __tablename__ = "users"
     
@@ -84,6 +101,11 @@ class User(Base):
     def last_seen(self) -> Optional[datetime]:
         """Последнее время активности (для совместимости)"""
         return self.updated_at
+    
+    __table_args__ = (
+        Index('ix_users_updated_at', 'updated_at'),
+        Index('ix_users_created_at', 'created_at'),
+    )
 
 
 class Game(Base):
@@ -142,6 +164,24 @@ class Tournament(Base):
     def required_channels_list(self, channels: List[str]):
         """Установить список обязательных каналов"""
         self.required_channels = json.dumps(channels)
+    
+    @property
+    def is_registration_open(self) -> bool:
+        """
+        Открыта ли регистрация.
+        Окончание регистрации отражается в статусе (его переводит сервис
+        жизненного цикла), поэтому по времени проверяется только начало.
+        """
+        return (
+            self.status == TournamentStatus.REGISTRATION.value and
+            self.registration_start <= datetime.utcnow()
+        )
+    
+    __table_args__ = (
+        Index('ix_tournaments_status_region', 'status', 'region'),
+        Index('ix_tournaments_updated_at', 'updated_at'),
+        Index('ix_tournaments_created_at', 'created_at'),
+    )
 
 
 class Team(Base):
@@ -158,6 +198,7 @@ class Team(Base):
     block_scope: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)  # 'tournament' или 'global'
     blocked_by: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
     blocked_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    approved_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)  # первое одобрение, UTC
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -174,6 +215,9 @@ class Team(Base):
         UniqueConstraint('tournament_id', 'name', name='uq_tournament_team_name'),
         Index('ix_teams_tournament_id', 'tournament_id'),
         Index('ix_teams_captain_id', 'captain_id'),
+        Index('ix_teams_updated_at', 'updated_at'),
+        Index('ix_teams_created_at', 'created_at'),
+        Index('ix_teams_approved_at', 'approved_at'),
     )
 
 
@@ -213,6 +257,7 @@ class Match(Base):
     bracket_type: Mapped[str] = mapped_column(String(20), nullable=False, default="winner")
     next_match_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("matches.id"), nullable=True)
     scheduled_time: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)  # первое завершение, UTC
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -225,6 +270,7 @@ class Match(Base):
     
     __table_args__ = (
         Index('ix_matches_tournament_id', 'tournament_id'),
+        Index('ix_matches_completed_at', 'completed_at'),
     )
 
 
@@ -289,4 +335,109 @@ class Notification(Base):
     __table_args__ = (
         Index('ix_notifications_user_id', 'user_id'),
         Index('ix_notifications_is_read', 'is_read'),
-    )
\ No newline at end of file
+    )
+
+
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    key: Mapped[Optional[str]] = mapped_column(String(100), nullable=True, unique=True)  # Ключ для идемпотентного планирования
+    payload: Mapped[str] = mapped_column(Text, nullable=False, default="{}")  # JSON
+    run_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # UTC
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default=JobStatus.PENDING.value)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    executed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    
+    @property
+    def payload_dict(self) -> dict:
+        """Получить параметры задачи как словарь"""
+        return json.loads(self.payload or "{}")
+    
+    __table_args__ = (
+        Index('ix_scheduled_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+
+class DailyStat(Base):
+    """Суточный агрегат метрики в разрезе игры, региона и формата"""
+    __tablename__ = "daily_stats"
+    
+    # Разрезы входят в первичный ключ; 0 / "" — разрез к метрике не относится
+    day: Mapped[date] = mapped_column(Date, primary_key=True)  # UTC
+    metric: Mapped[str] = mapped_column(String(30), primary_key=True)
+    game_id: Mapped[int] = mapped_column(Integer, primary_key=True, default=0)
+    region: Mapped[str] = mapped_column(String(20), primary_key=True, default="")
+    format: Mapped[str] = mapped_column(String(30), primary_key=True, default="")
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index('ix_daily_stats_metric_day', 'metric', 'day'),
+    )
+
+
+class DailyStatsCursor(Base):
+    """До какого дня включительно пересчитаны суточные агрегаты"""
+    __tablename__ = "daily_stats_cursor"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)  # единственная строка, id = 1
+    rebuilt_through: Mapped[date] = mapped_column(Date, nullable=False)  # UTC
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # UTC
+
+
+class UserActivityDay(Base):
+    """Активные за сутки пользователи: бит с номером User.id выставлен, если пользователь был активен"""
+    __tablename__ = "user_activity_days"
+    
+    day: Mapped[date] = mapped_column(Date, primary_key=True)  # UTC
+    bitmap: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, default=b"")  # little-endian
+    active_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class DeletedRecord(Base):
+    """Надгробие удаленной записи для инкрементальных выгрузок"""
+    __tablename__ = "deleted_records"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    entity: Mapped[str] = mapped_column(String(30), nullable=False)  # имя выгрузки: teams, tournaments
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('ix_deleted_records_entity_deleted_at', 'entity', 'deleted_at'),
+    )
+
+
+class ExportWatermark(Base):
+    """До какого момента потребитель уже забрал изменения выгрузки"""
+    __tablename__ = "export_watermarks"
+    
+    consumer: Mapped[str] = mapped_column(String(50), primary_key=True)
+    export: Mapped[str] = mapped_column(String(30), primary_key=True)
+    watermark: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)  # UTC
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class FSMRecord(Base):
+    """Состояние FSM пользователя (хранилище aiogram с отложенной записью)"""
+    __tablename__ = "fsm_states"
+    
+    key: Mapped[str] = mapped_column(String(200), primary_key=True)  # ключ DefaultKeyBuilder
+    state: Mapped[Optional[str]] = mapped_column(String(200), nullable=True)
+    data: Mapped[str] = mapped_column(Text, nullable=False, default="{}")  # JSON
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # UTC, время последней записи
+    
+    __table_args__ = (
+        Index('ix_fsm_states_updated_at', 'updated_at'),
+    )
+
+
+class UpdateCursor(Base):
+    """До какого update_id бот обработал апдейты (защита от повторов после перезапуска)"""
+    __tablename__ = "update_cursors"
+    
+    bot_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    update_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # UTC, когда бот последний раз был в сети
@@ -6,6 +6,13 @@ from .game_repository import GameRepository
 from .player_repository import PlayerRepository
 from .match_repository import MatchRepository
 from .action_log_repository import ActionLogRepository
+from .scheduled_job_repository import ScheduledJobRepository
+from .statistics_repository import StatisticsRepository
+from .daily_stats_repository import DailyStatsRepository
+from .activity_repository import ActivityRepository
+from .maintenance_repository import MaintenanceRepository
+from .fsm_repository import FSMRepository
+from .update_cursor_repository import UpdateCursorRepository
 
 __all__ = [
     "UserRepository",
@@ -14,5 +21,12 @@ __all__ = [
     "GameRepository",
     "PlayerRepository",
     "MatchRepository",
-    "ActionLogRepository"
+    "ActionLogRepository",
+    "ScheduledJobRepository",
+    "StatisticsRepository",
+    "DailyStatsRepository",
+    "ActivityRepository",
+    "MaintenanceRepository",
+    "FSMRepository",
+    "UpdateCursorRepository"
 ]
\ No newline at end of file
@@ -3,12 +3,13 @@
 """
 import logging
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
-from sqlalchemy import select, func, desc, and_
+from typing import List, Optional, Dict, Any, Sequence, Tuple
+from sqlalchemy import select, func, desc, and_, insert
 from sqlalchemy.orm import joinedload
 
 from database.db_manager import get_session
 from database.models import ActionLog, User
+from database.repositories.maintenance_repository import MaintenanceRepository
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,38 @@ class ActionLogRepository:
             logger.error(f"Ошибка создания лога: {e}")
             return None
     
+    @staticmethod
+    async def create_logs(entries: Sequence[Tuple[int, str, Optional[str], datetime]]) -> int:
+        """
+        Записать пачку логов одним многострочным INSERT.
+        entries: (Telegram ID, действие, детали, время UTC); записи
+        пользователей, которых нет в базе, пропускаются. Возвращает число записанных.
+        """
+        if not entries:
+            return 0
+        
+        async with get_session() as session:
+            telegram_ids = {telegram_id for telegram_id, _, _, _ in entries}
+            result = await session.execute(
+                select(User.telegram_id, User.id).where(User.telegram_id.in_(telegram_ids))
+            )
+            user_ids = dict(result.all())
+            
+            rows = [
+                {
+                    "user_id": user_ids[telegram_id],
+                    "action": action[:100],
+                    "details": details,
+                    "created_at": created_at,
+                }
+                for telegram_id, action, details, created_at in entries
+                if telegram_id in user_ids
+            ]
+            if rows:
+                await session.execute(insert(ActionLog).values(rows))
+                await session.commit()
+            return len(rows)
+    
     @staticmethod
     async def get_logs(
         limit: int = 10,
@@ -195,21 +228,16 @@ class ActionLogRepository:
             return []
     
     @staticmethod
-    async def delete_old_logs(days: int = 90) -> int:
-        """Удалить логи старше указанного количества дней"""
+    async def delete_old_logs(days: int = 90, chunk_size: int = 1000) -> int:
+        """Удалить логи старше указанного количества дней (порциями, без загрузки строк)"""
         try:
-            async with get_session() as session:
-                cutoff_date = datetime.now() - timedelta(days=days)
-                query = select(ActionLog).where(ActionLog.created_at < cutoff_date)
-                result = await session.execute(query)
-                old_logs = result.scalars().all()
-                
-                count = len(old_logs)
-                for log in old_logs:
-                    await session.delete(log)
-                
-                await session.commit()
-                return count
+            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            total = 0
+            while True:
+                deleted = await MaintenanceRepository.delete_older_than(ActionLog, cutoff_date, chunk_size)
+                total += deleted
+                if deleted < chunk_size:
+                    return total
         except Exception as e:
             logger.error(f"Ошибка удаления старых логов: {e}")
             return 0
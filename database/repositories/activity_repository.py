@@ -0,0 +1,106 @@
+"""
+Репозиторий суточных битовых карт активности пользователей
+
+Карта дня — битовая строка, где бит с номером User.id выставлен, если
+пользователь в этот день взаимодействовал с ботом. «Активные за N дней»
+— OR карт N дней, количество — popcount, удержание — AND карт.
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db_manager import get_session
+from database.models import User, UserActivityDay
+
+
+def ids_to_bitmap(user_ids: Iterable[int]) -> int:
+    """Битовая карта из набора User.id"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    data = bytearray(max(user_ids) // 8 + 1)
+    for user_id in user_ids:
+        data[user_id >> 3] |= 1 << (user_id & 7)
+    return int.from_bytes(data, "little")
+
+
+def bitmap_to_ids(bitmap: int) -> List[int]:
+    """Номера выставленных битов по возрастанию"""
+    ids = []
+    for index, byte in enumerate(_to_bytes(bitmap)):
+        while byte:
+            low = byte & -byte
+            ids.append(index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return ids
+
+
+def active_counts(bitmaps: Dict[date, int], today: date) -> Dict[str, int]:
+    """DAU, WAU и MAU из карт за последние 30 дней"""
+    counts = {}
+    union = 0
+    for offset in range(30):
+        union |= bitmaps.get(today - timedelta(days=offset), 0)
+        if offset == 0:
+            counts["dau"] = union.bit_count()
+        elif offset == 6:
+            counts["wau"] = union.bit_count()
+    counts["mau"] = union.bit_count()
+    return counts
+
+
+def retention(cohort: int, bitmap: int) -> float:
+    """Доля когорты, активной в день карты bitmap, в %"""
+    size = cohort.bit_count()
+    return (cohort & bitmap).bit_count() / size * 100 if size else 0.0
+
+
+def _to_bytes(bitmap: int) -> bytes:
+    return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+
+
+def _from_bytes(data: bytes) -> int:
+    return int.from_bytes(data or b"", "little")
+
+
+class ActivityRepository:
+    """Репозиторий активности пользователей"""
+
+    @staticmethod
+    async def add_activity(day: date, user_ids: Iterable[int]) -> int:
+        """Отметить пользователей активными в день day, вернуть число активных за день"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            row = await session.get(UserActivityDay, day)
+            if row is None:
+                row = UserActivityDay(day=day, bitmap=b"", active_count=0)
+                session.add(row)
+
+            bitmap = _from_bytes(row.bitmap) | ids_to_bitmap(user_ids)
+            row.bitmap = _to_bytes(bitmap)
+            row.active_count = bitmap.bit_count()
+            await session.commit()
+            return row.active_count
+
+    @staticmethod
+    async def get_bitmaps(start: date, end: date) -> Dict[date, int]:
+        """Карты по дням за [start, end]"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = select(UserActivityDay.day, UserActivityDay.bitmap).where(
+                UserActivityDay.day.between(start, end)
+            )
+            return {day: _from_bytes(data) for day, data in (await session.execute(stmt)).all()}
+
+    @staticmethod
+    async def get_cohort(day: date) -> int:
+        """Карта пользователей, зарегистрировавшихся в день day"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = select(User.id).where(func.date(User.created_at) == day.isoformat())
+            return ids_to_bitmap((await session.execute(stmt)).scalars())
@@ -0,0 +1,220 @@
+"""
+Репозиторий суточных агрегатов статистики (таблица daily_stats)
+
+Агрегаты пересчитываются из исходных таблиц за диапазон дней: при
+первом запуске за всю историю (backfill), дальше периодически — с дня
+отметки «пересчитано по» (daily_stats_cursor), так что дни простоя бота
+тоже досчитываются. Пересчет отбирает строки диапазоном по индексам
+дат (created_at, approved_at, completed_at), а не date() от колонки,
+так что периодический досчет читает только строки последних дней.
+Временные окна статистики читаются из daily_stats диапазонным сканом по
+(metric, day) — не больше 366 дней на окно.
+
+Каждая запись относится к дню по дате, которая не меняется при
+последующих правках (создание, первое одобрение, первое завершение):
+иначе правка старой записи переносила бы ее в сегодняшний день, а
+старый, уже не пересчитываемый день продолжал бы ее учитывать.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, delete, insert, func, literal, case, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db_manager import get_session
+from database.models import (
+    DailyStat, DailyStatsCursor, DailyMetric, User, Team, Tournament, Match
+)
+
+logger = logging.getLogger(__name__)
+
+DateRange = Tuple[date, date]  # включительно
+
+
+def stat_windows(today: date) -> Dict[str, DateRange]:
+    """Стандартные окна для экрана статистики по датам"""
+    start_week = today - timedelta(days=today.weekday())
+    start_month = today.replace(day=1)
+    start_last_month = (start_month - timedelta(days=1)).replace(day=1)
+    return {
+        'today': (today, today),
+        'yesterday': (today - timedelta(days=1), today - timedelta(days=1)),
+        'this_week': (start_week, today),
+        'last_week': (start_week - timedelta(days=7), start_week - timedelta(days=1)),
+        'this_month': (start_month, today),
+        'last_month': (start_last_month, start_month - timedelta(days=1)),
+    }
+
+
+def _in_days(column, start: date, end: date):
+    """
+    column в днях [start, end] сравнением самой колонки, по ее индексу.
+    Границы — строки 'YYYY-MM-DD': они верно сравниваются и с func.now()
+    SQLite, и с датами, записанными SQLAlchemy (с микросекундами).
+    """
+    return and_(
+        column >= literal(start.isoformat()),
+        column < literal((end + timedelta(days=1)).isoformat())
+    )
+
+
+def _rollup_queries(start: date, end: date):
+    """
+    SELECT-ы, считающие метрики по дням из исходных таблиц.
+    Одобрения и сыгранные матчи датируются первым одобрением и первым
+    завершением (approved_at, completed_at).
+    """
+    user_day = func.date(User.created_at)
+    yield (
+        select(user_day, literal(DailyMetric.NEW_USERS.value), literal(0), User.region, literal(""), func.count(User.id))
+        .where(_in_days(User.created_at, start, end))
+        .group_by(user_day, User.region)
+    )
+
+    tournament_day = func.date(Tournament.created_at)
+    yield (
+        select(
+            tournament_day, literal(DailyMetric.NEW_TOURNAMENTS.value),
+            Tournament.game_id, Tournament.region, Tournament.format, func.count(Tournament.id)
+        )
+        .where(_in_days(Tournament.created_at, start, end))
+        .group_by(tournament_day, Tournament.game_id, Tournament.region, Tournament.format)
+    )
+
+    for metric, team_column in [
+        (DailyMetric.NEW_TEAMS, Team.created_at),
+        (DailyMetric.TEAM_APPROVALS, Team.approved_at),
+    ]:
+        team_day = func.date(team_column)
+        yield (
+            select(
+                team_day, literal(metric.value),
+                Tournament.game_id, Tournament.region, Tournament.format, func.count(Team.id)
+            )
+            .join(Tournament, Team.tournament_id == Tournament.id)
+            .where(_in_days(team_column, start, end))
+            .group_by(team_day, Tournament.game_id, Tournament.region, Tournament.format)
+        )
+
+    match_day = func.date(Match.completed_at)
+    yield (
+        select(
+            match_day, literal(DailyMetric.MATCHES_COMPLETED.value),
+            Tournament.game_id, Tournament.region, Tournament.format, func.count(Match.id)
+        )
+        .join(Tournament, Match.tournament_id == Tournament.id)
+        .where(_in_days(Match.completed_at, start, end))
+        .group_by(match_day, Tournament.game_id, Tournament.region, Tournament.format)
+    )
+
+
+class DailyStatsRepository:
+    """Репозиторий суточных агрегатов"""
+
+    @staticmethod
+    async def rebuild(start: date, end: date) -> None:
+        """Пересчитать агрегаты за дни [start, end] (идемпотентно) и сдвинуть отметку «пересчитано по»"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            await session.execute(delete(DailyStat).where(DailyStat.day.between(start, end)))
+
+            columns = [DailyStat.day, DailyStat.metric, DailyStat.game_id,
+                       DailyStat.region, DailyStat.format, DailyStat.count]
+            for query in _rollup_queries(start, end):
+                await session.execute(insert(DailyStat).from_select(columns, query))
+
+            cursor = await session.get(DailyStatsCursor, 1)
+            if cursor is None:
+                session.add(DailyStatsCursor(id=1, rebuilt_through=end, updated_at=datetime.utcnow()))
+            elif end >= cursor.rebuilt_through:
+                cursor.rebuilt_through = end
+                cursor.updated_at = datetime.utcnow()
+
+            await session.commit()
+
+    @staticmethod
+    async def get_rebuilt_through() -> Optional[date]:
+        """По какой день включительно агрегаты пересчитаны (None — ни разу)"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            result = await session.execute(select(DailyStatsCursor.rebuilt_through).where(DailyStatsCursor.id == 1))
+            return result.scalar_one_or_none()
+
+    @staticmethod
+    async def get_first_activity_date() -> Optional[date]:
+        """Самая ранняя дата в исходных таблицах (начало backfill)"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            # min по самой колонке — один шаг по индексу
+            stmt = select(
+                select(func.date(func.min(User.created_at))).scalar_subquery(),
+                select(func.date(func.min(Tournament.created_at))).scalar_subquery(),
+            )
+            dates = [value for value in (await session.execute(stmt)).one() if value]
+            return date.fromisoformat(min(dates)) if dates else None
+
+    @staticmethod
+    async def get_total(metric: DailyMetric, start: date, end: date) -> int:
+        """Сумма метрики за дни [start, end]"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = select(func.coalesce(func.sum(DailyStat.count), 0)).where(
+                DailyStat.metric == metric.value,
+                DailyStat.day.between(start, end)
+            )
+            return (await session.execute(stmt)).scalar() or 0
+
+    @staticmethod
+    async def get_window_totals(metric: DailyMetric, windows: Dict[str, DateRange]) -> Dict[str, int]:
+        """Суммы метрики по нескольким окнам одним запросом"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            first = min(start for start, _ in windows.values())
+            last = max(end for _, end in windows.values())
+            stmt = (
+                select(*[
+                    func.coalesce(func.sum(case(
+                        (DailyStat.day.between(start, end), DailyStat.count), else_=0
+                    )), 0)
+                    for start, end in windows.values()
+                ])
+                .where(DailyStat.metric == metric.value, DailyStat.day.between(first, last))
+            )
+            row = (await session.execute(stmt)).one()
+            return dict(zip(windows.keys(), row))
+
+    @staticmethod
+    async def get_daily_series(metric: DailyMetric, start: date, end: date) -> Dict[date, int]:
+        """Значения метрики по дням (только дни с ненулевым значением), от новых к старым"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = (
+                select(DailyStat.day, func.sum(DailyStat.count))
+                .where(DailyStat.metric == metric.value, DailyStat.day.between(start, end))
+                .group_by(DailyStat.day)
+                .order_by(DailyStat.day.desc())
+            )
+            return {day: count for day, count in (await session.execute(stmt)).all()}
+
+    @staticmethod
+    async def get_peak_days(metric: DailyMetric, limit: int = 10) -> List[Tuple[date, int]]:
+        """Дни с максимальным значением метрики"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            total = func.sum(DailyStat.count)
+            stmt = (
+                select(DailyStat.day, total)
+                .where(DailyStat.metric == metric.value)
+                .group_by(DailyStat.day)
+                .order_by(total.desc())
+                .limit(limit)
+            )
+            return [(day, count) for day, count in (await session.execute(stmt)).all()]
@@ -0,0 +1,91 @@
+"""
+Репозиторий для потоковой выгрузки таблиц
+
+Строки читаются порциями по ключу (keyset pagination: WHERE key > last
+ORDER BY key LIMIT n), так что каждая порция — короткий индексный скан,
+а в памяти одновременно находится не больше chunk_size строк. Ключ может
+быть составным, например (updated_at, id) для дельт: сравнение кортежей
+SQLite ведет по индексу updated_at (id там — rowid) без сортировки.
+
+Для инкрементальных выгрузок здесь же хранятся отметки потребителей
+(ExportWatermark): момент, до которого изменения уже забраны.
+"""
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, String, literal, select, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db_manager import get_session
+from database.models import ExportWatermark
+
+
+class ExportRepository:
+    """Репозиторий потоковой выгрузки"""
+
+    @staticmethod
+    async def iter_chunks(
+        stmt: Select,
+        key_columns,
+        chunk_size: int = 1000,
+        after: Sequence[Any] = ()
+    ) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        """
+        Порции строк запроса stmt по возрастанию ключа key_columns
+        (столбец или кортеж столбцов).
+        after — нижняя граница (не включая) для первых столбцов ключа;
+        дальше ее заменяет ключ последней прочитанной строки. Отдельное
+        условие на эти столбцы в stmt помешало бы SQLite начинать каждую
+        порцию поиском по индексу.
+        """
+        keys = tuple(key_columns) if isinstance(key_columns, (tuple, list)) else (key_columns,)
+        # Ключ читается в том виде, в каком он хранится: DateTime после
+        # разбора и повторной привязки сравнивался бы как другая строка
+        stmt = stmt.add_columns(*[type_coerce(key, String).label(f"_key_{index}") for index, key in enumerate(keys)])
+        bound = tuple(after)
+        while True:
+            chunk_stmt = stmt.order_by(*keys).limit(chunk_size)
+            if bound:
+                if len(bound) == 1:
+                    chunk_stmt = chunk_stmt.where(keys[0] > bound[0])
+                else:
+                    chunk_stmt = chunk_stmt.where(tuple_(*keys[:len(bound)]) > tuple_(*bound))
+
+            # Отдельная короткая сессия на порцию: не держим транзакцию, пока порция пишется в файл
+            async with get_session() as session:
+                session: AsyncSession
+                rows = list((await session.execute(chunk_stmt)).all())
+
+            if not rows:
+                return
+            yield [row[:-len(keys)] for row in rows]
+            if len(rows) < chunk_size:
+                return
+            bound = tuple(literal(value) for value in rows[-1][-len(keys):])
+    
+    @staticmethod
+    async def get_watermark(consumer: str, export: str) -> Optional[datetime]:
+        """Отметка потребителя для выгрузки (None — еще ничего не забирал)"""
+        async with get_session() as session:
+            session: AsyncSession
+            
+            result = await session.execute(
+                select(ExportWatermark.watermark).where(
+                    ExportWatermark.consumer == consumer,
+                    ExportWatermark.export == export
+                )
+            )
+            return result.scalar_one_or_none()
+    
+    @staticmethod
+    async def set_watermark(consumer: str, export: str, watermark: datetime) -> None:
+        """Сдвинуть отметку потребителя после успешной доставки выгрузки"""
+        async with get_session() as session:
+            session: AsyncSession
+            
+            row = await session.get(ExportWatermark, (consumer, export))
+            if row is None:
+                session.add(ExportWatermark(consumer=consumer, export=export, watermark=watermark))
+            else:
+                row.watermark = watermark
+            await session.commit()
@@ -0,0 +1,76 @@
+"""
+Репозиторий для хранилища состояний FSM
+
+Пишется только из фонового сброса services.fsm_storage.DatabaseStorage: вся пачка
+измененных ключей — одна транзакция.
+"""
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db_manager import get_session
+from database.models import FSMRecord
+
+# (ключ, состояние, данные в JSON, время записи UTC)
+FSMRow = Tuple[str, Optional[str], str, datetime]
+
+
+class FSMRepository:
+    """Репозиторий состояний FSM"""
+
+    @staticmethod
+    async def get_record(key: str) -> Optional[FSMRow]:
+        """Сохраненное состояние по ключу"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            result = await session.execute(
+                select(FSMRecord.key, FSMRecord.state, FSMRecord.data, FSMRecord.updated_at)
+                .where(FSMRecord.key == key)
+            )
+            row = result.first()
+            return tuple(row) if row else None
+
+    @staticmethod
+    async def save_records(rows: Sequence[FSMRow], deleted_keys: Sequence[str]) -> None:
+        """Записать измененные состояния и удалить очищенные одной транзакцией"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            if rows:
+                keys = [row[0] for row in rows]
+                result = await session.execute(select(FSMRecord).where(FSMRecord.key.in_(keys)))
+                existing = {record.key: record for record in result.scalars()}
+                for key, state, data, updated_at in rows:
+                    record = existing.get(key)
+                    if record is None:
+                        session.add(FSMRecord(key=key, state=state, data=data, updated_at=updated_at))
+                    else:
+                        record.state = state
+                        record.data = data
+                        record.updated_at = updated_at
+
+            if deleted_keys:
+                await session.execute(delete(FSMRecord).where(FSMRecord.key.in_(list(deleted_keys))))
+
+            await session.commit()
+
+    @staticmethod
+    async def delete_expired(cutoff: datetime, limit: int) -> int:
+        """Удалить не больше limit состояний, не менявшихся с cutoff"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            result = await session.execute(
+                select(FSMRecord.key)
+                .where(FSMRecord.updated_at < cutoff)
+                .order_by(FSMRecord.updated_at)
+                .limit(limit)
+            )
+            keys = list(result.scalars())
+            if keys:
+                await session.execute(delete(FSMRecord).where(FSMRecord.key.in_(keys)))
+                await session.commit()
+            return len(keys)
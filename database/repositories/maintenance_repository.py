@@ -0,0 +1,86 @@
+"""
+Репозиторий для обслуживания базы данных
+
+Удаление старых строк порциями и служебные PRAGMA SQLite. Каждый вызов —
+отдельная короткая транзакция, чтобы обслуживание не держало блокировку
+записи дольше одной порции.
+"""
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db_manager import get_session
+
+
+class MaintenanceRepository:
+    """Репозиторий обслуживания базы"""
+
+    @staticmethod
+    async def delete_older_than(model, cutoff: datetime, limit: int) -> int:
+        """
+        Удалить не больше limit самых старых строк model с created_at < cutoff.
+        DELETE ... LIMIT в стандартной сборке SQLite недоступен, поэтому
+        порция выбирается подзапросом по первичному ключу: id растут вместе
+        с created_at, так что скан по id останавливается на первой порции.
+        """
+        async with get_session() as session:
+            session: AsyncSession
+
+            chunk = (
+                select(model.id)
+                .where(model.created_at < cutoff)
+                .order_by(model.id)
+                .limit(limit)
+                .scalar_subquery()
+            )
+            result = await session.execute(
+                delete(model).where(model.id.in_(chunk)).execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            return result.rowcount
+
+    @staticmethod
+    async def get_pragma(name: str):
+        """Значение PRAGMA без аргументов (auto_vacuum, freelist_count, page_count...)"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            result = await session.execute(text(f"PRAGMA {name}"))
+            return result.scalar()
+
+    @staticmethod
+    async def incremental_vacuum(pages: int) -> int:
+        """Вернуть файловой системе до pages свободных страниц; возвращает число освобожденных"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            before = (await session.execute(text("PRAGMA freelist_count"))).scalar()
+            # Через execute() модуль sqlite3 делает один шаг PRAGMA — одну страницу;
+            # executescript выполняет его до конца
+            connection = await session.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            after = (await session.execute(text("PRAGMA freelist_count"))).scalar()
+            return before - after
+
+    @staticmethod
+    async def optimize(analysis_limit: int) -> None:
+        """PRAGMA optimize с ограничением числа строк, просматриваемых ANALYZE"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            await session.execute(text(f"PRAGMA analysis_limit = {int(analysis_limit)}"))
+            await session.execute(text("PRAGMA optimize"))
+            await session.commit()
+
+    @staticmethod
+    async def wal_checkpoint(mode: str = "PASSIVE") -> Tuple[int, int, int]:
+        """Контрольная точка WAL: (занято, страниц в журнале, перенесено в базу)"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            row = (await session.execute(text(f"PRAGMA wal_checkpoint({mode})"))).one()
+            await session.commit()
+            return tuple(row)
@@ -1,13 +1,16 @@
 """
 Репозиторий для работы с матчами
 """
-from typing import List, Optional
-from sqlalchemy import select, update, and_
+from typing import Dict, List, Optional
+from sqlalchemy import select, update, and_, func
 from sqlalchemy.orm import selectinload
 
 from database.models import Match, MatchStatus, Team, TeamStatus
 from database.db_manager import DatabaseSession
 
+# Дата первого завершения матча: повторный ввод счета ее не сдвигает
+_COMPLETED_AT = func.coalesce(Match.completed_at, func.now())
+
 
 class MatchRepository:
     """Репозиторий для работы с матчами"""
@@ -109,6 +112,18 @@ class MatchRepository:
             status=MatchStatus.PENDING.value
         )
     
+    @staticmethod
+    async def get_status_counts(tournament_id: int) -> Dict[str, int]:
+        """Количество матчей турнира по статусам (одним запросом)"""
+        async with DatabaseSession() as session:
+            query = (
+                select(Match.status, func.count(Match.id))
+                .where(Match.tournament_id == tournament_id)
+                .group_by(Match.status)
+            )
+            result = await session.execute(query)
+            return {status: count for status, count in result.all()}
+    
     @staticmethod
     async def get_completed_matches(tournament_id: int) -> List[Match]:
         """Получение завершенных матчей турнира"""
@@ -157,7 +172,8 @@ class MatchRepository:
                     team1_score=team1_score,
                     team2_score=team2_score,
                     winner_id=winner_id,
-                    status=MatchStatus.COMPLETED.value if winner_id else MatchStatus.PENDING.value
+                    status=MatchStatus.COMPLETED.value if winner_id else MatchStatus.PENDING.value,
+                    completed_at=_COMPLETED_AT if winner_id else Match.completed_at
                 )
             )
             await session.commit()
@@ -197,7 +213,8 @@ class MatchRepository:
                 .where(Match.id == match_id)
                 .values(
                     winner_id=winner_id,
-                    status=MatchStatus.COMPLETED.value
+                    status=MatchStatus.COMPLETED.value,
+                    completed_at=_COMPLETED_AT
                 )
             )
             await session.commit()
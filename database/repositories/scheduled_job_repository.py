@@ -0,0 +1,225 @@
+"""
+Репозиторий для работы с отложенными задачами
+"""
+import json
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db_manager import get_session
+from database.models import ScheduledJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledJobRepository:
+    """Репозиторий для работы с отложенными задачами"""
+
+    @staticmethod
+    async def create_job(
+        job_type: str,
+        run_at: datetime,
+        payload: Optional[dict] = None,
+        key: Optional[str] = None
+    ) -> ScheduledJob:
+        """
+        Создать задачу или перепланировать существующую с тем же ключом.
+        Выполненная задача с ключом снова становится ожидающей, если время запуска изменилось.
+        """
+        async with get_session() as session:
+            session: AsyncSession
+
+            job = None
+            if key:
+                result = await session.execute(select(ScheduledJob).where(ScheduledJob.key == key))
+                job = result.scalar_one_or_none()
+
+            payload_json = json.dumps(payload or {}, ensure_ascii=False)
+
+            if job:
+                if job.run_at != run_at or job.status == JobStatus.PENDING.value:
+                    if job.run_at != run_at:
+                        job.status = JobStatus.PENDING.value
+                        job.error = None
+                        job.executed_at = None
+                    job.run_at = run_at
+                    job.payload = payload_json
+                    job.job_type = job_type
+            else:
+                job = ScheduledJob(
+                    job_type=job_type,
+                    key=key,
+                    payload=payload_json,
+                    run_at=run_at,
+                    status=JobStatus.PENDING.value
+                )
+                session.add(job)
+
+            await session.commit()
+            await session.refresh(job)
+            return job
+
+    @staticmethod
+    async def get_by_id(job_id: int) -> Optional[ScheduledJob]:
+        """Получить задачу по ID"""
+        async with get_session() as session:
+            return await session.get(ScheduledJob, job_id)
+
+    @staticmethod
+    async def get_pending_jobs() -> List[ScheduledJob]:
+        """Получить все ожидающие задачи (для восстановления кучи при запуске)"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = (
+                select(ScheduledJob)
+                .where(ScheduledJob.status == JobStatus.PENDING.value)
+                .order_by(ScheduledJob.run_at.asc())
+            )
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+
+    @staticmethod
+    async def get_running_jobs() -> List[ScheduledJob]:
+        """Получить задачи, выполнявшиеся при остановке бота (для восстановления при запуске)"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = select(ScheduledJob).where(ScheduledJob.status == JobStatus.RUNNING.value)
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+
+    @staticmethod
+    async def claim(job_id: int) -> Optional[ScheduledJob]:
+        """
+        Взять задачу в работу: pending -> running одним UPDATE.
+        None — задачу уже взяли, отменили или выполнили.
+        """
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = (
+                update(ScheduledJob)
+                .where(
+                    ScheduledJob.id == job_id,
+                    ScheduledJob.status == JobStatus.PENDING.value
+                )
+                .values(status=JobStatus.RUNNING.value)
+            )
+            result = await session.execute(stmt)
+            await session.commit()
+            if result.rowcount == 0:
+                return None
+            return await session.get(ScheduledJob, job_id)
+
+    @staticmethod
+    async def requeue(job_id: int, run_at: datetime) -> bool:
+        """Вернуть прерванную задачу в ожидающие (если ее не перепланировали)"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = (
+                update(ScheduledJob)
+                .where(
+                    ScheduledJob.id == job_id,
+                    ScheduledJob.status == JobStatus.RUNNING.value,
+                    ScheduledJob.run_at == run_at
+                )
+                .values(status=JobStatus.PENDING.value)
+            )
+            result = await session.execute(stmt)
+            await session.commit()
+            return result.rowcount > 0
+
+    @staticmethod
+    async def save_payload(job_id: int, payload: dict) -> None:
+        """Перезаписать параметры задачи (прогресс выполняемой задачи)"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = (
+                update(ScheduledJob)
+                .where(ScheduledJob.id == job_id)
+                .values(payload=json.dumps(payload, ensure_ascii=False))
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    @staticmethod
+    async def get_upcoming_by_type(job_type: str, limit: int = 20) -> List[ScheduledJob]:
+        """Получить ближайшие ожидающие задачи указанного типа"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = (
+                select(ScheduledJob)
+                .where(
+                    ScheduledJob.status == JobStatus.PENDING.value,
+                    ScheduledJob.job_type == job_type
+                )
+                .order_by(ScheduledJob.run_at.asc())
+                .limit(limit)
+            )
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+
+    @staticmethod
+    async def mark_done(job_id: int, run_at: Optional[datetime] = None) -> bool:
+        """
+        Отметить выполняемую задачу выполненной.
+        Если передан run_at, задача, перепланированная во время выполнения
+        (например, периодическая задача сама назначила следующий запуск), не трогается.
+        """
+        return await ScheduledJobRepository._finish(job_id, JobStatus.DONE, run_at=run_at)
+
+    @staticmethod
+    async def mark_failed(job_id: int, error: str, run_at: Optional[datetime] = None) -> bool:
+        """Отметить выполняемую задачу завершившейся с ошибкой"""
+        return await ScheduledJobRepository._finish(job_id, JobStatus.FAILED, error, run_at)
+
+    @staticmethod
+    async def cancel(job_id: int) -> bool:
+        """Отменить ожидающую задачу"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            stmt = (
+                update(ScheduledJob)
+                .where(
+                    ScheduledJob.id == job_id,
+                    ScheduledJob.status == JobStatus.PENDING.value
+                )
+                .values(status=JobStatus.CANCELLED.value)
+            )
+            result = await session.execute(stmt)
+            await session.commit()
+            return result.rowcount > 0
+
+    @staticmethod
+    async def _finish(
+        job_id: int,
+        status: JobStatus,
+        error: Optional[str] = None,
+        run_at: Optional[datetime] = None
+    ) -> bool:
+        async with get_session() as session:
+            session: AsyncSession
+
+            conditions = [
+                ScheduledJob.id == job_id,
+                ScheduledJob.status == JobStatus.RUNNING.value
+            ]
+            if run_at is not None:
+                conditions.append(ScheduledJob.run_at == run_at)
+
+            stmt = (
+                update(ScheduledJob)
+                .where(*conditions)
+                .values(status=status.value, error=error, executed_at=datetime.utcnow())
+            )
+            result = await session.execute(stmt)
+            await session.commit()
+            return result.rowcount > 0
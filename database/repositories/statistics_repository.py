@@ -0,0 +1,388 @@
+"""
+Репозиторий агрегированной статистики для админ-панели
+
+Каждый экран статистики собирается одним-двумя SQL-запросами с условной
+агрегацией (COUNT(*) FILTER (WHERE ...)) вместо десятка отдельных COUNT.
+Результат — типизированный снимок, который хендлер только форматирует.
+Хендлеры читают снимки через get_cached_* (см. database/stats_cache.py).
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, func, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db_manager import get_session
+from database.repositories.activity_repository import (
+    ActivityRepository, active_counts, bitmap_to_ids, retention
+)
+from database.stats_cache import stats_cache, USERS, TEAMS, TOURNAMENTS
+from database.models import User, UserRole, Team, TeamStatus, Player, Tournament, TournamentStatus, Game
+
+
+@dataclass
+class GeneralStatsSnapshot:
+    """Общая статистика"""
+    total_users: int = 0
+    total_tournaments: int = 0
+    total_teams: int = 0
+    users_30d: int = 0
+    tournaments_30d: int = 0
+    teams_30d: int = 0
+    users_7d: int = 0
+    tournaments_7d: int = 0
+    teams_7d: int = 0
+    languages: Dict[str, int] = field(default_factory=dict)
+    regions: Dict[str, int] = field(default_factory=dict)
+    generated_at: datetime = field(default_factory=datetime.utcnow)
+
+
+@dataclass
+class UserStatsSnapshot:
+    """Статистика пользователей"""
+    total: int = 0
+    active: int = 0
+    admins: int = 0
+    blocked: int = 0
+    dau: int = 0
+    wau: int = 0
+    mau: int = 0
+    retention_d1: float = 0.0  # % зарегистрированных 7 дней назад, активных на следующий день
+    retention_d7: float = 0.0  # ... и сегодня
+    daily_registrations: Dict[str, int] = field(default_factory=dict)  # дата -> регистраций, от сегодня назад
+    most_active: List[Tuple[str, int]] = field(default_factory=list)  # имя -> активных дней из 30
+    generated_at: datetime = field(default_factory=datetime.utcnow)
+
+
+@dataclass
+class TournamentStatsSnapshot:
+    """Статистика турниров (общая для всех экранов турнирной статистики)"""
+    total: int = 0
+    by_status: Dict[str, int] = field(default_factory=dict)
+    by_format: Dict[str, int] = field(default_factory=dict)
+    by_game: Dict[str, int] = field(default_factory=dict)  # по убыванию количества
+    by_game_format: Dict[Tuple[str, str], int] = field(default_factory=dict)  # по убыванию количества
+    created_30d: int = 0
+    created_this_month: int = 0
+    created_this_week: int = 0
+    average_max_teams: float = 0.0
+    generated_at: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def active(self) -> int:
+        return self.by_status.get(TournamentStatus.IN_PROGRESS.value, 0)
+
+    @property
+    def completed(self) -> int:
+        return self.by_status.get(TournamentStatus.COMPLETED.value, 0)
+
+    @property
+    def cancelled(self) -> int:
+        return self.by_status.get(TournamentStatus.CANCELLED.value, 0)
+
+    @property
+    def paused(self) -> int:
+        return self.by_status.get('paused', 0)
+
+    @property
+    def upcoming(self) -> int:
+        return (
+            self.by_status.get(TournamentStatus.REGISTRATION.value, 0) +
+            self.by_status.get(TournamentStatus.REGISTRATION_CLOSED.value, 0)
+        )
+
+    @property
+    def completion_rate(self) -> float:
+        return (self.completed / self.total * 100) if self.total else 0.0
+
+
+@dataclass
+class TeamStatsSnapshot:
+    """Статистика команд"""
+    total: int = 0
+    approved: int = 0
+    pending: int = 0
+    rejected: int = 0
+    average_size: float = 0.0
+    by_tournament: Dict[str, int] = field(default_factory=dict)  # одобренные команды, по убыванию
+    top_captains: List[Tuple[str, int]] = field(default_factory=list)
+    generated_at: datetime = field(default_factory=datetime.utcnow)
+
+
+def _add(counter: Dict, key, value: int) -> None:
+    counter[key] = counter.get(key, 0) + value
+
+
+def _sorted_desc(counter: Dict) -> Dict:
+    return dict(sorted(counter.items(), key=lambda item: item[1], reverse=True))
+
+
+class StatisticsRepository:
+    """Репозиторий агрегированной статистики"""
+
+    @staticmethod
+    async def get_general_stats() -> GeneralStatsSnapshot:
+        """Общая статистика: 2 запроса"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            now = datetime.utcnow()
+            month_ago = now - timedelta(days=30)
+            week_ago = now - timedelta(days=7)
+
+            def created_counts(model, entity: str):
+                return select(
+                    literal(entity).label("entity"),
+                    func.count(model.id).label("total"),
+                    func.count(model.id).filter(model.created_at >= month_ago).label("last_30d"),
+                    func.count(model.id).filter(model.created_at >= week_ago).label("last_7d"),
+                )
+
+            snapshot = GeneralStatsSnapshot(generated_at=now)
+
+            # 1. Итоги и новые записи по трем таблицам одним UNION ALL
+            stmt = union_all(
+                created_counts(User, "users"),
+                created_counts(Tournament, "tournaments"),
+                created_counts(Team, "teams"),
+            )
+            for entity, total, last_30d, last_7d in (await session.execute(stmt)).all():
+                setattr(snapshot, f"total_{entity}", total)
+                setattr(snapshot, f"{entity}_30d", last_30d)
+                setattr(snapshot, f"{entity}_7d", last_7d)
+
+            # 2. Языки и регионы — одна группировка, разворачиваем в Python
+            stmt = (
+                select(User.language, User.region, func.count(User.id))
+                .where(User.is_blocked == False)
+                .group_by(User.language, User.region)
+            )
+            for language, region, count in (await session.execute(stmt)).all():
+                _add(snapshot.languages, language, count)
+                if region is not None:
+                    _add(snapshot.regions, region, count)
+
+            return snapshot
+
+    @staticmethod
+    async def get_user_stats(top_limit: int = 5, days: int = 7) -> UserStatsSnapshot:
+        """
+        Статистика пользователей: 4 запроса.
+        Активность берется из суточных битовых карт за 30 дней, без сканирования users.
+        """
+        now = datetime.utcnow()
+        today = now.date()
+        dates = [(today - timedelta(days=offset)).isoformat() for offset in range(days)]
+        not_blocked = User.is_blocked == False
+
+        # 1-2. Карты активности за 30 дней и когорта недельной давности
+        bitmaps = await ActivityRepository.get_bitmaps(today - timedelta(days=29), today)
+        cohort_day = today - timedelta(days=7)
+        cohort = await ActivityRepository.get_cohort(cohort_day)
+
+        active_days = Counter()
+        for bitmap in bitmaps.values():
+            active_days.update(bitmap_to_ids(bitmap))
+        top_ids = [user_id for user_id, _ in active_days.most_common(top_limit * 2)]
+
+        async with get_session() as session:
+            session: AsyncSession
+
+            # 3. Все счетчики, включая регистрации по дням, одним проходом по users
+            stmt = select(
+                func.count(User.id),
+                func.count(User.id).filter(not_blocked),
+                func.count(User.id).filter(User.role == UserRole.ADMIN.value),
+                func.count(User.id).filter(User.is_blocked == True),
+                *[func.count(User.id).filter(func.date(User.created_at) == day) for day in dates],
+            )
+            row = (await session.execute(stmt)).one()
+            total, active, admins, blocked = row[:4]
+
+            # 4. Имена самых активных (с запасом на заблокированных)
+            stmt = (
+                select(User.id, User.full_name, User.username, User.telegram_id)
+                .where(User.id.in_(top_ids), not_blocked)
+            )
+            names = {
+                user_id: full_name or (f"@{username}" if username else f"ID:{telegram_id}")
+                for user_id, full_name, username, telegram_id in (await session.execute(stmt)).all()
+            }
+
+        most_active = [
+            (names[user_id], active_days[user_id]) for user_id in top_ids if user_id in names
+        ][:top_limit]
+
+        return UserStatsSnapshot(
+            total=total,
+            active=active,
+            admins=admins,
+            blocked=blocked,
+            **active_counts(bitmaps, today),
+            retention_d1=retention(cohort, bitmaps.get(cohort_day + timedelta(days=1), 0)),
+            retention_d7=retention(cohort, bitmaps.get(today, 0)),
+            daily_registrations=dict(zip(dates, row[4:])),
+            most_active=most_active,
+            generated_at=now,
+        )
+
+    @staticmethod
+    async def get_tournament_stats() -> TournamentStatsSnapshot:
+        """
+        Статистика турниров: 1 запрос.
+        Группировка по (статус, формат, игра) дает все разрезы сразу,
+        итоги и средние досчитываются в Python по нескольким строкам.
+        """
+        async with get_session() as session:
+            session: AsyncSession
+
+            now = datetime.utcnow()
+            month_ago = now - timedelta(days=30)
+            start_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            start_week = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+
+            stmt = (
+                select(
+                    Tournament.status,
+                    Tournament.format,
+                    Game.name,
+                    func.count(Tournament.id),
+                    func.count(Tournament.id).filter(Tournament.created_at >= month_ago),
+                    func.count(Tournament.id).filter(Tournament.created_at >= start_month),
+                    func.count(Tournament.id).filter(Tournament.created_at >= start_week),
+                    func.sum(Tournament.max_teams),
+                )
+                .join(Game, Tournament.game_id == Game.id)
+                .group_by(Tournament.status, Tournament.format, Game.name)
+            )
+
+            snapshot = TournamentStatsSnapshot(generated_at=now)
+            max_teams_sum = 0
+            for status, format_type, game_name, count, last_30d, this_month, this_week, max_teams in (
+                await session.execute(stmt)
+            ).all():
+                snapshot.total += count
+                snapshot.created_30d += last_30d
+                snapshot.created_this_month += this_month
+                snapshot.created_this_week += this_week
+                max_teams_sum += max_teams or 0
+                _add(snapshot.by_status, status, count)
+                _add(snapshot.by_format, format_type, count)
+                _add(snapshot.by_game, game_name, count)
+                _add(snapshot.by_game_format, (game_name, format_type), count)
+
+            snapshot.by_game = _sorted_desc(snapshot.by_game)
+            snapshot.by_game_format = _sorted_desc(snapshot.by_game_format)
+            if snapshot.total:
+                snapshot.average_max_teams = max_teams_sum / snapshot.total
+            return snapshot
+
+    @staticmethod
+    async def get_team_stats(top_limit: int = 5) -> TeamStatsSnapshot:
+        """Статистика команд: 3 запроса"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            approved = Team.status == TeamStatus.APPROVED.value
+            players_count = (
+                select(func.count(Player.id))
+                .where(Player.team_id == Team.id)
+                .scalar_subquery()
+            )
+
+            # 1. Счетчики по статусам и средний размер одобренной команды
+            stmt = select(
+                func.count(Team.id),
+                func.count(Team.id).filter(approved),
+                func.count(Team.id).filter(Team.status == TeamStatus.PENDING.value),
+                func.count(Team.id).filter(Team.status == TeamStatus.REJECTED.value),
+                func.avg(players_count).filter(approved),
+            )
+            total, approved_count, pending, rejected, average_size = (await session.execute(stmt)).one()
+
+            # 2. Одобренные команды по турнирам
+            teams_count = func.count(Team.id)
+            stmt = (
+                select(Tournament.name, teams_count)
+                .join(Tournament, Team.tournament_id == Tournament.id)
+                .where(approved)
+                .group_by(Tournament.name)
+                .order_by(teams_count.desc())
+            )
+            by_tournament = {name: count for name, count in (await session.execute(stmt)).all()}
+
+            # 3. Капитаны с наибольшим числом одобренных команд
+            stmt = (
+                select(User.full_name, teams_count)
+                .join(User, Team.captain_id == User.id)
+                .where(approved)
+                .group_by(User.id, User.full_name)
+                .order_by(teams_count.desc())
+                .limit(top_limit)
+            )
+            top_captains = [(name, count) for name, count in (await session.execute(stmt)).all()]
+
+            return TeamStatsSnapshot(
+                total=total,
+                approved=approved_count,
+                pending=pending,
+                rejected=rejected,
+                average_size=float(average_size or 0.0),
+                by_tournament=by_tournament,
+                top_captains=top_captains,
+            )
+
+    @staticmethod
+    async def get_top_tournaments_by_teams(limit: int = 5) -> List[Tuple[str, int]]:
+        """Топ турниров по количеству команд: 1 запрос, без загрузки самих команд"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            teams_count = func.count(Team.id)
+            stmt = (
+                select(Tournament.name, teams_count)
+                .outerjoin(Team, Team.tournament_id == Tournament.id)
+                .group_by(Tournament.id)
+                .order_by(teams_count.desc())
+                .limit(limit)
+            )
+            return [(name, count) for name, count in (await session.execute(stmt)).all()]
+
+    @staticmethod
+    async def get_cached_general_stats() -> GeneralStatsSnapshot:
+        """Общая статистика из кэша"""
+        return await stats_cache.get_or_compute(
+            "general", StatisticsRepository.get_general_stats, (USERS, TOURNAMENTS, TEAMS)
+        )
+
+    @staticmethod
+    async def get_cached_user_stats() -> UserStatsSnapshot:
+        """Статистика пользователей из кэша"""
+        return await stats_cache.get_or_compute(
+            "users", StatisticsRepository.get_user_stats, (USERS,)
+        )
+
+    @staticmethod
+    async def get_cached_team_stats() -> TeamStatsSnapshot:
+        """Статистика команд из кэша"""
+        return await stats_cache.get_or_compute(
+            "teams", StatisticsRepository.get_team_stats, (TEAMS, USERS, TOURNAMENTS)
+        )
+
+    @staticmethod
+    async def get_cached_tournament_stats() -> TournamentStatsSnapshot:
+        """Статистика турниров из кэша"""
+        return await stats_cache.get_or_compute(
+            "tournaments", StatisticsRepository.get_tournament_stats, (TOURNAMENTS,)
+        )
+
+    @staticmethod
+    async def get_cached_top_tournaments_by_teams(limit: int = 5) -> List[Tuple[str, int]]:
+        """Топ турниров по количеству команд из кэша"""
+        return await stats_cache.get_or_compute(
+            f"top_tournaments:{limit}",
+            lambda: StatisticsRepository.get_top_tournaments_by_teams(limit),
+            (TOURNAMENTS, TEAMS)
+        )
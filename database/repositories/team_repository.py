@@ -5,7 +5,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from database.db_manager import get_session
-from database.models import Team, TeamStatus, Player, Tournament, User
+from database.stats_cache import stats_cache, TEAMS
+from database.models import Team, TeamStatus, Player, Tournament, User, DeletedRecord
+
+
+def _status_values(status: str) -> dict:
+    """Значения для смены статуса: при одобрении запоминается дата первого одобрения"""
+    values = {"status": status}
+    if status == TeamStatus.APPROVED.value:
+        values["approved_at"] = func.coalesce(Team.approved_at, func.now())
+    return values
 
 
 class TeamRepository:
@@ -32,6 +41,7 @@ class TeamRepository:
             
             session.add(team)
             await session.commit()
+            stats_cache.invalidate(TEAMS)
             await session.refresh(team)
             
             return team
@@ -103,7 +113,7 @@ class TeamRepository:
         async with get_session() as session:
             session: AsyncSession
             
-            values = {"status": status.value}
+            values = _status_values(status.value)
             if rejection_reason is not None:
                 values["rejection_reason"] = rejection_reason
             
@@ -115,6 +125,7 @@ class TeamRepository:
             
             result = await session.execute(stmt)
             await session.commit()
+            stats_cache.invalidate(TEAMS)
             
             return result.rowcount > 0
     
@@ -153,7 +164,9 @@ class TeamRepository:
             team = await session.get(Team, team_id)
             if team:
                 await session.delete(team)
+                session.add(DeletedRecord(entity="teams", entity_id=team_id))
                 await session.commit()
+                stats_cache.invalidate(TEAMS)
                 return True
             
             return False
@@ -407,7 +420,7 @@ class TeamRepository:
                 update(Team)
                 .where(Team.id == team_id)
                 .values(
-                    status=TeamStatus.APPROVED.value,
+                    **_status_values(TeamStatus.APPROVED.value),
                     block_reason=None,
                     block_scope=None,
                     blocked_by=None,
@@ -472,9 +485,10 @@ class TeamRepository:
         async with get_session() as session:
             session: AsyncSession
             
-            stmt = update(Team).where(Team.id == team_id).values(status=status)
+            stmt = update(Team).where(Team.id == team_id).values(**_status_values(status))
             result = await session.execute(stmt)
             await session.commit()
+            stats_cache.invalidate(TEAMS)
             return result.rowcount > 0
     
     @staticmethod
@@ -698,9 +712,11 @@ class TeamRepository:
             if not team:
                 return False
             
-            # Удаляем команду
+            # Удаляем команду и оставляем надгробие для дельта-выгрузок
             await session.delete(team)
+            session.add(DeletedRecord(entity="teams", entity_id=team_id))
             await session.commit()
+            stats_cache.invalidate(TEAMS)
             return True
     
     @staticmethod
@@ -722,11 +738,13 @@ class TeamRepository:
                 captain_id=captain_id,
                 description=description,
                 logo_file_id=logo_file_id,
-                status=status
+                status=status,
+                approved_at=func.now() if status == TeamStatus.APPROVED.value else None
             )
             
             session.add(new_team)
             await session.commit()
+            stats_cache.invalidate(TEAMS)
             await session.refresh(new_team)
             
             return new_team
\ No newline at end of file
@@ -1,12 +1,14 @@
 from typing import Optional, List, Tuple, Dict
-from datetime import datetime, timezone, timedelta, date
+from datetime import datetime, date
 from sqlalchemy import select, update, and_, func, desc, cast, DATE
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 import logging
 
 from database.db_manager import get_session
-from database.models import Tournament, TournamentStatus, TournamentFormat, Game
+from database.stats_cache import stats_cache, TEAMS, TOURNAMENTS
+from database.models import Tournament, TournamentStatus, TournamentFormat, Game, DailyMetric, Team, DeletedRecord
+from database.repositories.daily_stats_repository import DailyStatsRepository, stat_windows
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +64,7 @@ class TournamentRepository:
             
             session.add(tournament)
             await session.commit()
+            stats_cache.invalidate(TOURNAMENTS)
             await session.refresh(tournament)
             
             logger.info(f"Tournament after commit: logo={tournament.logo_file_id}, rules={tournament.rules_file_id}")
@@ -88,23 +91,27 @@ class TournamentRepository:
             return result.scalar_one_or_none()
     
     @staticmethod
-    async def get_active_tournaments(region: str = None) -> List[Tournament]:
-        """Получение активных турниров (регистрация открыта)"""
+    async def get_active_tournaments(region: str = None, game_id: int = None) -> List[Tournament]:
+        """
+        Получение активных турниров (регистрация открыта).
+        Закрытие регистрации отражается в статусе, поэтому фильтр идет по
+        индексу (status, region), а не по датам окончания.
+        """
         async with get_session() as session:
             session: AsyncSession
             
-            now = datetime.utcnow()
-            
             conditions = [
                 Tournament.status == TournamentStatus.REGISTRATION.value,
-                Tournament.registration_start <= now,
-                Tournament.registration_end > now
+                Tournament.registration_start <= datetime.utcnow()
             ]
             
             # Добавляем фильтр по региону, если указан
             if region:
                 conditions.append(Tournament.region == region)
             
+            if game_id:
+                conditions.append(Tournament.game_id == game_id)
+            
             stmt = (
                 select(Tournament)
                 .options(selectinload(Tournament.game))
@@ -183,6 +190,36 @@ class TournamentRepository:
             
             result = await session.execute(stmt)
             await session.commit()
+            stats_cache.invalidate(TOURNAMENTS)
+            
+            return result.rowcount > 0
+    
+    @staticmethod
+    async def transition_status(
+        tournament_id: int,
+        from_statuses: List[TournamentStatus],
+        to_status: TournamentStatus
+    ) -> bool:
+        """
+        Перевести турнир в новый статус, только если текущий статус из from_statuses.
+        Проверка и запись выполняются одним UPDATE, поэтому повторный или
+        конкурентный переход не срабатывает дважды.
+        """
+        async with get_session() as session:
+            session: AsyncSession
+            
+            stmt = (
+                update(Tournament)
+                .where(
+                    Tournament.id == tournament_id,
+                    Tournament.status.in_([status.value for status in from_statuses])
+                )
+                .values(status=to_status.value)
+            )
+            
+            result = await session.execute(stmt)
+            await session.commit()
+            stats_cache.invalidate(TOURNAMENTS)
             
             return result.rowcount > 0
     
@@ -230,6 +267,7 @@ class TournamentRepository:
                 tournament.logo_file_id = logo_file_id
             
             await session.commit()
+            stats_cache.invalidate(TOURNAMENTS)
             return True
     
     @staticmethod
@@ -240,8 +278,15 @@ class TournamentRepository:
             
             tournament = await session.get(Tournament, tournament_id)
             if tournament:
+                # Команды удаляются каскадом — надгробия нужны и для них
+                team_ids = (await session.execute(
+                    select(Team.id).where(Team.tournament_id == tournament_id)
+                )).scalars().all()
                 await session.delete(tournament)
+                session.add_all([DeletedRecord(entity="teams", entity_id=team_id) for team_id in team_ids])
+                session.add(DeletedRecord(entity="tournaments", entity_id=tournament_id))
                 await session.commit()
+                stats_cache.invalidate(TOURNAMENTS, TEAMS)
                 return True
             
             return False
@@ -306,11 +351,7 @@ class TournamentRepository:
             if not tournament:
                 return False
             
-            now = datetime.utcnow()
-            return (
-                tournament.status == TournamentStatus.REGISTRATION.value and
-                tournament.registration_start <= now <= tournament.registration_end
-            )
+            return tournament.is_registration_open
     
     @staticmethod
     async def is_edit_allowed(tournament_id: int) -> bool:
@@ -381,12 +422,11 @@ class TournamentRepository:
         async with get_session() as session:
             session: AsyncSession
             
-            now = datetime.utcnow()
             stmt = select(func.count(Tournament.id)).where(
-                and_(
-                    Tournament.status == TournamentStatus.REGISTRATION.value,
-                    Tournament.start_date > now
-                )
+                Tournament.status.in_([
+                    TournamentStatus.REGISTRATION.value,
+                    TournamentStatus.REGISTRATION_CLOSED.value
+                ])
             )
             result = await session.execute(stmt)
             return result.scalar() or 0
@@ -454,7 +494,7 @@ class TournamentRepository:
             session: AsyncSession
             
             stmt = select(func.count(Tournament.id)).where(
-                Tournament.status.in_(['registration', 'in_progress'])
+                Tournament.status.in_(['registration', 'registration_closed', 'in_progress'])
             )
             result = await session.execute(stmt)
             return result.scalar() or 0
@@ -498,6 +538,7 @@ class TournamentRepository:
             if tournament:
                 tournament.status = new_status
                 await session.commit()
+                stats_cache.invalidate(TOURNAMENTS)
                 return True
             return False
     
@@ -537,6 +578,7 @@ class TournamentRepository:
             if tournament:
                 tournament.game_id = new_game_id
                 await session.commit()
+                stats_cache.invalidate(TOURNAMENTS)
                 return True
             return False
     
@@ -550,6 +592,7 @@ class TournamentRepository:
             if tournament:
                 tournament.format = new_format
                 await session.commit()
+                stats_cache.invalidate(TOURNAMENTS)
                 return True
             return False
     
@@ -563,6 +606,7 @@ class TournamentRepository:
             if tournament:
                 tournament.max_teams = new_max_teams
                 await session.commit()
+                stats_cache.invalidate(TOURNAMENTS)
                 return True
             return False
     
@@ -698,96 +742,35 @@ class TournamentRepository:
     @staticmethod
     async def get_tournaments_this_month() -> int:
         """Получение количества турниров в этом месяце"""
-        async with get_session() as session:
-            session: AsyncSession
-            
-            now = datetime.now(timezone.utc)
-            start_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            stmt = (
-                select(func.count(Tournament.id))
-                .where(Tournament.created_at >= start_month)
-            )
-            result = await session.execute(stmt)
-            return result.scalar_one_or_none() or 0
+        return await DailyStatsRepository.get_total(
+            DailyMetric.NEW_TOURNAMENTS, *stat_windows(datetime.utcnow().date())['this_month']
+        )
 
     @staticmethod
     async def get_tournaments_this_week() -> int:
         """Получение количества турниров на этой неделе"""
-        async with get_session() as session:
-            session: AsyncSession
-            
-            now = datetime.now(timezone.utc)
-            start_week = now - timedelta(days=now.weekday())
-            start_week = start_week.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            stmt = (
-                select(func.count(Tournament.id))
-                .where(Tournament.created_at >= start_week)
-            )
-            result = await session.execute(stmt)
-            return result.scalar_one_or_none() or 0
+        return await DailyStatsRepository.get_total(
+            DailyMetric.NEW_TOURNAMENTS, *stat_windows(datetime.utcnow().date())['this_week']
+        )
 
     @staticmethod
     async def get_tournaments_last_week() -> int:
         """Получение количества турниров на прошлой неделе"""
-        async with get_session() as session:
-            session: AsyncSession
-            
-            now = datetime.now(timezone.utc)
-            end_last_week = now - timedelta(days=now.weekday())
-            start_last_week = end_last_week - timedelta(days=7)
-            start_last_week = start_last_week.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_last_week = end_last_week.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            stmt = (
-                select(func.count(Tournament.id))
-                .where(Tournament.created_at >= start_last_week)
-                .where(Tournament.created_at < end_last_week)
-            )
-            result = await session.execute(stmt)
-            return result.scalar_one_or_none() or 0
+        return await DailyStatsRepository.get_total(
+            DailyMetric.NEW_TOURNAMENTS, *stat_windows(datetime.utcnow().date())['last_week']
+        )
 
     @staticmethod
     async def get_tournaments_last_month() -> int:
         """Получение количества турниров в прошлом месяце"""
-        async with get_session() as session:
-            session: AsyncSession
-            
-            now = datetime.now(timezone.utc)
-            start_this_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # Находим начало прошлого месяца
-            if start_this_month.month == 1:
-                start_last_month = start_this_month.replace(year=start_this_month.year - 1, month=12)
-            else:
-                start_last_month = start_this_month.replace(month=start_this_month.month - 1)
-            
-            stmt = (
-                select(func.count(Tournament.id))
-                .where(Tournament.created_at >= start_last_month)
-                .where(Tournament.created_at < start_this_month)
-            )
-            result = await session.execute(stmt)
-            return result.scalar_one_or_none() or 0
+        return await DailyStatsRepository.get_total(
+            DailyMetric.NEW_TOURNAMENTS, *stat_windows(datetime.utcnow().date())['last_month']
+        )
 
     @staticmethod
     async def get_tournaments_count_for_date(date) -> int:
         """Получение количества турниров за определенную дату"""
-        async with get_session() as session:
-            session: AsyncSession
-            
-            from datetime import datetime as dt
-            start_date = dt.combine(date, dt.min.time()).replace(tzinfo=timezone.utc)
-            end_date = start_date + timedelta(days=1)
-            
-            stmt = (
-                select(func.count(Tournament.id))
-                .where(Tournament.created_at >= start_date)
-                .where(Tournament.created_at < end_date)
-            )
-            result = await session.execute(stmt)
-            return result.scalar_one_or_none() or 0
+        return await DailyStatsRepository.get_total(DailyMetric.NEW_TOURNAMENTS, date, date)
 
     @staticmethod
     async def get_paused_count() -> int:
@@ -808,20 +791,15 @@ class TournamentRepository:
         async with get_session() as session:
             session: AsyncSession
             
-            total_stmt = select(func.count(Tournament.id))
-            total_result = await session.execute(total_stmt)
-            total = total_result.scalar_one_or_none() or 0
+            stmt = select(
+                func.count(Tournament.id),
+                func.count(Tournament.id).filter(Tournament.status == 'completed')
+            )
+            total, completed = (await session.execute(stmt)).one()
             
             if total == 0:
                 return 0.0
             
-            completed_stmt = (
-                select(func.count(Tournament.id))
-                .where(Tournament.status == 'completed')
-            )
-            completed_result = await session.execute(completed_stmt)
-            completed = completed_result.scalar_one_or_none() or 0
-            
             return (completed / total) * 100
 
     @staticmethod
@@ -830,23 +808,10 @@ class TournamentRepository:
         # Заглушка - в реальном приложении нужно рассчитывать на основе дат
         return 7
 
-    @staticmethod  
+    @staticmethod
     async def get_peak_creation_days(limit: int = 10) -> List[Tuple]:
         """Получение дней с пиковым количеством созданных турниров"""
-        async with get_session() as session:
-            session: AsyncSession
-            
-            stmt = (
-                select(
-                    func.date(Tournament.created_at).label('creation_date'),
-                    func.count(Tournament.id).label('count')
-                )
-                .group_by(func.date(Tournament.created_at))
-                .order_by(func.count(Tournament.id).desc())
-                .limit(limit)
-            )
-            result = await session.execute(stmt)
-            return [(row.creation_date, row.count) for row in result.all()]
+        return await DailyStatsRepository.get_peak_days(DailyMetric.NEW_TOURNAMENTS, limit)
 
     @staticmethod
     async def get_format_by_game_statistics() -> Dict[Tuple[str, str], int]:
@@ -0,0 +1,42 @@
+"""
+Репозиторий для отметки обработанных апдейтов
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db_manager import get_session
+from database.models import UpdateCursor
+
+
+class UpdateCursorRepository:
+    """Репозиторий отметки update_id"""
+
+    @staticmethod
+    async def get_cursor(bot_id: int) -> Optional[Tuple[int, datetime]]:
+        """Последний обработанный update_id и время сохранения отметки"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            result = await session.execute(
+                select(UpdateCursor.update_id, UpdateCursor.updated_at).where(UpdateCursor.bot_id == bot_id)
+            )
+            row = result.first()
+            return tuple(row) if row else None
+
+    @staticmethod
+    async def save_cursor(bot_id: int, update_id: int) -> None:
+        """Сохранить отметку (время — текущее UTC)"""
+        async with get_session() as session:
+            session: AsyncSession
+
+            cursor = await session.get(UpdateCursor, bot_id)
+            if cursor is None:
+                cursor = UpdateCursor(bot_id=bot_id, update_id=update_id, updated_at=datetime.utcnow())
+                session.add(cursor)
+            else:
+                cursor.update_id = max(cursor.update_id, update_id)
+                cursor.updated_at = datetime.utcnow()
+            await session.commit()
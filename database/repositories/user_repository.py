@@ -5,7 +5,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 from database.db_manager import get_session
-from database.models import User, UserRole
+from database.stats_cache import stats_cache, USERS
+from database.models import User, UserRole, DailyMetric
+from database.repositories.daily_stats_repository import DailyStatsRepository
 
 
 class UserRepository:
@@ -41,6 +43,7 @@ class UserRepository:
             session.add(user)
             try:
                 await session.commit()
+                stats_cache.invalidate(USERS)
                 await session.refresh(user)
                 return user
             except IntegrityError:
@@ -82,6 +85,7 @@ class UserRepository:
             
             result = await session.execute(stmt)
             await session.commit()
+            stats_cache.invalidate(USERS)
             
             return result.rowcount > 0
     
@@ -99,6 +103,7 @@ class UserRepository:
             
             result = await session.execute(stmt)
             await session.commit()
+            stats_cache.invalidate(USERS)
             
             return result.rowcount > 0
     
@@ -116,6 +121,7 @@ class UserRepository:
             
             result = await session.execute(stmt)
             await session.commit()
+            stats_cache.invalidate(USERS)
             
             return result.rowcount > 0
     
@@ -133,6 +139,7 @@ class UserRepository:
             
             result = await session.execute(stmt)
             await session.commit()
+            stats_cache.invalidate(USERS)
             
             return result.rowcount > 0
     
@@ -150,6 +157,7 @@ class UserRepository:
             
             result = await session.execute(stmt)
             await session.commit()
+            stats_cache.invalidate(USERS)
             
             return result.rowcount > 0
     
@@ -210,6 +218,7 @@ class UserRepository:
             
             result = await session.execute(stmt)
             await session.commit()
+            stats_cache.invalidate(USERS)
             
             return result.rowcount > 0
     
@@ -328,6 +337,16 @@ class UserRepository:
             result = await session.execute(stmt)
             return list(result.scalars().all())
     
+    @staticmethod
+    async def get_ids_by_telegram_ids(telegram_ids: List[int]) -> List[int]:
+        """Получение User.id по списку Telegram ID (без загрузки объектов)"""
+        async with get_session() as session:
+            session: AsyncSession
+            
+            stmt = select(User.id).where(User.telegram_id.in_(telegram_ids))
+            result = await session.execute(stmt)
+            return list(result.scalars().all())
+    
     @staticmethod
     async def get_users_by_language(language: str) -> List[User]:
         """Получение пользователей по языку"""
@@ -438,57 +457,14 @@ class UserRepository:
             result = await session.execute(stmt)
             return list(result.scalars().all())
     
-    @staticmethod
-    async def get_active_since(date: datetime) -> int:
-        """Получение количества активных пользователей с определенной даты"""
-        async with get_session() as session:
-            session: AsyncSession
-            
-            stmt = select(func.count(User.id)).where(
-                and_(User.updated_at >= date, User.is_blocked == False)
-            )
-            result = await session.execute(stmt)
-            return result.scalar() or 0
-    
     @staticmethod
     async def get_daily_registrations(days: int) -> Dict[str, int]:
         """Получение статистики регистраций по дням за последние N дней"""
-        async with get_session() as session:
-            session: AsyncSession
-            
-            start_date = datetime.now() - timedelta(days=days)
-            stmt = select(
-                func.date(User.created_at).label('date'),
-                func.count(User.id).label('count')
-            ).where(
-                User.created_at >= start_date
-            ).group_by(
-                func.date(User.created_at)
-            ).order_by(
-                func.date(User.created_at).desc()
-            )
-            result = await session.execute(stmt)
-            return {str(row.date): row.count for row in result.all()}
-    
-    @staticmethod
-    async def get_most_active_users(limit: int = 5) -> Dict[str, str]:
-        """Получение самых активных пользователей (по updated_at)"""
-        async with get_session() as session:
-            session: AsyncSession
-            
-            stmt = select(User).where(
-                User.is_blocked == False
-            ).order_by(
-                User.updated_at.desc()
-            ).limit(limit)
-            result = await session.execute(stmt)
-            users = result.scalars().all()
-            
-            return {
-                user.full_name or f"@{user.username}" or f"ID:{user.telegram_id}": 
-                user.updated_at.strftime("%d.%m.%Y %H:%M") if user.updated_at else "Никогда"
-                for user in users
-            }
+        today = datetime.utcnow().date()
+        series = await DailyStatsRepository.get_daily_series(
+            DailyMetric.NEW_USERS, today - timedelta(days=days), today
+        )
+        return {day.isoformat(): count for day, count in series.items()}
     
     @staticmethod
     async def get_user_teams_count(user_id: int) -> int:
@@ -0,0 +1,157 @@
+"""
+Кэш снимков статистики для админ-панели
+
+Снимок хранится STATS_CACHE_TTL секунд. Устаревший (по времени или
+после записи в связанные таблицы) снимок отдается сразу, а пересчет
+запускается в фоне (stale-while-revalidate), так что экран статистики
+отвечает мгновенно, а следующее обновление показывает свежие данные.
+Старше STATS_CACHE_MAX_STALE снимок не отдается — считается заново.
+
+Репозитории вызывают invalidate() с тегами измененных таблиц.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Set
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Теги данных, от которых зависят снимки
+USERS = "users"
+TEAMS = "teams"
+TOURNAMENTS = "tournaments"
+
+
+@dataclass
+class _Entry:
+    value: Any
+    computed_at: float
+    tags: Set[str]
+    stale: bool = False
+
+
+@dataclass
+class CacheStats:
+    """Счетчики обращений к кэшу"""
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    invalidations: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total * 100 if total else 0.0
+
+
+class StatsCache:
+    """TTL-кэш с инвалидацией по тегам и фоновым пересчетом"""
+
+    def __init__(self, ttl: float, max_stale: float):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.stats = CacheStats()
+        self._entries: Dict[str, _Entry] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._invalidated_at: Dict[str, float] = {}
+
+    async def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Iterable[str],
+    ) -> Any:
+        """Вернуть снимок из кэша или посчитать его через loader"""
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None:
+            age = now - entry.computed_at
+            if not entry.stale and age < self.ttl:
+                self.stats.hits += 1
+                return entry.value
+            if age < self.max_stale:
+                self.stats.stale_hits += 1
+                self._refresh_in_background(key, loader, tags)
+                return entry.value
+
+        self.stats.misses += 1
+        return await self._compute(key, loader, tags)
+
+    def invalidate(self, *tags: str) -> None:
+        """Пометить устаревшими снимки, зависящие от тегов"""
+        changed = set(tags)
+        now = time.monotonic()
+        for tag in changed:
+            self._invalidated_at[tag] = now
+        for entry in self._entries.values():
+            if not entry.stale and entry.tags & changed:
+                entry.stale = True
+                self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._invalidated_at.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики кэша для админ-панели"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.stats.hits,
+            "stale_hits": self.stats.stale_hits,
+            "misses": self.stats.misses,
+            "refreshes": self.stats.refreshes,
+            "invalidations": self.stats.invalidations,
+            "errors": self.stats.errors,
+            "hit_rate": round(self.stats.hit_rate, 1),
+        }
+
+    async def _compute(self, key: str, loader, tags) -> Any:
+        # Один пересчет на ключ: параллельные запросы ждут тот же результат
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            started_at = time.monotonic()
+            entry = _Entry(value=await loader(), computed_at=started_at, tags=set(tags))
+            # Запись, пришедшая во время пересчета, могла не попасть в снимок
+            entry.stale = any(self._invalidated_at.get(tag, 0.0) >= started_at for tag in entry.tags)
+            self._entries[key] = entry
+            future.set_result(entry.value)
+            return entry.value
+        except Exception as e:
+            self.stats.errors += 1
+            future.set_exception(e)
+            # Исключение уже передано вызывающему, ожидающих может не быть
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+    def _refresh_in_background(self, key: str, loader, tags) -> None:
+        if key in self._pending or key in self._refreshing:
+            return
+        self.stats.refreshes += 1
+
+        async def refresh():
+            try:
+                await self._compute(key, loader, tags)
+            except Exception as e:
+                logger.error(f"Ошибка фонового пересчета статистики {key}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+
+# Глобальный экземпляр кэша
+stats_cache = StatsCache(ttl=settings.stats_cache_ttl, max_stale=settings.stats_cache_max_stale)
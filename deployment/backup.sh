@@ -1,34 +1,30 @@
 #!/bin/bash
 
 # Скрипт для создания резервной копии БД
+# Снимок снимается онлайн (backup API SQLite, порциями страниц), сжимается
+# и проверяется PRAGMA integrity_check — бота останавливать не нужно.
+# Ротация: хранятся последние BACKUP_KEEP снимков (по умолчанию 7).
 
-BACKUP_DIR="/home/ENASGame_bot_2025/backups"
-DB_PATH="/home/ENASGame_bot_2025/tournament_bot.db"
-DATE=$(date +%Y%m%d_%H%M%S)
-BACKUP_FILE="$BACKUP_DIR/tournament_bot_$DATE.db"
+PROJECT_DIR="/home/ENASGame_bot_2025"
+export BACKUP_DIR="$PROJECT_DIR/backups"
+PYTHON="$PROJECT_DIR/venv/bin/python"
 
-# Создаём папку для бэкапов если не существует
-mkdir -p $BACKUP_DIR
+cd $PROJECT_DIR || exit 1
 
-# Создаём бэкап
-echo "📦 Создание резервной копии БД..."
-cp $DB_PATH $BACKUP_FILE
+echo "📦 Создание снимка БД..."
+BACKUP_FILE=$($PYTHON -m services.backup_service)
 
-if [ $? -eq 0 ]; then
-    echo "✅ Бэкап создан: $BACKUP_FILE"
+if [ $? -eq 0 ] && [ -n "$BACKUP_FILE" ]; then
+    echo "✅ Снимок создан и проверен: $BACKUP_FILE"
     
     # Показываем размер
     SIZE=$(du -h $BACKUP_FILE | cut -f1)
-    echo "📊 Размер: $SIZE"
-    
-    # Удаляем бэкапы старше 30 дней
-    find $BACKUP_DIR -name "tournament_bot_*.db" -mtime +30 -delete
-    echo "🗑️  Старые бэкапы (>30 дней) удалены"
+    echo "📊 Размер (gzip): $SIZE"
     
     # Показываем список всех бэкапов
     echo ""
     echo "📋 Доступные бэкапы:"
-    ls -lh $BACKUP_DIR/tournament_bot_*.db 2>/dev/null | awk '{print $9, "("$5")"}'
+    ls -lh $BACKUP_DIR/tournament_bot_*.db.gz 2>/dev/null | awk '{print $9, "("$5")"}'
 else
     echo "❌ Ошибка создания бэкапа!"
     exit 1
@@ -4,6 +4,7 @@
 
 BACKUP_DIR="/home/ENASGame_bot_2025/backups"
 DB_PATH="/home/ENASGame_bot_2025/tournament_bot.db"
+PYTHON="/home/ENASGame_bot_2025/venv/bin/python"
 
 echo "🔄 Восстановление БД из бэкапа"
 echo "================================"
@@ -11,7 +12,7 @@ echo ""
 
 # Показываем доступные бэкапы
 echo "📋 Доступные бэкапы:"
-ls -lh $BACKUP_DIR/tournament_bot_*.db 2>/dev/null | nl -w2 -s'. ' | awk '{print $1, $10, "("$6")"}'
+ls -lht $BACKUP_DIR/tournament_bot_*.db.gz 2>/dev/null | nl -w2 -s'. ' | awk '{print $1, $10, "("$6")"}'
 
 if [ $? -ne 0 ]; then
     echo "❌ Бэкапы не найдены!"
@@ -22,7 +23,7 @@ echo ""
 read -p "Введите номер бэкапа для восстановления: " backup_num
 
 # Получаем путь к выбранному бэкапу
-SELECTED_BACKUP=$(ls -t $BACKUP_DIR/tournament_bot_*.db | sed -n "${backup_num}p")
+SELECTED_BACKUP=$(ls -t $BACKUP_DIR/tournament_bot_*.db.gz | sed -n "${backup_num}p")
 
 if [ -z "$SELECTED_BACKUP" ]; then
     echo "❌ Некорректный номер!"
@@ -39,6 +40,18 @@ if [ "$confirm" != "y" ]; then
     exit 0
 fi
 
+# Распаковываем и проверяем снимок до остановки бота
+RESTORED_DB=$(mktemp --suffix=.db)
+gunzip -c $SELECTED_BACKUP > $RESTORED_DB
+CHECK=$($PYTHON -c "import sqlite3, sys; print(sqlite3.connect(sys.argv[1]).execute('PRAGMA integrity_check').fetchone()[0])" $RESTORED_DB)
+
+if [ "$CHECK" != "ok" ]; then
+    echo "❌ Снимок поврежден (integrity_check: $CHECK), восстановление отменено"
+    rm -f $RESTORED_DB
+    exit 1
+fi
+echo "✅ integrity_check пройден"
+
 # Останавливаем бота
 echo ""
 echo "🛑 Остановка бота..."
@@ -50,7 +63,8 @@ cp $DB_PATH "$DB_PATH.before_restore.$(date +%Y%m%d_%H%M%S).db"
 
 # Восстанавливаем из бэкапа
 echo "🔄 Восстановление..."
-cp $SELECTED_BACKUP $DB_PATH
+mv $RESTORED_DB $DB_PATH
+rm -f "$DB_PATH-wal" "$DB_PATH-shm"
 
 # Запускаем бота
 echo "🚀 Запуск бота..."
@@ -3,11 +3,17 @@
 """
 from aiogram import Router
 
+from middlewares import AuditMiddleware
+
 
 def setup_admin_handlers() -> Router:
     """Настройка всех админских роутеров"""
     admin_router = Router()
     
+    # Журнал действий: middleware роутера действует и на все вложенные роутеры
+    admin_router.message.middleware(AuditMiddleware())
+    admin_router.callback_query.middleware(AuditMiddleware())
+    
     # Импортируем и добавляем роутеры по одному
     from .main import router as admin_main_router
     admin_router.include_router(admin_main_router)
@@ -39,4 +45,7 @@ def setup_admin_handlers() -> Router:
     from .matches import router as match_router
     admin_router.include_router(match_router)
     
+    from .diagnostics import router as admin_diagnostics_router
+    admin_router.include_router(admin_diagnostics_router)
+    
     return admin_router
\ No newline at end of file
@@ -52,6 +52,12 @@ def get_attachment_options_keyboard() -> InlineKeyboardMarkup:
                 callback_data="admin:attachment_audio"
             )
         ],
+        [
+            InlineKeyboardButton(
+                text="🗂 Альбом (до 10 файлов)",
+                callback_data="admin:attachment_album"
+            )
+        ],
         [
             InlineKeyboardButton(
                 text="🔙 Назад",
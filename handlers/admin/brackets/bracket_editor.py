@@ -86,7 +86,7 @@ async def show_bracket_editor(callback: CallbackQuery, state: FSMContext):
             return
         
         # Проверка статуса турнира
-        if tournament.status != TournamentStatus.REGISTRATION.value:
+        if tournament.status not in (TournamentStatus.REGISTRATION.value, TournamentStatus.REGISTRATION_CLOSED.value):
             text = f"""⚠️ **Редактирование недоступно**
 
 Редактировать сетку можно только до запуска турнира.
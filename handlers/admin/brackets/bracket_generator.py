@@ -8,10 +8,12 @@ from aiogram.fsm.context import FSMContext
 
 from database.repositories.tournament_repository import TournamentRepository
 from database.repositories.team_repository import TeamRepository
-from integrations.challonge_api import ChallongeAPI
+from database.models import TournamentStatus
+from integrations.challonge_api import ChallongeAPI, CHALLONGE_FORMATS
 from config.settings import settings
 from utils.message_utils import safe_edit_message
 from handlers.admin.states import AdminStates
+from services.tournament_lifecycle import tournament_lifecycle
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -31,8 +33,8 @@ async def show_bracket_generation_menu(callback: CallbackQuery, state: FSMContex
             return
         
         # Проверяем что турнир ещё не начат
-        if tournament.status != "registration":
-            await callback.answer("❌ Генерация доступна только для турниров в статусе регистрации", show_alert=True)
+        if tournament.status not in (TournamentStatus.REGISTRATION.value, TournamentStatus.REGISTRATION_CLOSED.value):
+            await callback.answer("❌ Генерация доступна только до начала турнира", show_alert=True)
             return
         
         # Получаем одобренные команды
@@ -185,14 +187,7 @@ Challonge API не настроен.
         challonge = ChallongeAPI(settings.challonge_client_id, settings.challonge_client_secret, settings.challonge_username)
         
         # Определяем формат для Challonge
-        format_mapping = {
-            'single_elimination': 'single elimination',
-            'double_elimination': 'double elimination',
-            'round_robin': 'round robin',
-            'group_stage_playoffs': 'single elimination'  # Пока как single
-        }
-        
-        challonge_format = format_mapping.get(tournament.format, 'single elimination')
+        challonge_format = CHALLONGE_FORMATS.get(tournament.format, 'single elimination')
         
         # Создаем турнир в Challonge
         logger.info(f"Создаём турнир {tournament.name} в Challonge...")
@@ -538,7 +533,7 @@ async def refresh_bracket_status(callback: CallbackQuery, state: FSMContext):
         
         if current_state == 'underway':
             # Турнир запущен! Обновляем статус в БД
-            await TournamentRepository.update_status(tournament_id, 'in_progress')
+            await tournament_lifecycle.start_tournament(callback.bot, tournament_id)
             
             tournament_name = tournament.name.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
             
@@ -699,7 +694,7 @@ Challonge API v2.1 не поддерживает автоматический з
             return
         
         # Обновляем статус турнира в БД
-        await TournamentRepository.update_status(tournament_id, 'in_progress')
+        await tournament_lifecycle.start_tournament(callback.bot, tournament_id)
         
         # Получаем инфо о турнире
         tournament_info = await challonge.get_tournament(tournament.challonge_id)
@@ -4,6 +4,9 @@
 import logging
 import asyncio
 from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import pytz
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, ContentType
 from aiogram.filters import StateFilter
@@ -12,8 +15,14 @@ from aiogram.fsm.context import FSMContext
 from database.repositories import UserRepository, TeamRepository, TournamentRepository
 from utils.localization import _
 from utils.message_utils import safe_edit_message
+from services.outbound_scheduler import outbound_priority, Priority
+from services.broadcast_service import run_broadcast, ALBUM_MAX_ITEMS, ALBUM_CAPTION_LIMIT
+from services.job_scheduler import job_scheduler
+from services.scheduled_jobs import SCHEDULED_BROADCAST
+from config.settings import settings
+from utils.datetime_utils import get_timezone_offset
 from .states import AdminStates
-from .keyboards import get_broadcast_keyboard, get_confirmation_keyboard, get_broadcast_cancel_keyboard
+from .keyboards import get_broadcast_keyboard, get_broadcast_confirmation_keyboard, get_broadcast_cancel_keyboard
 from .attachment_keyboards import get_attachment_keyboard, get_attachment_options_keyboard, get_attachment_confirm_keyboard
 
 router = Router()
@@ -189,6 +198,10 @@ async def select_attachment_type(callback: CallbackQuery, state: FSMContext):
     """Выбор типа вложения"""
     attachment_type = callback.data.split("_")[1]
     
+    if attachment_type == "album":
+        await _start_album(callback, state)
+        return
+    
     await state.update_data(expected_attachment_type=attachment_type)
     
     type_names = {
@@ -210,12 +223,143 @@ async def select_attachment_type(callback: CallbackQuery, state: FSMContext):
     )
     await callback.answer()
 
+# ========== АЛЬБОМЫ ==========
+# Telegram присылает каждое медиа альбома отдельным сообщением (и отдельным
+# апдейтом), поэтому файлы копятся в буфере, а ответ администратору уходит
+# один раз — после паузы, когда новые файлы перестали приходить. Паузу
+# выжидает отдельная задача, а не хендлер: апдейты одного пользователя
+# обрабатываются по очереди (services.update_executor), и хендлер, спящий
+# до следующего файла, его бы никогда не дождался.
+
+ALBUM_COLLECT_DELAY = 1.0
+
+_album_buffers: Dict[int, List[dict]] = {}
+_album_dropped: Dict[int, int] = {}
+# Отложенный ответ по альбому; каждый новый файл перезапускает отсчет
+_album_flush: Dict[int, asyncio.Task] = {}
+
+
+def _extract_album_item(message: Message) -> Optional[dict]:
+    """Достать file_id медиа из сообщения администратора"""
+    if message.photo:
+        return {"type": "photo", "file_id": message.photo[-1].file_id}
+    if message.video:
+        return {"type": "video", "file_id": message.video.file_id}
+    if message.document:
+        return {"type": "document", "file_id": message.document.file_id, "filename": message.document.file_name}
+    if message.audio:
+        return {"type": "audio", "file_id": message.audio.file_id}
+    return None
+
+
+def _album_is_compatible(items: List[dict]) -> bool:
+    """Фото и видео смешивать можно, документы и аудио — только между собой"""
+    types = {item["type"] for item in items}
+    return types <= {"photo", "video"} or types == {"document"} or types == {"audio"}
+
+
+async def _start_album(callback: CallbackQuery, state: FSMContext):
+    """Переход в режим сбора альбома"""
+    data = await state.get_data()
+    if len(data.get('broadcast_message') or "") > ALBUM_CAPTION_LIMIT:
+        await callback.answer(
+            f"❌ Для альбома текст рассылки должен быть не длиннее {ALBUM_CAPTION_LIMIT} символов",
+            show_alert=True
+        )
+        return
+    
+    _album_buffers.pop(callback.from_user.id, None)
+    _album_dropped.pop(callback.from_user.id, None)
+    pending_flush = _album_flush.pop(callback.from_user.id, None)
+    if pending_flush is not None:
+        pending_flush.cancel()
+    await state.update_data(expected_attachment_type="album")
+    
+    text = _("""
+🗂 Отправьте альбом
+
+Отправьте до {max} фото/видео одним альбомом (или документы/аудио — без смешивания с фото).
+Текст рассылки станет подписью к альбому.
+""", "ru").format(max=ALBUM_MAX_ITEMS)
+    
+    await safe_edit_message(callback.message, text, parse_mode="Markdown")
+    await callback.answer()
+
+
+async def _collect_album_item(message: Message, state: FSMContext):
+    """Добавить медиа в альбом рассылки"""
+    item = _extract_album_item(message)
+    if not item:
+        await message.answer(_(
+            "❌ В альбом можно добавить только фото, видео, документы или аудио.", "ru"
+        ))
+        return
+    
+    user_id = message.from_user.id
+    buffer = _album_buffers.setdefault(user_id, [])
+    if len(buffer) < ALBUM_MAX_ITEMS:
+        buffer.append(item)
+    else:
+        _album_dropped[user_id] = _album_dropped.get(user_id, 0) + 1
+    
+    previous = _album_flush.pop(user_id, None)
+    if previous is not None:
+        previous.cancel()
+    _album_flush[user_id] = asyncio.create_task(_flush_album(message, state))
+
+
+async def _flush_album(message: Message, state: FSMContext):
+    """Ответить по альбому, когда новые файлы перестали приходить"""
+    user_id = message.from_user.id
+    await asyncio.sleep(ALBUM_COLLECT_DELAY)
+    # Дальше отмены нет: файлы, пришедшие после этого, начнут новый отсчет
+    if _album_flush.get(user_id) is asyncio.current_task():
+        del _album_flush[user_id]
+    
+    try:
+        await _reply_album(message, state, user_id)
+    except Exception as e:
+        logger.error(f"Ошибка при сборе альбома администратора {user_id}: {e}")
+
+
+async def _reply_album(message: Message, state: FSMContext, user_id: int):
+    """Сохранить собранный альбом и сообщить администратору"""
+    buffer = _album_buffers.get(user_id)
+    if not buffer:
+        return
+    
+    if not _album_is_compatible(buffer):
+        _album_buffers.pop(user_id, None)
+        await message.answer(_(
+            "❌ Документы и аудио нельзя смешивать с фото и видео в одном альбоме. Отправьте альбом заново.", "ru"
+        ))
+        return
+    
+    await state.update_data(attachment={"type": "album", "media": list(buffer)})
+    
+    text = _("""
+✅ Альбом получен!
+
+🗂 Файлов: {count}/{max}
+""", "ru").format(count=len(buffer), max=ALBUM_MAX_ITEMS)
+    
+    dropped = _album_dropped.pop(user_id, 0)
+    if dropped:
+        text += f"\n⚠️ Не добавлено сверх лимита: {dropped}"
+    text += "\n\nМожно отправить еще файлы, чтобы дополнить альбом."
+    
+    await message.answer(text, reply_markup=get_attachment_confirm_keyboard(), parse_mode="Markdown")
+
 @router.message(StateFilter(AdminStates.broadcast_adding_attachment))
 async def process_attachment(message: Message, state: FSMContext):
     """Обработка полученного вложения"""
     data = await state.get_data()
     expected_type = data.get('expected_attachment_type')
     
+    if expected_type == "album":
+        await _collect_album_item(message, state)
+        return
+    
     attachment_info = None
     
     # Проверяем тип полученного сообщения
@@ -332,7 +476,10 @@ async def show_broadcast_confirmation(callback_or_message, state: FSMContext):
     
     # Добавляем информацию о вложении
     if attachment:
-        text += f"\n📎 Вложение: {attachment['type']}"
+        if attachment['type'] == 'album':
+            text += f"\n📎 Вложение: альбом ({len(attachment['media'])} шт.)"
+        else:
+            text += f"\n📎 Вложение: {attachment['type']}"
         if attachment.get('filename'):
             text += f" ({attachment['filename']})"
     
@@ -342,7 +489,7 @@ async def show_broadcast_confirmation(callback_or_message, state: FSMContext):
         # Это callback
         await safe_edit_message(
             callback_or_message.message, text,
-            reply_markup=get_confirmation_keyboard("broadcast"),
+            reply_markup=get_broadcast_confirmation_keyboard("broadcast"),
             parse_mode="Markdown"
         )
         await callback_or_message.answer()
@@ -350,7 +497,7 @@ async def show_broadcast_confirmation(callback_or_message, state: FSMContext):
         # Это message
         await callback_or_message.answer(
             text,
-            reply_markup=get_confirmation_keyboard("broadcast"),
+            reply_markup=get_broadcast_confirmation_keyboard("broadcast"),
             parse_mode="Markdown"
         )
 
@@ -379,22 +526,24 @@ async def confirm_broadcast(callback: CallbackQuery, state: FSMContext):
     await safe_edit_message(callback.message, text, parse_mode="Markdown")
     await callback.answer()
     
-    # Запускаем рассылку в фоне
-    asyncio.create_task(
-        perform_broadcast(
-            callback.bot,
-            callback.from_user.id,
-            callback.message.chat.id,
-            callback.message.message_id,
-            broadcast_type,
-            broadcast_message,
-            attachment
+    # Запускаем рассылку в фоне с низшим приоритетом отправки:
+    # задача наследует контекст, поэтому все ее запросы идут классом BULK
+    with outbound_priority(Priority.BULK):
+        asyncio.create_task(
+            perform_broadcast(
+                callback.bot,
+                callback.from_user.id,
+                callback.message.chat.id,
+                callback.message.message_id,
+                broadcast_type,
+                broadcast_message,
+                attachment
+            )
         )
-    )
     
     await state.clear()
 
-async def perform_broadcast(bot, admin_id: int, chat_id: int, message_id: int, broadcast_type: str, message_text: str, attachment: dict = None):
+async def perform_broadcast(bot, admin_id: int, chat_id: int, message_id: int, broadcast_type: str, message_text: str, attachment: dict = None, attempted: Optional[Set[int]] = None):
     """Выполнение рассылки"""
     try:
 
@@ -409,54 +558,11 @@ async def perform_broadcast(bot, admin_id: int, chat_id: int, message_id: int, b
             recipients = []
         
         total_recipients = len(recipients)
-        sent_count = 0
-        failed_count = 0
         
         logger.info(f"Начата рассылка администратором {admin_id}. Получателей: {total_recipients}")
         
-        # Отправляем сообщения
-        for i, recipient in enumerate(recipients):
-            try:
-                # Отправляем сообщение с вложением или без
-                if attachment:
-                    if attachment['type'] == 'photo':
-                        await bot.send_photo(
-                            recipient.telegram_id, 
-                            attachment['file_id'],
-                            caption=message_text,
-                            parse_mode="Markdown"
-                        )
-                    elif attachment['type'] == 'document':
-                        await bot.send_document(
-                            recipient.telegram_id, 
-                            attachment['file_id'],
-                            caption=message_text,
-                            parse_mode="Markdown"
-                        )
-                    elif attachment['type'] == 'video':
-                        await bot.send_video(
-                            recipient.telegram_id, 
-                            attachment['file_id'],
-                            caption=message_text,
-                            parse_mode="Markdown"
-                        )
-                    elif attachment['type'] == 'audio':
-                        await bot.send_audio(
-                            recipient.telegram_id, 
-                            attachment['file_id'],
-                            caption=message_text,
-                            parse_mode="Markdown"
-                        )
-                else:
-                    await bot.send_message(recipient.telegram_id, message_text, parse_mode="Markdown")
-                sent_count += 1
-                
-                # Небольшая задержка между сообщениями
-                await asyncio.sleep(0.1)
-                
-                # Обновляем статус каждые 10 сообщений
-                if (i + 1) % 10 == 0:
-                    progress_text = _("""
+        async def report_progress(result):
+            progress_text = _("""
 📤 Рассылка в процессе
 
 📊 Прогресс: {sent}/{total}
@@ -465,24 +571,29 @@ async def perform_broadcast(bot, admin_id: int, chat_id: int, message_id: int, b
 
 ⏳ Продолжается отправка...
 """, "ru").format(
-                        sent=sent_count,
-                        total=total_recipients,
-                        failed=failed_count
-                    )
-                    
-                    try:
-                        await bot.edit_message_text(
-            progress_text,
-                            chat_id=chat_id,
-                            message_id=message_id,
-            parse_mode="Markdown"
+                sent=result.sent,
+                total=result.total,
+                failed=result.failed
+            )
+            await bot.edit_message_text(
+                progress_text,
+                chat_id=chat_id,
+                message_id=message_id,
+                parse_mode="Markdown"
+            )
+        
+        # Отправляем сообщения (темп задает планировщик исходящих запросов)
+        result = await run_broadcast(
+            bot,
+            [recipient.telegram_id for recipient in recipients],
+            message_text,
+            attachment,
+            on_progress=report_progress,
+            progress_every=10,
+            attempted=attempted
         )
-                    except Exception:
-                        pass  # Игнорируем ошибки обновления статуса
-                
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Ошибка отправки сообщения пользователю {recipient.telegram_id}: {e}")
+        sent_count = result.sent
+        failed_count = result.failed
         
         # Отправляем финальный отчет
         final_text = _("""
@@ -928,6 +1039,10 @@ async def select_selective_attachment_type(callback: CallbackQuery, state: FSMCo
     """Выбор типа вложения для выборочной рассылки"""
     attachment_type = callback.data.split("_")[1]
     
+    if attachment_type == "album":
+        await _start_album(callback, state)
+        return
+    
     await state.update_data(expected_attachment_type=attachment_type)
     
     type_names = {
@@ -955,6 +1070,10 @@ async def process_selective_attachment(message: Message, state: FSMContext):
     data = await state.get_data()
     expected_type = data.get('expected_attachment_type')
     
+    if expected_type == "album":
+        await _collect_album_item(message, state)
+        return
+    
     attachment_info = None
     
     # Проверяем тип полученного сообщения
@@ -1064,7 +1183,10 @@ async def show_selective_broadcast_confirmation(callback_or_message, state: FSMC
     
     # Добавляем информацию о вложении
     if attachment:
-        text += f"\n📎 Вложение: {attachment['type']}"
+        if attachment['type'] == 'album':
+            text += f"\n📎 Вложение: альбом ({len(attachment['media'])} шт.)"
+        else:
+            text += f"\n📎 Вложение: {attachment['type']}"
         if attachment.get('filename'):
             text += f" ({attachment['filename']})"
     
@@ -1074,7 +1196,7 @@ async def show_selective_broadcast_confirmation(callback_or_message, state: FSMC
         # Это callback
         await safe_edit_message(
             callback_or_message.message, text,
-            reply_markup=get_confirmation_keyboard("selective_broadcast"),
+            reply_markup=get_broadcast_confirmation_keyboard("selective_broadcast"),
             parse_mode="Markdown"
         )
         await callback_or_message.answer()
@@ -1082,7 +1204,7 @@ async def show_selective_broadcast_confirmation(callback_or_message, state: FSMC
         # Это message
         await callback_or_message.answer(
             text,
-            reply_markup=get_confirmation_keyboard("selective_broadcast"),
+            reply_markup=get_broadcast_confirmation_keyboard("selective_broadcast"),
             parse_mode="Markdown"
         )
 
@@ -1111,19 +1233,21 @@ async def confirm_selective_broadcast(callback: CallbackQuery, state: FSMContext
     await safe_edit_message(callback.message, text, parse_mode="Markdown")
     await callback.answer()
     
-    # Запускаем рассылку в фоне
-    asyncio.create_task(
-        perform_selective_broadcast(
-            callback.bot,
-            callback.from_user.id,
-            callback.message.chat.id,
-            callback.message.message_id,
-            selective_type,
-            selective_value,
-            broadcast_message,
-            attachment
+    # Запускаем рассылку в фоне с низшим приоритетом отправки:
+    # задача наследует контекст, поэтому все ее запросы идут классом BULK
+    with outbound_priority(Priority.BULK):
+        asyncio.create_task(
+            perform_selective_broadcast(
+                callback.bot,
+                callback.from_user.id,
+                callback.message.chat.id,
+                callback.message.message_id,
+                selective_type,
+                selective_value,
+                broadcast_message,
+                attachment
+            )
         )
-    )
     
     await state.clear()
 
@@ -1135,7 +1259,8 @@ async def perform_selective_broadcast(
     selective_type: str,
     selective_value,
     message_text: str,
-    attachment: dict = None
+    attachment: dict = None,
+    attempted: Optional[Set[int]] = None
 ):
     """Выполнение выборочной рассылки"""
     try:
@@ -1151,54 +1276,11 @@ async def perform_selective_broadcast(
             recipients = []
         
         total_recipients = len(recipients)
-        sent_count = 0
-        failed_count = 0
         
         logger.info(f"Начата выборочная рассылка администратором {admin_id}. Получателей: {total_recipients}")
         
-        # Отправляем сообщения
-        for i, recipient in enumerate(recipients):
-            try:
-                # Отправляем сообщение с вложением или без
-                if attachment:
-                    if attachment['type'] == 'photo':
-                        await bot.send_photo(
-                            recipient.telegram_id, 
-                            attachment['file_id'],
-                            caption=message_text,
-                            parse_mode="Markdown"
-                        )
-                    elif attachment['type'] == 'document':
-                        await bot.send_document(
-                            recipient.telegram_id, 
-                            attachment['file_id'],
-                            caption=message_text,
-                            parse_mode="Markdown"
-                        )
-                    elif attachment['type'] == 'video':
-                        await bot.send_video(
-                            recipient.telegram_id, 
-                            attachment['file_id'],
-                            caption=message_text,
-                            parse_mode="Markdown"
-                        )
-                    elif attachment['type'] == 'audio':
-                        await bot.send_audio(
-                            recipient.telegram_id, 
-                            attachment['file_id'],
-                            caption=message_text,
-                            parse_mode="Markdown"
-                        )
-                else:
-                    await bot.send_message(recipient.telegram_id, message_text, parse_mode="Markdown")
-                sent_count += 1
-                
-                # Небольшая задержка
-                await asyncio.sleep(0.1)
-                
-                # Обновляем статус каждые 5 сообщений
-                if (i + 1) % 5 == 0:
-                    progress_text = _("""
+        async def report_progress(result):
+            progress_text = _("""
 📤 Выборочная рассылка в процессе
 
 📊 Прогресс: {sent}/{total}
@@ -1207,24 +1289,29 @@ async def perform_selective_broadcast(
 
 ⏳ Продолжается отправка...
 """, "ru").format(
-                        sent=sent_count,
-                        total=total_recipients,
-                        failed=failed_count
-                    )
-                    
-                    try:
-                        await bot.edit_message_text(
-            progress_text,
-                            chat_id=chat_id,
-                            message_id=message_id,
-            parse_mode="Markdown"
+                sent=result.sent,
+                total=result.total,
+                failed=result.failed
+            )
+            await bot.edit_message_text(
+                progress_text,
+                chat_id=chat_id,
+                message_id=message_id,
+                parse_mode="Markdown"
+            )
+        
+        # Отправляем сообщения (темп задает планировщик исходящих запросов)
+        result = await run_broadcast(
+            bot,
+            [recipient.telegram_id for recipient in recipients],
+            message_text,
+            attachment,
+            on_progress=report_progress,
+            progress_every=5,
+            attempted=attempted
         )
-                    except Exception:
-                        pass
-                
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Ошибка отправки сообщения пользователю {recipient.telegram_id}: {e}")
+        sent_count = result.sent
+        failed_count = result.failed
         
         # Финальный отчет
         final_text = _("""
@@ -1284,6 +1371,86 @@ async def cancel_selective_broadcast(callback: CallbackQuery, state: FSMContext)
     await callback.answer()
 
 
+# ========== ОТЛОЖЕННАЯ РАССЫЛКА ==========
+
+@router.callback_query(F.data.in_({"admin:schedule_broadcast", "admin:schedule_selective_broadcast"}))
+async def ask_broadcast_schedule_time(callback: CallbackQuery, state: FSMContext):
+    """Запрос времени отложенной рассылки"""
+    data = await state.get_data()
+    if not data.get('broadcast_message'):
+        await callback.answer(_("❌ Сообщение не найдено", "ru"))
+        return
+    
+    await state.update_data(schedule_selective=callback.data == "admin:schedule_selective_broadcast")
+    await state.set_state(AdminStates.scheduling_broadcast_time)
+    
+    text = _("""
+⏰ Отложенная рассылка
+
+Введите дату и время отправки в формате ДД.ММ.ГГГГ ЧЧ:ММ
+Часовой пояс: {timezone} ({offset})
+
+Например: {example}
+""", "ru").format(
+        timezone=settings.timezone_default,
+        offset=get_timezone_offset(settings.timezone_default),
+        example=datetime.now(pytz.timezone(settings.timezone_default)).strftime("%d.%m.%Y 18:00")
+    )
+    
+    await safe_edit_message(callback.message, text, reply_markup=get_broadcast_cancel_keyboard())
+    await callback.answer()
+
+@router.message(StateFilter(AdminStates.scheduling_broadcast_time))
+async def process_broadcast_schedule_time(message: Message, state: FSMContext):
+    """Сохранение отложенной рассылки"""
+    user_tz = pytz.timezone(settings.timezone_default)
+    try:
+        local_time = user_tz.localize(datetime.strptime((message.text or "").strip(), "%d.%m.%Y %H:%M"))
+    except ValueError:
+        await message.answer(_("❌ Неверный формат. Используйте ДД.ММ.ГГГГ ЧЧ:ММ", "ru"))
+        return
+    
+    run_at = local_time.astimezone(pytz.utc).replace(tzinfo=None)
+    if run_at <= datetime.utcnow():
+        await message.answer(_("❌ Время отправки должно быть в будущем", "ru"))
+        return
+    
+    data = await state.get_data()
+    payload = {
+        "admin_id": message.from_user.id,
+        "message_text": data.get('broadcast_message'),
+        "attachment": data.get('attachment'),
+    }
+    if data.get('schedule_selective'):
+        payload["selective_type"] = data.get('selective_type')
+        payload["selective_value"] = data.get('selective_value')
+    else:
+        payload["broadcast_type"] = data.get('broadcast_type')
+    
+    job = await job_scheduler.schedule(SCHEDULED_BROADCAST, run_at, payload)
+    await state.clear()
+    
+    text = _("""
+✅ Рассылка запланирована
+
+📅 Отправка: {time} ({timezone})
+🆔 Задача: #{job_id}
+
+Отчет о рассылке придет в этот чат.
+""", "ru").format(
+        time=local_time.strftime("%d.%m.%Y %H:%M"),
+        timezone=settings.timezone_default,
+        job_id=job.id
+    )
+    
+    await message.answer(
+        text,
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text=_("🔙 К рассылке", "ru"), callback_data="admin:broadcast")
+        ]])
+    )
+
+
 # Обработчик кнопки назад для ввода текста рассылки  
 @router.callback_query(F.data == "admin:broadcast")
 async def handle_broadcast_back(callback: CallbackQuery, state: FSMContext):
@@ -0,0 +1,206 @@
+"""
+Хендлеры экрана диагностики (/diag)
+"""
+import html
+import logging
+import time
+
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message
+
+from database.stats_cache import stats_cache
+from services.audit_log import audit_log
+from services.callback_answers import callback_answers
+from services.fsm_storage import fsm_storage
+from services.loop_monitor import loop_monitor
+from services.maintenance import maintenance_service
+from services.metrics import metrics
+from services.outbound_scheduler import outbound_scheduler
+from services.sql_profiler import sql_profiler
+from services.update_backlog import update_backlog
+from utils.message_utils import safe_edit_message
+from .keyboards import get_diagnostics_keyboard, get_sql_profiler_keyboard
+from .main import is_admin
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+# Сколько самых медленных хендлеров показывать
+TOP_HANDLERS = 8
+# Сколько находок SQL-профиля показывать и сколько символов запроса
+SQL_REPORT_ITEMS = 5
+SQL_STATEMENT_CHARS = 160
+
+
+def _short_name(handler: str) -> str:
+    return html.escape(handler.removeprefix("handlers."))
+
+
+def build_diagnostics_text() -> str:
+    """Текст экрана диагностики"""
+    minutes = (time.time() - metrics.started) / 60
+    lines = [f"🩺 <b>Диагностика</b> (метрики за {minutes:.0f} мин)", ""]
+
+    lines.append("⏱ <b>Медленные хендлеры</b> (p50/p95/p99, мс)")
+    top = metrics.top(TOP_HANDLERS)
+    if not top:
+        lines.append("нет данных")
+    for row in top:
+        lines.append(
+            f"<code>{_short_name(row['handler'])}</code> — {row['calls']} выз., "
+            f"ошибок {row['error_rate'] * 100:.1f}%\n"
+            f"    {row['p50_ms']:.0f}/{row['p95_ms']:.0f}/{row['p99_ms']:.0f}; p95 БД {row['db_p95_ms']:.0f}, "
+            f"Telegram {row['telegram_p95_ms']:.0f}, внешн. {row['external_p95_ms']:.0f}"
+        )
+
+    answers = callback_answers.get_stats()
+    lines += [
+        "",
+        f"🐢 <b>Ответ на нажатия</b> (бюджет {answers['budget_ms']} мс): "
+        f"автоответов {answers['auto_answered']}, без ответа {answers['answered_on_finish']}, "
+        f"поздних {answers['late_answers']} (сообщением {answers['late_delivered']})",
+    ]
+    for row in answers["slow_handlers"][:TOP_HANDLERS]:
+        lines.append(f"<code>{_short_name(row['handler'])}</code> p95 {row['p95_ms']:.0f} мс")
+
+    loop = loop_monitor.get_stats()
+    lines += [
+        "",
+        f"🔁 <b>Event loop</b>: задержка p50 {loop['p50_ms']:.0f} / p99 {loop['p99_ms']:.0f} / "
+        f"макс. {loop['max_ms']:.0f} мс, блокировок {loop['stalls']}",
+    ]
+    for stall in loop["recent_stalls"][:3]:
+        lines.append(
+            f"{stall['lag_ms']:.0f} мс, {html.escape(stall['task'])}: <code>{html.escape(stall['culprit'])}</code>"
+        )
+
+    lines.append("")
+    if update_backlog.executor is not None:
+        lanes = update_backlog.executor.get_stats()
+        lines.append(
+            f"📥 <b>Апдейты</b>: в очереди {lanes['pending']}/{lanes['max_pending']}, "
+            f"в работе {lanes['in_flight']}, обработано {lanes['processed']}, ошибок {lanes['failed']}, "
+            f"отклонено {lanes['rejected']}, ожидание {lanes['avg_wait_ms']} мс"
+        )
+    backlog = update_backlog.get_stats()
+    lines.append(
+        f"♻️ <b>После запуска</b>: очередь {backlog['backlog_size']}, "
+        f"{'разобрана за ' + str(backlog['drain_seconds']) + ' с' if backlog['drained'] else 'разбирается'}, "
+        f"повторов {backlog['duplicates']}, устаревших нажатий {backlog['stale_callbacks']}"
+    )
+
+    outbound = outbound_scheduler.get_stats()
+    lines.append(
+        "📤 <b>Исходящие</b>: " + ", ".join(
+            f"{name} {outbound[name]['queued']} в очереди / {outbound[name]['avg_wait_ms']} мс"
+            for name in ("interactive", "transactional", "bulk")
+        ) + f", flood control {outbound['retry_after']}"
+    )
+
+    fsm = fsm_storage.get_stats()
+    lines.append(
+        f"🗂 <b>FSM</b>: в памяти {fsm['cached']}, не записано {fsm['dirty']}, "
+        f"записано {fsm['written']}, ошибок {fsm['failed']}"
+    )
+    audit = audit_log.get_stats()
+    lines.append(
+        f"📝 <b>Журнал</b>: в очереди {audit['queued']}, записано {audit['written']}, "
+        f"отброшено {audit['dropped']}, ошибок {audit['failed']}"
+    )
+    cache = stats_cache.get_stats()
+    lines.append(f"⚡ <b>Кэш статистики</b>: {cache['hit_rate']}% попаданий, ошибок {cache['errors']}")
+
+    report = maintenance_service.last_report
+    lines.append(
+        "🧰 <b>Обслуживание</b>: "
+        + (html.escape(report.summary()) if report else "еще не запускалось")
+    )
+    if sql_profiler.enabled:
+        lines.append("🔬 <b>SQL-профилировщик включен</b>")
+    return "\n".join(lines)
+
+
+def build_sql_profile_text() -> str:
+    """Текст экрана SQL-профилировщика"""
+    status = "включен" if sql_profiler.enabled else "выключен"
+    report = sql_profiler.format_report(SQL_REPORT_ITEMS, SQL_STATEMENT_CHARS)
+    return f"🔬 <b>SQL-профилировщик</b> ({status})\n\n<pre>{html.escape(report)}</pre>"
+
+
+@router.message(Command("diag"))
+async def diagnostics_command(message: Message):
+    """Команда экрана диагностики"""
+    if not await is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав доступа")
+        return
+    await message.answer(build_diagnostics_text(), reply_markup=get_diagnostics_keyboard(), parse_mode="HTML")
+
+
+@router.callback_query(F.data == "admin:diag")
+async def diagnostics_refresh(callback: CallbackQuery):
+    """Обновление экрана диагностики"""
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("❌ У вас нет прав доступа")
+        return
+    await callback.answer()
+    await safe_edit_message(
+        callback.message, build_diagnostics_text(),
+        reply_markup=get_diagnostics_keyboard(), parse_mode="HTML"
+    )
+
+
+@router.callback_query(F.data == "admin:diag_reset")
+async def diagnostics_reset(callback: CallbackQuery):
+    """Сброс гистограмм хендлеров"""
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("❌ У вас нет прав доступа")
+        return
+    metrics.reset()
+    logger.info(f"Метрики хендлеров сброшены администратором {callback.from_user.id}")
+    await callback.answer("🧹 Метрики сброшены")
+    await safe_edit_message(
+        callback.message, build_diagnostics_text(),
+        reply_markup=get_diagnostics_keyboard(), parse_mode="HTML"
+    )
+
+
+async def _show_sql_profile(callback: CallbackQuery) -> None:
+    await safe_edit_message(
+        callback.message, build_sql_profile_text(),
+        reply_markup=get_sql_profiler_keyboard(sql_profiler.enabled, sql_profiler.duration_minutes),
+        parse_mode="HTML"
+    )
+
+
+@router.callback_query(F.data == "admin:diag_sql")
+async def sql_profile_screen(callback: CallbackQuery):
+    """Экран SQL-профилировщика"""
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("❌ У вас нет прав доступа")
+        return
+    await callback.answer()
+    await _show_sql_profile(callback)
+
+
+@router.callback_query(F.data == "admin:diag_sql_start")
+async def sql_profile_start(callback: CallbackQuery):
+    """Включение SQL-профилировщика на SQL_PROFILE_MINUTES"""
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("❌ У вас нет прав доступа")
+        return
+    sql_profiler.enable()
+    logger.info(f"SQL-профилировщик включен администратором {callback.from_user.id}")
+    await callback.answer(f"▶️ Профилирование на {sql_profiler.duration_minutes:g} мин")
+    await _show_sql_profile(callback)
+
+
+@router.callback_query(F.data == "admin:diag_sql_stop")
+async def sql_profile_stop(callback: CallbackQuery):
+    """Остановка SQL-профилировщика с отчетом"""
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("❌ У вас нет прав доступа")
+        return
+    sql_profiler.disable()
+    await callback.answer("⏹ Профилирование остановлено")
+    await _show_sql_profile(callback)
@@ -301,6 +301,59 @@ def get_statistics_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+def get_diagnostics_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура экрана диагностики"""
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text="🔄 Обновить",
+                callback_data="admin:diag"
+            ),
+            InlineKeyboardButton(
+                text="🧹 Сбросить метрики",
+                callback_data="admin:diag_reset"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="🔬 SQL-профиль",
+                callback_data="admin:diag_sql"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="🔙 Назад в админ-панель",
+                callback_data="admin:main"
+            )
+        ]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+def get_sql_profiler_keyboard(enabled: bool, minutes: float) -> InlineKeyboardMarkup:
+    """Клавиатура SQL-профилировщика"""
+    if enabled:
+        toggle = InlineKeyboardButton(text="⏹ Остановить", callback_data="admin:diag_sql_stop")
+    else:
+        toggle = InlineKeyboardButton(text=f"▶️ Включить на {minutes:g} мин", callback_data="admin:diag_sql_start")
+    keyboard = [
+        [
+            toggle,
+            InlineKeyboardButton(
+                text="🔄 Обновить",
+                callback_data="admin:diag_sql"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="🔙 К диагностике",
+                callback_data="admin:diag"
+            )
+        ]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
 def get_broadcast_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для рассылки"""
     keyboard = [
@@ -355,6 +408,29 @@ def get_confirmation_keyboard(action: str = "confirm") -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+def get_broadcast_confirmation_keyboard(action: str) -> InlineKeyboardMarkup:
+    """Клавиатура подтверждения рассылки с возможностью отложенной отправки"""
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text="✅ Подтвердить",
+                callback_data=f"admin:confirm_{action}"
+            ),
+            InlineKeyboardButton(
+                text="❌ Отменить",
+                callback_data=f"admin:cancel_{action}"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="⏰ Запланировать",
+                callback_data=f"admin:schedule_{action}"
+            )
+        ]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
 def get_selective_broadcast_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для выборочной рассылки"""
     keyboard = [
@@ -470,6 +546,7 @@ def get_tournament_settings_keyboard(tournaments=None) -> InlineKeyboardMarkup:
         for tournament in tournaments[:8]:  # Максимум 8 турниров чтобы поместились
             status_emoji = {
                 'registration': '📝',
+                'registration_closed': '🔒',
                 'in_progress': '🏃',
                 'completed': '✅',
                 'cancelled': '❌'
@@ -501,7 +578,7 @@ def get_tournament_action_keyboard(tournament_id: int, tournament_status: str) -
     keyboard = []
     
     # Кнопки управления в зависимости от статуса
-    if tournament_status == 'registration':
+    if tournament_status in ['registration', 'registration_closed']:
         keyboard.append([
             InlineKeyboardButton(
                 text="🏁 Запустить турнир",
@@ -523,8 +600,8 @@ def get_tournament_action_keyboard(tournament_id: int, tournament_status: str) -
             )
         ])
     
-    # Генерация сетки (только для регистрации)
-    if tournament_status == 'registration':
+    # Генерация сетки (только до начала турнира)
+    if tournament_status in ['registration', 'registration_closed']:
         keyboard.append([
             InlineKeyboardButton(
                 text="🎯 Генерация сетки",
@@ -19,6 +19,7 @@ from database.models import MatchStatus, TournamentStatus, TeamStatus
 from integrations.challonge_api import ChallongeAPI
 from config.settings import settings
 from handlers.admin.states import AdminStates
+from services.tournament_lifecycle import tournament_lifecycle
 
 logger = logging.getLogger(__name__)
 
@@ -635,6 +636,12 @@ async def confirm_match_result(callback: CallbackQuery, state: FSMContext):
             except Exception as e:
                 logger.warning(f"⚠️ Не удалось синхронизировать после обновления: {e}")
         
+        # Если это был последний матч — турнир завершается
+        try:
+            await tournament_lifecycle.complete_if_finished(callback.bot, tournament.id)
+        except Exception as e:
+            logger.error(f"Ошибка проверки завершения турнира {tournament.id}: {e}")
+        
         # Очищаем состояние
         await state.clear()
         
@@ -64,6 +64,9 @@ class AdminStates(StatesGroup):
     selective_broadcast_entering_message = State()
     selective_broadcast_adding_attachment = State()
     
+    # Отложенная рассылка
+    scheduling_broadcast_time = State()
+    
     # Управление играми
     adding_game_name = State()
     adding_game_max_players = State()
@@ -1,13 +1,18 @@
 """
 Хендлеры для статистики и аналитики
 """
+import asyncio
 import logging
+import os
 from datetime import datetime, timedelta
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile, Message
 from aiogram.fsm.context import FSMContext
 
-from database.repositories import UserRepository, TournamentRepository, TeamRepository
+from database.repositories import UserRepository, StatisticsRepository
+from database.stats_cache import stats_cache
+from services.backup_service import backup_service
+from services.export_service import ExportFormat, export_service
 from utils.localization import _
 from utils.message_utils import safe_edit_message
 from .keyboards import get_statistics_keyboard
@@ -15,42 +20,40 @@ from .keyboards import get_statistics_keyboard
 router = Router()
 logger = logging.getLogger(__name__)
 
+# Снимок старше этого при скачивании пересоздается
+DOWNLOAD_SNAPSHOT_MAX_AGE = timedelta(hours=1)
+
 @router.callback_query(F.data == "admin:download_database")
 async def download_database(callback: CallbackQuery):
-    """Отправка файла базы данных администратору"""
+    """Отправка последнего проверенного снимка базы данных администратору"""
     try:
-        import os
-        from config.settings import settings
-        
-        # Путь к файлу БД
-        db_path = "tournament_bot.db"
-        
-        if not os.path.exists(db_path):
-            await callback.answer("❌ Файл базы данных не найден", show_alert=True)
-            return
-        
-        # Получаем размер файла
-        file_size = os.path.getsize(db_path)
-        file_size_mb = file_size / (1024 * 1024)
+        snapshot = backup_service.latest_snapshot()
+        if snapshot is None or datetime.utcnow() - snapshot.created_at > DOWNLOAD_SNAPSHOT_MAX_AGE:
+            await callback.answer("⏳ Создаю снимок базы данных...")
+            snapshot = await backup_service.create_snapshot()
+        else:
+            await callback.answer()
         
-        # Отправляем файл
-        from aiogram.types import FSInputFile
+        file_size_mb = snapshot.size / (1024 * 1024)
         
         try:
-            db_file = FSInputFile(db_path)
             await callback.message.answer_document(
-                document=db_file,
-                caption=f"💾 <b>База данных бота</b>\n\n📊 Размер: {file_size_mb:.2f} МБ\n📅 Дата: {datetime.now().strftime('%d.%m.%Y %H:%M')}",
+                document=FSInputFile(snapshot.path, filename=snapshot.filename),
+                caption=(
+                    f"💾 <b>Снимок базы данных</b>\n\n"
+                    f"📊 Размер (gzip): {file_size_mb:.2f} МБ\n"
+                    f"📅 Снят: {snapshot.created_at.strftime('%d.%m.%Y %H:%M')} UTC\n"
+                    f"✅ integrity_check пройден"
+                ),
                 parse_mode="HTML"
             )
-            await callback.answer("✅ База данных отправлена")
         except Exception as e:
-            logger.error(f"Ошибка отправки файла БД: {e}")
-            await callback.answer("❌ Ошибка отправки файла", show_alert=True)
+            logger.error(f"Ошибка отправки снимка БД: {e}")
+            await callback.message.answer("❌ Ошибка отправки файла")
             
     except Exception as e:
-        logger.error(f"Ошибка получения БД: {e}")
-        await callback.answer("❌ Ошибка", show_alert=True)
+        logger.error(f"Ошибка получения снимка БД: {e}")
+        await callback.message.answer("❌ Не удалось создать снимок базы данных")
 
 
 @router.callback_query(F.data == "admin:statistics")
@@ -67,6 +70,14 @@ async def statistics_menu(callback: CallbackQuery, state: FSMContext):
 Выберите тип статистики для просмотра:
 """, language)
     
+    # Диагностика кэша снимков статистики
+    cache = stats_cache.get_stats()
+    text += (
+        f"\n⚡ Кэш: {cache['hit_rate']}% попаданий "
+        f"({cache['hits']} свежих, {cache['stale_hits']} устаревших, {cache['misses']} промахов, "
+        f"{cache['invalidations']} инвалидаций)"
+    )
+    
     await safe_edit_message(
         callback.message, text, parse_mode="Markdown",
         reply_markup=get_statistics_keyboard()
@@ -78,35 +89,17 @@ async def general_statistics(callback: CallbackQuery, state: FSMContext):
     """Общая статистика"""
     try:
 
-        # Получаем общую статистику
-        total_users = await UserRepository.get_total_count()
-        total_tournaments = await TournamentRepository.get_total_count()
-        total_teams = await TeamRepository.get_total_count()
-        
-        # Статистика за последние 30 дней
-        date_30_days_ago = datetime.now() - timedelta(days=30)
-        new_users_30d = await UserRepository.get_count_since(date_30_days_ago)
-        new_tournaments_30d = await TournamentRepository.get_count_since(date_30_days_ago)
-        new_teams_30d = await TeamRepository.get_count_since(date_30_days_ago)
-        
-        # Статистика за последние 7 дней
-        date_7_days_ago = datetime.now() - timedelta(days=7)
-        new_users_7d = await UserRepository.get_count_since(date_7_days_ago)
-        new_tournaments_7d = await TournamentRepository.get_count_since(date_7_days_ago)
-        new_teams_7d = await TeamRepository.get_count_since(date_7_days_ago)
+        # Вся общая статистика — двумя запросами
+        stats = await StatisticsRepository.get_cached_general_stats()
         
-        # Статистика по языкам
-        language_stats = await UserRepository.get_language_statistics()
         language_text = "\n".join([
             f"• {lang.upper()}: {count}" 
-            for lang, count in language_stats.items()
+            for lang, count in stats.languages.items()
         ])
         
-        # Статистика по регионам
-        region_stats = await UserRepository.get_region_statistics()
         region_text = "\n".join([
             f"• {region.upper()}: {count}" 
-            for region, count in region_stats.items()
+            for region, count in stats.regions.items()
         ])
         
         text = _("""
@@ -135,18 +128,18 @@ async def general_statistics(callback: CallbackQuery, state: FSMContext):
 
 📅 Обновлено: {updated}
 """, "ru").format(
-            total_users=total_users,
-            total_tournaments=total_tournaments,
-            total_teams=total_teams,
-            users_30d=new_users_30d,
-            tournaments_30d=new_tournaments_30d,
-            teams_30d=new_teams_30d,
-            users_7d=new_users_7d,
-            tournaments_7d=new_tournaments_7d,
-            teams_7d=new_teams_7d,
+            total_users=stats.total_users,
+            total_tournaments=stats.total_tournaments,
+            total_teams=stats.total_teams,
+            users_30d=stats.users_30d,
+            tournaments_30d=stats.tournaments_30d,
+            teams_30d=stats.teams_30d,
+            users_7d=stats.users_7d,
+            tournaments_7d=stats.tournaments_7d,
+            teams_7d=stats.teams_7d,
             languages=language_text or "Нет данных",
             regions=region_text or "Нет данных",
-            updated=datetime.now().strftime("%d.%m.%Y %H:%M")
+            updated=stats.generated_at.strftime("%d.%m.%Y %H:%M UTC")
         )
         
     except Exception as e:
@@ -176,24 +169,17 @@ async def tournament_statistics(callback: CallbackQuery, state: FSMContext):
     """Статистика турниров"""
     try:
 
-        # Общая статистика турниров
-        total_tournaments = await TournamentRepository.get_total_count()
-        active_tournaments = await TournamentRepository.get_active_count()
-        completed_tournaments = await TournamentRepository.get_completed_count()
-        upcoming_tournaments = await TournamentRepository.get_upcoming_count()
-        
-        # Статистика по играм
-        game_stats = await TournamentRepository.get_game_statistics()
+        # Счетчики и разрез по играм — одним запросом, топ — вторым
+        stats = await StatisticsRepository.get_cached_tournament_stats()
         game_text = "\n".join([
             f"• {game}: {count} турниров" 
-            for game, count in game_stats.items()
+            for game, count in stats.by_game.items()
         ])
         
-        # Топ турниров по количеству команд
-        top_tournaments = await TournamentRepository.get_top_by_teams(5)
+        top_tournaments = await StatisticsRepository.get_cached_top_tournaments_by_teams(5)
         top_text = "\n".join([
-            f"• {tournament.name}: {len(tournament.teams)} команд" 
-            for tournament in top_tournaments
+            f"• {name}: {teams_count} команд" 
+            for name, teams_count in top_tournaments
         ])
         
         text = _("""
@@ -213,13 +199,13 @@ async def tournament_statistics(callback: CallbackQuery, state: FSMContext):
 
 📅 Обновлено: {updated}
 """, "ru").format(
-            total=total_tournaments,
-            active=active_tournaments,
-            completed=completed_tournaments,
-            upcoming=upcoming_tournaments,
+            total=stats.total,
+            active=stats.active,
+            completed=stats.completed,
+            upcoming=stats.upcoming,
             games=game_text or "Нет данных",
             top_tournaments=top_text or "Нет данных",
-            updated=datetime.now().strftime("%d.%m.%Y %H:%M")
+            updated=stats.generated_at.strftime("%d.%m.%Y %H:%M UTC")
         )
         
     except Exception as e:
@@ -249,27 +235,16 @@ async def team_statistics(callback: CallbackQuery, state: FSMContext):
     """Статистика команд"""
     try:
 
-        # Общая статистика команд
-        total_teams = await TeamRepository.get_total_count()
-        active_teams = await TeamRepository.get_active_count()
-        pending_teams = await TeamRepository.get_pending_count()
-        blocked_teams = await TeamRepository.get_blocked_count()
-        
-        # Средний размер команд
-        avg_team_size = await TeamRepository.get_average_team_size()
-        
-        # Статистика по турнирам
-        tournament_stats = await TeamRepository.get_tournament_participation_stats()
+        # Счетчики, разрез по турнирам и топ капитанов — тремя запросами
+        stats = await StatisticsRepository.get_cached_team_stats()
         tournament_text = "\n".join([
             f"• {tournament}: {count} команд" 
-            for tournament, count in tournament_stats.items()
+            for tournament, count in stats.by_tournament.items()
         ])
         
-        # Топ капитанов по количеству команд
-        top_captains = await TeamRepository.get_top_captains(5)
         captains_text = "\n".join([
             f"• {captain}: {count} команд" 
-            for captain, count in top_captains.items()
+            for captain, count in stats.top_captains
         ])
         
         text = _("""
@@ -291,14 +266,14 @@ async def team_statistics(callback: CallbackQuery, state: FSMContext):
 
 📅 Обновлено: {updated}
 """, "ru").format(
-            total=total_teams,
-            active=active_teams,
-            pending=pending_teams,
-            blocked=blocked_teams,
-            avg_size=round(avg_team_size, 1) if avg_team_size else 0,
+            total=stats.total,
+            active=stats.approved,
+            pending=stats.pending,
+            blocked=stats.rejected,
+            avg_size=round(stats.average_size, 1),
             tournaments=tournament_text or "Нет данных",
             captains=captains_text or "Нет данных",
-            updated=datetime.now().strftime("%d.%m.%Y %H:%M")
+            updated=stats.generated_at.strftime("%d.%m.%Y %H:%M UTC")
         )
         
     except Exception as e:
@@ -328,32 +303,17 @@ async def user_statistics(callback: CallbackQuery, state: FSMContext):
     """Статистика пользователей"""
     try:
 
-        # Общая статистика пользователей
-        total_users = await UserRepository.get_total_count()
-        active_users = await UserRepository.get_active_count()
-        admin_users = len(await UserRepository.get_admins())
-        blocked_users = len(await UserRepository.get_blocked_users())
-        
-        # Статистика активности (последние 30 дней)
-        date_30_days_ago = datetime.now() - timedelta(days=30)
-        active_30d = await UserRepository.get_active_since(date_30_days_ago)
+        # Счетчики — из users, активность — из суточных карт активности
+        stats = await StatisticsRepository.get_cached_user_stats()
         
-        # Статистика активности (последние 7 дней)
-        date_7_days_ago = datetime.now() - timedelta(days=7)
-        active_7d = await UserRepository.get_active_since(date_7_days_ago)
-        
-        # Статистика регистраций по дням за последнюю неделю
-        daily_registrations = await UserRepository.get_daily_registrations(7)
         daily_text = "\n".join([
             f"• {date}: {count} пользователей" 
-            for date, count in daily_registrations.items()
+            for date, count in stats.daily_registrations.items()
         ])
         
-        # Топ пользователей по активности (последнее обновление)
-        top_active = await UserRepository.get_most_active_users(5)
         active_text = "\n".join([
-            f"• {user}: последнее обновление {activity}" 
-            for user, activity in top_active.items()
+            f"• {name}: {active_days} дн. из 30" 
+            for name, active_days in stats.most_active
         ])
         
         text = _("""
@@ -366,26 +326,31 @@ async def user_statistics(callback: CallbackQuery, state: FSMContext):
 🚫 Заблокированных: {blocked}
 
 📈 Активность:
-🌟 Обновлений за 30 дней: {active_30d}
-🔥 Обновлений за 7 дней: {active_7d}
+🔥 За сегодня (DAU): {dau}
+🌟 За 7 дней (WAU): {wau}
+📆 За 30 дней (MAU): {mau}
+🔁 Удержание зарегистрированных 7 дней назад: {retention_d1}% на след. день, {retention_d7}% сегодня
 
 📅 Регистрации за неделю:
 {daily}
 
-🏆 Самые активные (по обновлению):
+🏆 Самые активные за 30 дней:
 {top_active}
 
 📅 Обновлено: {updated}
 """, "ru").format(
-            total=total_users,
-            active=active_users,
-            admins=admin_users,
-            blocked=blocked_users,
-            active_30d=active_30d,
-            active_7d=active_7d,
+            total=stats.total,
+            active=stats.active,
+            admins=stats.admins,
+            blocked=stats.blocked,
+            dau=stats.dau,
+            wau=stats.wau,
+            mau=stats.mau,
+            retention_d1=round(stats.retention_d1),
+            retention_d7=round(stats.retention_d7),
             daily=daily_text or "Нет данных",
             top_active=active_text or "Нет данных",
-            updated=datetime.now().strftime("%d.%m.%Y %H:%M")
+            updated=stats.generated_at.strftime("%d.%m.%Y %H:%M UTC")
         )
         
     except Exception as e:
@@ -436,6 +401,12 @@ async def export_data(callback: CallbackQuery, state: FSMContext):
                 callback_data="admin:export_excel"
             )
         ],
+        [
+            InlineKeyboardButton(
+                text="🔄 Изменения (NDJSON)",
+                callback_data="admin:export_delta"
+            )
+        ],
         [
             InlineKeyboardButton(
                 text=_("🔙 Назад к статистике", "ru"),
@@ -496,7 +467,7 @@ async def export_csv_menu(callback: CallbackQuery, state: FSMContext):
 async def export_json_menu(callback: CallbackQuery, state: FSMContext):
     """Меню экспорта JSON"""
     text = _("""
-📋 Экспорт в JSON
+📋 Экспорт в JSON (NDJSON, по объекту на строку)
 
 Выберите данные для экспорта:
 """, "ru")
@@ -511,7 +482,7 @@ async def export_json_menu(callback: CallbackQuery, state: FSMContext):
         [
             InlineKeyboardButton(
                 text="👥 Команды",
-                callback_data="admin:export_teams"
+                callback_data="admin:export_teams_json"
             )
         ],
         [
@@ -534,6 +505,18 @@ async def export_json_menu(callback: CallbackQuery, state: FSMContext):
     )
     await callback.answer()
 
+async def send_export(callback: CallbackQuery, name: str, export_format, caption: str):
+    """Потоковая выгрузка таблицы в gzip-файл и отправка его администратору"""
+    result = await export_service.export_to_file(name, export_format)
+    try:
+        await callback.message.answer_document(
+            document=FSInputFile(result.path, filename=result.filename),
+            caption=f"{caption}\n📦 Строк: {result.rows}"
+        )
+    finally:
+        os.remove(result.path)
+
+
 # CSV экспорт хэндлеры
 @router.callback_query(F.data == "admin:export_users_csv")
 async def export_users_csv_handler(callback: CallbackQuery, state: FSMContext):
@@ -541,22 +524,9 @@ async def export_users_csv_handler(callback: CallbackQuery, state: FSMContext):
     await callback.answer("Генерирую CSV файл пользователей...")
     
     try:
-        from services.export_service import export_service
-        from aiogram.types import BufferedInputFile
-        
-        # Генерируем CSV
-        csv_data = await export_service.export_users_csv()
-        csv_content = csv_data.getvalue().encode('utf-8-sig')  # BOM для правильного отображения в Excel
-        
-        # Отправляем файл
-        file = BufferedInputFile(csv_content, filename=f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-        
-        await callback.message.answer_document(
-            document=file,
-            caption="📄 Экспорт пользователей в формате CSV"
-        )
-        
+        await send_export(callback, "users", ExportFormat.CSV, "📄 Экспорт пользователей в формате CSV (gzip)")
     except Exception as e:
+        logger.error(f"Ошибка экспорта пользователей: {e}")
         await callback.message.answer(f"❌ Ошибка при экспорте: {str(e)}")
 
 @router.callback_query(F.data == "admin:export_teams_csv")
@@ -565,22 +535,9 @@ async def export_teams_csv_handler(callback: CallbackQuery, state: FSMContext):
     await callback.answer("Генерирую CSV файл команд...")
     
     try:
-        from services.export_service import export_service
-        from aiogram.types import BufferedInputFile
-        
-        # Генерируем CSV
-        csv_data = await export_service.export_teams_csv()
-        csv_content = csv_data.getvalue().encode('utf-8-sig')
-        
-        # Отправляем файл
-        file = BufferedInputFile(csv_content, filename=f"teams_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-        
-        await callback.message.answer_document(
-            document=file,
-            caption="📄 Экспорт команд в формате CSV"
-        )
-        
+        await send_export(callback, "teams", ExportFormat.CSV, "📄 Экспорт команд в формате CSV (gzip)")
     except Exception as e:
+        logger.error(f"Ошибка экспорта команд: {e}")
         await callback.message.answer(f"❌ Ошибка при экспорте: {str(e)}")
 
 @router.callback_query(F.data == "admin:export_tournaments_csv")
@@ -589,115 +546,161 @@ async def export_tournaments_csv_handler(callback: CallbackQuery, state: FSMCont
     await callback.answer("Генерирую CSV файл турниров...")
     
     try:
-        from services.export_service import export_service
-        from aiogram.types import BufferedInputFile
-        
-        # Генерируем CSV
-        csv_data = await export_service.export_tournaments_csv()
-        csv_content = csv_data.getvalue().encode('utf-8-sig')
-        
-        # Отправляем файл
-        file = BufferedInputFile(csv_content, filename=f"tournaments_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-        
-        await callback.message.answer_document(
-            document=file,
-            caption="📄 Экспорт турниров в формате CSV"
-        )
-        
+        await send_export(callback, "tournaments", ExportFormat.CSV, "📄 Экспорт турниров в формате CSV (gzip)")
     except Exception as e:
+        logger.error(f"Ошибка экспорта турниров: {e}")
         await callback.message.answer(f"❌ Ошибка при экспорте: {str(e)}")
 
-# JSON экспорт хэндлеры
+# JSON экспорт хэндлеры (NDJSON: один объект на строку)
 @router.callback_query(F.data == "admin:export_users_json")
 async def export_users_json_handler(callback: CallbackQuery, state: FSMContext):
-    """Экспорт пользователей в JSON"""
+    """Экспорт пользователей в NDJSON"""
     await callback.answer("Генерирую JSON файл пользователей...")
     
     try:
-        from services.export_service import export_service
-        from aiogram.types import BufferedInputFile
-        
-        # Генерируем JSON
-        json_content = await export_service.export_users_json()
-        
-        # Отправляем файл
-        file = BufferedInputFile(json_content.encode('utf-8'), filename=f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        
-        await callback.message.answer_document(
-            document=file,
-            caption="📋 Экспорт пользователей в формате JSON"
-        )
-        
+        await send_export(callback, "users", ExportFormat.NDJSON, "📋 Экспорт пользователей в формате NDJSON (gzip)")
     except Exception as e:
+        logger.error(f"Ошибка экспорта пользователей: {e}")
         await callback.message.answer(f"❌ Ошибка при экспорте: {str(e)}")
 
 @router.callback_query(F.data == "admin:export_teams_json")
 async def export_teams_json_handler(callback: CallbackQuery, state: FSMContext):
-    """Экспорт команд в JSON"""
+    """Экспорт команд в NDJSON"""
     await callback.answer("Генерирую JSON файл команд...")
     
     try:
-        from services.export_service import export_service
-        from aiogram.types import BufferedInputFile
-        
-        # Генерируем JSON
-        json_content = await export_service.export_teams_json()
-        
-        # Отправляем файл
-        file = BufferedInputFile(json_content.encode('utf-8'), filename=f"teams_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        
-        await callback.message.answer_document(
-            document=file,
-            caption="📋 Экспорт команд в формате JSON"
-        )
-        
+        await send_export(callback, "teams", ExportFormat.NDJSON, "📋 Экспорт команд в формате NDJSON (gzip)")
     except Exception as e:
+        logger.error(f"Ошибка экспорта команд: {e}")
         await callback.message.answer(f"❌ Ошибка при экспорте: {str(e)}")
 
 @router.callback_query(F.data == "admin:export_tournaments_json")
 async def export_tournaments_json_handler(callback: CallbackQuery, state: FSMContext):
-    """Экспорт турниров в JSON"""
+    """Экспорт турниров в NDJSON"""
     await callback.answer("Генерирую JSON файл турниров...")
     
     try:
-        from services.export_service import export_service
-        from aiogram.types import BufferedInputFile
-        
-        # Генерируем JSON
-        json_content = await export_service.export_tournaments_json()
-        
-        # Отправляем файл
-        file = BufferedInputFile(json_content.encode('utf-8'), filename=f"tournaments_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        
-        await callback.message.answer_document(
-            document=file,
-            caption="📋 Экспорт турниров в формате JSON"
-        )
-        
+        await send_export(callback, "tournaments", ExportFormat.NDJSON, "📋 Экспорт турниров в формате NDJSON (gzip)")
     except Exception as e:
+        logger.error(f"Ошибка экспорта турниров: {e}")
+        await callback.message.answer(f"❌ Ошибка при экспорте: {str(e)}")
+
+# Дельта-выгрузки: отметка у каждого администратора своя
+DELTA_EXPORT_TITLES = {
+    "users": "пользователей",
+    "teams": "команд",
+    "tournaments": "турниров",
+}
+
+@router.callback_query(F.data == "admin:export_delta")
+async def export_delta_menu(callback: CallbackQuery, state: FSMContext):
+    """Меню дельта-выгрузок"""
+    text = _("""
+🔄 Изменения с прошлой выгрузки (NDJSON)
+
+В файл попадут только строки, созданные или измененные после вашей прошлой дельта-выгрузки, и удаленные записи (`"op": "delete"`). Первая выгрузка содержит все строки.
+
+Названия связанных записей и счетчики в дельту не входят — только ID (`tournament_id`, `captain_id`, `game_id`).
+
+Выберите данные для экспорта:
+""", "ru")
+    
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text="👤 Пользователи",
+                callback_data="admin:export_delta:users"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="👥 Команды",
+                callback_data="admin:export_delta:teams"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="🏆 Турниры",
+                callback_data="admin:export_delta:tournaments"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text=_("🔙 Назад к экспорту", "ru"),
+                callback_data="admin:export_data"
+            )
+        ]
+    ]
+    
+    await safe_edit_message(
+        callback.message, text, parse_mode="Markdown",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
+    )
+    await callback.answer()
+
+@router.callback_query(F.data.startswith("admin:export_delta:"))
+async def export_delta_handler(callback: CallbackQuery, state: FSMContext):
+    """Дельта-выгрузка таблицы с отметки администратора"""
+    name = callback.data.split(":")[-1]
+    if name not in DELTA_EXPORT_TITLES:
+        await callback.answer("❌ Неизвестная выгрузка", show_alert=True)
+        return
+    
+    await callback.answer("Собираю изменения...")
+    consumer = f"admin:{callback.from_user.id}"
+    
+    try:
+        result = await export_service.export_delta(consumer, name)
+        try:
+            await callback.message.answer_document(
+                document=FSInputFile(result.path, filename=result.filename),
+                caption=(
+                    f"🔄 Изменения {DELTA_EXPORT_TITLES[name]} по {result.watermark.strftime('%d.%m.%Y %H:%M:%S')} UTC\n"
+                    f"📦 Изменено: {result.rows}, удалено: {result.deleted}"
+                )
+            )
+        finally:
+            os.remove(result.path)
+        # Сдвигаем отметку только после доставки файла
+        await export_service.acknowledge_delta(consumer, name, result)
+    except Exception as e:
+        logger.error(f"Ошибка дельта-выгрузки {name}: {e}")
         await callback.message.answer(f"❌ Ошибка при экспорте: {str(e)}")
 
 # Excel экспорт хэндлер
+# Фоновые выгрузки Excel (ссылки держим, чтобы задачи не собрал GC)
+_excel_exports: set = set()
+
+
+async def run_excel_export(status_message: Message):
+    """Фоновая выгрузка Excel с обновлением сообщения о прогрессе"""
+    done_steps = []
+    
+    async def progress(step: str):
+        done_steps.append(step)
+        await safe_edit_message(status_message, "⏳ Экспорт в Excel\n\n" + "\n".join(f"• {s}" for s in done_steps))
+    
+    try:
+        result = await export_service.export_excel(progress=progress)
+        try:
+            await status_message.answer_document(
+                document=FSInputFile(result.path, filename=result.filename),
+                caption=f"📊 Полный экспорт данных в формате Excel\n📦 Строк: {result.rows}"
+            )
+        finally:
+            os.remove(result.path)
+        await safe_edit_message(status_message, "✅ Экспорт в Excel готов")
+    except Exception as e:
+        logger.error(f"Ошибка экспорта в Excel: {e}")
+        await safe_edit_message(status_message, f"❌ Ошибка при экспорте: {str(e)}")
+
+
 @router.callback_query(F.data == "admin:export_excel")
 async def export_excel_handler(callback: CallbackQuery, state: FSMContext):
-    """Экспорт всех данных в Excel"""
+    """Экспорт всех данных в Excel (в фоне, файл придет отдельным сообщением)"""
     await callback.answer("Генерирую Excel файл со всеми данными...")
     
-    try:
-        from services.export_service import export_service
-        from aiogram.types import BufferedInputFile
-        
-        # Генерируем Excel
-        excel_data = await export_service.export_excel()
-        excel_content = excel_data.getvalue()
-        
-        # Отправляем файл
-        file = BufferedInputFile(excel_content, filename=f"enas_game_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-        
-        await callback.message.answer_document(
-            document=file,
-            caption="📊 Полный экспорт данных в формате Excel"
-        )
-        
-    except Exception as e:
-        await callback.message.answer(f"❌ Ошибка при экспорте: {str(e)}")
\ No newline at end of file
+    status_message = await callback.message.answer("⏳ Экспорт в Excel запущен...")
+    task = asyncio.create_task(run_excel_export(status_message))
+    _excel_exports.add(task)
+    task.add_done_callback(_excel_exports.discard)
@@ -15,6 +15,10 @@ from aiogram.fsm.context import FSMContext
 from database.repositories import UserRepository, TeamRepository
 from database.db_manager import get_session
 from utils.message_utils import safe_edit_message
+from utils.callback_data import (
+    AdminRosterCallback, AdminTeamBlockCallback, AdminTeamStatusCallback, BlockScope, RosterAction
+)
+from services.outbound_scheduler import outbound_priority, Priority
 from .states import AdminStates
 from .keyboards import get_team_moderation_keyboard, get_team_action_keyboard
 
@@ -273,11 +277,12 @@ async def approve_team(callback: CallbackQuery, state: FSMContext):
 Следите за расписанием матчей."""
             
             try:
-                await callback.bot.send_message(
-                    chat_id=captain.telegram_id,
-                    text=captain_text,
-                    parse_mode="HTML"
-                )
+                with outbound_priority(Priority.TRANSACTIONAL):
+                    await callback.bot.send_message(
+                        chat_id=captain.telegram_id,
+                        text=captain_text,
+                        parse_mode="HTML"
+                    )
                 logger.info(f"Уведомление об одобрении отправлено капитану {captain.telegram_id}")
             except Exception as e:
                 logger.error(f"Ошибка отправки уведомления капитану {captain.telegram_id}: {e}")
@@ -427,11 +432,12 @@ async def process_team_rejection_reason(message: Message, state: FSMContext):
 Вы можете исправить ошибки и подать заявку заново."""
             
             try:
-                await message.bot.send_message(
-                    chat_id=captain.telegram_id,
-                    text=captain_text,
-                    parse_mode="HTML"
-                )
+                with outbound_priority(Priority.TRANSACTIONAL):
+                    await message.bot.send_message(
+                        chat_id=captain.telegram_id,
+                        text=captain_text,
+                        parse_mode="HTML"
+                    )
             except Exception as e:
                 logger.error(f"Ошибка отправки уведомления капитану: {e}")
         
@@ -522,9 +528,10 @@ async def view_blocked_teams(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data.regexp(r"^admin:team_details_\d+$"))
-async def view_team_details(callback: CallbackQuery, state: FSMContext):
+async def view_team_details(callback: CallbackQuery, state: FSMContext, team_id: int | None = None):
     from database.repositories import PlayerRepository
-    team_id = int(callback.data.split("_")[-1])
+    if team_id is None:
+        team_id = int(callback.data.split("_")[-1])
     team = await _get_team_or_answer_cb(callback, team_id)
     if not team:
         return
@@ -803,11 +810,12 @@ async def process_edit_team_logo(message: Message, state: FSMContext):
 
 
 @router.callback_query(F.data.regexp(r"^admin:manage_roster_\d+$"))
-async def manage_team_roster(callback: CallbackQuery, state: FSMContext):
+async def manage_team_roster(callback: CallbackQuery, state: FSMContext, team_id: int | None = None):
     """Управление составом команды"""
     from database.repositories import PlayerRepository
     
-    team_id = int(callback.data.split("_")[-1])
+    if team_id is None:
+        team_id = int(callback.data.split("_")[-1])
     team = await _get_team_or_answer_cb(callback, team_id)
     if not team:
         return
@@ -847,7 +855,9 @@ async def manage_team_roster(callback: CallbackQuery, state: FSMContext):
             ),
             InlineKeyboardButton(
                 text="❌",
-                callback_data=f"admin:remove_player_{player.id}_{team_id}"
+                callback_data=AdminRosterCallback(
+                    action=RosterAction.REMOVE, player_id=player.id, team_id=team_id
+                ).pack()
             )
         ])
     
@@ -860,7 +870,9 @@ async def manage_team_roster(callback: CallbackQuery, state: FSMContext):
             ),
             InlineKeyboardButton(
                 text="❌",
-                callback_data=f"admin:remove_player_{player.id}_{team_id}"
+                callback_data=AdminRosterCallback(
+                    action=RosterAction.REMOVE, player_id=player.id, team_id=team_id
+                ).pack()
             )
         ])
     
@@ -989,14 +1001,13 @@ async def process_add_roster_player(message: Message, state: FSMContext):
         await state.clear()
 
 
-@router.callback_query(F.data.regexp(r"^admin:remove_player_\d+_\d+$"))
-async def remove_roster_player(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(AdminRosterCallback.filter(F.action == RosterAction.REMOVE))
+async def remove_roster_player(callback: CallbackQuery, callback_data: AdminRosterCallback, state: FSMContext):
     """Удаление игрока из состава"""
     from database.repositories import PlayerRepository
     
-    parts = callback.data.split("_")
-    player_id = int(parts[2])
-    team_id = int(parts[3])
+    player_id = callback_data.player_id
+    team_id = callback_data.team_id
     
     try:
         # Получаем информацию об игроке перед удалением
@@ -1013,7 +1024,7 @@ async def remove_roster_player(callback: CallbackQuery, state: FSMContext):
         if success:
             await callback.answer(f"✅ Игрок {player_to_remove.nickname} удалён", show_alert=True)
             # Обновляем список
-            await manage_team_roster(callback, state)
+            await manage_team_roster(callback, state, team_id=team_id)
         else:
             await callback.answer("❌ Ошибка удаления", show_alert=True)
     except Exception as e:
@@ -1235,13 +1246,13 @@ async def block_team(callback: CallbackQuery, state: FSMContext):
             [
                 InlineKeyboardButton(
                     text="🏆 Только этот турнир",
-                    callback_data=f"admin:block_scope_tournament_{team_id}"
+                    callback_data=AdminTeamBlockCallback(scope=BlockScope.TOURNAMENT, team_id=team_id).pack()
                 )
             ],
             [
                 InlineKeyboardButton(
                     text="🌐 Все турниры",
-                    callback_data=f"admin:block_scope_global_{team_id}"
+                    callback_data=AdminTeamBlockCallback(scope=BlockScope.GLOBAL, team_id=team_id).pack()
                 )
             ],
             [
@@ -1255,12 +1266,11 @@ async def block_team(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data.regexp(r"^admin:block_scope_(tournament|global)_\d+$"))
-async def block_team_select_scope(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(AdminTeamBlockCallback.filter())
+async def block_team_select_scope(callback: CallbackQuery, callback_data: AdminTeamBlockCallback, state: FSMContext):
     """Выбор области блокировки"""
-    parts = callback.data.split("_")
-    scope = parts[2]  # tournament или global
-    team_id = int(parts[3])
+    scope = callback_data.scope.value  # tournament или global
+    team_id = callback_data.team_id
     
     team = await _get_team_or_answer_cb(callback, team_id)
     if not team:
@@ -1342,11 +1352,12 @@ async def process_team_blocking_reason(message: Message, state: FSMContext):
 Для получения дополнительной информации обратитесь к администраторам."""
             
             try:
-                await message.bot.send_message(
-                    chat_id=captain.telegram_id,
-                    text=captain_text,
-                    parse_mode="HTML"
-                )
+                with outbound_priority(Priority.TRANSACTIONAL):
+                    await message.bot.send_message(
+                        chat_id=captain.telegram_id,
+                        text=captain_text,
+                        parse_mode="HTML"
+                    )
                 logger.info(f"Уведомление о блокировке отправлено капитану {captain.telegram_id}")
             except Exception as e:
                 logger.error(f"Ошибка отправки уведомления капитану: {e}")
@@ -1399,11 +1410,12 @@ async def unblock_team(callback: CallbackQuery, state: FSMContext):
 Теперь вы снова можете участвовать в турнирах."""
             
             try:
-                await callback.bot.send_message(
-                    chat_id=captain.telegram_id,
-                    text=captain_text,
-                    parse_mode="HTML"
-                )
+                with outbound_priority(Priority.TRANSACTIONAL):
+                    await callback.bot.send_message(
+                        chat_id=captain.telegram_id,
+                        text=captain_text,
+                        parse_mode="HTML"
+                    )
             except Exception as e:
                 logger.error(f"Ошибка отправки уведомления капитану: {e}")
         
@@ -1443,13 +1455,13 @@ async def change_team_status_menu(callback: CallbackQuery, state: FSMContext):
     buttons = []
     
     if team.status != "pending":
-        buttons.append([InlineKeyboardButton(text="⏳ Ожидает модерации", callback_data=f"admin:set_status_pending_{team_id}")])
+        buttons.append([InlineKeyboardButton(text="⏳ Ожидает модерации", callback_data=AdminTeamStatusCallback(status="pending", team_id=team_id).pack())])
     
     if team.status != "approved":
-        buttons.append([InlineKeyboardButton(text="✅ Одобрить", callback_data=f"admin:set_status_approved_{team_id}")])
+        buttons.append([InlineKeyboardButton(text="✅ Одобрить", callback_data=AdminTeamStatusCallback(status="approved", team_id=team_id).pack())])
     
     if team.status != "rejected":
-        buttons.append([InlineKeyboardButton(text="❌ Отклонить", callback_data=f"admin:set_status_rejected_{team_id}")])
+        buttons.append([InlineKeyboardButton(text="❌ Отклонить", callback_data=AdminTeamStatusCallback(status="rejected", team_id=team_id).pack())])
     
     buttons.append([InlineKeyboardButton(text="🔙 Назад", callback_data=f"admin:team_details_{team_id}")])
     
@@ -1462,12 +1474,11 @@ async def change_team_status_menu(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data.regexp(r"^admin:set_status_(pending|approved|rejected)_\d+$"))
-async def set_team_status(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(AdminTeamStatusCallback.filter(F.status.in_({"pending", "approved", "rejected"})))
+async def set_team_status(callback: CallbackQuery, callback_data: AdminTeamStatusCallback, state: FSMContext):
     """Установка нового статуса команды"""
-    parts = callback.data.split("_")
-    new_status = parts[2]
-    team_id = int(parts[3])
+    new_status = callback_data.status
+    team_id = callback_data.team_id
     
     team = await _get_team_or_answer_cb(callback, team_id)
     if not team:
@@ -1484,7 +1495,7 @@ async def set_team_status(callback: CallbackQuery, state: FSMContext):
         
         await callback.answer(f"✅ Статус изменён на: {status_text}", show_alert=True)
         # Возвращаемся к деталям команды
-        await view_team_details(callback, state)
+        await view_team_details(callback, state, team_id=team_id)
         
     except Exception as e:
         logger.error(f"Ошибка изменения статуса: {e}")
@@ -11,6 +11,7 @@ from database.repositories import TournamentRepository, GameRepository
 from utils.message_utils import safe_edit_message, safe_send_message
 from utils.datetime_utils import format_datetime_for_user
 from utils.text_formatting import escape_markdown_simple
+from services.scheduled_jobs import schedule_tournament_jobs
 from ..states import AdminStates
 from ..keyboards import get_game_selection_keyboard, get_tournament_format_keyboard, get_confirm_tournament_creation_keyboard
 
@@ -672,6 +673,12 @@ async def confirm_create_tournament(callback: CallbackQuery, state: FSMContext):
         logger.info(f"Турнир правила: {tournament.rules_file_id if tournament else 'None'}")
         
         if tournament:
+            # Планируем напоминания по датам турнира
+            try:
+                await schedule_tournament_jobs(tournament)
+            except Exception as e:
+                logger.error(f"Ошибка планирования задач турнира {tournament.id}: {e}")
+            
             # Формируем сообщение с информацией
             rules_info = ""
             if tournament.rules_file_id:
@@ -15,6 +15,7 @@ from ..states import AdminStates
 from database.repositories import TournamentRepository
 from database.models import TournamentFormat
 from integrations.challonge_api import ChallongeAPI
+from services.scheduled_jobs import schedule_tournament_jobs
 from config import settings
 
 router = Router()
@@ -898,6 +899,12 @@ async def confirm_create_tournament(callback: CallbackQuery, state: FSMContext):
             rules_file_name=data.get('tournament_rules_file_name')
         )
         
+        # Планируем напоминания по датам турнира
+        try:
+            await schedule_tournament_jobs(tournament)
+        except Exception as e:
+            logger.error(f"Ошибка планирования задач турнира {tournament.id}: {e}")
+        
         # Создаем турнир в Challonge
         if not settings.challonge_client_id or not settings.challonge_client_secret:
             raise Exception("Challonge API не настроен. Проверьте CHALLONGE_CLIENT_ID и CHALLONGE_CLIENT_SECRET в .env файле")
@@ -9,6 +9,7 @@ from aiogram.fsm.context import FSMContext
 from database.repositories import TournamentRepository
 from utils.message_utils import safe_edit_message
 from utils.datetime_utils import format_datetime_for_user
+from services.tournament_lifecycle import tournament_lifecycle
 from ..keyboards import get_tournament_management_keyboard, get_tournament_settings_keyboard, get_tournament_action_keyboard
 
 router = Router()
@@ -95,6 +96,7 @@ async def show_tournament_management_info(callback: CallbackQuery, tournament):
     # Статус эмодзи
     status_emoji = {
         'registration': '📝',
+        'registration_closed': '🔒',
         'in_progress': '🏃', 
         'completed': '✅',
         'cancelled': '❌',
@@ -104,6 +106,7 @@ async def show_tournament_management_info(callback: CallbackQuery, tournament):
     # Статус на русском
     status_text = {
         'registration': 'Регистрация',
+        'registration_closed': 'Регистрация закрыта',
         'in_progress': 'В процессе',
         'completed': 'Завершен',
         'cancelled': 'Отменен', 
@@ -248,8 +251,8 @@ async def start_tournament(callback: CallbackQuery, state: FSMContext):
     try:
         tournament_id = int(callback.data.split("_")[-1])
         
-        # Обновляем статус турнира
-        success = await TournamentRepository.update_status(tournament_id, 'in_progress')
+        # Переводим турнир в статус "в процессе" с рассылкой событий запуска
+        success = await tournament_lifecycle.start_tournament(callback.bot, tournament_id)
         
         if success:
             await callback.answer("✅ Турнир запущен!", show_alert=True)
@@ -2,12 +2,14 @@
 Статистика турниров
 """
 import logging
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 
-from database.repositories import TournamentRepository
+from database.models import DailyMetric
+from database.repositories import TournamentRepository, StatisticsRepository, DailyStatsRepository
+from database.repositories.daily_stats_repository import stat_windows
 from utils.message_utils import safe_edit_message
 
 router = Router()
@@ -20,33 +22,26 @@ async def tournament_statistics_menu(callback: CallbackQuery, state: FSMContext)
     await state.clear()
     
     try:
-        # Получаем общую статистику
-        total_tournaments = await TournamentRepository.get_total_count()
-        active_tournaments = await TournamentRepository.get_active_count()
-        completed_tournaments = total_tournaments - active_tournaments
-        
-        # Получаем турниры за последние 30 дней
-        thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-        recent_tournaments = await TournamentRepository.get_tournaments_since(thirty_days_ago)
-        
-        # Получаем статистику по статусам
-        status_stats = await TournamentRepository.get_status_statistics()
+        # Все разрезы статистики — одним запросом
+        stats = await StatisticsRepository.get_cached_tournament_stats()
+        status_stats = stats.by_status
         
         text = f"""📊 **Статистика турниров**
 
 📈 **Общая статистика:**
-🏆 Всего турниров: **{total_tournaments}**
-🏃 Активных: **{active_tournaments}**
-✅ Завершенных: **{completed_tournaments}**
+🏆 Всего турниров: **{stats.total}**
+🏃 Активных: **{stats.active}**
+✅ Завершенных: **{stats.completed}**
 
 📅 **За последние 30 дней:**
-🆕 Создано турниров: **{len(recent_tournaments) if recent_tournaments else 0}**
+🆕 Создано турниров: **{stats.created_30d}**
 
 📋 **По статусам:**"""
         
         # Добавляем статистику по статусам
         status_names = {
             'registration': '📝 Регистрация',
+            'registration_closed': '🔒 Регистрация закрыта',
             'in_progress': '🏃 В процессе',
             'completed': '✅ Завершен',
             'cancelled': '❌ Отменен',
@@ -60,8 +55,8 @@ async def tournament_statistics_menu(callback: CallbackQuery, state: FSMContext)
         else:
             text += "\n*Нет данных*"
         
-        # Получаем популярные игры
-        popular_games = await TournamentRepository.get_popular_games()
+        # Популярные игры
+        popular_games = list(stats.by_game.items())
         
         if popular_games:
             text += "\n\n🎮 **Популярные игры:**"
@@ -69,7 +64,7 @@ async def tournament_statistics_menu(callback: CallbackQuery, state: FSMContext)
                 text += f"\n• {game_name}: **{count}** турниров"
         
         # Добавляем информацию о форматах
-        format_stats = await TournamentRepository.get_format_statistics()
+        format_stats = stats.by_format
         
         if format_stats:
             text += "\n\n🏆 **Популярные форматы:**"
@@ -139,38 +134,33 @@ async def tournament_statistics_menu(callback: CallbackQuery, state: FSMContext)
 async def detailed_tournament_statistics(callback: CallbackQuery, state: FSMContext):
     """Детальная статистика турниров"""
     try:
-        # Получаем детальную статистику
-        total_tournaments = await TournamentRepository.get_total_count()
+        # Получаем детальную статистику одним запросом
+        stats = await StatisticsRepository.get_cached_tournament_stats()
         
-        if total_tournaments == 0:
+        if stats.total == 0:
             text = """📊 **Детальная статистика**
 
 ❌ **Нет данных**
 
 Турниры еще не созданы в системе."""
         else:
-            # Получаем различную статистику
-            avg_teams = await TournamentRepository.get_average_teams_per_tournament()
-            tournaments_this_month = await TournamentRepository.get_tournaments_this_month()
-            tournaments_this_week = await TournamentRepository.get_tournaments_this_week()
-            
             text = f"""📊 **Детальная статистика**
 
 📈 **Основные метрики:**
-🏆 Всего турниров: **{total_tournaments}**
-👥 Среднее количество команд: **{avg_teams:.1f}**
+🏆 Всего турниров: **{stats.total}**
+👥 Среднее количество команд: **{stats.average_max_teams:.1f}**
 
 📅 **Временные периоды:**
-🗓️ За этот месяц: **{tournaments_this_month}**
-📅 За эту неделю: **{tournaments_this_week}**
+🗓️ За этот месяц: **{stats.created_this_month}**
+📅 За эту неделю: **{stats.created_this_week}**
 
 📊 **Активность:**
-⚡ Активных турниров: **{await TournamentRepository.get_active_count()}**
-⏸️ Приостановленных: **{await TournamentRepository.get_paused_count()}**
-✅ Завершенных: **{await TournamentRepository.get_completed_count()}**
+⚡ Активных турниров: **{stats.active}**
+⏸️ Приостановленных: **{stats.paused}**
+✅ Завершенных: **{stats.completed}**
 
 🏅 **Эффективность:**
-📈 Коэффициент завершения: **{await TournamentRepository.get_completion_rate():.1f}%**
+📈 Коэффициент завершения: **{stats.completion_rate:.1f}%**
 ⏱️ Средняя длительность: **{await TournamentRepository.get_average_duration()} дней**"""
         
         keyboard = [
@@ -216,18 +206,11 @@ async def detailed_tournament_statistics(callback: CallbackQuery, state: FSMCont
 async def tournament_date_statistics(callback: CallbackQuery, state: FSMContext):
     """Статистика турниров по датам"""
     try:
-        # Получаем статистику по датам
+        # Все окна — одним запросом к суточным агрегатам
         today = datetime.now(timezone.utc).date()
-        
-        # Статистика за разные периоды
-        stats_data = {
-            'today': await TournamentRepository.get_tournaments_count_for_date(today),
-            'yesterday': await TournamentRepository.get_tournaments_count_for_date(today - timedelta(days=1)),
-            'this_week': await TournamentRepository.get_tournaments_this_week(),
-            'last_week': await TournamentRepository.get_tournaments_last_week(),
-            'this_month': await TournamentRepository.get_tournaments_this_month(),
-            'last_month': await TournamentRepository.get_tournaments_last_month(),
-        }
+        stats_data = await DailyStatsRepository.get_window_totals(
+            DailyMetric.NEW_TOURNAMENTS, stat_windows(today)
+        )
         
         text = f"""📈 **Статистика по датам**
 
@@ -264,7 +247,7 @@ async def tournament_date_statistics(callback: CallbackQuery, state: FSMContext)
 🔄 Месяц к месяцу: {format_change(monthly_change)}"""
         
         # Получаем пиковые дни
-        peak_days = await TournamentRepository.get_peak_creation_days()
+        peak_days = await DailyStatsRepository.get_peak_days(DailyMetric.NEW_TOURNAMENTS)
         if peak_days:
             text += "\n\n🏆 **Самые активные дни:**"
             for date, count in peak_days[:5]:
@@ -314,8 +297,9 @@ async def tournament_game_statistics(callback: CallbackQuery, state: FSMContext)
     """Статистика турниров по играм"""
     try:
         # Получаем статистику по играм
-        popular_games = await TournamentRepository.get_popular_games()
-        total_tournaments = await TournamentRepository.get_total_count()
+        stats = await StatisticsRepository.get_cached_tournament_stats()
+        popular_games = list(stats.by_game.items())
+        total_tournaments = stats.total
         
         if not popular_games or total_tournaments == 0:
             text = """🎮 **Статистика по играм**
@@ -348,7 +332,7 @@ async def tournament_game_statistics(callback: CallbackQuery, state: FSMContext)
                 text += f"   📊 Турниров: **{count}** ({percentage:.1f}%)\n\n"
             
             # Статистика форматов по играм
-            format_by_game_stats = await TournamentRepository.get_format_by_game_statistics()
+            format_by_game_stats = stats.by_game_format
             
             if format_by_game_stats:
                 text += "🏆 **Форматы по играм:**\n"
@@ -407,14 +391,15 @@ async def export_tournament_statistics(callback: CallbackQuery, state: FSMContex
     """Экспорт статистики турниров"""
     try:
         # Получаем всю статистику
+        snapshot = await StatisticsRepository.get_tournament_stats()
         stats = {
-            'total': await TournamentRepository.get_total_count(),
-            'active': await TournamentRepository.get_active_count(),
-            'completed': await TournamentRepository.get_completed_count(),
-            'cancelled': await TournamentRepository.get_cancelled_count(),
-            'avg_teams': await TournamentRepository.get_average_teams_per_tournament(),
-            'popular_games': await TournamentRepository.get_popular_games(),
-            'format_stats': await TournamentRepository.get_format_statistics(),
+            'total': snapshot.total,
+            'active': snapshot.active,
+            'completed': snapshot.completed,
+            'cancelled': snapshot.cancelled,
+            'avg_teams': snapshot.average_max_teams,
+            'popular_games': list(snapshot.by_game.items()),
+            'format_stats': snapshot.by_format,
         }
         
         # Формируем текст для экспорта
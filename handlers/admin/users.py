@@ -10,6 +10,7 @@ from aiogram.fsm.context import FSMContext
 from database.repositories import UserRepository
 from utils.message_utils import safe_edit_message
 from utils.admin_commands import set_admin_commands, remove_admin_commands
+from services.outbound_scheduler import outbound_priority, Priority
 from .states import AdminStates
 from .keyboards import get_user_management_keyboard, get_user_action_keyboard
 
@@ -307,7 +308,8 @@ async def make_admin(callback: CallbackQuery, state: FSMContext):
 Используйте команду /admin для входа."""
         
         try:
-            await callback.bot.send_message(user.telegram_id, notification_text, parse_mode="Markdown")
+            with outbound_priority(Priority.TRANSACTIONAL):
+                await callback.bot.send_message(user.telegram_id, notification_text, parse_mode="Markdown")
         except Exception as e:
             logger.error(f"Ошибка отправки уведомления пользователю {user.telegram_id}: {e}")
         
@@ -12,6 +12,7 @@ from database.repositories.team_repository import TeamRepository
 from database.repositories.player_repository import PlayerRepository
 from database.models import TeamStatus
 from utils.message_utils import safe_edit_message
+from services.outbound_scheduler import outbound_priority, Priority
 from handlers.user.states import UserStates
 
 # Создаем роутер
@@ -749,8 +750,9 @@ async def create_team_final(callback: CallbackQuery, state: FSMContext):
         user = await UserRepository.get_by_telegram_id(callback.from_user.id)
         data = await state.get_data()
         
-        # Детальное логирование для отладки
-        logger.info(f"Финальное создание команды, все данные state: {data}")
+        # Полное состояние (все игроки) — только при отладке: форматировать его дорого
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Финальное создание команды, все данные state: {data}")
         
         tournament_id = data.get('tournament_id')
         team_name = data.get('team_name')
@@ -925,40 +927,41 @@ async def create_team_final(callback: CallbackQuery, state: FSMContext):
         ]
         
         # Отправляем в админ-чат (если настроен) или всем админам
-        if settings.admin_chat_id:
-            try:
-                # Если есть логотип команды, отправляем с ним
-                if team.logo_file_id:
-                    await callback.bot.send_photo(
-                        chat_id=settings.admin_chat_id,
-                        photo=team.logo_file_id,
-                        caption=admin_text,
-                        parse_mode="HTML",
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=admin_keyboard)
-                    )
-                else:
-                    await callback.bot.send_message(
-                        chat_id=settings.admin_chat_id,
-                        text=admin_text,
-                        parse_mode="HTML",
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=admin_keyboard)
-                    )
-                logger.info(f"Уведомление о команде {team.id} отправлено в админ-чат {settings.admin_chat_id}")
-            except Exception as e:
-                logger.error(f"Ошибка отправки уведомления в админ-чат: {e}")
-        else:
-            # Резервный вариант - отправка каждому админу
-            for admin_id in settings.admin_ids:
+        with outbound_priority(Priority.TRANSACTIONAL):
+            if settings.admin_chat_id:
                 try:
-                    await callback.bot.send_message(
-                        chat_id=admin_id,
-                        text=admin_text,
-                        parse_mode="HTML",
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=admin_keyboard)
-                    )
-                    logger.info(f"Уведомление о команде {team.id} отправлено админу {admin_id}")
+                    # Если есть логотип команды, отправляем с ним
+                    if team.logo_file_id:
+                        await callback.bot.send_photo(
+                            chat_id=settings.admin_chat_id,
+                            photo=team.logo_file_id,
+                            caption=admin_text,
+                            parse_mode="HTML",
+                            reply_markup=InlineKeyboardMarkup(inline_keyboard=admin_keyboard)
+                        )
+                    else:
+                        await callback.bot.send_message(
+                            chat_id=settings.admin_chat_id,
+                            text=admin_text,
+                            parse_mode="HTML",
+                            reply_markup=InlineKeyboardMarkup(inline_keyboard=admin_keyboard)
+                        )
+                    logger.info(f"Уведомление о команде {team.id} отправлено в админ-чат {settings.admin_chat_id}")
                 except Exception as e:
-                    logger.error(f"Ошибка отправки уведомления админу {admin_id}: {e}")
+                    logger.error(f"Ошибка отправки уведомления в админ-чат: {e}")
+            else:
+                # Резервный вариант - отправка каждому админу
+                for admin_id in settings.admin_ids:
+                    try:
+                        await callback.bot.send_message(
+                            chat_id=admin_id,
+                            text=admin_text,
+                            parse_mode="HTML",
+                            reply_markup=InlineKeyboardMarkup(inline_keyboard=admin_keyboard)
+                        )
+                        logger.info(f"Уведомление о команде {team.id} отправлено админу {admin_id}")
+                    except Exception as e:
+                        logger.error(f"Ошибка отправки уведомления админу {admin_id}: {e}")
         
     except Exception as e:
         logger.error(f"Ошибка финального создания команды: {e}")
@@ -7,7 +7,6 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
-from datetime import datetime
 
 from database.repositories.user_repository import UserRepository
 from database.repositories.tournament_repository import TournamentRepository
@@ -70,8 +69,7 @@ async def show_tournaments_by_game(callback: CallbackQuery):
         return
     
     # Получаем активные турниры для региона пользователя и выбранной игры
-    all_tournaments = await TournamentRepository.get_active_tournaments(user.region)
-    tournaments = [t for t in all_tournaments if t.game_id == game_id]
+    tournaments = await TournamentRepository.get_active_tournaments(user.region, game_id=game_id)
     
     safe_game_name = escape_html(game.name)
     
@@ -112,11 +110,7 @@ async def show_tournaments_by_game(callback: CallbackQuery):
     
     for tournament in tournaments:
         # Проверяем статус регистрации
-        now = datetime.utcnow()
-        is_registration_open = (
-            tournament.status == "registration" and 
-            tournament.registration_start <= now <= tournament.registration_end
-        )
+        is_registration_open = tournament.is_registration_open
         
         status_emoji = "✅" if is_registration_open else "🔒"
         safe_tournament_name = escape_html(tournament.name)
@@ -177,11 +171,7 @@ async def show_tournament_details(callback: CallbackQuery):
         return
     
     # Формируем описание турнира
-    now = datetime.utcnow()
-    is_registration_open = (
-        tournament.status == "registration" and 
-        tournament.registration_start <= now <= tournament.registration_end
-    )
+    is_registration_open = tournament.is_registration_open
     
     from utils.datetime_utils import format_datetime_for_user
     
@@ -333,13 +323,12 @@ async def register_team_for_tournament(callback: CallbackQuery, state: FSMContex
             return
         
         # Проверяем что турнир открыт для регистрации
-        now = datetime.utcnow()
         if tournament.status != "registration":
             await callback.answer("❌ Регистрация на этот турнир закрыта", show_alert=True)
             return
         
-        if not (tournament.registration_start <= now <= tournament.registration_end):
-            await callback.answer("❌ Регистрация на этот турнир еще не началась или уже закончилась", show_alert=True)
+        if not tournament.is_registration_open:
+            await callback.answer("❌ Регистрация на этот турнир еще не началась", show_alert=True)
             return
         
         # Проверяем что турнир не заполнен
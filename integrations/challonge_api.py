@@ -10,8 +10,18 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 import logging
 
+from services.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
+# Форматы турниров бота -> типы турниров Challonge
+CHALLONGE_FORMATS = {
+    'single_elimination': 'single elimination',
+    'double_elimination': 'double elimination',
+    'round_robin': 'round robin',
+    'group_stage_playoffs': 'single elimination'  # Пока как single
+}
+
 class ChallongeAPI:
     """Клиент для работы с Challonge API v2.1 через OAuth2"""
     
@@ -89,43 +99,45 @@ class ChallongeAPI:
             "Accept": "application/json"
         }
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                if method.upper() == 'GET':
-                    async with session.get(url, params=params, headers=headers) as response:
-                        if response.status >= 400:
-                            error_text = await response.text()
-                            logger.error(f"Challonge API error {response.status}: {error_text}")
-                            raise Exception(f"API error {response.status}: {error_text}")
-                        return await response.json()
+        # Время запроса учитывается в метриках хендлера как время внешнего API
+        with metrics.measure("external"):
+            async with aiohttp.ClientSession() as session:
+                try:
+                    if method.upper() == 'GET':
+                        async with session.get(url, params=params, headers=headers) as response:
+                            if response.status >= 400:
+                                error_text = await response.text()
+                                logger.error(f"Challonge API error {response.status}: {error_text}")
+                                raise Exception(f"API error {response.status}: {error_text}")
+                            return await response.json()
                         
-                elif method.upper() == 'POST':
-                    async with session.post(url, json=data, params=params, headers=headers) as response:
-                        if response.status >= 400:
-                            error_text = await response.text()
-                            logger.error(f"Challonge API error {response.status}: {error_text}")
-                            raise Exception(f"API error {response.status}: {error_text}")
-                        return await response.json()
+                    elif method.upper() == 'POST':
+                        async with session.post(url, json=data, params=params, headers=headers) as response:
+                            if response.status >= 400:
+                                error_text = await response.text()
+                                logger.error(f"Challonge API error {response.status}: {error_text}")
+                                raise Exception(f"API error {response.status}: {error_text}")
+                            return await response.json()
                         
-                elif method.upper() == 'PUT':
-                    async with session.put(url, json=data, params=params, headers=headers) as response:
-                        if response.status >= 400:
-                            error_text = await response.text()
-                            logger.error(f"Challonge API error {response.status}: {error_text}")
-                            raise Exception(f"API error {response.status}: {error_text}")
-                        return await response.json()
+                    elif method.upper() == 'PUT':
+                        async with session.put(url, json=data, params=params, headers=headers) as response:
+                            if response.status >= 400:
+                                error_text = await response.text()
+                                logger.error(f"Challonge API error {response.status}: {error_text}")
+                                raise Exception(f"API error {response.status}: {error_text}")
+                            return await response.json()
                         
-                elif method.upper() == 'DELETE':
-                    async with session.delete(url, params=params, headers=headers) as response:
-                        if response.status >= 400:
-                            error_text = await response.text()
-                            logger.error(f"Challonge API error {response.status}: {error_text}")
-                            raise Exception(f"API error {response.status}: {error_text}")
-                        return await response.json()
+                    elif method.upper() == 'DELETE':
+                        async with session.delete(url, params=params, headers=headers) as response:
+                            if response.status >= 400:
+                                error_text = await response.text()
+                                logger.error(f"Challonge API error {response.status}: {error_text}")
+                                raise Exception(f"API error {response.status}: {error_text}")
+                            return await response.json()
                         
-            except Exception as e:
-                logger.error(f"Ошибка запроса к Challonge: {e}")
-                raise
+                except Exception as e:
+                    logger.error(f"Ошибка запроса к Challonge: {e}")
+                    raise
     
     async def create_tournament(
         self,
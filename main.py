@@ -5,20 +5,45 @@
 import asyncio
 import logging
 
-from aiogram import Bot, Dispatcher, BaseMiddleware
+from aiogram import Bot, BaseMiddleware
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import TelegramObject, BotCommand, BotCommandScopeChat, BotCommandScopeDefault
 
 from config.settings import settings
-from database.db_manager import init_database
+from database.db_manager import db_manager, init_database
 from database.repositories.user_repository import UserRepository
 from database.models import UserRole
 from utils.admin_commands import USER_COMMANDS, update_all_admin_commands
 from handlers import setup_handlers
-from utils.logger import setup_logger
-from middlewares import ErrorHandlerMiddleware
+from utils.logger import complete_logging, setup_logger
+from utils.callback_index import CallbackIndex
+from middlewares import (
+    ErrorHandlerMiddleware, StaleCallbackMiddleware, CallbackIndexMiddleware,
+    CallbackAnswerMiddleware, CallbackHandlerNameMiddleware, MetricsMiddleware, SqlProfilerMiddleware
+)
+from services.outbound_scheduler import setup_outbound_scheduler, outbound_scheduler
+from services.callback_answers import setup_callback_answers
+from services.metrics import setup_metrics
+from services.sql_profiler import sql_profiler
+from services.loop_monitor import loop_monitor
+from services.job_scheduler import job_scheduler
+from services.scheduled_jobs import sync_tournament_jobs
+from services.daily_stats import start_daily_stats
+from services.activity_tracker import activity_tracker
+from services.export_service import shutdown_process_pool
+from services.backup_service import start_backups
+from services.maintenance import start_maintenance
+from services.audit_log import audit_log
+from services.webhook_server import run_webhook
+from services.update_executor import LaneDispatcher
+from services.fsm_storage import fsm_storage
+from services.update_backlog import update_backlog
+
+
+# Типы апдейтов, которые получает бот (polling и webhook)
+ALLOWED_UPDATES = ["message", "callback_query", "inline_query"]
 
 
 class UserMiddleware(BaseMiddleware):
@@ -36,23 +61,43 @@ class UserMiddleware(BaseMiddleware):
             data["username"] = event.from_user.username
             data["first_name"] = event.from_user.first_name
             data["last_name"] = event.from_user.last_name
+            activity_tracker.record(event.from_user.id)
         
         return await handler(event, data)
 
 
-async def on_startup(bot: Bot) -> None:
+async def on_startup(bot: Bot, dispatcher: LaneDispatcher) -> None:
     """Действия при запуске бота"""
     logger = logging.getLogger(__name__)
     
+    # Замер задержки event loop — с самого начала, чтобы видеть и тяжелый запуск
+    loop_monitor.start()
+    
     try:
-        # Удаляем webhook и очищаем ожидающие обновления
-        await bot.delete_webhook(drop_pending_updates=True)
-        logger.info("Webhook удален, старые обновления очищены")
+        # В режиме webhook его устанавливает run_webhook, когда сервер уже слушает порт
+        if settings.run_mode != "webhook":
+            # Удаляем webhook; накопившиеся обновления сохраняются, если не задан DROP_PENDING_UPDATES
+            await bot.delete_webhook(drop_pending_updates=settings.drop_pending_updates)
+            logger.info("Webhook удален")
         
         # Инициализируем базу данных
         await init_database()
         logger.info("База данных инициализирована")
         
+        # Отметка обработанных апдейтов и размер очереди — до начала получения апдейтов
+        await update_backlog.start(bot, dispatcher.lane_executor)
+        
+        # Запускаем планировщик отложенных задач (напоминания, рассылки)
+        await job_scheduler.start(bot)
+        await sync_tournament_jobs()
+        await start_daily_stats()
+        await activity_tracker.start()
+        await audit_log.start()
+        if settings.fsm_storage == "database":
+            await fsm_storage.start()
+        await start_backups()
+        await start_maintenance()
+        
         # Устанавливаем команды для обычных пользователей
         await bot.set_my_commands(USER_COMMANDS, scope=BotCommandScopeDefault())
         
@@ -73,6 +118,16 @@ async def on_startup(bot: Bot) -> None:
 async def on_shutdown(bot: Bot) -> None:
     """Действия при остановке бота"""
     logger = logging.getLogger(__name__)
+    await loop_monitor.stop()
+    await job_scheduler.stop()
+    await activity_tracker.stop()
+    await audit_log.stop()
+    await update_backlog.stop()
+    if settings.fsm_storage == "database":
+        # Записываем незаписанные шаги FSM, чтобы после рестарта продолжить с них
+        await fsm_storage.close()
+    shutdown_process_pool()
+    await outbound_scheduler.stop()
     logger.info("Бот остановлен")
 
 
@@ -87,6 +142,12 @@ async def main():
         # Проверяем конфигурацию
         if not settings.bot_token:
             raise ValueError("BOT_TOKEN не найден в конфигурации")
+        if settings.run_mode not in ("polling", "webhook"):
+            raise ValueError(f"Неизвестный RUN_MODE: {settings.run_mode}")
+        if settings.run_mode == "webhook" and not (settings.webhook_url and settings.webhook_secret):
+            raise ValueError("Для RUN_MODE=webhook нужны WEBHOOK_URL и WEBHOOK_SECRET")
+        if settings.fsm_storage not in ("database", "memory"):
+            raise ValueError(f"Неизвестный FSM_STORAGE: {settings.fsm_storage}")
         logger.info("Конфигурация проверена успешно")
         
     except ValueError as e:
@@ -101,31 +162,65 @@ async def main():
         )
     )
     
-    # Создаем диспетчер с хранилищем состояний в памяти
-    dp = Dispatcher(storage=MemoryStorage())
+    # Все исходящие запросы идут через планировщик с приоритетами и лимитами
+    setup_outbound_scheduler(bot)
+    # Ответы хендлеров на нажатия отмечаются, повторные ответы не отправляются
+    setup_callback_answers(bot)
+    # Время хендлеров, запросов к базе и Bot API — для /diag
+    setup_metrics(bot, db_manager.engine.sync_engine)
+    # SQL-профилировщик подключен всегда, а включается из /diag на несколько минут
+    sql_profiler.install(db_manager.engine.sync_engine)
+    
+    # Создаем диспетчер: состояния FSM хранятся в базе (или в памяти), апдейты
+    # идут через полосы — по порядку для каждого пользователя, параллельно между ними
+    storage = fsm_storage if settings.fsm_storage == "database" else MemoryStorage()
+    dp = LaneDispatcher(storage=storage)
     
-    # Регистрируем middleware
+    # Регистрируем middleware (время хендлера замеряется первым, вместе с остальными)
+    dp.message.middleware(MetricsMiddleware())
+    dp.callback_query.middleware(MetricsMiddleware())
+    dp.message.middleware(SqlProfilerMiddleware())
+    dp.callback_query.middleware(SqlProfilerMiddleware())
+    dp.callback_query.middleware(CallbackHandlerNameMiddleware())
     dp.message.middleware(ErrorHandlerMiddleware())
     dp.callback_query.middleware(ErrorHandlerMiddleware())
     dp.message.middleware(UserMiddleware())
     dp.callback_query.middleware(UserMiddleware())
+    # Устаревшие нажатия из очереди после перезапуска не доходят до хендлеров
+    dp.callback_query.outer_middleware(StaleCallbackMiddleware())
+    # На нажатие отвечаем сами, если хендлер не ответил за CALLBACK_ANSWER_BUDGET_MS
+    dp.callback_query.outer_middleware(CallbackAnswerMiddleware())
     
     # Регистрируем хендлеры
     main_router = setup_handlers()
     dp.include_router(main_router)
     
+    # Нажатия кнопок ищут хендлер по индексу callback data, а не перебором всех фильтров
+    callback_index = CallbackIndex(dp)
+    callback_index.install()
+    dp.callback_query.outer_middleware(CallbackIndexMiddleware(callback_index))
+    logger.info(f"Индекс callback_query: {callback_index.indexed} из {callback_index.total} хендлеров")
+    
     # Регистрируем события запуска и остановки
     dp.startup.register(on_startup)
+    # Сначала дообрабатываем принятые апдейты, потом останавливаем сервисы
+    dp.shutdown.register(dp.stop_lanes)
     dp.shutdown.register(on_shutdown)
     
-    # Запускаем бота
-    logger.info("Запускаем бота...")
+    # Запускаем бота: хуки запуска и остановки общие для обоих режимов
+    logger.info(f"Запускаем бота в режиме {settings.run_mode}...")
+    dp.start_lanes(bot, settings.update_lanes, settings.update_workers, settings.update_queue_size)
     try:
-        await dp.start_polling(
-            bot,
-            allowed_updates=["message", "callback_query", "inline_query"],
-            drop_pending_updates=True
-        )
+        if settings.run_mode == "webhook":
+            await run_webhook(dp, bot, allowed_updates=ALLOWED_UPDATES)
+        else:
+            # handle_as_tasks=False: апдейты по одному уходят в полосы, а при
+            # переполнении получение новых ждет (backpressure)
+            await dp.start_polling(
+                bot,
+                allowed_updates=ALLOWED_UPDATES,
+                handle_as_tasks=False
+            )
     except KeyboardInterrupt:
         logger.info("Получен сигнал остановки")
     except Exception as e:
@@ -133,6 +228,7 @@ async def main():
     finally:
         await bot.session.close()
         logger.info("Сессия бота закрыта")
+        await complete_logging()
 
 
 if __name__ == "__main__":
@@ -3,5 +3,13 @@
 """
 
 from .error_handler import ErrorHandlerMiddleware
+from .audit import AuditMiddleware
+from .backlog import StaleCallbackMiddleware
+from .callback_index import CallbackIndexMiddleware
+from .callback_answer import CallbackAnswerMiddleware, CallbackHandlerNameMiddleware
+from .metrics import MetricsMiddleware
+from .sql_profiler import SqlProfilerMiddleware
 
-__all__ = ['ErrorHandlerMiddleware']
\ No newline at end of file
+__all__ = ['ErrorHandlerMiddleware', 'AuditMiddleware', 'StaleCallbackMiddleware', 'CallbackIndexMiddleware',
+           'CallbackAnswerMiddleware', 'CallbackHandlerNameMiddleware', 'MetricsMiddleware',
+           'SqlProfilerMiddleware']
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Middleware журнала действий администраторов
+"""
+
+import json
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from services.audit_log import audit_log
+
+# Сколько символов текста сообщения сохранять
+TEXT_LIMIT = 200
+
+_NUMBER = re.compile(r"\d+")
+
+
+def _target_ids(callback_data: str) -> List[int]:
+    """ID объектов из callback data вида admin:approve_team_15"""
+    return [int(number) for number in _NUMBER.findall(callback_data)]
+
+
+class AuditMiddleware(BaseMiddleware):
+    """
+    Записывает каждый вызов хендлера админ-роутера: имя хендлера, ID
+    объектов, результат и время выполнения. Регистрируется как inner
+    middleware, поэтому вызывается только для сработавшего хендлера.
+    Запись уходит в очередь audit_log и в базу пишется пачками.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = getattr(event, "from_user", None)
+        if user is None:
+            return await handler(event, data)
+
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        action = getattr(callback, "__name__", type(event).__name__)
+        module = getattr(callback, "__module__", "")
+        if module:
+            action = f"{module.rsplit('.', 1)[-1]}.{action}"
+
+        details: Dict[str, Any] = {}
+        if isinstance(event, CallbackQuery) and event.data:
+            details["data"] = event.data
+            details["targets"] = _target_ids(event.data)
+        elif isinstance(event, Message):
+            details["text"] = (event.text or event.caption or "")[:TEXT_LIMIT]
+            if data.get("raw_state"):
+                details["state"] = data["raw_state"]
+
+        started = time.perf_counter()
+        try:
+            result = await handler(event, data)
+            details["outcome"] = "ok"
+            return result
+        except Exception as e:
+            details["outcome"] = f"error: {type(e).__name__}"
+            raise
+        finally:
+            details["ms"] = round((time.perf_counter() - started) * 1000, 1)
+            audit_log.record(user.id, action, json.dumps(details, ensure_ascii=False))
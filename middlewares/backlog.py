@@ -0,0 +1,46 @@
+"""
+Middleware для нажатий, накопившихся, пока бот был выключен
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import CallbackQuery, TelegramObject
+
+from services.update_backlog import update_backlog
+from utils.localization import localization
+
+logger = logging.getLogger(__name__)
+
+
+class StaleCallbackMiddleware(BaseMiddleware):
+    """
+    Пропускает устаревшие нажатия из очереди после перезапуска: хендлер не
+    вызывается, а пользователь получает просьбу нажать кнопку еще раз.
+    Регистрируется как outer middleware на callback_query диспетчера.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        update = data.get("event_update")
+        if not isinstance(event, CallbackQuery) or update is None:
+            return await handler(event, data)
+        if not update_backlog.is_stale_callback(update.update_id):
+            return await handler(event, data)
+
+        update_backlog.record_stale()
+        language = event.from_user.language_code
+        if not localization.is_supported_language(language):
+            language = localization.default_language
+        chat_id = event.message.chat.id if event.message else event.from_user.id
+        try:
+            await data["bot"].send_message(chat_id, localization.get_text("errors.stale_button", language))
+        except TelegramAPIError as e:
+            logger.warning(f"Не удалось попросить {event.from_user.id} повторить нажатие: {e}")
+        return None
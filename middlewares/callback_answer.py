@@ -0,0 +1,60 @@
+"""
+Middleware для ответа на нажатия, если хендлер не ответил сам
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+from services.callback_answers import callback_answers
+from services.metrics import handler_name
+
+
+class CallbackAnswerMiddleware(BaseMiddleware):
+    """
+    Запускает таймер бюджета на ответ и отвечает на нажатие, если хендлер
+    не успел или завершился без ответа (services.callback_answers).
+    Регистрируется как outer middleware на callback_query диспетчера, чтобы
+    покрывать и нажатия, для которых хендлер не нашелся.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not isinstance(event, CallbackQuery):
+            return await handler(event, data)
+
+        bot = data["bot"]
+        chat_id = event.message.chat.id if event.message else event.from_user.id
+        pending = callback_answers.begin(event.id, chat_id)
+        timer = asyncio.get_running_loop().call_later(
+            callback_answers.budget, callback_answers.on_budget_expired, bot, pending
+        )
+        try:
+            return await handler(event, data)
+        finally:
+            timer.cancel()
+            await callback_answers.finish(bot, pending)
+
+
+class CallbackHandlerNameMiddleware(BaseMiddleware):
+    """
+    Запоминает, какой хендлер обрабатывает нажатие, для списка медленных.
+    Регистрируется как inner middleware на callback_query диспетчера.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        if isinstance(event, CallbackQuery) and handler_object is not None:
+            callback_answers.set_handler(event.id, handler_name(handler_object))
+        return await handler(event, data)
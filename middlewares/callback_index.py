@@ -0,0 +1,31 @@
+"""
+Middleware поиска кандидатов для callback_query по индексу
+"""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+
+from utils.callback_index import CANDIDATES_KEY, CallbackIndex
+
+
+class CallbackIndexMiddleware(BaseMiddleware):
+    """
+    Находит кандидатов нажатия в CallbackIndex один раз до обхода роутеров;
+    роутеры берут своих кандидатов из данных апдейта. Регистрируется как
+    outer middleware на callback_query диспетчера.
+    """
+
+    def __init__(self, index: CallbackIndex):
+        self.index = index
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, CallbackQuery):
+            data[CANDIDATES_KEY] = self.index.lookup(event.data)
+        return await handler(event, data)
@@ -0,0 +1,41 @@
+"""
+Middleware для учета времени работы хендлеров
+"""
+
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from services.metrics import handler_name, metrics
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Замеряет полное время хендлера и время в базе, Bot API и внешних API
+    (services.metrics). Регистрируется как inner middleware первым, чтобы
+    учитывать и работу остальных middleware.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        if handler_object is None:
+            return await handler(event, data)
+
+        token = metrics.begin()
+        started = time.perf_counter()
+        error = False
+        try:
+            return await handler(event, data)
+        except Exception:
+            error = True
+            raise
+        finally:
+            wall = time.perf_counter() - started
+            metrics.record(handler_name(handler_object), wall, metrics.end(token), error)
@@ -0,0 +1,34 @@
+"""
+Middleware для отнесения SQL-запросов к апдейту и хендлеру
+"""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from services.metrics import handler_name
+from services.sql_profiler import sql_profiler
+
+
+class SqlProfilerMiddleware(BaseMiddleware):
+    """
+    Пока SQL-профилировщик включен, собирает запросы хендлера в профиль
+    апдейта (services.sql_profiler). Регистрируется как inner middleware.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        if not sql_profiler.enabled or handler_object is None:
+            return await handler(event, data)
+
+        token = sql_profiler.begin(handler_name(handler_object))
+        try:
+            return await handler(event, data)
+        finally:
+            sql_profiler.end(token)
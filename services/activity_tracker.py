@@ -0,0 +1,80 @@
+"""
+Учет активности пользователей
+
+Middleware отмечает каждого пользователя, приславшего апдейт; отметки
+копятся в памяти (множество Telegram ID на день) и раз в
+ACTIVITY_FLUSH_INTERVAL секунд сбрасываются пачкой в суточные битовые
+карты (см. ActivityRepository). Статистика пользователей читает карты
+напрямую, поэтому видит активность с задержкой до ACTIVITY_FLUSH_INTERVAL.
+"""
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Dict, Optional, Set
+
+from config.settings import settings
+from database.repositories import ActivityRepository, UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """Буфер отметок активности с периодическим сбросом в базу"""
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._pending: Dict[date, Set[int]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, telegram_id: int) -> None:
+        """Отметить активность пользователя (без обращения к базе)"""
+        self._pending.setdefault(datetime.utcnow().date(), set()).add(telegram_id)
+
+    async def start(self) -> None:
+        """Запуск периодического сброса"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="activity-tracker")
+
+    async def stop(self) -> None:
+        """Остановка с финальным сбросом накопленных отметок"""
+        if self._task:
+            # Идущий сброс не прерываем: его отметки уже сняты с буфера
+            async with self._flush_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Записать накопленные отметки в битовые карты"""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            for day in list(pending):
+                telegram_ids = pending[day]
+                try:
+                    user_ids = await UserRepository.get_ids_by_telegram_ids(list(telegram_ids))
+                    if user_ids:
+                        await ActivityRepository.add_activity(day, user_ids)
+                except Exception as e:
+                    logger.error(f"Ошибка записи активности за {day}: {e}")
+                    # Вернем отметки в буфер до следующего сброса
+                    self._pending.setdefault(day, set()).update(telegram_ids)
+                except BaseException:
+                    # Отмена посреди записи: незаписанные дни достанутся финальному сбросу
+                    for left_day, left_ids in pending.items():
+                        self._pending.setdefault(left_day, set()).update(left_ids)
+                    raise
+                del pending[day]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+# Глобальный экземпляр трекера
+activity_tracker = ActivityTracker(flush_interval=settings.activity_flush_interval)
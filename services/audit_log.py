@@ -0,0 +1,112 @@
+"""
+Буферизованная запись журнала действий администраторов
+
+AuditMiddleware вызывает record() — запись только кладется в очередь в
+памяти, без обращения к базе. Фоновая задача раз в AUDIT_FLUSH_INTERVAL_MS
+или при накоплении AUDIT_BATCH_SIZE записей сбрасывает очередь в
+action_logs одним многострочным INSERT. Очередь ограничена
+AUDIT_QUEUE_SIZE: при переполнении новые записи отбрасываются и
+считаются в dropped — журнал никогда не тормозит хендлер.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import settings
+from database.repositories import ActionLogRepository
+
+logger = logging.getLogger(__name__)
+
+# (Telegram ID, действие, детали, время UTC)
+AuditEntry = Tuple[int, str, Optional[str], datetime]
+
+
+class AuditLogWriter:
+    """Очередь записей журнала с пакетным сбросом в базу"""
+
+    def __init__(self, flush_interval: float, batch_size: int, max_queue: int):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self._pending: List[AuditEntry] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.skipped = 0  # пользователя нет в базе
+
+    def record(self, telegram_id: int, action: str, details: Optional[str] = None) -> bool:
+        """Поставить запись в очередь; False — очередь переполнена, запись отброшена"""
+        if len(self._pending) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self._pending.append((telegram_id, action, details, datetime.utcnow()))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def start(self) -> None:
+        """Запуск фонового сброса"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="audit-log-writer")
+
+    async def stop(self) -> None:
+        """Остановка с финальным сбросом очереди"""
+        if self._task:
+            # Идущий сброс не прерываем: его пачка уже снята с очереди
+            async with self._flush_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Записать накопленные записи пачками по batch_size"""
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                try:
+                    written = await ActionLogRepository.create_logs(batch)
+                    self.written += written
+                    self.skipped += len(batch) - written
+                except Exception as e:
+                    self.failed += len(batch)
+                    logger.error(f"Ошибка записи журнала действий ({len(batch)} записей): {e}")
+                except BaseException:
+                    # Отмена посреди записи: пачка достанется финальному сбросу
+                    self._pending[:0] = batch
+                    raise
+
+    def get_stats(self) -> Dict[str, int]:
+        """Счетчики журнала для диагностики"""
+        return {
+            "queued": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "skipped": self.skipped,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+# Глобальный экземпляр журнала
+audit_log = AuditLogWriter(
+    flush_interval=settings.audit_flush_interval_ms / 1000,
+    batch_size=settings.audit_batch_size,
+    max_queue=settings.audit_queue_size
+)
@@ -0,0 +1,228 @@
+"""
+Согласованные снимки базы данных
+
+Снимок снимается онлайн через backup API SQLite небольшими порциями
+страниц: между шагами блокировка чтения снимается, и запись в базу не
+ждет окончания копирования. Если за время копирования база слишком
+часто меняется (SQLite начинает копию заново), оставшееся копируется за
+один шаг.
+
+Копия сжимается gzip в отдельном потоке, затем проверяется
+восстановлением: архив распаковывается во временный файл и проходит
+PRAGMA integrity_check. Только проверенный архив получает итоговое имя
+tournament_bot_ГГГГММДД_ЧЧММСС.db.gz; хранятся последние BACKUP_KEEP.
+
+Запуск вручную (для cron / deployment/backup.sh):
+    python -m services.backup_service
+"""
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from config.settings import settings
+from services.job_scheduler import job_scheduler
+
+logger = logging.getLogger(__name__)
+
+DATABASE_SNAPSHOT = "database_snapshot"
+
+SNAPSHOT_PREFIX = "tournament_bot_"
+SNAPSHOT_SUFFIX = ".db.gz"
+SNAPSHOT_TIME_FORMAT = "%Y%m%d_%H%M%S"
+
+# Пауза между шагами копирования: окно для пишущих транзакций
+STEP_PAUSE = 0.01
+# Сколько раз копия может начаться заново, прежде чем докопировать за один шаг
+MAX_RESTARTS = 3
+
+
+@dataclass
+class Snapshot:
+    """Проверенный снимок базы"""
+    path: str
+    created_at: datetime  # UTC
+    size: int
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.path)
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _copy_database(source_path: str, target_path: str, pages_per_step: int) -> None:
+    """Копия базы через backup API порциями по pages_per_step страниц"""
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status, remaining, total):
+        # Запись в источник другим соединением заставляет SQLite копировать заново
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > MAX_RESTARTS:
+                raise _TooManyRestarts()
+        state["remaining"] = remaining
+        if remaining:
+            time.sleep(STEP_PAUSE)
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=pages_per_step, progress=progress)
+        except _TooManyRestarts:
+            logger.warning("База активно меняется во время снимка, копирую за один шаг")
+            source.backup(target, pages=-1)
+    finally:
+        target.close()
+        source.close()
+
+
+def _compress(source_path: str, target_path: str) -> None:
+    with open(source_path, "rb") as source, gzip.open(target_path, "wb", compresslevel=6) as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+
+
+def _decompress(source_path: str, target_path: str) -> None:
+    with gzip.open(source_path, "rb") as source, open(target_path, "wb") as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+
+
+def integrity_check(database_path: str) -> List[str]:
+    """PRAGMA integrity_check; пустой список — база цела"""
+    connection = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+    try:
+        messages = [row[0] for row in connection.execute("PRAGMA integrity_check")]
+    finally:
+        connection.close()
+    return [] if messages == ["ok"] else messages
+
+
+def verify_snapshot(archive_path: str) -> List[str]:
+    """Проверка восстановлением: распаковать архив и проверить целостность"""
+    fd, restored_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        _decompress(archive_path, restored_path)
+        return integrity_check(restored_path)
+    except (OSError, EOFError, zlib.error, sqlite3.DatabaseError) as e:
+        return [str(e)]
+    finally:
+        os.remove(restored_path)
+
+
+class BackupService:
+    """Снимки базы с ротацией"""
+
+    def __init__(self, database_path: str, directory: str, keep: int, pages_per_step: int):
+        self.database_path = database_path
+        self.directory = directory
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self._lock = asyncio.Lock()
+
+    def list_snapshots(self) -> List[Snapshot]:
+        """Снимки от новых к старым"""
+        if not os.path.isdir(self.directory):
+            return []
+
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith(SNAPSHOT_PREFIX) and filename.endswith(SNAPSHOT_SUFFIX)):
+                continue
+            stamp = filename[len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)]
+            try:
+                created_at = datetime.strptime(stamp, SNAPSHOT_TIME_FORMAT)
+            except ValueError:
+                continue
+            path = os.path.join(self.directory, filename)
+            snapshots.append(Snapshot(path=path, created_at=created_at, size=os.path.getsize(path)))
+        return sorted(snapshots, key=lambda snapshot: snapshot.created_at, reverse=True)
+
+    def latest_snapshot(self) -> Optional[Snapshot]:
+        """Последний проверенный снимок"""
+        snapshots = self.list_snapshots()
+        return snapshots[0] if snapshots else None
+
+    async def create_snapshot(self) -> Snapshot:
+        """Снять, сжать и проверить снимок; старые снимки сверх keep удаляются"""
+        async with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            created_at = datetime.utcnow().replace(microsecond=0)
+            base_path = os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{created_at.strftime(SNAPSHOT_TIME_FORMAT)}")
+            archive_path = f"{base_path}{SNAPSHOT_SUFFIX}"
+            raw_path = f"{base_path}.db.part"
+            part_path = f"{archive_path}.part"
+
+            started = time.monotonic()
+            try:
+                await asyncio.to_thread(_copy_database, self.database_path, raw_path, self.pages_per_step)
+                await asyncio.to_thread(_compress, raw_path, part_path)
+                problems = await asyncio.to_thread(verify_snapshot, part_path)
+                if problems:
+                    raise RuntimeError(f"Снимок не прошел integrity_check: {'; '.join(problems[:5])}")
+                os.replace(part_path, archive_path)
+            finally:
+                for path in (raw_path, part_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+            self._rotate()
+            snapshot = Snapshot(path=archive_path, created_at=created_at, size=os.path.getsize(archive_path))
+            logger.info(
+                f"Снимок базы {snapshot.filename} создан и проверен за "
+                f"{time.monotonic() - started:.1f} с ({snapshot.size / 1024 / 1024:.2f} МБ)"
+            )
+            return snapshot
+
+    def _rotate(self) -> None:
+        for snapshot in self.list_snapshots()[self.keep:]:
+            os.remove(snapshot.path)
+            logger.info(f"Старый снимок {snapshot.filename} удален")
+
+
+# Глобальный экземпляр сервиса снимков
+backup_service = BackupService(
+    database_path=settings.database_path,
+    directory=settings.backup_dir,
+    keep=settings.backup_keep,
+    pages_per_step=settings.backup_pages_per_step
+)
+
+
+async def _schedule_next_snapshot(run_at: datetime) -> None:
+    await job_scheduler.schedule(DATABASE_SNAPSHOT, run_at, {}, key=DATABASE_SNAPSHOT)
+
+
+@job_scheduler.register(DATABASE_SNAPSHOT, resumable=True)
+async def take_database_snapshot(bot):
+    """Плановый снимок базы; следующий — через BACKUP_INTERVAL_HOURS"""
+    try:
+        await backup_service.create_snapshot()
+    finally:
+        await _schedule_next_snapshot(datetime.utcnow() + timedelta(hours=settings.backup_interval_hours))
+
+
+async def start_backups() -> None:
+    """При запуске: запланировать снимок по расписанию от последнего снимка"""
+    latest = backup_service.latest_snapshot()
+    run_at = datetime.utcnow()
+    if latest:
+        run_at = max(run_at, latest.created_at + timedelta(hours=settings.backup_interval_hours))
+    await _schedule_next_snapshot(run_at)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    snapshot = asyncio.run(backup_service.create_snapshot())
+    print(snapshot.path)
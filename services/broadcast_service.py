@@ -0,0 +1,159 @@
+"""
+Конвейер массовой рассылки
+
+Отправляет одно сообщение (с вложением или без) списку получателей
+несколькими параллельными воркерами. Скорость отправки ограничивает
+планировщик исходящих запросов, поэтому здесь нет пауз между сообщениями.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable, List, Optional, Set, Union
+
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.types import InputMediaAudio, InputMediaDocument, InputMediaPhoto, InputMediaVideo
+
+from config.settings import settings
+from services.outbound_scheduler import outbound_priority, Priority
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BroadcastResult:
+    """Итоги рассылки"""
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0  # пользователи, заблокировавшие бота (входят в failed)
+    latencies: List[float] = field(default_factory=list)  # длительность каждой отправки, сек
+
+    @property
+    def success_rate(self) -> float:
+        return round((self.sent / self.total * 100) if self.total > 0 else 0, 1)
+
+
+ALBUM_MAX_ITEMS = 10
+ALBUM_CAPTION_LIMIT = 1024
+
+_INPUT_MEDIA = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo,
+    "document": InputMediaDocument,
+    "audio": InputMediaAudio,
+}
+
+InputMedia = Union[InputMediaPhoto, InputMediaVideo, InputMediaDocument, InputMediaAudio]
+
+
+def build_album_media(attachment: dict, caption: str) -> List[InputMedia]:
+    """
+    Собрать медиа альбома из file_id, полученных от администратора.
+    Подпись ставится на первое медиа — так Telegram показывает ее под альбомом.
+    """
+    media = []
+    for index, item in enumerate(attachment["media"][:ALBUM_MAX_ITEMS]):
+        if index == 0:
+            media.append(_INPUT_MEDIA[item["type"]](media=item["file_id"], caption=caption, parse_mode="Markdown"))
+        else:
+            media.append(_INPUT_MEDIA[item["type"]](media=item["file_id"]))
+    return media
+
+
+async def send_broadcast_message(
+    bot,
+    chat_id: int,
+    message_text: str,
+    attachment: Optional[dict] = None,
+    album_media: Optional[List[InputMedia]] = None,
+):
+    """Отправить сообщение рассылки одному получателю"""
+    if not attachment:
+        return await bot.send_message(chat_id, message_text, parse_mode="Markdown")
+
+    if attachment['type'] == 'album':
+        # Один вызов sendMediaGroup на получателя
+        media = album_media or build_album_media(attachment, message_text)
+        return await bot.send_media_group(chat_id, media)
+
+    if attachment['type'] == 'photo':
+        return await bot.send_photo(chat_id, attachment['file_id'], caption=message_text, parse_mode="Markdown")
+    elif attachment['type'] == 'document':
+        return await bot.send_document(chat_id, attachment['file_id'], caption=message_text, parse_mode="Markdown")
+    elif attachment['type'] == 'video':
+        return await bot.send_video(chat_id, attachment['file_id'], caption=message_text, parse_mode="Markdown")
+    elif attachment['type'] == 'audio':
+        return await bot.send_audio(chat_id, attachment['file_id'], caption=message_text, parse_mode="Markdown")
+
+    raise ValueError(f"Неизвестный тип вложения: {attachment['type']}")
+
+
+async def run_broadcast(
+    bot,
+    chat_ids: Iterable[int],
+    message_text: str,
+    attachment: Optional[dict] = None,
+    concurrency: Optional[int] = None,
+    on_progress: Optional[Callable[[BroadcastResult], Awaitable[None]]] = None,
+    progress_every: int = 10,
+    priority: Priority = Priority.BULK,
+    attempted: Optional[Set[int]] = None,
+) -> BroadcastResult:
+    """
+    Разослать сообщение всем получателям.
+
+    Args:
+        bot: Экземпляр бота
+        chat_ids: Telegram ID получателей
+        message_text: Текст (или подпись к вложению)
+        attachment: Вложение в формате FSM-данных рассылки
+        concurrency: Количество параллельных воркеров
+        on_progress: Колбэк, вызываемый каждые progress_every отправок
+        priority: Класс приоритета отправки (рассылки — BULK, уведомления — TRANSACTIONAL)
+        attempted: Получатели, которым отправка уже была (пропускаются);
+            пополняется перед каждой отправкой — по нему прерванная рассылка
+            продолжается без повторов
+
+    Returns:
+        BroadcastResult: Итоги рассылки
+    """
+    chat_ids = list(chat_ids)
+    if attempted is not None:
+        chat_ids = [chat_id for chat_id in chat_ids if chat_id not in attempted]
+    result = BroadcastResult(total=len(chat_ids))
+    pending = iter(chat_ids)
+    concurrency = concurrency or settings.broadcast_concurrency
+    # Медиа альбома собираем один раз и переиспользуем для всех получателей
+    album_media = build_album_media(attachment, message_text) if attachment and attachment['type'] == 'album' else None
+
+    async def worker():
+        for chat_id in pending:
+            if attempted is not None:
+                attempted.add(chat_id)
+            started = time.perf_counter()
+            try:
+                await send_broadcast_message(bot, chat_id, message_text, attachment, album_media)
+                result.sent += 1
+            except TelegramForbiddenError:
+                result.failed += 1
+                result.blocked += 1
+                logger.debug(f"Пользователь {chat_id} заблокировал бота")
+            except Exception as e:
+                result.failed += 1
+                logger.error(f"Ошибка отправки сообщения пользователю {chat_id}: {e}")
+            result.latencies.append(time.perf_counter() - started)
+
+            done = result.sent + result.failed
+            if on_progress and done % progress_every == 0 and done < result.total:
+                try:
+                    await on_progress(result)
+                except Exception:
+                    pass  # Игнорируем ошибки обновления статуса
+
+    # Воркеры наследуют контекст, поэтому все их запросы идут с заданным приоритетом
+    with outbound_priority(priority):
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(chat_ids)))]
+    await asyncio.gather(*workers)
+
+    return result
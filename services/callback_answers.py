@@ -0,0 +1,259 @@
+"""
+Ответы на нажатия кнопок и список медленных хендлеров
+
+Пока на callback query нет ответа, клиент Telegram показывает крутилку, и
+пользователь нажимает кнопку еще раз. Многие хендлеры вызывают
+callback.answer() только после запросов к базе или Challonge, а некоторые —
+только в ветках с ошибкой. Поэтому:
+
+- если хендлер не ответил за CALLBACK_ANSWER_BUDGET_MS, бот отвечает сам
+  (пустым ответом — крутилка просто пропадает);
+- если хендлер завершился без ответа, бот отвечает сразу;
+- второй ответ на нажатие Telegram не примет, поэтому поздний ответ
+  хендлера с текстом («✅ Игрок удалён», «❌ Ошибка») приходит в чат
+  сообщением, а пустой просто не отправляется; ошибки повторного ответа
+  («query is too old», «query ID is invalid») не доходят до хендлеров.
+
+Для каждого хендлера хранится время до ответа по последним нажатиям;
+хендлеры, у которых p95 больше бюджета, попадают в список медленных
+(get_slow_handlers), вход и выход из списка пишутся в лог.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import AnswerCallbackQuery, Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Нажатия, для которых хендлер не найден
+UNHANDLED = "<unhandled>"
+
+# Ошибки Telegram при повторном или слишком позднем ответе
+_DUPLICATE_ANSWER_ERRORS = ("query is too old", "query id is invalid")
+
+# Ответ отправляет сам бот, а не хендлер
+_auto_answer: contextvars.ContextVar[bool] = contextvars.ContextVar("callback_auto_answer", default=False)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class PendingAnswer:
+    """Нажатие, которое сейчас обрабатывается"""
+
+    __slots__ = ("callback_query_id", "chat_id", "started", "handler", "answered_at", "auto")
+
+    def __init__(self, callback_query_id: str, chat_id: Optional[int] = None):
+        self.callback_query_id = callback_query_id
+        self.chat_id = chat_id  # куда доставить текст позднего ответа
+        self.started = time.monotonic()
+        self.handler = UNHANDLED
+        self.answered_at: Optional[float] = None  # когда ответил хендлер
+        self.auto = False                         # бот уже ответил сам
+
+    @property
+    def answered(self) -> bool:
+        return self.auto or self.answered_at is not None
+
+
+class CallbackAnswerWatchdog:
+    """Учет ответов на нажатия, автоматический ответ и время ответа по хендлерам"""
+
+    def __init__(self, budget_ms: int, window: int, min_samples: int):
+        self.budget = budget_ms / 1000
+        self.window = window
+        self.min_samples = min_samples
+        self._pending: Dict[str, PendingAnswer] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+        self._slow: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.callbacks = 0
+        self.answered_in_budget = 0
+        self.auto_answered = 0       # бюджет истек
+        self.answered_on_finish = 0  # хендлер завершился без ответа
+        self.late_answers = 0        # ответ хендлера после автоматического
+        self.late_delivered = 0      # из них с текстом, доставлены сообщением
+        self.duplicate_errors = 0    # проглоченные ошибки повторного ответа
+
+    def begin(self, callback_query_id: str, chat_id: Optional[int] = None) -> PendingAnswer:
+        self.callbacks += 1
+        pending = PendingAnswer(callback_query_id, chat_id)
+        self._pending[callback_query_id] = pending
+        return pending
+
+    def get(self, callback_query_id: str) -> Optional[PendingAnswer]:
+        return self._pending.get(callback_query_id)
+
+    def set_handler(self, callback_query_id: str, handler: str) -> None:
+        pending = self._pending.get(callback_query_id)
+        if pending is not None:
+            pending.handler = handler
+
+    async def answer(self, bot: Bot, pending: PendingAnswer) -> None:
+        """Ответить на нажатие вместо хендлера"""
+        if pending.answered:
+            return
+        pending.auto = True
+        token = _auto_answer.set(True)
+        try:
+            await bot.answer_callback_query(pending.callback_query_id)
+        except TelegramBadRequest as e:
+            if not self.is_duplicate_error(e):
+                logger.warning(f"Не удалось ответить на нажатие ({pending.handler}): {e}")
+        except Exception as e:
+            logger.warning(f"Не удалось ответить на нажатие ({pending.handler}): {e}")
+        finally:
+            _auto_answer.reset(token)
+
+    def on_budget_expired(self, bot: Bot, pending: PendingAnswer) -> None:
+        """Вызывается по таймеру, если хендлер не ответил за бюджет"""
+        if pending.answered or self._pending.get(pending.callback_query_id) is not pending:
+            return
+        self.auto_answered += 1
+        logger.debug(f"Хендлер {pending.handler} не ответил на нажатие за {self.budget * 1000:.0f} мс")
+        task = asyncio.create_task(self.answer(bot, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def deliver_late(self, bot: Bot, pending: PendingAnswer, method: AnswerCallbackQuery) -> None:
+        """Поздний ответ хендлера: текст — сообщением в чат, пустой — никуда"""
+        self.late_answers += 1
+        if not method.text or pending.chat_id is None:
+            logger.debug(f"Поздний ответ хендлера {pending.handler} на нажатие не отправлен")
+            return
+        try:
+            await bot.send_message(pending.chat_id, method.text, parse_mode=None)
+            self.late_delivered += 1
+        except Exception as e:
+            logger.warning(f"Не удалось доставить поздний ответ хендлера {pending.handler}: {e}")
+
+    async def finish(self, bot: Bot, pending: PendingAnswer) -> None:
+        """Хендлер завершился: ответить, если он этого не сделал, и учесть время"""
+        if self._pending.get(pending.callback_query_id) is pending:
+            del self._pending[pending.callback_query_id]
+        finished = time.monotonic()
+        if not pending.answered:
+            self.answered_on_finish += 1
+            await self.answer(bot, pending)
+        elif pending.answered_at is not None and pending.answered_at - pending.started <= self.budget:
+            self.answered_in_budget += 1
+        self.record(pending.handler, (pending.answered_at or finished) - pending.started)
+
+    def record(self, handler: str, seconds: float) -> None:
+        """Учесть время до ответа хендлера и обновить список медленных"""
+        samples = self._samples.get(handler)
+        if samples is None:
+            samples = self._samples[handler] = deque(maxlen=self.window)
+        samples.append(seconds)
+        if len(samples) < self.min_samples:
+            return
+
+        p95 = percentile(list(samples), 95)
+        if p95 > self.budget and handler not in self._slow:
+            self._slow.add(handler)
+            logger.warning(
+                f"Медленный хендлер {handler}: p95 ответа на нажатие {p95 * 1000:.0f} мс "
+                f"при бюджете {self.budget * 1000:.0f} мс ({len(samples)} нажатий)"
+            )
+        elif p95 <= self.budget and handler in self._slow:
+            self._slow.discard(handler)
+            logger.info(f"Хендлер {handler} снова укладывается в бюджет: p95 {p95 * 1000:.0f} мс")
+
+    @staticmethod
+    def is_duplicate_error(error: TelegramBadRequest) -> bool:
+        message = str(error).lower()
+        return any(marker in message for marker in _DUPLICATE_ANSWER_ERRORS)
+
+    def get_slow_handlers(self) -> List[Dict[str, Any]]:
+        """Хендлеры с p95 больше бюджета, самые медленные первыми"""
+        slow = []
+        for handler in self._slow:
+            samples = list(self._samples[handler])
+            slow.append({
+                "handler": handler,
+                "p95_ms": round(percentile(samples, 95) * 1000, 1),
+                "p50_ms": round(percentile(samples, 50) * 1000, 1),
+                "samples": len(samples),
+                "over_budget": round(sum(1 for value in samples if value > self.budget) / len(samples), 2),
+            })
+        slow.sort(key=lambda item: item["p95_ms"], reverse=True)
+        return slow
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "budget_ms": round(self.budget * 1000),
+            "callbacks": self.callbacks,
+            "pending": len(self._pending),
+            "answered_in_budget": self.answered_in_budget,
+            "auto_answered": self.auto_answered,
+            "answered_on_finish": self.answered_on_finish,
+            "late_answers": self.late_answers,
+            "late_delivered": self.late_delivered,
+            "duplicate_errors": self.duplicate_errors,
+            "slow_handlers": self.get_slow_handlers(),
+        }
+
+
+class CallbackAnswerRequestMiddleware(BaseRequestMiddleware):
+    """Request middleware сессии бота: отмечает ответы хендлеров и глушит повторные"""
+
+    def __init__(self, watchdog: CallbackAnswerWatchdog):
+        self.watchdog = watchdog
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if not isinstance(method, AnswerCallbackQuery):
+            return await make_request(bot, method)
+        pending = self.watchdog.get(method.callback_query_id)
+        if pending is None:
+            return await make_request(bot, method)
+
+        if not _auto_answer.get():
+            if pending.answered_at is None:
+                pending.answered_at = time.monotonic()
+            if pending.auto:
+                # Крутилка уже убрана, второй ответ Telegram не примет
+                await self.watchdog.deliver_late(bot, pending, method)
+                return True
+        try:
+            return await make_request(bot, method)
+        except TelegramBadRequest as e:
+            if not self.watchdog.is_duplicate_error(e):
+                raise
+            self.watchdog.duplicate_errors += 1
+            logger.debug(f"Повторный ответ на нажатие ({pending.handler}): {e}")
+            return True
+
+
+# Глобальный экземпляр
+callback_answers = CallbackAnswerWatchdog(
+    budget_ms=settings.callback_answer_budget_ms,
+    window=settings.callback_slow_window,
+    min_samples=settings.callback_slow_min_samples,
+)
+
+
+def setup_callback_answers(bot: Bot) -> CallbackAnswerWatchdog:
+    """Подключить учет ответов на нажатия к сессии бота"""
+    bot.session.middleware(CallbackAnswerRequestMiddleware(callback_answers))
+    return callback_answers
@@ -0,0 +1,58 @@
+"""
+Поддержание суточных агрегатов статистики (таблица daily_stats)
+
+Периодическая задача пересчитывает дни с отметки «пересчитано по» по
+сегодня, так что агрегаты отстают от данных не больше чем на
+ROLLUP_INTERVAL. Обычно это вчера и сегодня (вчера — чтобы подхватить
+записи около полуночи), после простоя бота — все пропущенные дни. Если
+отметки еще нет, агрегаты заполняются за всю историю.
+"""
+import logging
+from datetime import date, datetime, timedelta
+
+from database.repositories import DailyStatsRepository
+from services.job_scheduler import job_scheduler
+
+logger = logging.getLogger(__name__)
+
+DAILY_STATS_ROLLUP = "daily_stats_rollup"
+
+# Как часто пересчитывать агрегаты за последние дни
+ROLLUP_INTERVAL = timedelta(minutes=5)
+
+
+async def _schedule_next_rollup() -> None:
+    await job_scheduler.schedule(
+        DAILY_STATS_ROLLUP,
+        datetime.utcnow() + ROLLUP_INTERVAL,
+        {},
+        key=DAILY_STATS_ROLLUP
+    )
+
+
+async def rebuild_pending_days(today: date) -> None:
+    """Пересчитать агрегаты с отметки «пересчитано по» (не позже вчера) по today"""
+    rebuilt_through = await DailyStatsRepository.get_rebuilt_through()
+    if rebuilt_through is None:
+        start = await DailyStatsRepository.get_first_activity_date() or today
+    else:
+        start = min(rebuilt_through, today - timedelta(days=1))
+
+    await DailyStatsRepository.rebuild(start, today)
+    if (today - start).days > 1:
+        logger.info(f"Суточные агрегаты пересчитаны с {start} по {today}")
+
+
+@job_scheduler.register(DAILY_STATS_ROLLUP, resumable=True)
+async def rollup_recent_days(bot):
+    """Пересчитать агрегаты за последние дни и запланировать следующий пересчет"""
+    try:
+        await rebuild_pending_days(datetime.utcnow().date())
+    finally:
+        await _schedule_next_rollup()
+
+
+async def start_daily_stats() -> None:
+    """При запуске: досчитать агрегаты за время простоя (или всю историю) и запустить пересчет"""
+    await rebuild_pending_days(datetime.utcnow().date())
+    await _schedule_next_rollup()
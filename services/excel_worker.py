@@ -0,0 +1,85 @@
+"""
+Сборка xlsx-файла в отдельном процессе
+
+Модуль импортируется процессом-воркером пула (spawn), поэтому не тянет
+за собой бота, базу и настройки — только openpyxl.
+
+Строки приходят через спул-файл: последовательность pickle-кадров
+(номер листа, порция строк). Книга пишется в режиме write_only, так что
+память воркера не растет с числом строк.
+"""
+import pickle
+from datetime import datetime
+from typing import Any, List, Sequence, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+COLUMN_WIDTH = 20
+
+
+def write_spool_frame(spool, sheet_index: int, rows: Sequence[Sequence[Any]]) -> None:
+    """Дописать порцию строк листа в спул-файл"""
+    pickle.dump((sheet_index, [tuple(row) for row in rows]), spool, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _excel_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return 'Да' if value else 'Нет'
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Excel не хранит часовой пояс
+        return value.replace(tzinfo=None)
+    return value
+
+
+def build_workbook(
+    spool_path: str,
+    output_path: str,
+    sheets: List[Tuple[str, List[str]]],
+    summary: List[Tuple[str, Any]],
+) -> int:
+    """Собрать книгу из спул-файла; возвращает число записанных строк данных"""
+    wb = Workbook(write_only=True)
+
+    worksheets = []
+    for title, headers in sheets:
+        ws = wb.create_sheet(title)
+        for col in range(1, len(headers) + 1):
+            ws.column_dimensions[get_column_letter(col)].width = COLUMN_WIDTH
+        header_row = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            header_row.append(cell)
+        ws.append(header_row)
+        worksheets.append(ws)
+
+    rows_written = 0
+    with open(spool_path, "rb") as spool:
+        while True:
+            try:
+                sheet_index, rows = pickle.load(spool)
+            except EOFError:
+                break
+            ws = worksheets[sheet_index]
+            for row in rows:
+                ws.append([_excel_value(value) for value in row])
+            rows_written += len(rows)
+
+    ws = wb.create_sheet("Статистика")
+    ws.column_dimensions['A'].width = 25
+    ws.column_dimensions['B'].width = 15
+    title = WriteOnlyCell(ws, value="ОБЩАЯ СТАТИСТИКА")
+    title.font = Font(bold=True, size=14)
+    ws.append([title])
+    ws.append([])
+    for name, value in summary:
+        ws.append([name, value])
+
+    wb.save(output_path)
+    return rows_written
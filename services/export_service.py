@@ -1,19 +1,240 @@
 """
 Сервис для экспорта данных в различных форматах
+
+CSV и NDJSON выгружаются потоково: строки читаются порциями по ключу
+(только нужные столбцы, без загрузки связей) и сразу дописываются в
+gzip-файл во временном каталоге. Память не зависит от числа строк;
+готовый файл отправляется через FSInputFile и удаляется.
+
+Excel собирается в пуле процессов (services.excel_worker), чтобы
+генерация книги не останавливала обработку апдейтов.
+
+Дельта-выгрузки (NDJSON) отдают только строки, созданные или измененные
+после отметки потребителя (по индексу updated_at), и надгробия удаленных
+команд и турниров. Отметка сдвигается, только когда потребитель
+подтвердил получение файла (acknowledge_delta). Производные столбцы
+(названия из связанных таблиц и счетчики) в дельту не входят: они
+меняются без изменения updated_at самой строки, и потребитель хранил бы
+устаревшие значения. Вместо них дельта отдает внешние ключи; счетчики
+есть только в полных выгрузках.
 """
+import asyncio
 import csv
+import gzip
 import json
-import asyncio
-from io import StringIO, BytesIO
-from datetime import datetime
-from typing import Dict, List, Any, Union
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
-from openpyxl.utils import get_column_letter
+import os
+import tempfile
+from dataclasses import dataclass
+from enum import Enum
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+from sqlalchemy import Select, select, func
+
+from config.settings import settings
+from database.models import User, Team, TeamStatus, Player, Tournament, Game, DeletedRecord
+from database.repositories.export_repository import ExportRepository
+from database.repositories.statistics_repository import StatisticsRepository
+from services.excel_worker import build_workbook, write_spool_frame
+
+# Строк в одной порции чтения/записи
+EXPORT_CHUNK_SIZE = 1000
+
+# Отставание верхней границы дельты от текущего момента: updated_at
+# проставляется SQLite с точностью до секунды, а транзакция, начатая в ту
+# же секунду, может закоммититься уже после выгрузки
+DELTA_SAFETY_LAG = timedelta(seconds=5)
+
+# Листы Excel: выгрузка -> название листа
+EXCEL_SHEETS = (
+    ("users", "Пользователи"),
+    ("teams", "Команды"),
+    ("tournaments", "Турниры"),
+)
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Пул процессов для тяжелых выгрузок (создается при первом использовании)"""
+    global _process_pool
+    if _process_pool is None:
+        # spawn: не копировать в воркер потоки и соединения бота
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.export_process_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Остановить пул процессов (при остановке бота)"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+@dataclass(frozen=True)
+class ExportColumn:
+    """Столбец выгрузки: ключ NDJSON, заголовок CSV и выражение SQL"""
+    key: str
+    header: str
+    expression: Any
+    derived: bool = False  # значение из других таблиц: в дельту не входит
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    """Описание выгрузки таблицы; первый столбец — ключ порционного чтения"""
+    name: str
+    model: Any
+    columns: Tuple[ExportColumn, ...]
+    joins: Tuple[Tuple[Any, Any], ...] = ()  # (таблица, условие) для LEFT JOIN
+
+    @property
+    def key_column(self):
+        return self.columns[0].expression
+
+    def statement(self) -> Select:
+        stmt = select(*[column.expression.label(column.key) for column in self.columns]).select_from(self.model)
+        for target, onclause in self.joins:
+            stmt = stmt.outerjoin(target, onclause)
+        return stmt
+
+    @property
+    def delta_columns(self) -> Tuple[ExportColumn, ...]:
+        return tuple(column for column in self.columns if not column.derived)
+
+    def delta_statement(self) -> Select:
+        """Только столбцы самой таблицы, без JOIN и подзапросов"""
+        return select(*[column.expression.label(column.key) for column in self.delta_columns]).select_from(self.model)
 
-from database.repositories.user_repository import UserRepository
-from database.repositories.team_repository import TeamRepository
-from database.repositories.tournament_repository import TournamentRepository
+
+@dataclass
+class ExportResult:
+    """Готовый файл выгрузки"""
+    path: str
+    filename: str
+    rows: int
+    deleted: int = 0  # надгробий в дельта-выгрузке
+    watermark: Optional[datetime] = None  # верхняя граница дельты (UTC)
+
+
+_team_players_count = (
+    select(func.count(Player.id))
+    .where(Player.team_id == Team.id)
+    .correlate(Team)
+    .scalar_subquery()
+)
+
+_tournament_approved_teams = (
+    select(func.count(Team.id))
+    .where(Team.tournament_id == Tournament.id, Team.status == TeamStatus.APPROVED.value)
+    .correlate(Tournament)
+    .scalar_subquery()
+)
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "users": ExportSpec(
+        name="users",
+        model=User,
+        columns=(
+            ExportColumn("id", "ID", User.id),
+            ExportColumn("telegram_id", "Telegram ID", User.telegram_id),
+            ExportColumn("username", "Имя пользователя", User.username),
+            ExportColumn("full_name", "Полное имя", User.full_name),
+            ExportColumn("role", "Роль", User.role),
+            ExportColumn("region", "Регион", User.region),
+            ExportColumn("language", "Язык", User.language),
+            ExportColumn("is_blocked", "Заблокирован", User.is_blocked),
+            ExportColumn("created_at", "Дата регистрации", User.created_at),
+            ExportColumn("updated_at", "Последнее обновление", User.updated_at),
+        ),
+    ),
+    "teams": ExportSpec(
+        name="teams",
+        model=Team,
+        columns=(
+            ExportColumn("id", "ID", Team.id),
+            ExportColumn("name", "Название", Team.name),
+            ExportColumn("tournament_id", "Турнир ID", Team.tournament_id),
+            ExportColumn("tournament_name", "Турнир", Tournament.name, derived=True),
+            ExportColumn("captain_id", "Капитан ID", Team.captain_id),
+            ExportColumn("captain_name", "Капитан", User.full_name, derived=True),
+            ExportColumn("status", "Статус", Team.status),
+            ExportColumn("players_count", "Участников", _team_players_count, derived=True),
+            ExportColumn("created_at", "Дата создания", Team.created_at),
+            ExportColumn("updated_at", "Последнее обновление", Team.updated_at),
+        ),
+        joins=(
+            (Tournament, Team.tournament_id == Tournament.id),
+            (User, Team.captain_id == User.id),
+        ),
+    ),
+    "tournaments": ExportSpec(
+        name="tournaments",
+        model=Tournament,
+        columns=(
+            ExportColumn("id", "ID", Tournament.id),
+            ExportColumn("name", "Название", Tournament.name),
+            ExportColumn("description", "Описание", Tournament.description),
+            ExportColumn("game_id", "Игра ID", Tournament.game_id),
+            ExportColumn("game", "Игра", Game.name, derived=True),
+            ExportColumn("format", "Формат", Tournament.format),
+            ExportColumn("region", "Регион", Tournament.region),
+            ExportColumn("status", "Статус", Tournament.status),
+            ExportColumn("max_teams", "Максимум команд", Tournament.max_teams),
+            ExportColumn("approved_teams", "Одобренных команд", _tournament_approved_teams, derived=True),
+            ExportColumn("registration_start", "Начало регистрации", Tournament.registration_start),
+            ExportColumn("registration_end", "Конец регистрации", Tournament.registration_end),
+            ExportColumn("tournament_start", "Начало турнира", Tournament.tournament_start),
+            ExportColumn("created_at", "Дата создания", Tournament.created_at),
+            ExportColumn("updated_at", "Последнее обновление", Tournament.updated_at),
+        ),
+        joins=(
+            (Game, Tournament.game_id == Game.id),
+        ),
+    ),
+}
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Да' if value else 'Нет'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode_csv(rows: Sequence[Sequence[Any]]) -> bytes:
+    buffer = StringIO()
+    csv.writer(buffer, delimiter=';').writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _encode_ndjson(keys: Sequence[str], rows: Sequence[Sequence[Any]], op: Optional[str] = None) -> bytes:
+    prefix = {"op": op} if op else {}
+    lines = [
+        json.dumps({**prefix, **{key: _json_value(value) for key, value in zip(keys, row)}}, ensure_ascii=False)
+        for row in rows
+    ]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
 
 
 class ExportService:
@@ -23,362 +244,151 @@ class ExportService:
         # Репозитории используют статические методы, экземпляры не нужны
         pass
     
-    async def export_users_csv(self) -> StringIO:
-        """Экспорт пользователей в CSV"""
-        output = StringIO()
-        writer = csv.writer(output, delimiter=';')
-        
-        # Заголовки
-        headers = [
-            'ID', 'Telegram ID', 'Имя пользователя', 'Полное имя', 
-            'Роль', 'Регион', 'Язык', 'Заблокирован',
-            'Дата регистрации', 'Последнее обновление'
-        ]
-        writer.writerow(headers)
-        
-        # Получаем всех пользователей
-        users = await UserRepository.get_all_users(limit=None)
-        
-        for user in users:
-            row = [
-                user.id,
-                user.telegram_id,
-                user.username or '',
-                user.full_name or '',
-                user.role or 'user',
-                user.region or '',
-                user.language or '',
-                'Да' if user.is_blocked else 'Нет',
-                user.created_at.strftime('%Y-%m-%d %H:%M:%S') if user.created_at else '',
-                user.updated_at.strftime('%Y-%m-%d %H:%M:%S') if user.updated_at else ''
-            ]
-            writer.writerow(row)
-        
-        output.seek(0)
-        return output
+    async def export_to_file(
+        self,
+        name: str,
+        export_format: ExportFormat,
+        chunk_size: int = EXPORT_CHUNK_SIZE
+    ) -> ExportResult:
+        """Потоковая выгрузка таблицы name в gzip-файл; файл удаляет вызывающий"""
+        spec = EXPORTS[name]
+        keys = [column.key for column in spec.columns]
+        extension = f"{export_format.value}.gz"
+        
+        fd, path = tempfile.mkstemp(prefix=f"export_{name}_", suffix=f".{extension}")
+        os.close(fd)
+        rows = 0
+        try:
+            with gzip.open(path, "wb") as archive:
+                if export_format == ExportFormat.CSV:
+                    # BOM для правильного отображения в Excel
+                    header = _encode_csv([[column.header for column in spec.columns]])
+                    archive.write('\ufeff'.encode('utf-8') + header)
+                
+                async for chunk in ExportRepository.iter_chunks(spec.statement(), spec.key_column, chunk_size):
+                    if export_format == ExportFormat.CSV:
+                        data = _encode_csv(chunk)
+                    else:
+                        data = _encode_ndjson(keys, chunk)
+                    # Сжатие и запись — вне event loop
+                    await asyncio.to_thread(archive.write, data)
+                    rows += len(chunk)
+        except Exception:
+            os.remove(path)
+            raise
+        
+        filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        return ExportResult(path=path, filename=filename, rows=rows)
     
-    async def export_teams_csv(self) -> StringIO:
-        """Экспорт команд в CSV"""
-        output = StringIO()
-        writer = csv.writer(output, delimiter=';')
-        
-        # Заголовки
-        headers = [
-            'ID', 'Название', 'Описание', 'Капитан ID', 'Капитан',
-            'Статус', 'Максимум участников', 'Текущих участников',
-            'Дата создания', 'Последнее обновление'
-        ]
-        writer.writerow(headers)
-        
-        # Получаем все команды
-        teams = await TeamRepository.get_all_teams()
-        
-        for team in teams:
-            # Подсчитываем участников
-            members_count = len(team.players) if hasattr(team, 'players') and team.players else 0
-            
-            row = [
-                team.id,
-                team.name,
-                team.description or '',
-                team.captain_id or '',
-                team.captain.full_name if team.captain else '',
-                team.status or 'pending',
-                team.max_members or '',
-                members_count,
-                team.created_at.strftime('%Y-%m-%d %H:%M:%S') if team.created_at else '',
-                team.updated_at.strftime('%Y-%m-%d %H:%M:%S') if team.updated_at else ''
-            ]
-            writer.writerow(row)
-        
-        output.seek(0)
-        return output
+    async def export_delta(
+        self,
+        consumer: str,
+        name: str,
+        chunk_size: int = EXPORT_CHUNK_SIZE
+    ) -> ExportResult:
+        """
+        Изменения таблицы name с отметки потребителя consumer в gzip NDJSON.
+        Сначала идут надгробия {"op": "delete", "id", "deleted_at"}, затем
+        строки {"op": "upsert", ...}: так повторно выданный SQLite id не
+        потеряется. Без отметки выгружается все (первичная загрузка).
+        Строки содержат только столбцы самой таблицы (ExportSpec.delta_statement).
+        Отметку не меняет — после доставки файла вызовите acknowledge_delta.
+        """
+        spec = EXPORTS[name]
+        keys = [column.key for column in spec.delta_columns]
+        since = await ExportRepository.get_watermark(consumer, name)
+        until = (datetime.utcnow() - DELTA_SAFETY_LAG).replace(microsecond=0)
+        if since is not None:
+            until = max(until, since)
+        
+        # Нижнюю границу since задает iter_chunks: порции идут по (updated_at, id)
+        updated_at = spec.model.updated_at
+        stmt = spec.delta_statement().where(updated_at <= until)
+        after = (since,) if since is not None else ()
+        
+        fd, path = tempfile.mkstemp(prefix=f"delta_{name}_", suffix=".ndjson.gz")
+        os.close(fd)
+        rows = deleted = 0
+        try:
+            with gzip.open(path, "wb") as archive:
+                if since is not None:
+                    tombstones = select(
+                        DeletedRecord.id, DeletedRecord.entity_id, DeletedRecord.deleted_at
+                    ).where(
+                        DeletedRecord.entity == name,
+                        DeletedRecord.deleted_at > since,
+                        DeletedRecord.deleted_at <= until
+                    )
+                    async for chunk in ExportRepository.iter_chunks(tombstones, DeletedRecord.id, chunk_size):
+                        data = _encode_ndjson(("id", "deleted_at"), [row[1:] for row in chunk], op="delete")
+                        await asyncio.to_thread(archive.write, data)
+                        deleted += len(chunk)
+                
+                async for chunk in ExportRepository.iter_chunks(
+                    stmt, (updated_at, spec.key_column), chunk_size, after=after
+                ):
+                    await asyncio.to_thread(archive.write, _encode_ndjson(keys, chunk, op="upsert"))
+                    rows += len(chunk)
+        except Exception:
+            os.remove(path)
+            raise
+        
+        filename = f"{name}_delta_{until.strftime('%Y%m%d_%H%M%S')}.ndjson.gz"
+        return ExportResult(path=path, filename=filename, rows=rows, deleted=deleted, watermark=until)
     
-    async def export_tournaments_csv(self) -> StringIO:
-        """Экспорт турниров в CSV"""
-        output = StringIO()
-        writer = csv.writer(output, delimiter=';')
-        
-        # Заголовки
-        headers = [
-            'ID', 'Название', 'Описание', 'Статус', 'Максимум команд',
-            'Зарегистрированных команд', 'Дата начала', 'Дата окончания',
-            'Дата создания', 'Последнее обновление'
-        ]
-        writer.writerow(headers)
-        
-        # Получаем все турниры
-        tournaments = await TournamentRepository.get_all_tournaments(limit=None)
-        
-        for tournament in tournaments:
-            # Подсчитываем зарегистрированные команды
-            registered_count = len([r for r in tournament.registrations if r.status == 'approved'])
-            
-            row = [
-                tournament.id,
-                tournament.name,
-                tournament.description or '',
-                tournament.status or 'draft',
-                tournament.max_teams or '',
-                registered_count,
-                tournament.start_date.strftime('%Y-%m-%d %H:%M:%S') if tournament.start_date else '',
-                tournament.end_date.strftime('%Y-%m-%d %H:%M:%S') if tournament.end_date else '',
-                tournament.created_at.strftime('%Y-%m-%d %H:%M:%S') if tournament.created_at else '',
-                tournament.updated_at.strftime('%Y-%m-%d %H:%M:%S') if tournament.updated_at else ''
-            ]
-            writer.writerow(row)
-        
-        output.seek(0)
-        return output
+    async def acknowledge_delta(self, consumer: str, name: str, result: ExportResult) -> None:
+        """Потребитель получил дельту — следующая начнется с ее верхней границы"""
+        await ExportRepository.set_watermark(consumer, name, result.watermark)
     
-    async def export_users_json(self) -> str:
-        """Экспорт пользователей в JSON"""
-        users = await UserRepository.get_all_users(limit=None)
-        
-        users_data = []
-        for user in users:
-            user_data = {
-                'id': user.id,
-                'telegram_id': user.telegram_id,
-                'username': user.username,
-                'full_name': user.full_name,
-                'role': user.role,
-                'region': user.region,
-                'language': user.language,
-                'is_blocked': user.is_blocked,
-                'created_at': user.created_at.isoformat() if user.created_at else None,
-                'updated_at': user.updated_at.isoformat() if user.updated_at else None
-            }
-            users_data.append(user_data)
-        
-        return json.dumps(users_data, ensure_ascii=False, indent=2)
-    
-    async def export_teams_json(self) -> str:
-        """Экспорт команд в JSON"""
-        teams = await TeamRepository.get_all_teams()
-        
-        teams_data = []
-        for team in teams:
-            players = [
-                {
-                    'id': player.id,
-                    'nickname': player.nickname,
-                    'game_id': player.game_id,
-                    'is_substitute': player.is_substitute,
-                    'position': player.position
-                }
-                for player in (team.players if hasattr(team, 'players') and team.players else [])
-            ]
+    async def export_excel(
+        self,
+        progress: Optional[Callable[[str], Awaitable[None]]] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE
+    ) -> ExportResult:
+        """
+        Экспорт всех данных в Excel.
+        Строки порциями пишутся в спул-файл, книга собирается в пуле
+        процессов (services.excel_worker), event loop не блокируется.
+        """
+        fd, spool_path = tempfile.mkstemp(prefix="export_excel_", suffix=".spool")
+        fd_out, output_path = tempfile.mkstemp(prefix="export_excel_", suffix=".xlsx")
+        os.close(fd_out)
+        try:
+            sheets = []
+            with os.fdopen(fd, "wb") as spool:
+                for sheet_index, (name, title) in enumerate(EXCEL_SHEETS):
+                    spec = EXPORTS[name]
+                    sheets.append((title, [column.header for column in spec.columns]))
+                    rows = 0
+                    async for chunk in ExportRepository.iter_chunks(spec.statement(), spec.key_column, chunk_size):
+                        await asyncio.to_thread(write_spool_frame, spool, sheet_index, chunk)
+                        rows += len(chunk)
+                    if progress:
+                        await progress(f"{title}: {rows} строк")
             
-            team_data = {
-                'id': team.id,
-                'name': team.name,
-                'description': team.description,
-                'status': team.status,
-                'max_members': team.max_members,
-                'captain': {
-                    'id': team.captain.id,
-                    'full_name': team.captain.full_name
-                } if team.captain else None,
-                'players': players,
-                'created_at': team.created_at.isoformat() if team.created_at else None,
-                'updated_at': team.updated_at.isoformat() if team.updated_at else None
-            }
-            teams_data.append(team_data)
-        
-        return json.dumps(teams_data, ensure_ascii=False, indent=2)
-    
-    async def export_tournaments_json(self) -> str:
-        """Экспорт турниров в JSON"""
-        tournaments = await TournamentRepository.get_all_tournaments(limit=None)
-        
-        tournaments_data = []
-        for tournament in tournaments:
-            registrations = [
-                {
-                    'team_id': reg.team_id,
-                    'team_name': reg.team.name if reg.team else None,
-                    'status': reg.status,
-                    'registered_at': reg.created_at.isoformat() if reg.created_at else None
-                }
-                for reg in tournament.registrations
+            stats = await StatisticsRepository.get_general_stats()
+            summary = [
+                ("Всего пользователей", stats.total_users),
+                ("Всего команд", stats.total_teams),
+                ("Всего турниров", stats.total_tournaments),
+                ("Новых пользователей за 30 дней", stats.users_30d),
+                ("Новых турниров за 30 дней", stats.tournaments_30d),
             ]
             
-            tournament_data = {
-                'id': tournament.id,
-                'name': tournament.name,
-                'description': tournament.description,
-                'status': tournament.status,
-                'max_teams': tournament.max_teams,
-                'start_date': tournament.start_date.isoformat() if tournament.start_date else None,
-                'end_date': tournament.end_date.isoformat() if tournament.end_date else None,
-                'registrations': registrations,
-                'created_at': tournament.created_at.isoformat() if tournament.created_at else None,
-                'updated_at': tournament.updated_at.isoformat() if tournament.updated_at else None
-            }
-            tournaments_data.append(tournament_data)
-        
-        return json.dumps(tournaments_data, ensure_ascii=False, indent=2)
-    
-    async def export_excel(self) -> BytesIO:
-        """Экспорт всех данных в Excel"""
-        wb = Workbook()
-        
-        # Стили
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        
-        # Удаляем стандартный лист
-        wb.remove(wb.active)
-        
-        # Экспорт пользователей
-        await self._add_users_sheet(wb, header_font, header_fill)
-        
-        # Экспорт команд
-        await self._add_teams_sheet(wb, header_font, header_fill)
-        
-        # Экспорт турниров
-        await self._add_tournaments_sheet(wb, header_font, header_fill)
-        
-        # Статистика
-        await self._add_statistics_sheet(wb, header_font, header_fill)
-        
-        # Сохраняем в BytesIO
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        return output
-    
-    async def _add_users_sheet(self, wb: Workbook, header_font: Font, header_fill: PatternFill):
-        """Добавляет лист с пользователями"""
-        ws = wb.create_sheet("Пользователи")
-        
-        # Заголовки
-        headers = [
-            'ID', 'Telegram ID', 'Имя пользователя', 'Полное имя', 
-            'Роль', 'Регион', 'Язык', 'Заблокирован', 'Дата регистрации'
-        ]
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-        
-        # Данные
-        users = await UserRepository.get_all_users(limit=None)
-        for row, user in enumerate(users, 2):
-            ws.cell(row=row, column=1, value=user.id)
-            ws.cell(row=row, column=2, value=user.telegram_id)
-            ws.cell(row=row, column=3, value=user.username or '')
-            ws.cell(row=row, column=4, value=user.full_name or '')
-            ws.cell(row=row, column=5, value=user.role or 'user')
-            ws.cell(row=row, column=6, value=user.region or '')
-            ws.cell(row=row, column=7, value=user.language or '')
-            ws.cell(row=row, column=8, value='Да' if user.is_blocked else 'Нет')
-            ws.cell(row=row, column=9, value=user.created_at)
-        
-        # Автоширина столбцов
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].auto_size = True
-    
-    async def _add_teams_sheet(self, wb: Workbook, header_font: Font, header_fill: PatternFill):
-        """Добавляет лист с командами"""
-        ws = wb.create_sheet("Команды")
-        
-        # Заголовки
-        headers = [
-            'ID', 'Название', 'Описание', 'Капитан', 'Статус',
-            'Максимум участников', 'Текущих участников', 'Дата создания'
-        ]
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-        
-        # Данные
-        teams = await TeamRepository.get_all_teams()
-        for row, team in enumerate(teams, 2):
-            members_count = len(team.players) if hasattr(team, 'players') and team.players else 0
-            
-            ws.cell(row=row, column=1, value=team.id)
-            ws.cell(row=row, column=2, value=team.name)
-            ws.cell(row=row, column=3, value=team.description or '')
-            ws.cell(row=row, column=4, value=team.captain.full_name if team.captain else '')
-            ws.cell(row=row, column=5, value=team.status or 'pending')
-            ws.cell(row=row, column=6, value=team.max_members or '')
-            ws.cell(row=row, column=7, value=members_count)
-            ws.cell(row=row, column=8, value=team.created_at)
-        
-        # Автоширина столбцов
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].auto_size = True
-    
-    async def _add_tournaments_sheet(self, wb: Workbook, header_font: Font, header_fill: PatternFill):
-        """Добавляет лист с турнирами"""
-        ws = wb.create_sheet("Турниры")
-        
-        # Заголовки
-        headers = [
-            'ID', 'Название', 'Описание', 'Статус', 'Максимум команд',
-            'Зарегистрированных команд', 'Дата начала', 'Дата окончания', 'Дата создания'
-        ]
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-        
-        # Данные
-        tournaments = await TournamentRepository.get_all_tournaments(limit=None)
-        for row, tournament in enumerate(tournaments, 2):
-            registered_count = len([r for r in tournament.registrations if r.status == 'approved'])
-            
-            ws.cell(row=row, column=1, value=tournament.id)
-            ws.cell(row=row, column=2, value=tournament.name)
-            ws.cell(row=row, column=3, value=tournament.description or '')
-            ws.cell(row=row, column=4, value=tournament.status or 'draft')
-            ws.cell(row=row, column=5, value=tournament.max_teams or '')
-            ws.cell(row=row, column=6, value=registered_count)
-            ws.cell(row=row, column=7, value=tournament.start_date)
-            ws.cell(row=row, column=8, value=tournament.end_date)
-            ws.cell(row=row, column=9, value=tournament.created_at)
-        
-        # Автоширина столбцов
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].auto_size = True
-    
-    async def _add_statistics_sheet(self, wb: Workbook, header_font: Font, header_fill: PatternFill):
-        """Добавляет лист со статистикой"""
-        ws = wb.create_sheet("Статистика")
-        
-        # Общая статистика
-        row = 1
-        ws.cell(row=row, column=1, value="ОБЩАЯ СТАТИСТИКА").font = Font(bold=True, size=14)
-        row += 2
-        
-        # Получаем статистику
-        total_users = await UserRepository.get_total_count()
-        total_teams = await TeamRepository.get_total_teams()
-        total_tournaments = await TournamentRepository.get_total_tournaments()
-        active_tournaments = await TournamentRepository.get_active_tournaments_count()
-        
-        stats = [
-            ("Всего пользователей", total_users),
-            ("Всего команд", total_teams),
-            ("Всего турниров", total_tournaments),
-            ("Активных турниров", active_tournaments)
-        ]
-        
-        for stat_name, stat_value in stats:
-            ws.cell(row=row, column=1, value=stat_name)
-            ws.cell(row=row, column=2, value=stat_value)
-            row += 1
-        
-        # Автоширина столбцов
-        ws.column_dimensions['A'].width = 25
-        ws.column_dimensions['B'].width = 15
+            if progress:
+                await progress("Формирование файла Excel...")
+            loop = asyncio.get_running_loop()
+            rows = await loop.run_in_executor(
+                get_process_pool(), build_workbook, spool_path, output_path, sheets, summary
+            )
+        except Exception:
+            os.remove(output_path)
+            raise
+        finally:
+            os.remove(spool_path)
+        
+        filename = f"enas_game_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        return ExportResult(path=output_path, filename=filename, rows=rows)
 
 
 # Экземпляр сервиса для использования в хэндлерах
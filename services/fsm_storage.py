@@ -0,0 +1,258 @@
+"""
+Хранилище состояний FSM в базе с отложенной записью
+
+Состояния живут в памяти, как в MemoryStorage, поэтому чтение FSM в
+хендлерах не ходит в базу. Запись только помечает ключ измененным;
+фоновая задача раз в FSM_FLUSH_INTERVAL_MS (или при накоплении
+FSM_BATCH_SIZE ключей) пишет все измененные ключи в fsm_states одной
+транзакцией. Регистрация команды, создание турнира и рассылка переживают
+перезапуск: после старта состояние пользователя подгружается из базы при
+первом обращении.
+
+Состояние, которое не менялось FSM_STATE_TTL_HOURS, считается брошенным:
+оно не загружается и удаляется из базы. Неизмененные записи, к которым
+не обращались FSM_CACHE_IDLE_MINUTES, вытесняются из памяти.
+"""
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Set
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from config.settings import settings
+from database.repositories import FSMRepository
+
+logger = logging.getLogger(__name__)
+
+# Сколько просроченных состояний удалять из базы за раз
+EXPIRE_BATCH = 500
+
+# Как часто искать просроченные и давно не используемые состояния, с
+SWEEP_INTERVAL = 60
+
+
+def _encode_value(value: Any) -> Any:
+    """Типы, которых нет в JSON, но которые кладут в FSM хендлеры (даты турнира)"""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Тип {type(value).__name__} не сохраняется в FSM")
+
+
+def _decode_object(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        if "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+        if "__date__" in obj:
+            return date.fromisoformat(obj["__date__"])
+    return obj
+
+
+def dump_data(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, default=_encode_value)
+
+
+def load_data(raw: str) -> Dict[str, Any]:
+    return json.loads(raw, object_hook=_decode_object) if raw else {}
+
+
+@dataclass
+class _Entry:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    updated_at: datetime = field(default_factory=datetime.utcnow)  # последняя запись, UTC
+    accessed: float = field(default_factory=time.monotonic)
+
+
+class DatabaseStorage(BaseStorage):
+    """FSM-хранилище aiogram: память + пакетная запись в базу"""
+
+    def __init__(
+        self,
+        flush_interval: float,
+        batch_size: int,
+        ttl: timedelta,
+        cache_idle: float,
+        key_builder: Optional[KeyBuilder] = None
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.cache_idle = cache_idle
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._cache: Dict[str, _Entry] = {}
+        self._dirty: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_sweep = time.monotonic()
+        self.loads = 0
+        self.hits = 0
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key, entry)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._entry(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        entry = await self._entry(key)
+        entry.data = data.copy()
+        self._mark_dirty(key, entry)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._entry(key)).data.copy()
+
+    async def start(self) -> None:
+        """Запуск фонового сброса"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="fsm-storage-writer")
+
+    async def close(self) -> None:
+        """Остановка с финальным сбросом измененных состояний"""
+        if self._task:
+            # Идущий сброс не прерываем: ключи из него уже сняты с _dirty
+            async with self._flush_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Записать все измененные состояния пачками по batch_size"""
+        async with self._flush_lock:
+            while self._dirty:
+                keys = [self._dirty.pop() for _ in range(min(self.batch_size, len(self._dirty)))]
+                rows = []
+                deleted = []
+                for raw_key in keys:
+                    entry = self._cache.get(raw_key)
+                    if entry is None or (entry.state is None and not entry.data):
+                        deleted.append(raw_key)
+                        continue
+                    try:
+                        rows.append((raw_key, entry.state, dump_data(entry.data), entry.updated_at))
+                    except (TypeError, ValueError) as e:
+                        # Такое состояние переживет только работу в памяти
+                        self.failed += 1
+                        logger.error(f"Состояние FSM {raw_key} не сохранено: {e}")
+
+                try:
+                    await FSMRepository.save_records(rows, deleted)
+                    self.flushes += 1
+                    self.written += len(rows) + len(deleted)
+                except Exception as e:
+                    # Вернем ключи в очередь: запишем при следующем сбросе
+                    self.failed += len(keys)
+                    self._dirty.update(keys)
+                    logger.error(f"Ошибка записи состояний FSM ({len(keys)} ключей): {e}")
+                    return
+                except BaseException:
+                    # Отмена посреди записи: ключи достанутся финальному сбросу
+                    self._dirty.update(keys)
+                    raise
+
+    async def expire(self) -> int:
+        """Убрать брошенные состояния из памяти и базы, вытеснить давно не используемые"""
+        cutoff = datetime.utcnow() - self.ttl
+        idle_before = time.monotonic() - self.cache_idle
+        for raw_key, entry in list(self._cache.items()):
+            if raw_key in self._dirty:
+                continue
+            if entry.updated_at < cutoff:
+                del self._cache[raw_key]
+                self.expired += 1
+            elif entry.accessed < idle_before:
+                del self._cache[raw_key]
+                self.evicted += 1
+
+        removed = 0
+        while True:
+            deleted = await FSMRepository.delete_expired(cutoff, EXPIRE_BATCH)
+            removed += deleted
+            if deleted < EXPIRE_BATCH:
+                break
+        if removed:
+            logger.info(f"Удалено брошенных состояний FSM: {removed}")
+        return removed
+
+    def get_stats(self) -> Dict[str, int]:
+        """Счетчики хранилища для диагностики"""
+        return {
+            "cached": len(self._cache),
+            "dirty": len(self._dirty),
+            "hits": self.hits,
+            "loads": self.loads,
+            "flushes": self.flushes,
+            "written": self.written,
+            "failed": self.failed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    async def _entry(self, key: StorageKey) -> _Entry:
+        """Запись из памяти; при первом обращении — загрузка из базы"""
+        raw_key = self.key_builder.build(key)
+        entry = self._cache.get(raw_key)
+        if entry is not None:
+            self.hits += 1
+            entry.accessed = time.monotonic()
+            return entry
+
+        self.loads += 1
+        row = await FSMRepository.get_record(raw_key)
+        # Пока шел запрос, ключ мог загрузить или изменить другой хендлер
+        entry = self._cache.get(raw_key)
+        if entry is None:
+            entry = _Entry()
+            if row and row[3] >= datetime.utcnow() - self.ttl:
+                _, entry.state, raw_data, entry.updated_at = row
+                entry.data = load_data(raw_data)
+            self._cache[raw_key] = entry
+        return entry
+
+    def _mark_dirty(self, key: StorageKey, entry: _Entry) -> None:
+        entry.updated_at = datetime.utcnow()
+        self._dirty.add(self.key_builder.build(key))
+        if len(self._dirty) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if time.monotonic() - self._last_sweep >= SWEEP_INTERVAL:
+                self._last_sweep = time.monotonic()
+                try:
+                    await self.expire()
+                except Exception as e:
+                    logger.error(f"Ошибка очистки состояний FSM: {e}")
+
+
+# Глобальный экземпляр хранилища (используется при FSM_STORAGE=database)
+fsm_storage = DatabaseStorage(
+    flush_interval=settings.fsm_flush_interval_ms / 1000,
+    batch_size=settings.fsm_batch_size,
+    ttl=timedelta(hours=settings.fsm_state_ttl_hours),
+    cache_idle=settings.fsm_cache_idle_minutes * 60
+)
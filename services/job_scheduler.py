@@ -0,0 +1,234 @@
+"""
+Планировщик отложенных задач
+
+Задачи хранятся в SQLite (таблица scheduled_jobs), а ближайшие времена
+запуска — в min-куче в памяти. Цикл спит ровно до ближайшего дедлайна и
+просыпается раньше, только если добавили более раннюю задачу. При запуске
+куча восстанавливается из базы, поэтому пропущенные за время простоя
+задачи выполняются сразу.
+
+Задача берется в работу одним UPDATE pending -> running, поэтому дважды
+она не запустится. При остановке бота выполняемые задачи дорабатывают до
+STOP_TIMEOUT секунд, затем прерываются. Что делать с прерванной задачей
+(в том числе оставшейся в running после падения процесса), решает ее тип:
+resumable-задача возвращается в ожидающие и после перезапуска выполняется
+снова — с прогрессом, сохраненным через save_progress; остальные
+помечаются failed, чтобы не повторять уже сделанное.
+"""
+import asyncio
+import contextvars
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from database.repositories.scheduled_job_repository import ScheduledJobRepository
+from database.models import ScheduledJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[..., Awaitable[None]]
+
+# Максимальный сон за один раз: страховка от перевода системных часов
+MAX_SLEEP_SECONDS = 3600
+
+# Сколько ждать выполняемые задачи при остановке, прежде чем прервать
+STOP_TIMEOUT = 10
+
+INTERRUPTED_ERROR = "Прервана остановкой бота"
+
+# (ID, параметры) задачи, которую выполняет текущая asyncio-задача
+_current_job: contextvars.ContextVar[Optional[Tuple[int, dict]]] = contextvars.ContextVar(
+    "current_scheduled_job", default=None
+)
+
+
+def to_naive_utc(dt: datetime) -> datetime:
+    """Привести datetime к UTC без tzinfo (так даты хранятся в SQLite)"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _timestamp(dt: datetime) -> float:
+    """UTC datetime без tzinfo -> unix timestamp"""
+    return (to_naive_utc(dt) - datetime(1970, 1, 1)).total_seconds()
+
+
+class JobScheduler:
+    """Планировщик задач на основе min-кучи"""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int]] = []
+        # Актуальное время запуска каждой задачи в куче: устаревшие записи
+        # (после перепланирования) пропускаются при извлечении
+        self._deadlines: Dict[int, float] = {}
+        self._handlers: Dict[str, JobHandler] = {}
+        self._resumable: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: set = set()
+        self.bot = None
+
+    def register(self, job_type: str, resumable: bool = False) -> Callable[[JobHandler], JobHandler]:
+        """
+        Декоратор регистрации обработчика задач типа job_type.
+        resumable — прерванную задачу выполнить снова после перезапуска:
+        обработчик должен быть безопасен для повтора или сохранять прогресс.
+        """
+        def decorator(handler: JobHandler) -> JobHandler:
+            self._handlers[job_type] = handler
+            if resumable:
+                self._resumable.add(job_type)
+            return handler
+        return decorator
+
+    async def start(self, bot) -> None:
+        """Восстановить кучу из базы и запустить цикл"""
+        self.bot = bot
+        self._wakeup = asyncio.Event()
+
+        for job in await ScheduledJobRepository.get_running_jobs():
+            await self._interrupted(job, "при прошлом запуске")
+
+        jobs = await ScheduledJobRepository.get_pending_jobs()
+        self._heap = [(_timestamp(job.run_at), job.id) for job in jobs]
+        heapq.heapify(self._heap)
+        self._deadlines = {job_id: run_at for run_at, job_id in self._heap}
+
+        self._task = asyncio.create_task(self._run(), name="job-scheduler")
+        logger.info(f"Планировщик задач запущен, ожидающих задач: {len(self._heap)}")
+
+    async def stop(self, timeout: float = STOP_TIMEOUT) -> None:
+        """Остановить цикл, дождаться выполняемых задач, не успевшие — прервать"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._running:
+            _, unfinished = await asyncio.wait(set(self._running), timeout=timeout)
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+
+    async def save_progress(self, **values) -> None:
+        """
+        Сохранить прогресс выполняемой задачи в ее параметры: после
+        прерывания обработчик получит эти значения аргументами.
+        """
+        current = _current_job.get()
+        if current is None:
+            return
+        job_id, payload = current
+        payload.update(values)
+        await ScheduledJobRepository.save_payload(job_id, payload)
+
+    async def schedule(
+        self,
+        job_type: str,
+        run_at: datetime,
+        payload: Optional[dict] = None,
+        key: Optional[str] = None
+    ) -> ScheduledJob:
+        """
+        Запланировать задачу на run_at (UTC).
+        Повторный вызов с тем же key перепланирует задачу, а не создает дубликат.
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"Неизвестный тип задачи: {job_type}")
+
+        job = await ScheduledJobRepository.create_job(job_type, to_naive_utc(run_at), payload, key)
+        if job.status == JobStatus.PENDING.value:
+            self._push(job.id, _timestamp(job.run_at))
+        return job
+
+    async def cancel(self, job_id: int) -> bool:
+        """Отменить задачу"""
+        self._deadlines.pop(job_id, None)
+        return await ScheduledJobRepository.cancel(job_id)
+
+    def _push(self, job_id: int, run_at: float) -> None:
+        self._deadlines[job_id] = run_at
+        heapq.heappush(self._heap, (run_at, job_id))
+        # Будим цикл, только если новая задача стала ближайшей
+        if self._wakeup and self._heap[0] == (run_at, job_id):
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            run_at, job_id = self._heap[0]
+            if self._deadlines.get(job_id) != run_at:
+                heapq.heappop(self._heap)
+                continue
+
+            delay = run_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, MAX_SLEEP_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            del self._deadlines[job_id]
+            task = asyncio.create_task(self._execute(job_id))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job_id: int) -> None:
+        job = await ScheduledJobRepository.claim(job_id)
+        if not job:
+            return
+
+        handler = self._handlers.get(job.job_type)
+        if not handler:
+            await ScheduledJobRepository.mark_failed(job_id, f"Нет обработчика для {job.job_type}")
+            return
+
+        payload = job.payload_dict
+        token = _current_job.set((job_id, dict(payload)))
+        try:
+            await handler(self.bot, **payload)
+            await ScheduledJobRepository.mark_done(job_id, run_at=job.run_at)
+            logger.info(f"Задача {job_id} ({job.job_type}) выполнена")
+        except asyncio.CancelledError:
+            await self._interrupted(job, "остановкой бота")
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка выполнения задачи {job_id} ({job.job_type}): {e}")
+            await ScheduledJobRepository.mark_failed(job_id, str(e)[:500], run_at=job.run_at)
+        finally:
+            _current_job.reset(token)
+
+    async def _interrupted(self, job: ScheduledJob, reason: str) -> None:
+        """Прерванная задача: resumable — снова в ожидающие, остальные — failed"""
+        if job.job_type in self._resumable:
+            await ScheduledJobRepository.requeue(job.id, job.run_at)
+            logger.warning(f"Задача {job.id} ({job.job_type}) прервана {reason} и будет выполнена снова")
+        else:
+            await ScheduledJobRepository.mark_failed(job.id, INTERRUPTED_ERROR, run_at=job.run_at)
+            logger.warning(f"Задача {job.id} ({job.job_type}) прервана {reason} и не будет повторена")
+
+    def get_stats(self) -> Dict[str, object]:
+        """Состояние планировщика"""
+        next_run = min(self._deadlines.values()) if self._deadlines else None
+        return {
+            "pending": len(self._deadlines),
+            "running": len(self._running),
+            "next_run": datetime.utcfromtimestamp(next_run) if next_run else None,
+        }
+
+
+# Глобальный экземпляр планировщика
+job_scheduler = JobScheduler()
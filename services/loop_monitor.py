@@ -0,0 +1,159 @@
+"""
+Монитор задержки event loop
+
+Выгрузки openpyxl, разбор больших JSON и тяжелое форматирование выполняются
+в единственном event loop, и пока они идут, бот не отвечает никому.
+Монитор это измеряет и показывает, кто виноват:
+
+- задача в loop засыпает на LOOP_LAG_INTERVAL_MS и замеряет, насколько
+  позже проснулась — это задержка планирования (гистограмма, как у
+  хендлеров в services.metrics);
+- поток-сторож следит за отметкой, которую ставит эта задача; если отметка
+  не обновлялась дольше LOOP_LAG_THRESHOLD_MS, loop заблокирован, и сторож
+  снимает стек потока loop и имя текущей asyncio-задачи — прямо во время
+  блокировки, пока виновник еще на стеке;
+- после блокировки в лог пишется ее длительность, задача и стек, последние
+  блокировки видны в /diag.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from config.settings import settings
+from services.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Сколько кадров стека сохранять и сколько последних блокировок помнить
+STACK_LIMIT = 12
+RECENT_STALLS = 10
+
+
+class LoopStall:
+    """Блокировка event loop"""
+
+    __slots__ = ("at", "lag_ms", "task", "stack")
+
+    def __init__(self, at: float, lag_ms: float, task: str, stack: List[str]):
+        self.at = at
+        self.lag_ms = lag_ms
+        self.task = task
+        self.stack = stack
+
+    @property
+    def culprit(self) -> str:
+        """Самый вложенный кадр стека — где именно стоял loop"""
+        return self.stack[-1].strip().splitlines()[0] if self.stack else "стек не снят"
+
+
+class LoopMonitor:
+    """Замер задержки event loop и снятие стека при блокировке"""
+
+    def __init__(self, interval_ms: int, threshold_ms: int):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.histogram = Histogram()
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.recent: Deque[LoopStall] = deque(maxlen=RECENT_STALLS)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        self._capture: Optional[tuple] = None  # (отметка, задача, стек), снятые сторожем
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Запустить замер и поток-сторож (из работающего loop)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run(), name="loop-monitor")
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started - self.interval)
+            heartbeat, self._heartbeat = self._heartbeat, now
+            self.histogram.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self._record_stall(heartbeat, lag)
+
+    def _record_stall(self, heartbeat: float, lag: float) -> None:
+        task, stack = "?", []
+        capture = self._capture
+        if capture is not None and capture[0] == heartbeat:
+            _, task, stack = capture
+        self._capture = None
+        stall = LoopStall(time.time(), round(lag * 1000, 1), task, stack)
+        self.stalls += 1
+        self.recent.append(stall)
+        logger.warning(
+            f"Event loop был заблокирован {stall.lag_ms:.0f} мс, задача {task}:\n" + "".join(stack)
+        )
+
+    def _watch(self) -> None:
+        """Поток-сторож: снимает стек loop, пока тот заблокирован"""
+        while not self._stop.wait(self.interval):
+            heartbeat = self._heartbeat
+            if time.monotonic() - heartbeat < self.threshold + self.interval:
+                continue
+            if self._capture is not None and self._capture[0] == heartbeat:
+                continue  # эту блокировку уже сняли
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame, limit=STACK_LIMIT) if frame is not None else []
+            try:
+                task = asyncio.current_task(self._loop)
+                task_name = task.get_name() if task is not None else "<вне задачи>"
+            except RuntimeError:
+                task_name = "?"
+            self._capture = (heartbeat, task_name, stack)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Задержка loop и последние блокировки"""
+        return {
+            "samples": self.histogram.count,
+            "p50_ms": round(self.histogram.quantile(0.5) * 1000, 1),
+            "p99_ms": round(self.histogram.quantile(0.99) * 1000, 1),
+            "max_ms": round(self.max_lag * 1000, 1),
+            "stalls": self.stalls,
+            "recent_stalls": [
+                {"at": stall.at, "lag_ms": stall.lag_ms, "task": stall.task, "culprit": stall.culprit}
+                for stall in reversed(self.recent)
+            ],
+        }
+
+
+# Глобальный экземпляр
+loop_monitor = LoopMonitor(
+    interval_ms=settings.loop_lag_interval_ms,
+    threshold_ms=settings.loop_lag_threshold_ms,
+)
@@ -0,0 +1,177 @@
+"""
+Плановое обслуживание базы данных
+
+Раз в сутки, в час MAINTENANCE_HOUR_UTC (ночь по времени пользователей):
+  1. удаляет старые логи действий и уведомления порциями по
+     MAINTENANCE_CHUNK_SIZE строк, каждая порция — отдельная транзакция;
+  2. обновляет статистику планировщика запросов (PRAGMA optimize);
+  3. возвращает свободные страницы файловой системе шагами
+     incremental_vacuum (нужен auto_vacuum = INCREMENTAL, см. миграцию 005);
+  4. переносит WAL в базу и усекает журнал (wal_checkpoint(TRUNCATE)).
+
+Между шагами делаются паузы, а общий бюджет времени ограничен, чтобы
+задержка ответов бота оставалась ровной; не уложившееся доделается
+следующей ночью. Итог (удалено строк, освобождено страниц, время по
+шагам) пишется в лог и хранится в last_report.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from config.settings import settings
+from database.models import ActionLog, Notification
+from database.repositories import MaintenanceRepository
+from services.job_scheduler import job_scheduler
+
+logger = logging.getLogger(__name__)
+
+DATABASE_MAINTENANCE = "database_maintenance"
+
+# Пауза между порциями и шагами: окно для запросов бота
+STEP_PAUSE = 0.05
+# Страниц за один шаг incremental_vacuum
+VACUUM_STEP_PAGES = 256
+# Строк на индекс, которые ANALYZE просматривает в PRAGMA optimize
+ANALYSIS_LIMIT = 1000
+# Бюджет времени на одно обслуживание
+TIME_BUDGET = timedelta(minutes=10)
+
+# Значение PRAGMA auto_vacuum для режима INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+@dataclass
+class MaintenanceReport:
+    """Итоги обслуживания"""
+    started_at: datetime  # UTC
+    deleted: Dict[str, int] = field(default_factory=dict)  # таблица -> удалено строк
+    pages_reclaimed: int = 0
+    page_size: int = 0
+    wal_pages_checkpointed: int = 0
+    durations: Dict[str, float] = field(default_factory=dict)  # шаг -> секунд
+    completed: bool = True  # False — остановлено по бюджету времени
+
+    def summary(self) -> str:
+        deleted = ", ".join(f"{table}: {count}" for table, count in self.deleted.items())
+        durations = ", ".join(f"{step} {seconds:.1f} с" for step, seconds in self.durations.items())
+        reclaimed_mb = self.pages_reclaimed * self.page_size / 1024 / 1024
+        return (
+            f"удалено ({deleted}); освобождено страниц: {self.pages_reclaimed} ({reclaimed_mb:.1f} МБ); "
+            f"WAL перенесено страниц: {self.wal_pages_checkpointed}; время: {durations}"
+            + ("" if self.completed else "; остановлено по бюджету времени")
+        )
+
+
+class MaintenanceService:
+    """Обслуживание базы небольшими шагами"""
+
+    def __init__(self, chunk_size: int, time_budget: timedelta = TIME_BUDGET):
+        self.chunk_size = chunk_size
+        self.time_budget = time_budget
+        self.retention = (
+            (ActionLog, settings.action_log_retention_days),
+            (Notification, settings.notification_retention_days),
+        )
+        self.last_report: Optional[MaintenanceReport] = None
+        self._lock = asyncio.Lock()
+
+    async def run(self) -> MaintenanceReport:
+        """Выполнить все шаги обслуживания"""
+        async with self._lock:
+            report = MaintenanceReport(started_at=datetime.utcnow())
+            deadline = time.monotonic() + self.time_budget.total_seconds()
+
+            steps = (
+                ("retention", self._apply_retention),
+                ("optimize", self._optimize),
+                ("vacuum", self._incremental_vacuum),
+                ("checkpoint", self._checkpoint),
+            )
+            for name, step in steps:
+                if time.monotonic() >= deadline:
+                    report.completed = False
+                    break
+                started = time.monotonic()
+                try:
+                    await step(report, deadline)
+                except Exception as e:
+                    logger.error(f"Ошибка шага обслуживания {name}: {e}")
+                report.durations[name] = time.monotonic() - started
+
+            self.last_report = report
+            logger.info(f"Обслуживание базы: {report.summary()}")
+            return report
+
+    async def _apply_retention(self, report: MaintenanceReport, deadline: float) -> None:
+        now = datetime.utcnow()
+        for model, days in self.retention:
+            cutoff = now - timedelta(days=days)
+            total = 0
+            while time.monotonic() < deadline:
+                deleted = await MaintenanceRepository.delete_older_than(model, cutoff, self.chunk_size)
+                total += deleted
+                if deleted < self.chunk_size:
+                    break
+                await asyncio.sleep(STEP_PAUSE)
+            else:
+                report.completed = False
+            report.deleted[model.__tablename__] = total
+
+    async def _optimize(self, report: MaintenanceReport, deadline: float) -> None:
+        await MaintenanceRepository.optimize(ANALYSIS_LIMIT)
+
+    async def _incremental_vacuum(self, report: MaintenanceReport, deadline: float) -> None:
+        report.page_size = await MaintenanceRepository.get_pragma("page_size")
+        if await MaintenanceRepository.get_pragma("auto_vacuum") != AUTO_VACUUM_INCREMENTAL:
+            logger.warning("auto_vacuum не INCREMENTAL — примените миграцию 005, страницы не освобождаются")
+            return
+
+        while time.monotonic() < deadline:
+            reclaimed = await MaintenanceRepository.incremental_vacuum(VACUUM_STEP_PAGES)
+            report.pages_reclaimed += reclaimed
+            if reclaimed < VACUUM_STEP_PAGES:
+                return
+            await asyncio.sleep(STEP_PAUSE)
+        report.completed = False
+
+    async def _checkpoint(self, report: MaintenanceReport, deadline: float) -> None:
+        if await MaintenanceRepository.get_pragma("journal_mode") != "wal":
+            return
+        busy, log_pages, checkpointed = await MaintenanceRepository.wal_checkpoint("TRUNCATE")
+        report.wal_pages_checkpointed = max(checkpointed, 0)
+        if busy:
+            logger.warning(f"Контрольная точка WAL не завершена: журнал занят ({log_pages} страниц)")
+
+
+# Глобальный экземпляр сервиса обслуживания
+maintenance_service = MaintenanceService(chunk_size=settings.maintenance_chunk_size)
+
+
+def next_maintenance_time(now: datetime) -> datetime:
+    """Ближайший запуск в час MAINTENANCE_HOUR_UTC после now"""
+    run_at = now.replace(hour=settings.maintenance_hour_utc, minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at
+
+
+@job_scheduler.register(DATABASE_MAINTENANCE, resumable=True)
+async def run_database_maintenance(bot):
+    """Ночное обслуживание базы и планирование следующего"""
+    try:
+        await maintenance_service.run()
+    finally:
+        await start_maintenance()
+
+
+async def start_maintenance() -> None:
+    """Запланировать ближайшее обслуживание"""
+    await job_scheduler.schedule(
+        DATABASE_MAINTENANCE,
+        next_maintenance_time(datetime.utcnow()),
+        {},
+        key=DATABASE_MAINTENANCE
+    )
@@ -0,0 +1,254 @@
+"""
+Время работы хендлеров: гистограммы по хендлерам
+
+Для каждого хендлера (message и callback_query) считаются вызовы, ошибки и
+четыре гистограммы с фиксированными корзинами:
+
+    wall     — полное время хендлера;
+    db       — время запросов к базе (события курсора SQLAlchemy);
+    telegram — время запросов к Bot API (request middleware сессии);
+    external — время внешних API (Challonge, через measure("external")).
+
+Время db/telegram/external относится к хендлеру через ContextVar, который
+MetricsMiddleware выставляет на время вызова. Запись в гистограмму — поиск
+корзины и два сложения, без блокировок (все в одном event loop).
+
+Данные показываются админам командой /diag (handlers/admin/diagnostics.py)
+и, если включено METRICS_ENDPOINT, отдаются в формате Prometheus по
+GET /metrics webhook-сервера.
+"""
+import contextvars
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Верхние границы корзин, с (последняя корзина — все, что дольше)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+KINDS = ("wall", "db", "telegram", "external")
+
+# Ключ в conn.info со временем начала текущих запросов
+_QUERY_STARTED = "metrics_query_started"
+
+
+def handler_name(handler: HandlerObject) -> str:
+    """Имя хендлера для метрик: модуль.функция"""
+    callback = handler.callback
+    return f"{getattr(callback, '__module__', '?')}.{getattr(callback, '__qualname__', repr(callback))}"
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами"""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля, с: линейная интерполяция внутри корзины"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(BUCKETS):
+                    return BUCKETS[-1]
+                lower = BUCKETS[index - 1] if index else 0.0
+                return lower + (BUCKETS[index] - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-1]
+
+
+class UpdateTimings:
+    """Время во внешних системах в рамках одного вызова хендлера"""
+
+    __slots__ = ("db", "telegram", "external", "queries")
+
+    def __init__(self):
+        self.db = 0.0
+        self.telegram = 0.0
+        self.external = 0.0
+        self.queries = 0
+
+
+class HandlerStats:
+    """Счетчики и гистограммы одного хендлера"""
+
+    __slots__ = ("calls", "errors", "histograms")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.histograms = {kind: Histogram() for kind in KINDS}
+
+
+_timings: contextvars.ContextVar[Optional[UpdateTimings]] = contextvars.ContextVar(
+    "handler_timings", default=None
+)
+
+
+class MetricsRegistry:
+    """Метрики всех хендлеров"""
+
+    def __init__(self):
+        self.handlers: Dict[str, HandlerStats] = {}
+        self.started = time.time()
+
+    @staticmethod
+    def begin() -> contextvars.Token:
+        return _timings.set(UpdateTimings())
+
+    @staticmethod
+    def end(token: contextvars.Token) -> UpdateTimings:
+        timings = _timings.get()
+        _timings.reset(token)
+        return timings
+
+    @staticmethod
+    def add(kind: str, seconds: float) -> None:
+        """Добавить время db/telegram/external к текущему хендлеру"""
+        timings = _timings.get()
+        if timings is not None:
+            setattr(timings, kind, getattr(timings, kind) + seconds)
+
+    @contextmanager
+    def measure(self, kind: str) -> Iterator[None]:
+        """Учесть время блока как время внешней системы"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(kind, time.perf_counter() - started)
+
+    def record(self, handler: str, wall: float, timings: UpdateTimings, error: bool) -> None:
+        stats = self.handlers.get(handler)
+        if stats is None:
+            stats = self.handlers[handler] = HandlerStats()
+        stats.calls += 1
+        if error:
+            stats.errors += 1
+        histograms = stats.histograms
+        histograms["wall"].observe(wall)
+        histograms["db"].observe(timings.db)
+        histograms["telegram"].observe(timings.telegram)
+        histograms["external"].observe(timings.external)
+
+    def top(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Самые медленные хендлеры по p95 полного времени"""
+        rows = []
+        for handler, stats in self.handlers.items():
+            wall = stats.histograms["wall"]
+            rows.append({
+                "handler": handler,
+                "calls": stats.calls,
+                "error_rate": round(stats.errors / stats.calls, 3),
+                "p50_ms": round(wall.quantile(0.5) * 1000, 1),
+                "p95_ms": round(wall.quantile(0.95) * 1000, 1),
+                "p99_ms": round(wall.quantile(0.99) * 1000, 1),
+                "db_p95_ms": round(stats.histograms["db"].quantile(0.95) * 1000, 1),
+                "telegram_p95_ms": round(stats.histograms["telegram"].quantile(0.95) * 1000, 1),
+                "external_p95_ms": round(stats.histograms["external"].quantile(0.95) * 1000, 1),
+            })
+        rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return rows[:limit]
+
+    def reset(self) -> None:
+        self.handlers.clear()
+        self.started = time.time()
+
+    def render_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        lines = [
+            "# HELP bot_handler_seconds Время хендлера по видам: wall, db, telegram, external",
+            "# TYPE bot_handler_seconds histogram",
+        ]
+        for handler, stats in sorted(self.handlers.items()):
+            for kind, histogram in stats.histograms.items():
+                labels = f'handler="{_escape_label(handler)}",kind="{kind}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'bot_handler_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'bot_handler_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"bot_handler_seconds_sum{{{labels}}} {histogram.total:.6f}")
+                lines.append(f"bot_handler_seconds_count{{{labels}}} {histogram.count}")
+
+        lines.append("# HELP bot_handler_errors_total Вызовы хендлера, завершившиеся исключением")
+        lines.append("# TYPE bot_handler_errors_total counter")
+        for handler, stats in sorted(self.handlers.items()):
+            lines.append(f'bot_handler_errors_total{{handler="{_escape_label(handler)}"}} {stats.errors}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class TelegramTimingMiddleware(BaseRequestMiddleware):
+    """Request middleware сессии бота: время запросов к Bot API"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            metrics.add("telegram", time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault(_QUERY_STARTED, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info[_QUERY_STARTED].pop()
+    timings = _timings.get()
+    if timings is not None:
+        timings.db += time.perf_counter() - started
+        timings.queries += 1
+
+
+def _handle_error(context) -> None:
+    # after_cursor_execute для упавшего запроса не вызывается
+    started = context.connection.info.get(_QUERY_STARTED) if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def install_db_timing(engine: Engine) -> None:
+    """Подписаться на события курсора движка (sync_engine для async-движка)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+# Глобальный экземпляр
+metrics = MetricsRegistry()
+
+
+def setup_metrics(bot, engine: Engine) -> MetricsRegistry:
+    """Подключить учет времени Bot API и базы"""
+    bot.session.middleware(TelegramTimingMiddleware())
+    install_db_timing(engine)
+    return metrics
@@ -0,0 +1,295 @@
+"""
+Планировщик исходящих запросов к Telegram Bot API
+
+Все запросы бота (ответы на нажатия, уведомления, рассылки) проходят через
+одну сессию. Планировщик подключается к ней как request middleware и выдает
+"слоты" на отправку с учетом приоритета, глобального лимита и лимита на чат,
+чтобы большая рассылка не вытесняла интерактивные ответы.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Классы приоритета исходящих запросов (меньше — важнее)"""
+    INTERACTIVE = 0    # ответы на действия пользователя
+    TRANSACTIONAL = 1  # уведомления (одобрение/отклонение заявок и т.п.)
+    BULK = 2           # массовые рассылки
+
+
+_current_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "outbound_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def outbound_priority(priority: Priority) -> Iterator[None]:
+    """Задать приоритет для всех запросов к API внутри блока"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> Priority:
+    """Текущий приоритет исходящих запросов"""
+    return _current_priority.get()
+
+
+class TokenBucket:
+    """Глобальный ограничитель скорости (token bucket)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, now: float) -> float:
+        """Сколько секунд ждать до появления токена"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+
+class OutboundScheduler:
+    """
+    Очередь исходящих запросов с приоритетами и справедливым обслуживанием.
+
+    Внутри каждого класса приоритета запросы сгруппированы по чатам и
+    обслуживаются по кругу (round-robin), поэтому один "шумный" чат не
+    задерживает остальные. Лимит на чат применяется к уведомлениям и
+    рассылкам; интерактивные ответы ограничены только глобальным лимитом.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        global_burst: float = 30.0,
+        chat_interval: float = 1.0,
+    ):
+        self._bucket = TokenBucket(global_rate, global_burst)
+        self._chat_interval = chat_interval
+        self._queues: Dict[Priority, "OrderedDict[Any, Deque[asyncio.Future]]"] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self._chat_ready_at: Dict[Any, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Метрики
+        self._granted: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self._wait_total: Dict[Priority, float] = {priority: 0.0 for priority in Priority}
+        self._wait_max: Dict[Priority, float] = {priority: 0.0 for priority in Priority}
+        self._retry_after_count = 0
+
+    def start(self) -> None:
+        """Запуск цикла выдачи слотов (вызывается лениво при первом запросе)"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="outbound-scheduler")
+
+    async def stop(self) -> None:
+        """Остановка цикла и отмена ожидающих запросов"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queues in self._queues.values():
+            for waiters in queues.values():
+                for future in waiters:
+                    if not future.done():
+                        future.cancel()
+            queues.clear()
+
+    async def acquire(self, priority: Priority, chat_id: Any = None) -> None:
+        """Дождаться разрешения на отправку запроса"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        queues = self._queues[priority]
+        queues.setdefault(chat_id, deque()).append(future)
+        self._wakeup.set()
+
+        enqueued_at = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._discard(priority, chat_id, future)
+            raise
+
+        waited = time.monotonic() - enqueued_at
+        self._wait_total[priority] += waited
+        if waited > self._wait_max[priority]:
+            self._wait_max[priority] = waited
+
+    def penalize(self, chat_id: Any, retry_after: float) -> None:
+        """Отложить отправку в чат после ответа 429 от Telegram"""
+        self._retry_after_count += 1
+        ready_at = time.monotonic() + retry_after
+        if chat_id is None:
+            # Глобальный flood-wait: опустошаем bucket
+            self._bucket.tokens = -retry_after * self._bucket.rate
+        elif self._chat_ready_at.get(chat_id, 0) < ready_at:
+            self._chat_ready_at[chat_id] = ready_at
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _discard(self, priority: Priority, chat_id: Any, future: asyncio.Future) -> None:
+        queues = self._queues[priority]
+        waiters = queues.get(chat_id)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                del queues[chat_id]
+
+    def _pick(self, now: float):
+        """Выбрать следующий запрос: (приоритет, чат) или время ближайшей готовности"""
+        next_ready: Optional[float] = None
+        for priority in Priority:
+            queues = self._queues[priority]
+            for chat_id in queues:
+                if priority == Priority.INTERACTIVE or chat_id is None:
+                    return (priority, chat_id), None
+                ready_at = self._chat_ready_at.get(chat_id, 0.0)
+                if ready_at <= now:
+                    return (priority, chat_id), None
+                if next_ready is None or ready_at < next_ready:
+                    next_ready = ready_at
+        return None, next_ready
+
+    def _grant(self, priority: Priority, chat_id: Any, now: float) -> None:
+        queues = self._queues[priority]
+        waiters = queues[chat_id]
+        future = waiters.popleft()
+        if waiters:
+            # Round-robin: чат уходит в конец очереди своего класса
+            queues.move_to_end(chat_id)
+        else:
+            del queues[chat_id]
+
+        if future.done():
+            return
+
+        self._bucket.consume()
+        if chat_id is not None:
+            self._chat_ready_at[chat_id] = now + self._chat_interval
+        self._granted[priority] += 1
+        future.set_result(None)
+
+    def _prune_chats(self, now: float) -> None:
+        if len(self._chat_ready_at) > 10000:
+            self._chat_ready_at = {
+                chat_id: ready_at for chat_id, ready_at in self._chat_ready_at.items()
+                if ready_at > now
+            }
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            picked, next_ready = self._pick(now)
+
+            if picked is None:
+                self._prune_chats(now)
+                self._wakeup.clear()
+                timeout = max(0.0, next_ready - now) if next_ready is not None else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            delay = self._bucket.delay(now)
+            if delay > 0:
+                # Ждем токен и выбираем заново: мог прийти более важный запрос
+                await asyncio.sleep(delay)
+                continue
+
+            self._grant(*picked, now)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики очереди: глубина, выдано слотов, время ожидания"""
+        stats: Dict[str, Any] = {"retry_after": self._retry_after_count}
+        for priority in Priority:
+            name = priority.name.lower()
+            granted = self._granted[priority]
+            stats[name] = {
+                "queued": sum(len(waiters) for waiters in self._queues[priority].values()),
+                "granted": granted,
+                "avg_wait_ms": round(self._wait_total[priority] / granted * 1000, 1) if granted else 0.0,
+                "max_wait_ms": round(self._wait_max[priority] * 1000, 1),
+            }
+        return stats
+
+
+class OutboundSchedulerMiddleware(BaseRequestMiddleware):
+    """Request middleware сессии бота, пропускающий запросы через планировщик"""
+
+    def __init__(self, scheduler: OutboundScheduler, max_retries: int = 3):
+        self.scheduler = scheduler
+        self.max_retries = max_retries
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        priority = current_priority()
+        chat_id = getattr(method, "chat_id", None)
+        attempt = 0
+
+        while True:
+            await self.scheduler.acquire(priority, chat_id)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.scheduler.penalize(chat_id, e.retry_after)
+                # Интерактивные запросы не повторяем — пользователь нажмет еще раз
+                if priority == Priority.INTERACTIVE or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                logger.warning(
+                    f"Flood control для {type(method).__name__} в чате {chat_id}, "
+                    f"повтор через {e.retry_after} с (попытка {attempt})"
+                )
+
+
+# Глобальный экземпляр планировщика
+outbound_scheduler = OutboundScheduler(
+    global_rate=settings.outbound_global_rate,
+    global_burst=settings.outbound_global_rate,
+    chat_interval=settings.outbound_chat_interval,
+)
+
+
+def setup_outbound_scheduler(bot) -> OutboundScheduler:
+    """Подключить планировщик к сессии бота"""
+    bot.session.middleware(OutboundSchedulerMiddleware(outbound_scheduler))
+    return outbound_scheduler
@@ -0,0 +1,154 @@
+"""
+Отложенные задачи бота: напоминания по турнирам и запланированные рассылки
+
+Рассылки в задачах сохраняют в параметры задачи список получателей, которым
+отправка уже была (delivered). Прерванная перезапуском рассылка выполняется
+снова и продолжает с оставшихся получателей, никому не отправляя дважды;
+отправка, оборванная на середине, не повторяется — лучше потерять одно
+сообщение, чем прислать его повторно.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterable, List, Optional, Set
+
+from database.models import Tournament, TournamentStatus
+from database.repositories import TournamentRepository, TeamRepository
+from services.broadcast_service import run_broadcast
+from services.job_scheduler import job_scheduler, to_naive_utc
+from services.outbound_scheduler import outbound_priority, Priority
+from services.tournament_lifecycle import tournament_lifecycle, SCHEDULED_STATUSES
+from utils.datetime_utils import format_datetime_for_user
+from utils.text_formatting import escape_markdown_simple
+# Регистрирует подписчиков событий жизненного цикла турнира
+import services.tournament_events  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+# Типы задач
+TOURNAMENT_START_REMINDER = "tournament_start_reminder"
+SCHEDULED_BROADCAST = "scheduled_broadcast"
+
+# За сколько до начала турнира напоминать капитанам
+REMINDER_BEFORE_START = timedelta(hours=1)
+
+# Как часто рассылка в задаче сохраняет прогресс (на случай падения процесса)
+PROGRESS_SAVE_SECONDS = 5
+
+
+@asynccontextmanager
+async def broadcast_progress(delivered: Optional[Iterable[int]]) -> AsyncIterator[Set[int]]:
+    """
+    Множество получателей, которым отправка уже была, для run_broadcast.
+    Сохраняется в параметры задачи периодически и при выходе, в том числе
+    при прерывании.
+    """
+    attempted: Set[int] = set(delivered or ())
+    saved = len(attempted)
+
+    async def save() -> None:
+        nonlocal saved
+        if len(attempted) != saved:
+            saved = len(attempted)
+            await job_scheduler.save_progress(delivered=sorted(attempted))
+
+    async def save_periodically() -> None:
+        while True:
+            await asyncio.sleep(PROGRESS_SAVE_SECONDS)
+            await save()
+
+    saver = asyncio.create_task(save_periodically())
+    try:
+        yield attempted
+    finally:
+        saver.cancel()
+        await save()
+
+
+@job_scheduler.register(TOURNAMENT_START_REMINDER, resumable=True)
+async def remind_captains_before_start(bot, tournament_id: int, delivered: Optional[List[int]] = None):
+    """Напомнить капитанам одобренных команд о скором начале турнира"""
+    tournament = await TournamentRepository.get_by_id(tournament_id)
+    if not tournament or tournament.status == TournamentStatus.CANCELLED.value:
+        return
+
+    teams = await TeamRepository.get_approved_teams_by_tournament(tournament_id)
+    chat_ids = {team.captain.telegram_id for team in teams if team.captain}
+    if not chat_ids:
+        return
+
+    text = (
+        f"⏰ *Напоминание*\n\n"
+        f"Турнир *{escape_markdown_simple(tournament.name)}* начнется через час "
+        f"({format_datetime_for_user(tournament.tournament_start, 'UTC')}).\n\n"
+        f"Проверьте состав команды и будьте на связи!"
+    )
+    async with broadcast_progress(delivered) as attempted:
+        result = await run_broadcast(bot, chat_ids, text, priority=Priority.TRANSACTIONAL, attempted=attempted)
+    logger.info(
+        f"Напоминание о турнире {tournament_id} отправлено: {result.sent}/{result.total}"
+    )
+
+
+@job_scheduler.register(SCHEDULED_BROADCAST, resumable=True)
+async def run_scheduled_broadcast(
+    bot,
+    admin_id: int,
+    message_text: str,
+    broadcast_type: Optional[str] = None,
+    selective_type: Optional[str] = None,
+    selective_value=None,
+    attachment: Optional[dict] = None,
+    delivered: Optional[List[int]] = None,
+):
+    """Запустить рассылку, запланированную администратором (или продолжить прерванную)"""
+    # Импорт здесь: модуль хендлеров тянет роутеры, а сервис грузится раньше них
+    from handlers.admin.broadcast import perform_broadcast, perform_selective_broadcast
+
+    if delivered:
+        status_text = f"📤 Запланированная рассылка продолжена после перезапуска (уже отправлено: {len(delivered)})..."
+    else:
+        status_text = "📤 Запланированная рассылка запущена..."
+    status_message = await bot.send_message(admin_id, status_text)
+
+    async with broadcast_progress(delivered) as attempted:
+        with outbound_priority(Priority.BULK):
+            if selective_type:
+                await perform_selective_broadcast(
+                    bot, admin_id, admin_id, status_message.message_id,
+                    selective_type, selective_value, message_text, attachment, attempted
+                )
+            else:
+                await perform_broadcast(
+                    bot, admin_id, admin_id, status_message.message_id,
+                    broadcast_type, message_text, attachment, attempted
+                )
+
+
+async def schedule_tournament_jobs(tournament: Tournament) -> None:
+    """
+    Запланировать задачи по датам турнира: напоминание и переходы статусов.
+    Ключи задач привязаны к турниру, поэтому повторный вызов после
+    изменения дат перепланирует их.
+    """
+    run_at = to_naive_utc(tournament.tournament_start - REMINDER_BEFORE_START)
+    if run_at > datetime.utcnow():
+        await job_scheduler.schedule(
+            TOURNAMENT_START_REMINDER,
+            run_at,
+            {"tournament_id": tournament.id},
+            key=f"{TOURNAMENT_START_REMINDER}:{tournament.id}"
+        )
+
+    await tournament_lifecycle.schedule(tournament)
+
+
+async def sync_tournament_jobs() -> None:
+    """Досоздать задачи для всех турниров, ожидающих переходов (при запуске бота)"""
+    for status in SCHEDULED_STATUSES:
+        for tournament in await TournamentRepository.get_tournaments_by_status(status):
+            try:
+                await schedule_tournament_jobs(tournament)
+            except Exception as e:
+                logger.error(f"Ошибка планирования задач турнира {tournament.id}: {e}")
@@ -0,0 +1,241 @@
+"""
+Профилировщик SQL-запросов с поиском N+1
+
+Включается на время прямо в работающем боте (экран /diag → «SQL-профиль»)
+и сам выключается через SQL_PROFILE_MINUTES. Пока включен:
+
+- каждый запрос (события курсора SQLAlchemy) относится к текущему апдейту и
+  хендлеру (SqlProfilerMiddleware выставляет ContextVar);
+- запросы сводятся к «форме» — тексту с плейсхолдерами, списки IN (?, ?, ...)
+  схлопываются;
+- если в одном апдейте одна форма выполнилась SQL_N_PLUS_ONE_THRESHOLD раз и
+  больше, это N+1: запрос в цикле по элементам;
+- запросы дольше SQL_SLOW_QUERY_MS попадают в список медленных (и запросы
+  фоновых задач — с хендлером «<фон>»).
+
+При выключении отчет пишется в лог; последний отчет виден в /diag.
+Выключенный профилировщик стоит одной проверки флага на запрос.
+"""
+import asyncio
+import contextvars
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Хендлер для запросов вне апдейтов (задачи планировщика, обслуживание)
+BACKGROUND = "<фон>"
+# Сколько медленных запросов хранить
+SLOW_QUERIES_KEEP = 20
+
+# Ключ в conn.info со временем начала текущих запросов
+_QUERY_STARTED = "sql_profiler_started"
+
+_IN_LIST = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """Форма запроса: пробелы нормализованы, списки IN схлопнуты"""
+    shape = _SPACES.sub(" ", statement).strip()
+    return _IN_LIST.sub("(?…)", shape)
+
+
+class UpdateProfile:
+    """Запросы одного апдейта"""
+
+    __slots__ = ("handler", "shapes")
+
+    def __init__(self, handler: str):
+        self.handler = handler
+        self.shapes: Dict[str, List[float]] = {}  # форма -> [сколько раз, секунд]
+
+
+_profile: contextvars.ContextVar[Optional[UpdateProfile]] = contextvars.ContextVar(
+    "sql_profile", default=None
+)
+
+
+class SqlProfiler:
+    """Профиль запросов по апдейтам и хендлерам, включаемый на время"""
+
+    def __init__(self, n_plus_one_threshold: int, slow_query_ms: int, duration_minutes: float):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_query = slow_query_ms / 1000
+        self.duration_minutes = duration_minutes
+        self.enabled = False
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.updates = 0
+        self.statements = 0
+        self.seconds = 0.0
+        # (хендлер, форма) -> апдейтов с N+1, наибольший повтор, запросов, секунд
+        self.n_plus_one: Dict[Tuple[str, str], List[float]] = {}
+        self.slow_queries: List[Tuple[float, str, str]] = []  # (секунд, хендлер, форма)
+
+    def enable(self, minutes: Optional[float] = None) -> None:
+        """Включить с чистого листа; выключится сам через minutes"""
+        minutes = minutes or self.duration_minutes
+        self._reset()
+        self.enabled = True
+        self.started_at = time.time()
+        self.stopped_at = None
+        if self._timer:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(minutes * 60, self.disable)
+        logger.info(f"SQL-профилировщик включен на {minutes:g} мин")
+
+    def disable(self) -> None:
+        """Выключить и записать отчет в лог"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.stopped_at = time.time()
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        logger.info(f"SQL-профилировщик выключен\n{self.format_report()}")
+
+    def begin(self, handler: str) -> Optional[contextvars.Token]:
+        """Начать профиль апдейта (None — профилировщик выключен)"""
+        if not self.enabled:
+            return None
+        return _profile.set(UpdateProfile(handler))
+
+    def end(self, token: Optional[contextvars.Token]) -> None:
+        """Закончить профиль апдейта и найти в нем N+1"""
+        if token is None:
+            return
+        profile = _profile.get()
+        _profile.reset(token)
+        if not self.enabled or profile is None:
+            return
+        self.updates += 1
+        for shape, (count, seconds) in profile.shapes.items():
+            if count < self.n_plus_one_threshold:
+                continue
+            finding = self.n_plus_one.setdefault((profile.handler, shape), [0, 0, 0, 0.0])
+            finding[0] += 1
+            finding[1] = max(finding[1], count)
+            finding[2] += count
+            finding[3] += seconds
+
+    def observe(self, statement: str, seconds: float) -> None:
+        """Учесть выполненный запрос"""
+        self.statements += 1
+        self.seconds += seconds
+        shape = statement_shape(statement)
+        profile = _profile.get()
+        if profile is not None:
+            totals = profile.shapes.get(shape)
+            if totals is None:
+                profile.shapes[shape] = [1, seconds]
+            else:
+                totals[0] += 1
+                totals[1] += seconds
+        if seconds >= self.slow_query:
+            handler = profile.handler if profile is not None else BACKGROUND
+            self.slow_queries.append((seconds, handler, shape))
+            self.slow_queries.sort(reverse=True)
+            del self.slow_queries[SLOW_QUERIES_KEEP:]
+
+    def get_report(self) -> Dict[str, Any]:
+        """Итоги текущего или последнего профилирования"""
+        n_plus_one = [
+            {
+                "handler": handler,
+                "statement": shape,
+                "updates": int(updates),
+                "max_repeats": int(max_repeats),
+                "statements": int(statements),
+                "total_ms": round(seconds * 1000, 1),
+            }
+            for (handler, shape), (updates, max_repeats, statements, seconds) in self.n_plus_one.items()
+        ]
+        n_plus_one.sort(key=lambda item: item["total_ms"], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "updates": self.updates,
+            "statements": self.statements,
+            "total_ms": round(self.seconds * 1000, 1),
+            "n_plus_one": n_plus_one,
+            "slow_queries": [
+                {"handler": handler, "statement": shape, "ms": round(seconds * 1000, 1)}
+                for seconds, handler, shape in self.slow_queries
+            ],
+        }
+
+    def format_report(self, limit: int = 10, statement_chars: int = 200) -> str:
+        """Отчет текстом (для лога и /diag)"""
+        report = self.get_report()
+        if report["started_at"] is None:
+            return "Профилирование еще не запускалось"
+        minutes = ((report["stopped_at"] or time.time()) - report["started_at"]) / 60
+        per_update = report["statements"] / report["updates"] if report["updates"] else 0
+        lines = [
+            f"SQL-профиль за {minutes:.1f} мин: апдейтов {report['updates']}, "
+            f"запросов {report['statements']} ({per_update:.1f} на апдейт), {report['total_ms']:.0f} мс"
+        ]
+        lines.append(f"N+1 (от {self.n_plus_one_threshold} одинаковых запросов за апдейт):")
+        for item in report["n_plus_one"][:limit]:
+            lines.append(
+                f"  {item['handler']}: до {item['max_repeats']} раз за апдейт, в {item['updates']} апд., "
+                f"{item['total_ms']:.0f} мс — {item['statement'][:statement_chars]}"
+            )
+        if not report["n_plus_one"]:
+            lines.append("  не найдено")
+        lines.append(f"Медленные запросы (от {self.slow_query * 1000:.0f} мс):")
+        for item in report["slow_queries"][:limit]:
+            lines.append(f"  {item['ms']:.0f} мс, {item['handler']} — {item['statement'][:statement_chars]}")
+        if not report["slow_queries"]:
+            lines.append("  не найдено")
+        return "\n".join(lines)
+
+    def install(self, engine: Engine) -> None:
+        """Подписаться на события курсора движка (sync_engine для async-движка)"""
+        if event.contains(engine, "before_cursor_execute", self._before_cursor_execute):
+            return
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self.enabled:
+            conn.info.setdefault(_QUERY_STARTED, []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.get(_QUERY_STARTED)
+        if started:
+            # Профилировщик могли выключить во время запроса — время все равно снимаем со стека
+            seconds = time.perf_counter() - started.pop()
+            if self.enabled:
+                self.observe(statement, seconds)
+
+    @staticmethod
+    def _handle_error(context) -> None:
+        started = context.connection.info.get(_QUERY_STARTED) if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+# Глобальный экземпляр
+sql_profiler = SqlProfiler(
+    n_plus_one_threshold=settings.sql_n_plus_one_threshold,
+    slow_query_ms=settings.sql_slow_query_ms,
+    duration_minutes=settings.sql_profile_minutes,
+)
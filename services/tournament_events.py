@@ -0,0 +1,159 @@
+"""
+Обработчики событий жизненного цикла турнира: уведомления капитанов
+и администраторов, создание сетки в Challonge при старте
+"""
+import logging
+
+from config.settings import settings
+from database.models import Tournament, TeamStatus
+from database.repositories import TournamentRepository, TeamRepository
+from integrations.challonge_api import ChallongeAPI, CHALLONGE_FORMATS
+from services.broadcast_service import run_broadcast
+from services.outbound_scheduler import outbound_priority, Priority
+from services.tournament_lifecycle import tournament_lifecycle, LifecycleEvent
+from utils.datetime_utils import format_datetime_for_user
+from utils.text_formatting import escape_markdown_simple
+
+logger = logging.getLogger(__name__)
+
+
+def _admin_chat_ids():
+    """Куда отправлять служебные уведомления: админ-чат или каждому админу"""
+    if settings.admin_chat_id:
+        return [settings.admin_chat_id]
+    return list(settings.admin_ids)
+
+
+async def _notify_admins(bot, text: str):
+    with outbound_priority(Priority.TRANSACTIONAL):
+        for chat_id in _admin_chat_ids():
+            try:
+                await bot.send_message(chat_id, text, parse_mode="Markdown")
+            except Exception as e:
+                logger.error(f"Ошибка служебного уведомления в чат {chat_id}: {e}")
+
+
+async def _notify_captains(bot, tournament: Tournament, text: str):
+    teams = await TeamRepository.get_approved_teams_by_tournament(tournament.id)
+    chat_ids = {team.captain.telegram_id for team in teams if team.captain}
+    if not chat_ids:
+        return
+
+    result = await run_broadcast(bot, chat_ids, text, priority=Priority.TRANSACTIONAL)
+    logger.info(f"Уведомление капитанам турнира {tournament.id}: {result.sent}/{result.total}")
+
+
+@tournament_lifecycle.on(LifecycleEvent.REGISTRATION_CLOSED)
+async def on_registration_closed(bot, tournament: Tournament, late: bool):
+    """Сообщить администраторам и капитанам о закрытии регистрации"""
+    if late:
+        return
+
+    name = escape_markdown_simple(tournament.name)
+    approved = sum(1 for team in tournament.teams if team.status == TeamStatus.APPROVED.value)
+    pending = sum(1 for team in tournament.teams if team.status == TeamStatus.PENDING.value)
+
+    await _notify_admins(bot, (
+        f"🔒 *Регистрация закрыта*\n\n"
+        f"🏆 Турнир: *{name}*\n"
+        f"✅ Одобрено команд: {approved}/{tournament.max_teams}\n"
+        f"⏳ Ожидают модерации: {pending}"
+    ))
+    await _notify_captains(bot, tournament, (
+        f"🔒 Регистрация на турнир *{name}* закрыта.\n\n"
+        f"🏁 Начало: {format_datetime_for_user(tournament.tournament_start, 'UTC')}\n"
+        f"✏️ Изменить состав можно до {format_datetime_for_user(tournament.edit_deadline, 'UTC')}"
+    ))
+
+
+@tournament_lifecycle.on(LifecycleEvent.ROSTERS_LOCKED)
+async def on_rosters_locked(bot, tournament: Tournament, late: bool):
+    """Сообщить капитанам, что составы зафиксированы"""
+    if late:
+        return
+
+    await _notify_captains(bot, tournament, (
+        f"📋 Составы команд турнира *{escape_markdown_simple(tournament.name)}* зафиксированы.\n\n"
+        f"Изменить игроков больше нельзя."
+    ))
+
+
+@tournament_lifecycle.on(LifecycleEvent.TOURNAMENT_STARTED)
+async def on_tournament_started(bot, tournament: Tournament, late: bool):
+    """Сообщить капитанам о начале турнира"""
+    if late:
+        return
+
+    await _notify_captains(bot, tournament, (
+        f"🏁 Турнир *{escape_markdown_simple(tournament.name)}* начался!\n\n"
+        f"Следите за расписанием матчей и будьте на связи."
+    ))
+
+
+@tournament_lifecycle.on(LifecycleEvent.TOURNAMENT_STARTED)
+async def generate_bracket_on_start(bot, tournament: Tournament, late: bool):
+    """
+    Создать сетку в Challonge, если администратор не сделал этого заранее.
+    API v2.1 не умеет запускать турнир, поэтому администратор получает
+    ссылку для запуска вручную.
+    """
+    if late or tournament.challonge_id:
+        return
+    if not settings.challonge_client_id or not settings.challonge_username:
+        return
+
+    teams = await TeamRepository.get_approved_teams_by_tournament(tournament.id)
+    if len(teams) < 2:
+        await _notify_admins(bot, (
+            f"⚠️ Турнир *{escape_markdown_simple(tournament.name)}* начался, "
+            f"но одобренных команд меньше двух — сетка не создана."
+        ))
+        return
+
+    challonge = ChallongeAPI(settings.challonge_client_id, settings.challonge_client_secret, settings.challonge_username)
+    challonge_tournament = await challonge.create_tournament(
+        name=tournament.name,
+        tournament_type=CHALLONGE_FORMATS.get(tournament.format, 'single elimination'),
+        description=tournament.description or "",
+        private=False
+    )
+    if not challonge_tournament:
+        await _notify_admins(bot, (
+            f"❌ Не удалось создать сетку турнира *{escape_markdown_simple(tournament.name)}* в Challonge. "
+            f"Создайте ее вручную в меню турнира."
+        ))
+        return
+
+    await TournamentRepository.update_challonge_id(tournament.id, challonge_tournament['id'])
+
+    added = 0
+    for team in teams:
+        try:
+            if await challonge.add_participant(tournament_id=challonge_tournament['id'], participant_name=team.name):
+                added += 1
+        except Exception as e:
+            logger.error(f"Ошибка добавления команды {team.name} в Challonge: {e}")
+
+    logger.info(f"Сетка турнира {tournament.id} создана в Challonge: {challonge_tournament['id']}")
+    await _notify_admins(bot, (
+        f"🎯 *Сетка создана автоматически*\n\n"
+        f"🏆 Турнир: *{escape_markdown_simple(tournament.name)}*\n"
+        f"👥 Добавлено команд: {added}/{len(teams)}\n"
+        f"🔗 {challonge_tournament.get('full_challonge_url', 'N/A')}\n\n"
+        f"Запустите турнир на Challonge, затем откройте «Управление матчами»."
+    ))
+
+
+@tournament_lifecycle.on(LifecycleEvent.TOURNAMENT_COMPLETED)
+async def on_tournament_completed(bot, tournament: Tournament, late: bool):
+    """Завершить турнир в Challonge и поздравить участников"""
+    if tournament.challonge_id:
+        challonge = ChallongeAPI(settings.challonge_client_id, settings.challonge_client_secret, settings.challonge_username)
+        await challonge.finalize_tournament(tournament.challonge_id)
+
+    name = escape_markdown_simple(tournament.name)
+    await _notify_captains(bot, tournament, (
+        f"🏆 Турнир *{name}* завершен!\n\n"
+        f"Спасибо за участие!"
+    ))
+    await _notify_admins(bot, f"✅ Сыгран последний матч — турнир *{name}* завершен.")
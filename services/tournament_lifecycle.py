@@ -0,0 +1,179 @@
+"""
+Жизненный цикл турнира
+
+Переводит турнир по статусам по его дедлайнам:
+registration → registration_closed (registration_end) → in_progress
+(tournament_start) → completed (завершен последний матч).
+Переходы по времени выполняет планировщик задач, каждый переход
+рассылает доменное событие подписчикам (уведомления, генерация сетки).
+"""
+import logging
+from datetime import datetime, timedelta
+from enum import Enum as PyEnum
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from database.models import Tournament, TournamentStatus, MatchStatus
+from database.repositories import TournamentRepository, MatchRepository
+from services.job_scheduler import job_scheduler, to_naive_utc
+
+logger = logging.getLogger(__name__)
+
+# Типы задач планировщика. Закрытие регистрации сохраняет прежний тип
+# задачи, чтобы уже запланированные задачи выполнились новым обработчиком
+CLOSE_REGISTRATION_JOB = "registration_closed"
+LOCK_ROSTERS_JOB = "rosters_lock"
+START_TOURNAMENT_JOB = "tournament_start"
+
+# Если переход выполняется с большим опозданием (бот был выключен),
+# статус меняется, но подписчики не шлют уведомлений и не создают сетку
+LATE_EVENT_THRESHOLD = timedelta(hours=6)
+
+# Статусы, из которых турнир еще переходит по дедлайнам
+SCHEDULED_STATUSES = (TournamentStatus.REGISTRATION, TournamentStatus.REGISTRATION_CLOSED)
+
+
+class LifecycleEvent(PyEnum):
+    REGISTRATION_CLOSED = "registration_closed"
+    ROSTERS_LOCKED = "rosters_locked"
+    TOURNAMENT_STARTED = "tournament_started"
+    TOURNAMENT_COMPLETED = "tournament_completed"
+
+
+# Подписчик: handler(bot, tournament, late)
+EventHandler = Callable[[object, Tournament, bool], Awaitable[None]]
+
+
+def _is_late(deadline: Optional[datetime]) -> bool:
+    if deadline is None:
+        return False
+    return datetime.utcnow() - to_naive_utc(deadline) > LATE_EVENT_THRESHOLD
+
+
+class TournamentLifecycle:
+    """Переходы статусов турнира и рассылка событий"""
+
+    def __init__(self):
+        self._subscribers: Dict[LifecycleEvent, List[EventHandler]] = {}
+
+    def on(self, event: LifecycleEvent) -> Callable[[EventHandler], EventHandler]:
+        """Декоратор подписки на событие жизненного цикла"""
+        def decorator(handler: EventHandler) -> EventHandler:
+            self._subscribers.setdefault(event, []).append(handler)
+            return handler
+        return decorator
+
+    async def emit(self, event: LifecycleEvent, bot, tournament: Tournament, late: bool = False) -> None:
+        """Вызвать подписчиков события; ошибка одного не мешает остальным"""
+        for handler in self._subscribers.get(event, []):
+            try:
+                await handler(bot, tournament, late)
+            except Exception as e:
+                logger.error(
+                    f"Ошибка обработчика {handler.__name__} события {event.value} "
+                    f"турнира {tournament.id}: {e}"
+                )
+
+    async def _transition(
+        self,
+        bot,
+        tournament_id: int,
+        from_statuses,
+        to_status: TournamentStatus,
+        event: LifecycleEvent,
+        deadline_field: Optional[str] = None
+    ) -> bool:
+        if not await TournamentRepository.transition_status(tournament_id, list(from_statuses), to_status):
+            return False
+
+        tournament = await TournamentRepository.get_by_id(tournament_id)
+        logger.info(f"Турнир {tournament_id} переведен в статус {to_status.value}")
+        deadline = getattr(tournament, deadline_field) if deadline_field else None
+        await self.emit(event, bot, tournament, _is_late(deadline))
+        return True
+
+    async def close_registration(self, bot, tournament_id: int) -> bool:
+        """Закрыть регистрацию (registration_end)"""
+        return await self._transition(
+            bot, tournament_id,
+            [TournamentStatus.REGISTRATION],
+            TournamentStatus.REGISTRATION_CLOSED,
+            LifecycleEvent.REGISTRATION_CLOSED,
+            "registration_end"
+        )
+
+    async def lock_rosters(self, bot, tournament_id: int) -> bool:
+        """
+        Зафиксировать составы (edit_deadline).
+        Статус не меняется: после дедлайна редактирование запрещает is_edit_allowed.
+        """
+        tournament = await TournamentRepository.get_by_id(tournament_id)
+        if not tournament or tournament.status not in [status.value for status in SCHEDULED_STATUSES]:
+            return False
+
+        await self.emit(LifecycleEvent.ROSTERS_LOCKED, bot, tournament, _is_late(tournament.edit_deadline))
+        return True
+
+    async def start_tournament(self, bot, tournament_id: int) -> bool:
+        """Начать турнир (tournament_start или кнопка администратора)"""
+        return await self._transition(
+            bot, tournament_id,
+            SCHEDULED_STATUSES,
+            TournamentStatus.IN_PROGRESS,
+            LifecycleEvent.TOURNAMENT_STARTED,
+            "tournament_start"
+        )
+
+    async def complete_if_finished(self, bot, tournament_id: int) -> bool:
+        """Завершить турнир, если сыгран последний матч"""
+        counts = await MatchRepository.get_status_counts(tournament_id)
+        if not counts.get(MatchStatus.COMPLETED.value) or counts.get(MatchStatus.PENDING.value):
+            return False
+
+        return await self._transition(
+            bot, tournament_id,
+            [TournamentStatus.IN_PROGRESS],
+            TournamentStatus.COMPLETED,
+            LifecycleEvent.TOURNAMENT_COMPLETED
+        )
+
+    async def schedule(self, tournament: Tournament) -> None:
+        """
+        Запланировать переходы по датам турнира.
+        Прошедшие дедлайны тоже планируются: задача выполнится сразу, а
+        повторный вызов с теми же датами ничего не меняет (ключ задачи).
+        """
+        if tournament.status not in [status.value for status in SCHEDULED_STATUSES]:
+            return
+
+        # Администратор продлил регистрацию закрытого турнира — открываем снова
+        if (tournament.status == TournamentStatus.REGISTRATION_CLOSED.value and
+                to_naive_utc(tournament.registration_end) > datetime.utcnow()):
+            await TournamentRepository.transition_status(
+                tournament.id,
+                [TournamentStatus.REGISTRATION_CLOSED],
+                TournamentStatus.REGISTRATION
+            )
+            logger.info(f"Регистрация на турнир {tournament.id} снова открыта")
+
+        jobs = [
+            (CLOSE_REGISTRATION_JOB, tournament.registration_end),
+            (LOCK_ROSTERS_JOB, tournament.edit_deadline),
+            (START_TOURNAMENT_JOB, tournament.tournament_start),
+        ]
+        for job_type, run_at in jobs:
+            await job_scheduler.schedule(
+                job_type,
+                run_at,
+                {"tournament_id": tournament.id},
+                key=f"{job_type}:{tournament.id}"
+            )
+
+
+# Глобальный экземпляр
+tournament_lifecycle = TournamentLifecycle()
+
+# Переходы статусов безопасно повторить после прерывания (повторный ничего не
+# меняет), а фиксацию составов — нет: капитаны получили бы уведомление дважды
+job_scheduler.register(CLOSE_REGISTRATION_JOB, resumable=True)(tournament_lifecycle.close_registration)
+job_scheduler.register(LOCK_ROSTERS_JOB)(tournament_lifecycle.lock_rosters)
+job_scheduler.register(START_TOURNAMENT_JOB, resumable=True)(tournament_lifecycle.start_tournament)
@@ -0,0 +1,161 @@
+"""
+Разбор накопившихся апдейтов после перезапуска
+
+Раньше бот запускался с drop_pending_updates=True и терял все нажатия,
+пришедшие, пока он был выключен. Теперь накопившиеся апдейты
+обрабатываются через те же полосы (services.update_executor), то есть с
+ограниченной параллельностью, а:
+
+- повторы отсекаются по сохраненной отметке update_id: раз в
+  UPDATE_CURSOR_SAVE_SECONDS и при остановке в базу пишется
+  committed_update_id исполнителя, а после запуска апдейты с update_id не
+  больше отметки отбрасываются (Telegram повторно присылает апдейты,
+  получение которых бот не успел подтвердить);
+- нажатия кнопок из очереди, на которые Telegram уже может не принять
+  ответ (бот был недоступен дольше CALLBACK_MAX_AGE_SECONDS), не
+  обрабатываются: пользователь получает короткую просьбу нажать еще раз
+  (middlewares.backlog.StaleCallbackMiddleware).
+
+Размер очереди при запуске берется из getWebhookInfo.pending_update_count,
+время разбора и счетчики — в get_stats().
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from aiogram import Bot
+
+from config.settings import settings
+from database.repositories import UpdateCursorRepository
+from services.update_executor import LaneExecutor
+
+logger = logging.getLogger(__name__)
+
+# Как часто проверять, разобрана ли очередь, с
+DRAIN_CHECK_INTERVAL = 1
+
+
+class UpdateBacklog:
+    """Отметка обработанных апдейтов и метрики разбора очереди после запуска"""
+
+    def __init__(self, save_interval: float, callback_max_age: float):
+        self.save_interval = save_interval
+        self.callback_max_age = callback_max_age
+        self.executor: Optional[LaneExecutor] = None
+        self.bot_id: Optional[int] = None
+        self.size = 0
+        self.offline_since: Optional[datetime] = None  # когда бот последний раз сохранял отметку
+        self.offline_seconds: Optional[float] = None
+        self.drain_seconds: Optional[float] = None
+        self.stale_callbacks = 0
+        self._started = 0.0
+        self._saved_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, bot: Bot, executor: LaneExecutor) -> None:
+        """Загрузить отметку и размер очереди; вызывать до начала получения апдейтов"""
+        self.executor = executor
+        self.bot_id = bot.id
+        self._started = time.monotonic()
+
+        cursor = await UpdateCursorRepository.get_cursor(bot.id)
+        if cursor:
+            executor.skip_through, self.offline_since = cursor
+            self.offline_seconds = (datetime.utcnow() - self.offline_since).total_seconds()
+
+        info = await bot.get_webhook_info()
+        self.size = info.pending_update_count
+        if not self.size:
+            self.drain_seconds = 0.0
+        logger.info(
+            f"Накопилось апдейтов: {self.size}, отметка update_id: {executor.skip_through}, "
+            f"бот был недоступен {self.offline_seconds or 0:.0f} с"
+        )
+
+        self._saved_at = time.monotonic()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="update-backlog")
+
+    async def stop(self) -> None:
+        """Остановка с сохранением отметки"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.save()
+
+    async def save(self) -> None:
+        """Сохранить committed_update_id исполнителя"""
+        if self.executor is None:
+            return
+        await UpdateCursorRepository.save_cursor(self.bot_id, self.executor.committed_update_id)
+        self._saved_at = time.monotonic()
+
+    @property
+    def last_backlog_id(self) -> Optional[int]:
+        """update_id последнего апдейта из очереди (update_id идут подряд)"""
+        if not self.size or self.executor is None or self.executor.first_update_id is None:
+            return None
+        return self.executor.first_update_id + self.size - 1
+
+    def is_backlog(self, update_id: int) -> bool:
+        """Апдейт пришел, пока бот был выключен"""
+        last_id = self.last_backlog_id
+        return last_id is not None and update_id <= last_id
+
+    def is_stale_callback(self, update_id: int) -> bool:
+        """
+        Нажатие из очереди, на которое Telegram, возможно, уже не примет ответ.
+        Время нажатия неизвестно, поэтому берется наибольший возможный возраст —
+        с последней сохраненной отметки до текущего момента.
+        """
+        if self.offline_since is None or not self.is_backlog(update_id):
+            return False
+        return (datetime.utcnow() - self.offline_since).total_seconds() > self.callback_max_age
+
+    def record_stale(self) -> None:
+        self.stale_callbacks += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики разбора очереди после запуска"""
+        executor_stats = self.executor.get_stats() if self.executor else {}
+        return {
+            "backlog_size": self.size,
+            "drained": self.drain_seconds is not None,
+            "drain_seconds": self.drain_seconds,
+            "offline_seconds": self.offline_seconds,
+            "duplicates": executor_stats.get("duplicates", 0),
+            "stale_callbacks": self.stale_callbacks,
+            "committed_update_id": executor_stats.get("committed_update_id"),
+        }
+
+    def _check_drained(self) -> None:
+        last_id = self.last_backlog_id
+        if self.drain_seconds is None and last_id is not None and self.executor.committed_update_id >= last_id:
+            self.drain_seconds = round(time.monotonic() - self._started, 2)
+            logger.info(
+                f"Очередь после запуска разобрана: {self.size} апдейтов за {self.drain_seconds} с, "
+                f"повторов {self.executor.duplicates}, устаревших нажатий {self.stale_callbacks}"
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(DRAIN_CHECK_INTERVAL)
+            self._check_drained()
+            if time.monotonic() - self._saved_at >= self.save_interval:
+                try:
+                    await self.save()
+                except Exception as e:
+                    logger.error(f"Ошибка сохранения отметки апдейтов: {e}")
+
+
+# Глобальный экземпляр
+update_backlog = UpdateBacklog(
+    save_interval=settings.update_cursor_save_seconds,
+    callback_max_age=settings.callback_max_age_seconds
+)
@@ -0,0 +1,222 @@
+"""
+Исполнитель апдейтов с порядком внутри пользователя
+
+Апдейт попадает в одну из UPDATE_LANES полос по хэшу from_user.id.
+Каждая полоса — очередь с одним воркером, поэтому апдейты одного
+пользователя обрабатываются строго по очереди (двойное нажатие
+«✅ Подтвердить» не запустит две регистрации одновременно), а апдейты
+разных пользователей идут параллельно в разных полосах. Общее число
+одновременно обрабатываемых апдейтов ограничено UPDATE_WORKERS, а
+число ожидающих — UPDATE_QUEUE_SIZE.
+
+committed_update_id — наибольший update_id, до которого включительно
+обработаны все принятые апдейты; его сохраняет services.update_backlog,
+а после перезапуска апдейты с update_id <= skip_through отбрасываются
+как уже обработанные.
+
+LaneDispatcher направляет в полосы все апдейты диспетчера: при polling
+aiogram вызывает feed_update по одному (handle_as_tasks=False), и
+ожидание места в очереди тормозит получение новых апдейтов; webhook
+кладет апдейты через submit_nowait и при переполнении отвечает 503.
+"""
+import asyncio
+import contextvars
+import heapq
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+# Установлен в задачах-воркерах полос: feed_update из полосы обрабатывает апдейт сразу
+_in_lane: contextvars.ContextVar[bool] = contextvars.ContextVar("in_update_lane", default=False)
+
+
+def update_user_id(update: Update) -> Optional[int]:
+    """ID пользователя, от которого пришел апдейт"""
+    user = getattr(update.event, "from_user", None)
+    return user.id if user else None
+
+
+class LaneExecutor:
+    """Полосы апдейтов: порядок внутри пользователя, параллельность между пользователями"""
+
+    def __init__(
+        self,
+        process: Callable[..., Awaitable[Any]],
+        lanes: int,
+        concurrency: int,
+        max_pending: int
+    ):
+        self.process = process
+        self.lanes = lanes
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self._queues: List[asyncio.Queue] = [asyncio.Queue() for _ in range(lanes)]
+        self._tasks: List[asyncio.Task] = []
+        self._slots = asyncio.Semaphore(concurrency)
+        self._space = asyncio.Event()
+        self._pending = 0
+        self._in_flight = 0
+        self.received = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.max_pending_seen = 0
+        self.max_lane_depth = 0
+        self._wait_total = 0.0
+        self.skip_through: Optional[int] = None  # апдейты с update_id не больше этого уже обработаны
+        self.duplicates = 0
+        self.first_update_id: Optional[int] = None
+        self._max_update_id = 0
+        self._unfinished: List[int] = []  # куча update_id принятых, но не обработанных
+        self._finished: Set[int] = set()
+
+    def lane_for(self, update: Update) -> int:
+        """Полоса апдейта: по пользователю, без пользователя — по update_id"""
+        user_id = update_user_id(update)
+        return (user_id if user_id is not None else update.update_id) % self.lanes
+
+    @property
+    def committed_update_id(self) -> int:
+        """Наибольший update_id, до которого включительно все принятые апдейты обработаны"""
+        if self._unfinished:
+            return self._unfinished[0] - 1
+        return max(self._max_update_id, self.skip_through or 0)
+
+    def submit_nowait(self, update: Update, **kwargs: Any) -> bool:
+        """Поставить апдейт в полосу; False — достигнут предел ожидающих"""
+        if self._is_duplicate(update):
+            return True
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            return False
+        self._enqueue(update, kwargs)
+        return True
+
+    async def submit(self, update: Update, **kwargs: Any) -> None:
+        """Поставить апдейт в полосу, дождавшись места (backpressure)"""
+        if self._is_duplicate(update):
+            return
+        while self._pending >= self.max_pending:
+            self._space.clear()
+            await self._space.wait()
+        self._enqueue(update, kwargs)
+
+    def start(self) -> None:
+        """Запуск воркеров полос"""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker(queue), name=f"update-lane-{index}")
+                for index, queue in enumerate(self._queues)
+            ]
+
+    async def stop(self, timeout: float = 30) -> None:
+        """Дождаться обработки принятых апдейтов (не дольше timeout) и остановить воркеров"""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Полосы апдейтов не разобраны за {timeout} с, осталось {self._pending}")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики: глубина полос, ожидающие, обрабатываемые, отказы, среднее ожидание"""
+        depths = [queue.qsize() for queue in self._queues]
+        finished = self.processed + self.failed
+        return {
+            "lanes": self.lanes,
+            "concurrency": self.concurrency,
+            "pending": self._pending,
+            "capacity": self.max_pending,
+            "max_pending": self.max_pending_seen,
+            "in_flight": self._in_flight,
+            "busy_lanes": sum(1 for depth in depths if depth),
+            "deepest_lane": max(depths, default=0),
+            "max_lane_depth": self.max_lane_depth,
+            "received": self.received,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "committed_update_id": self.committed_update_id,
+            "avg_wait_ms": round(self._wait_total / finished * 1000, 1) if finished else 0.0,
+        }
+
+    def _is_duplicate(self, update: Update) -> bool:
+        if self.first_update_id is None:
+            self.first_update_id = update.update_id
+        if self.skip_through is not None and update.update_id <= self.skip_through:
+            self.duplicates += 1
+            return True
+        return False
+
+    def _enqueue(self, update: Update, kwargs: Dict[str, Any]) -> None:
+        heapq.heappush(self._unfinished, update.update_id)
+        self._max_update_id = max(self._max_update_id, update.update_id)
+        queue = self._queues[self.lane_for(update)]
+        queue.put_nowait((update, kwargs, time.monotonic()))
+        self._pending += 1
+        self.received += 1
+        self.max_pending_seen = max(self.max_pending_seen, self._pending)
+        self.max_lane_depth = max(self.max_lane_depth, queue.qsize())
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        _in_lane.set(True)
+        while True:
+            update, kwargs, queued_at = await queue.get()
+            try:
+                async with self._slots:
+                    self._wait_total += time.monotonic() - queued_at
+                    self._in_flight += 1
+                    try:
+                        await self.process(update, **kwargs)
+                        self.processed += 1
+                    except Exception as e:
+                        self.failed += 1
+                        logger.error(f"Ошибка обработки апдейта {update.update_id}: {e}")
+                    finally:
+                        self._in_flight -= 1
+            finally:
+                self._pending -= 1
+                self._finished.add(update.update_id)
+                while self._unfinished and self._unfinished[0] in self._finished:
+                    self._finished.discard(heapq.heappop(self._unfinished))
+                self._space.set()
+                queue.task_done()
+
+
+class LaneDispatcher(Dispatcher):
+    """Диспетчер, обрабатывающий апдейты через полосы LaneExecutor"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.lane_executor: Optional[LaneExecutor] = None
+
+    def start_lanes(self, bot: Bot, lanes: int, concurrency: int, max_pending: int) -> LaneExecutor:
+        """Создать и запустить полосы для бота"""
+        self.lane_executor = LaneExecutor(
+            lambda update, **kwargs: super(LaneDispatcher, self).feed_update(bot, update, **kwargs),
+            lanes=lanes,
+            concurrency=concurrency,
+            max_pending=max_pending
+        )
+        self.lane_executor.start()
+        return self.lane_executor
+
+    async def stop_lanes(self) -> None:
+        """Дообработать принятые апдейты и остановить полосы"""
+        if self.lane_executor:
+            await self.lane_executor.stop()
+            self.lane_executor = None
+
+    async def feed_update(self, bot: Bot, update: Update, **kwargs: Any) -> Any:
+        if self.lane_executor is None or _in_lane.get():
+            return await super().feed_update(bot, update, **kwargs)
+        await self.lane_executor.submit(update, **kwargs)
+        return None
@@ -0,0 +1,129 @@
+"""
+Прием апдейтов через webhook
+
+aiohttp-сервер принимает POST от Telegram, проверяет секретный токен
+(заголовок X-Telegram-Bot-Api-Secret-Token) и сразу отвечает 200, положив
+апдейт в полосы LaneExecutor (services/update_executor.py): апдейты
+одного пользователя обрабатываются по порядку, разных — параллельно.
+
+Если ожидающих апдейтов UPDATE_QUEUE_SIZE, сервер отвечает 503: Telegram
+повторит доставку позже, так что апдейт не теряется, а бот не набирает
+задач больше, чем успевает обработать (backpressure). Счетчики полос
+доступны по GET /healthz, метрики хендлеров (если METRICS_ENDPOINT=true) —
+по GET /metrics в формате Prometheus.
+"""
+import asyncio
+import hmac
+import logging
+import signal
+from contextlib import suppress
+from typing import Any, List, Optional
+
+from aiogram import Bot
+from aiogram.types import Update
+from aiohttp import web
+
+from config.settings import settings
+from services.metrics import metrics
+from services.update_executor import LaneDispatcher, LaneExecutor
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def create_app(
+    executor: LaneExecutor, bot: Bot, path: str, secret: str, metrics_endpoint: bool = False
+) -> web.Application:
+    """aiohttp-приложение: POST path — апдейты, GET /healthz — метрики полос, GET /metrics — Prometheus"""
+
+    async def handle_update(request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not secret or not hmac.compare_digest(token, secret):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except Exception as e:
+            logger.warning(f"Некорректный апдейт от webhook: {e}")
+            return web.Response(status=400)
+
+        if not executor.submit_nowait(update):
+            # Telegram повторит доставку — апдейт не потеряется
+            return web.Response(status=503)
+        return web.Response(status=200)
+
+    async def handle_health(request: web.Request) -> web.Response:
+        return web.json_response(executor.get_stats())
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        text = metrics.render_prometheus()
+        stats = executor.get_stats()
+        text += (
+            "# TYPE bot_updates_pending gauge\n"
+            f"bot_updates_pending {stats['pending']}\n"
+            "# TYPE bot_updates_in_flight gauge\n"
+            f"bot_updates_in_flight {stats['in_flight']}\n"
+            "# TYPE bot_updates_processed_total counter\n"
+            f"bot_updates_processed_total {stats['processed']}\n"
+            "# TYPE bot_updates_failed_total counter\n"
+            f"bot_updates_failed_total {stats['failed']}\n"
+        )
+        return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+    app.router.add_get("/healthz", handle_health)
+    if metrics_endpoint:
+        app.router.add_get("/metrics", handle_metrics)
+    return app
+
+
+async def run_webhook(
+    dispatcher: LaneDispatcher,
+    bot: Bot,
+    allowed_updates: Optional[List[str]] = None,
+    **workflow_data: Any
+) -> None:
+    """
+    Запуск в режиме webhook. Хуки startup/shutdown диспетчера вызываются
+    так же, как при polling; работает до SIGINT/SIGTERM.
+    Webhook устанавливается последним, когда сервер уже слушает порт.
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop_event.set)
+
+    workflow_data = {"dispatcher": dispatcher, "bots": [bot], **dispatcher.workflow_data, **workflow_data}
+    await dispatcher.emit_startup(bot=bot, **workflow_data)
+
+    executor = dispatcher.lane_executor or dispatcher.start_lanes(
+        bot, settings.update_lanes, settings.update_workers, settings.update_queue_size
+    )
+    runner = web.AppRunner(create_app(
+        executor, bot, settings.webhook_path, settings.webhook_secret, settings.metrics_endpoint
+    ))
+    await runner.setup()
+    site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+    await site.start()
+    logger.info(f"Webhook-сервер слушает {settings.webhook_host}:{settings.webhook_port}{settings.webhook_path}")
+
+    try:
+        # Раньше нельзя: накопившиеся апдейты Telegram начнет слать сразу, и
+        # на закрытый порт ответит повторами с нарастающей паузой
+        await bot.set_webhook(
+            url=f"{settings.webhook_url.rstrip('/')}{settings.webhook_path}",
+            secret_token=settings.webhook_secret,
+            allowed_updates=allowed_updates,
+            drop_pending_updates=settings.drop_pending_updates
+        )
+        logger.info("Webhook установлен")
+        await stop_event.wait()
+    finally:
+        # Сначала перестаем принимать апдейты, затем дорабатываем принятые
+        await runner.cleanup()
+        await dispatcher.stop_lanes()
+        await dispatcher.emit_shutdown(bot=bot, **workflow_data)
+        logger.info(f"Webhook-сервер остановлен: {executor.get_stats()}")
@@ -0,0 +1,23 @@
+"""
+Вспомогательные функции для тестов, работающих с базой данных
+"""
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.db_manager import db_manager
+from database.models import Base
+
+
+async def use_in_memory_database():
+    """Подменить движок db_manager на SQLite в памяти и создать таблицы"""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    db_manager.engine = engine
+    db_manager.async_session = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    return engine
@@ -0,0 +1,93 @@
+"""
+Тесты для учета активности пользователей
+"""
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from database.db_manager import get_session
+from database.models import User
+from database.repositories import ActivityRepository
+from database.repositories.activity_repository import active_counts, bitmap_to_ids, ids_to_bitmap, retention
+from services.activity_tracker import ActivityTracker
+from tests.db_helpers import use_in_memory_database
+
+
+class TestActivityTracker(unittest.IsolatedAsyncioTestCase):
+    """Тесты битовых карт активности и метрик DAU/WAU/MAU"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        self.tracker = ActivityTracker(flush_interval=60)
+        self.today = datetime.utcnow().date()
+
+        async with get_session() as session:
+            session.add_all([
+                User(telegram_id=100 + index, full_name=f"User {index}",
+                     created_at=datetime.utcnow() - timedelta(days=7))
+                for index in range(1, 5)
+            ])
+            await session.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    def test_bitmap_roundtrip(self):
+        """Карта восстанавливает исходный набор id"""
+        ids = [0, 1, 7, 8, 63, 64, 1000]
+        self.assertEqual(bitmap_to_ids(ids_to_bitmap(reversed(ids))), ids)
+
+    async def test_record_and_flush(self):
+        """Повторные отметки за день считаются один раз, неизвестные пользователи пропускаются"""
+        for telegram_id in [101, 102, 101, 999]:
+            self.tracker.record(telegram_id)
+
+        await self.tracker.flush()
+        bitmaps = await ActivityRepository.get_bitmaps(self.today, self.today)
+        self.assertEqual(active_counts(bitmaps, self.today), {"dau": 2, "wau": 2, "mau": 2})
+        self.assertEqual(bitmap_to_ids(bitmaps[self.today]), [1, 2])
+
+    async def test_stop_during_flush_keeps_marks(self):
+        """Остановка посреди фонового сброса дописывает отметки, а не теряет их"""
+        tracker = ActivityTracker(flush_interval=0.01)
+        add_activity = ActivityRepository.add_activity
+        started = asyncio.Event()
+
+        async def slow_add_activity(day, user_ids):
+            started.set()
+            await asyncio.sleep(0.1)
+            await add_activity(day, user_ids)
+
+        with mock.patch.object(ActivityRepository, "add_activity", side_effect=slow_add_activity):
+            await tracker.start()
+            tracker.record(101)
+            await started.wait()
+            await tracker.stop()
+
+        bitmaps = await ActivityRepository.get_bitmaps(self.today, self.today)
+        self.assertEqual(bitmap_to_ids(bitmaps[self.today]), [1])
+
+    async def test_windows_are_unions(self):
+        """WAU и MAU — объединение дней, а не сумма"""
+        await ActivityRepository.add_activity(self.today, [1, 2])
+        await ActivityRepository.add_activity(self.today - timedelta(days=3), [2, 3])
+        await ActivityRepository.add_activity(self.today - timedelta(days=20), [4])
+
+        bitmaps = await ActivityRepository.get_bitmaps(self.today - timedelta(days=29), self.today)
+        self.assertEqual(active_counts(bitmaps, self.today), {"dau": 2, "wau": 3, "mau": 4})
+
+    async def test_retention(self):
+        """Удержание — доля когорты, активной в день N"""
+        cohort_day = self.today - timedelta(days=7)
+        await ActivityRepository.add_activity(cohort_day + timedelta(days=1), [1, 2, 3])
+        await ActivityRepository.add_activity(self.today, [1])
+
+        cohort = await ActivityRepository.get_cohort(cohort_day)
+        bitmaps = await ActivityRepository.get_bitmaps(cohort_day, self.today)
+        self.assertEqual(retention(cohort, bitmaps[cohort_day + timedelta(days=1)]), 75.0)
+        self.assertEqual(retention(cohort, bitmaps[self.today]), 25.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Тесты для буферизованного журнала действий администраторов
+"""
+
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import CallbackQuery, User as TelegramUser
+from sqlalchemy import event, func, select
+
+from database.db_manager import get_session
+from database.models import ActionLog, User
+from database.repositories import ActionLogRepository
+import middlewares.audit as audit_middleware
+from middlewares.audit import AuditMiddleware
+from services.audit_log import AuditLogWriter
+from tests.db_helpers import use_in_memory_database
+
+
+async def approve_team(callback, **kwargs):
+    return "approved"
+
+
+async def block_user(callback, **kwargs):
+    raise RuntimeError("boom")
+
+
+class TestAuditLog(unittest.IsolatedAsyncioTestCase):
+    """Тесты очереди, пакетной записи и middleware"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        async with get_session() as session:
+            session.add_all([User(telegram_id=100, full_name="Admin"), User(telegram_id=200, full_name="Other")])
+            await session.commit()
+
+        self.inserts = 0
+
+        def count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO action_logs"):
+                self.inserts += 1
+
+        event.listen(self.engine.sync_engine, "before_cursor_execute", count_inserts)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def logs(self):
+        async with get_session() as session:
+            return list((await session.execute(select(ActionLog).order_by(ActionLog.id))).scalars())
+
+    async def test_flush_single_insert_per_batch(self):
+        """Пачка пишется одним INSERT; записи неизвестных пользователей пропускаются"""
+        writer = AuditLogWriter(flush_interval=60, batch_size=50, max_queue=1000)
+        for index in range(120):
+            writer.record(100 if index % 2 else 200, f"teams.action_{index}", "{}")
+        writer.record(999, "teams.ghost")
+
+        await writer.flush()
+
+        self.assertEqual(self.inserts, 3)
+        self.assertEqual(writer.get_stats()["written"], 120)
+        self.assertEqual(writer.get_stats()["skipped"], 1)
+        self.assertEqual(len(await self.logs()), 120)
+
+    async def test_bounded_queue_drops(self):
+        """Переполненная очередь отбрасывает новые записи и считает их"""
+        writer = AuditLogWriter(flush_interval=60, batch_size=100, max_queue=3)
+        results = [writer.record(100, "x") for _ in range(5)]
+
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(writer.get_stats()["dropped"], 2)
+
+    async def test_background_flush_on_batch_size(self):
+        """Накопление batch_size записей будит фоновый сброс раньше интервала"""
+        writer = AuditLogWriter(flush_interval=60, batch_size=3, max_queue=100)
+        await writer.start()
+        try:
+            for _ in range(3):
+                writer.record(100, "x")
+            for _ in range(50):
+                if writer.written == 3:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(writer.written, 3)
+
+            # Остаток сбрасывается при остановке
+            writer.record(100, "y")
+        finally:
+            await writer.stop()
+        self.assertEqual(len(await self.logs()), 4)
+
+    async def test_stop_during_flush_keeps_batch(self):
+        """Остановка посреди фонового сброса дописывает пачку, а не теряет ее"""
+        writer = AuditLogWriter(flush_interval=0.01, batch_size=100, max_queue=100)
+        create_logs = ActionLogRepository.create_logs
+        started = asyncio.Event()
+
+        async def slow_create_logs(entries):
+            started.set()
+            await asyncio.sleep(0.1)
+            return await create_logs(entries)
+
+        with mock.patch.object(ActionLogRepository, "create_logs", side_effect=slow_create_logs):
+            await writer.start()
+            writer.record(100, "teams.approve")
+            await started.wait()
+            await writer.stop()
+
+        self.assertEqual([log.action for log in await self.logs()], ["teams.approve"])
+        self.assertEqual(writer.get_stats()["queued"], 0)
+
+    async def test_middleware_records_handler_and_outcome(self):
+        """Middleware пишет имя хендлера, ID из callback data и результат, не дожидаясь базы"""
+        writer = AuditLogWriter(flush_interval=60, batch_size=100, max_queue=100)
+        middleware = AuditMiddleware()
+        user = TelegramUser(id=100, is_bot=False, first_name="Admin")
+
+        def callback_query(data):
+            return CallbackQuery(id="1", from_user=user, chat_instance="c", data=data)
+
+        async def call(callback, data):
+            handler = HandlerObject(callback=callback)
+            return await middleware(
+                lambda event, kwargs: handler.call(event, **kwargs), callback_query(data), {"handler": handler}
+            )
+
+        with mock.patch.object(audit_middleware, "audit_log", writer):
+            self.assertEqual(await call(approve_team, "admin:approve_team_15"), "approved")
+            with self.assertRaises(RuntimeError):
+                await call(block_user, "admin:block_user_7_global")
+
+        self.assertEqual(len(await self.logs()), 0)
+        await writer.flush()
+        logs = await self.logs()
+
+        self.assertEqual([log.action for log in logs], ["test_audit_log.approve_team", "test_audit_log.block_user"])
+        approved, blocked = (json.loads(log.details) for log in logs)
+        self.assertEqual((approved["targets"], approved["outcome"]), ([15], "ok"))
+        self.assertEqual((blocked["targets"], blocked["outcome"]), ([7], "error: RuntimeError"))
+
+        async with get_session() as session:
+            admin_id = (await session.execute(select(User.id).where(User.telegram_id == 100))).scalar()
+            self.assertEqual(
+                (await session.execute(select(func.count()).where(ActionLog.user_id == admin_id))).scalar(), 2
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
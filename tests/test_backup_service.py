@@ -0,0 +1,97 @@
+"""
+Тесты для снимков базы данных
+"""
+
+import gzip
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from services import backup_service as backup_module
+from services.backup_service import BackupService, verify_snapshot
+
+
+class TestBackupService(unittest.IsolatedAsyncioTestCase):
+    """Тесты онлайн-снимков, проверки и ротации"""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database_path = os.path.join(self.tmp.name, "bot.db")
+        connection = sqlite3.connect(self.database_path)
+        connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, payload TEXT)")
+        connection.executemany("INSERT INTO items (payload) VALUES (?)", [("x" * 500,)] * 2000)
+        connection.commit()
+        connection.close()
+
+        self.service = BackupService(
+            database_path=self.database_path,
+            directory=os.path.join(self.tmp.name, "backups"),
+            keep=2,
+            pages_per_step=16
+        )
+
+    async def asyncTearDown(self):
+        self.tmp.cleanup()
+
+    def restore(self, snapshot) -> sqlite3.Connection:
+        restored_path = os.path.join(self.tmp.name, "restored.db")
+        with gzip.open(snapshot.path, "rb") as archive, open(restored_path, "wb") as target:
+            target.write(archive.read())
+        return sqlite3.connect(restored_path)
+
+    async def test_snapshot_is_verified_copy(self):
+        """Снимок — сжатая копия базы, прошедшая проверку, без промежуточных файлов"""
+        snapshot = await self.service.create_snapshot()
+
+        self.assertEqual(verify_snapshot(snapshot.path), [])
+        self.assertEqual(os.listdir(self.service.directory), [snapshot.filename])
+        self.assertEqual(self.service.latest_snapshot().path, snapshot.path)
+        restored = self.restore(snapshot)
+        self.assertEqual(restored.execute("SELECT COUNT(*) FROM items").fetchone()[0], 2000)
+        restored.close()
+
+    async def test_rotation_keeps_newest(self):
+        """Хранятся только последние keep снимков"""
+        stamps = [datetime(2026, 10, day, 3, 0, 0) for day in (1, 2, 3)]
+        with mock.patch.object(backup_module, "datetime") as fake_datetime:
+            fake_datetime.strptime = datetime.strptime
+            for stamp in stamps:
+                fake_datetime.utcnow.return_value = stamp
+                await self.service.create_snapshot()
+
+        snapshots = self.service.list_snapshots()
+        self.assertEqual([snapshot.created_at for snapshot in snapshots], stamps[:0:-1])
+
+    async def test_writes_during_snapshot(self):
+        """Запись между шагами копирования не ломает снимок"""
+        writer = sqlite3.connect(self.database_path, check_same_thread=False)
+        original_sleep = backup_module.time.sleep
+
+        def write_between_steps(seconds):
+            writer.execute("INSERT INTO items (payload) VALUES ('late')")
+            writer.commit()
+            original_sleep(0)
+
+        with mock.patch.object(backup_module.time, "sleep", write_between_steps):
+            snapshot = await self.service.create_snapshot()
+        writer.close()
+
+        restored = self.restore(snapshot)
+        self.assertGreater(restored.execute("SELECT COUNT(*) FROM items").fetchone()[0], 2000)
+        restored.close()
+
+    async def test_corrupted_archive_fails_verification(self):
+        """Поврежденный архив не проходит проверку восстановлением"""
+        snapshot = await self.service.create_snapshot()
+        with open(snapshot.path, "r+b") as archive:
+            archive.seek(100)
+            archive.write(b"\x00" * 200)
+
+        self.assertNotEqual(verify_snapshot(snapshot.path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+Тесты для автоматических ответов на нажатия
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import AnswerCallbackQuery, SendMessage
+from aiogram.types import CallbackQuery, Message, Update
+
+import middlewares.callback_answer as callback_answer_middleware
+from middlewares.callback_answer import CallbackAnswerMiddleware, CallbackHandlerNameMiddleware
+from services.callback_answers import UNHANDLED, CallbackAnswerRequestMiddleware, CallbackAnswerWatchdog
+
+
+def callback_update(update_id: int, data: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": f"cb{update_id}",
+            "from": {"id": 42, "is_bot": False, "first_name": "Captain"},
+            "chat_instance": "c",
+            "data": data,
+        },
+    })
+
+
+class TestCallbackAnswers(unittest.IsolatedAsyncioTestCase):
+    """Тесты бюджета на ответ, поздних и повторных ответов, списка медленных хендлеров"""
+
+    async def asyncSetUp(self):
+        self.watchdog = CallbackAnswerWatchdog(budget_ms=20, window=10, min_samples=3)
+        self.bot = Bot(token="123456:TEST")
+        self.bot.session.middleware(CallbackAnswerRequestMiddleware(self.watchdog))
+        self.sent = []
+        self.fail_with = None
+
+        async def make_request(bot, method, timeout=None):
+            if self.fail_with:
+                raise TelegramBadRequest(method=method, message=self.fail_with)
+            if isinstance(method, SendMessage):
+                self.sent.append(("message", method.chat_id, method.text))
+                return Message.model_validate({
+                    "message_id": 1, "date": 0, "chat": {"id": method.chat_id, "type": "private"},
+                    "text": method.text,
+                })
+            self.sent.append((method.callback_query_id, method.text))
+            return True
+
+        self.bot.session.make_request = make_request
+        patcher = mock.patch.object(callback_answer_middleware, "callback_answers", self.watchdog)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.dispatcher = Dispatcher()
+        self.dispatcher.callback_query.outer_middleware(CallbackAnswerMiddleware())
+        self.dispatcher.callback_query.middleware(CallbackHandlerNameMiddleware())
+        self.router = Router()
+        self.dispatcher.include_router(self.router)
+
+    async def asyncTearDown(self):
+        await self.bot.session.close()
+
+    async def test_slow_handler_gets_auto_answer(self):
+        """Хендлер не ответил за бюджет: бот отвечает сам, поздний текст приходит сообщением"""
+        @self.router.callback_query(F.data == "sync")
+        async def sync_matches(callback: CallbackQuery):
+            await asyncio.sleep(0.06)
+            self.assertEqual(self.sent, [("cb1", None)])
+            await callback.answer("❌ Ошибка удаления", show_alert=True)
+
+        @self.router.callback_query(F.data == "refresh")
+        async def refresh(callback: CallbackQuery):
+            await asyncio.sleep(0.06)
+            await callback.answer()
+
+        await self.dispatcher.feed_update(self.bot, callback_update(1, "sync"))
+        await self.dispatcher.feed_update(self.bot, callback_update(2, "refresh"))
+
+        self.assertEqual(self.sent, [("cb1", None), ("message", 42, "❌ Ошибка удаления"), ("cb2", None)])
+        stats = self.watchdog.get_stats()
+        self.assertEqual(
+            (stats["auto_answered"], stats["late_answers"], stats["late_delivered"], stats["pending"]),
+            (2, 2, 1, 0)
+        )
+        handler, samples = next(iter(self.watchdog._samples.items()))
+        self.assertTrue(handler.endswith("sync_matches"))
+        self.assertGreater(samples[0], 0.05)
+
+    async def test_fast_and_unhandled_callbacks(self):
+        """Быстрый ответ хендлера не дублируется; без ответа и без хендлера бот отвечает сразу"""
+        @self.router.callback_query(F.data == "answered")
+        async def answered(callback: CallbackQuery):
+            await callback.answer("Ок")
+
+        @self.router.callback_query(F.data == "silent")
+        async def silent(callback: CallbackQuery):
+            pass
+
+        for update_id, data in enumerate(["answered", "silent", "old_button"], start=1):
+            await self.dispatcher.feed_update(self.bot, callback_update(update_id, data))
+
+        self.assertEqual(self.sent, [("cb1", "Ок"), ("cb2", None), ("cb3", None)])
+        stats = self.watchdog.get_stats()
+        self.assertEqual((stats["answered_in_budget"], stats["answered_on_finish"], stats["auto_answered"]), (1, 2, 0))
+        self.assertIn(UNHANDLED, self.watchdog._samples)
+
+    async def test_duplicate_answer_error_is_swallowed(self):
+        """Ошибка повторного ответа не доходит до хендлера"""
+        @self.router.callback_query(F.data == "twice")
+        async def twice(callback: CallbackQuery):
+            self.fail_with = "Bad Request: query is too old and response timeout expired or query ID is invalid"
+            self.assertTrue(await callback.answer())
+
+        await self.dispatcher.feed_update(self.bot, callback_update(1, "twice"))
+        self.assertEqual(self.watchdog.duplicate_errors, 1)
+
+        # Прочие ошибки по-прежнему поднимаются
+        self.fail_with = "Bad Request: message text is empty"
+        self.watchdog.begin("cb2")
+        with self.assertRaises(TelegramBadRequest):
+            await self.bot(AnswerCallbackQuery(callback_query_id="cb2"))
+
+    async def test_slow_handler_list(self):
+        """Хендлер попадает в список медленных по p95 и выходит из него"""
+        for seconds in (0.01, 0.05, 0.06):
+            self.watchdog.record("handlers.admin.sync", seconds)
+        self.watchdog.record("handlers.user.menu", 0.005)
+
+        slow = self.watchdog.get_slow_handlers()
+        self.assertEqual([item["handler"] for item in slow], ["handlers.admin.sync"])
+        self.assertEqual((slow[0]["p95_ms"], slow[0]["samples"], slow[0]["over_budget"]), (60.0, 3, 0.67))
+
+        for _ in range(10):
+            self.watchdog.record("handlers.admin.sync", 0.005)
+        self.assertEqual(self.watchdog.get_slow_handlers(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Тесты для индекса хендлеров callback_query
+"""
+
+import re
+import unittest
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.filters import StateFilter
+from aiogram.types import CallbackQuery, Update
+
+from handlers import setup_handlers
+from handlers.admin.states import AdminStates
+from middlewares.callback_index import CallbackIndexMiddleware
+from utils.callback_data import AdminTeamStatusCallback
+from utils.callback_index import CallbackIndex, regex_prefix
+
+
+def callback_query(data: str) -> CallbackQuery:
+    return CallbackQuery.model_validate({
+        "id": "1",
+        "from": {"id": 42, "is_bot": False, "first_name": "Admin"},
+        "chat_instance": "c",
+        "data": data,
+    })
+
+
+async def first_match(handlers, event, **kwargs):
+    """Первый хендлер, все фильтры которого проходят (как в TelegramEventObserver.trigger)"""
+    for handler in handlers:
+        result, _ = await handler.check(event, handler=handler, **kwargs)
+        if result:
+            return handler
+    return None
+
+
+class TestCallbackIndex(unittest.IsolatedAsyncioTestCase):
+    """Тесты разбора фильтров, выбора кандидатов и совпадения с обычным перебором"""
+
+    def test_regex_prefix(self):
+        """Литеральное начало шаблона; квантификатор отнимает символ, альтернатива — весь ключ"""
+        self.assertEqual(regex_prefix(re.compile(r"^admin:team_details_\d+$"), True), "admin:team_details_")
+        self.assertEqual(regex_prefix(re.compile(r"^admin:list_users(?:_page_\d+)?$"), True), "admin:list_users")
+        self.assertEqual(regex_prefix(re.compile(r"^admin:pages?$"), True), "admin:page")
+        self.assertEqual(regex_prefix(re.compile(r"admin:x"), True), "admin:x")
+        self.assertIsNone(regex_prefix(re.compile(r"admin:x"), False))
+        self.assertIsNone(regex_prefix(re.compile(r"^a_\d+|b_\d+$"), True))
+        self.assertIsNone(regex_prefix(re.compile(r"^admin:x", re.IGNORECASE), True))
+
+    async def test_dispatch_through_index(self):
+        """Через индекс вызывается тот же хендлер, а фильтры проверяются только у кандидатов"""
+        bot = Bot(token="123456:TEST")
+        self.addAsyncCleanup(bot.session.close)
+        dispatcher = Dispatcher()
+        admin, user = Router(), Router()
+        calls = []
+        checked = []
+
+        def tracked(name, magic):
+            def check(callback: CallbackQuery):
+                checked.append(name)
+                return magic.resolve(callback)
+            return check
+
+        for index in range(50):
+            @admin.callback_query(F.data == f"admin:action_{index}")
+            async def admin_action(callback: CallbackQuery, index=index):
+                calls.append(f"admin:{index}")
+
+        @admin.callback_query(tracked("status", F.data.startswith("adm_status:")), AdminTeamStatusCallback.filter())
+        async def set_status(callback: CallbackQuery, callback_data: AdminTeamStatusCallback):
+            calls.append(f"status:{callback_data.status}:{callback_data.team_id}")
+
+        @user.callback_query(StateFilter(None), F.data.regexp(r"^register_team:\d+$"))
+        async def register(callback: CallbackQuery):
+            calls.append("register")
+
+        @user.callback_query(tracked("fallback", F.data))
+        async def fallback(callback: CallbackQuery):
+            calls.append("fallback")
+
+        dispatcher.include_routers(admin, user)
+        index = CallbackIndex(dispatcher)
+        index.install()
+        dispatcher.callback_query.outer_middleware(CallbackIndexMiddleware(index))
+        self.assertEqual((index.total, index.indexed), (53, 52))
+
+        for update_id, data in enumerate(
+            ["register_team:7", "adm_status:approved:15", "admin:action_42", "unknown"]
+        ):
+            update = Update(update_id=update_id, callback_query=callback_query(data))
+            await dispatcher.feed_update(bot, update)
+
+        self.assertEqual(calls, ["register", "status:approved:15", "admin:42", "fallback"])
+        # Фильтр fallback без ключа проверялся только там, где до него дошла очередь
+        self.assertEqual(checked, ["status", "fallback"])
+        self.assertEqual(index.lookups, 4)
+
+    async def test_matches_linear_scan_on_real_handlers(self):
+        """На настоящем дереве роутеров индекс выбирает тот же хендлер, что и полный перебор"""
+        dispatcher = Dispatcher()
+        dispatcher.include_router(setup_handlers())
+        index = CallbackIndex(dispatcher)
+        self.assertEqual(index.indexed, index.total)
+
+        all_handlers = [handler for observer in index.observers for handler in observer.handlers]
+        samples = set(index._exact)
+        for prefixes in index._prefixes.values():
+            for prefix in prefixes:
+                samples.update(prefix + suffix for suffix in ("", "15", "approved:3"))
+
+        for raw_state in (None, AdminStates.broadcast_adding_attachment.state):
+            for data in sorted(samples):
+                event = callback_query(data)
+                candidates = [h for hs in index.lookup(data).values() for h in hs]
+                self.assertIs(
+                    await first_match(candidates, event, raw_state=raw_state),
+                    await first_match(all_handlers, event, raw_state=raw_state),
+                    data
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+"""
+Тесты для суточных агрегатов статистики
+"""
+
+import unittest
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, func, text
+
+from database.db_manager import get_session
+from database.models import (
+    DailyMetric, DailyStat, Game, Match, MatchStatus, Team, TeamStatus, Tournament, User
+)
+from database.repositories import DailyStatsRepository, TeamRepository, TournamentRepository
+from database.repositories.daily_stats_repository import _rollup_queries, stat_windows
+from services.daily_stats import rebuild_pending_days
+from tests.db_helpers import use_in_memory_database
+
+
+class TestDailyStats(unittest.IsolatedAsyncioTestCase):
+    """Тесты заполнения агрегатов и чтения временных окон"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        now = datetime.utcnow()
+        self.today = now.date()
+
+        async with get_session() as session:
+            users = [
+                User(telegram_id=1, full_name="Admin", region="kg", created_at=now - timedelta(days=40)),
+                User(telegram_id=2, full_name="Player", region="kz", created_at=now),
+            ]
+            game = Game(name="Dota 2", short_name="dota", max_players=5)
+            session.add_all(users + [game])
+            await session.flush()
+
+            tournaments = []
+            for created_ago in [0, 0, 1, 40]:
+                tournaments.append(Tournament(
+                    game_id=game.id, name=f"Cup {len(tournaments)}", format="single_elimination",
+                    max_teams=8, region="kg", created_by=users[0].id,
+                    registration_start=now, registration_end=now, tournament_start=now, edit_deadline=now,
+                    created_at=now - timedelta(days=created_ago),
+                ))
+            session.add_all(tournaments)
+            await session.flush()
+
+            self.old_team = Team(tournament_id=tournaments[3].id, name="Old", captain_id=users[0].id,
+                                 status=TeamStatus.APPROVED.value, created_at=now - timedelta(days=40),
+                                 approved_at=now - timedelta(days=39), updated_at=now - timedelta(days=39))
+            session.add_all([
+                Team(tournament_id=tournaments[0].id, name="A", captain_id=users[1].id,
+                     status=TeamStatus.APPROVED.value, approved_at=now),
+                Team(tournament_id=tournaments[0].id, name="B", captain_id=users[0].id),
+                Match(tournament_id=tournaments[0].id, round_number=1, match_number=1,
+                      status=MatchStatus.COMPLETED.value, completed_at=now),
+                self.old_team,
+            ])
+            await session.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def backfill(self):
+        first_day = await DailyStatsRepository.get_first_activity_date()
+        await DailyStatsRepository.rebuild(first_day, self.today)
+
+    async def test_backfill_and_windows(self):
+        """Backfill переносит историю, окна считаются по агрегатам"""
+        self.assertIsNone(await DailyStatsRepository.get_rebuilt_through())
+        await self.backfill()
+        self.assertEqual(await DailyStatsRepository.get_rebuilt_through(), self.today)
+
+        windows = await DailyStatsRepository.get_window_totals(
+            DailyMetric.NEW_TOURNAMENTS, stat_windows(self.today)
+        )
+        self.assertEqual((windows['today'], windows['yesterday']), (2, 1))
+        self.assertEqual(await TournamentRepository.get_tournaments_count_for_date(self.today), 2)
+        self.assertEqual(
+            await DailyStatsRepository.get_total(DailyMetric.NEW_TOURNAMENTS, self.today - timedelta(days=60), self.today),
+            4
+        )
+
+        peak_day, peak_count = (await TournamentRepository.get_peak_creation_days(1))[0]
+        self.assertEqual((peak_day, peak_count), (self.today, 2))
+
+    async def test_all_metrics_rolled_up(self):
+        """Агрегаты считаются для всех метрик"""
+        await self.backfill()
+        totals = {
+            metric: await DailyStatsRepository.get_total(metric, self.today, self.today)
+            for metric in DailyMetric
+        }
+        self.assertEqual(totals, {
+            DailyMetric.NEW_USERS: 1,
+            DailyMetric.NEW_TEAMS: 2,
+            DailyMetric.NEW_TOURNAMENTS: 2,
+            DailyMetric.TEAM_APPROVALS: 1,
+            DailyMetric.MATCHES_COMPLETED: 1,
+        })
+
+    async def test_rebuild_is_idempotent(self):
+        """Повторный пересчет дня не удваивает значения"""
+        await self.backfill()
+        async with get_session() as session:
+            rows_before = (await session.execute(select(func.count()).select_from(DailyStat))).scalar()
+
+        await DailyStatsRepository.rebuild(self.today - timedelta(days=1), self.today)
+        await DailyStatsRepository.rebuild(self.today - timedelta(days=1), self.today)
+
+        async with get_session() as session:
+            rows_after = (await session.execute(select(func.count()).select_from(DailyStat))).scalar()
+        self.assertEqual(rows_before, rows_after)
+        self.assertEqual(await DailyStatsRepository.get_total(DailyMetric.NEW_TOURNAMENTS, self.today, self.today), 2)
+
+    async def test_edit_does_not_move_old_approval(self):
+        """Правка давно одобренной команды не переносит одобрение в сегодняшний день"""
+        await self.backfill()
+        await TeamRepository.update_team_info(self.old_team.id, name="Old Renamed")
+        await TeamRepository.update_status(self.old_team.id, TeamStatus.APPROVED.value)
+        await rebuild_pending_days(self.today)
+
+        self.assertEqual(await DailyStatsRepository.get_total(DailyMetric.TEAM_APPROVALS, self.today, self.today), 1)
+        self.assertEqual(
+            await DailyStatsRepository.get_total(DailyMetric.TEAM_APPROVALS, self.today - timedelta(days=60), self.today),
+            2
+        )
+
+    async def test_downtime_gap_is_rebuilt(self):
+        """После простоя пересчитываются все дни с отметки, а не только вчера и сегодня"""
+        await DailyStatsRepository.rebuild(self.today - timedelta(days=60), self.today - timedelta(days=5))
+        self.assertEqual(await DailyStatsRepository.get_rebuilt_through(), self.today - timedelta(days=5))
+
+        # Отметку двигает только пересчет, доходящий дальше нее
+        await DailyStatsRepository.rebuild(self.today - timedelta(days=50), self.today - timedelta(days=30))
+        self.assertEqual(await DailyStatsRepository.get_rebuilt_through(), self.today - timedelta(days=5))
+
+        async with get_session() as session:
+            tournament = await session.get(Tournament, 1)
+            session.add(Tournament(
+                game_id=tournament.game_id, name="Gap Cup", format="single_elimination", max_teams=8,
+                region="kg", created_by=tournament.created_by, registration_start=tournament.registration_start,
+                registration_end=tournament.registration_end, tournament_start=tournament.tournament_start,
+                edit_deadline=tournament.edit_deadline, created_at=datetime.utcnow() - timedelta(days=3),
+            ))
+            await session.commit()
+
+        await rebuild_pending_days(self.today)
+        self.assertEqual(await DailyStatsRepository.get_rebuilt_through(), self.today)
+        self.assertEqual(
+            await DailyStatsRepository.get_total(DailyMetric.NEW_TOURNAMENTS, self.today - timedelta(days=60), self.today),
+            5
+        )
+
+
+    async def test_day_bounds_use_indexes(self):
+        """Дни отбираются по индексам дат; границы суток верны для обоих форматов хранения"""
+        async with get_session() as session:
+            # func.now() SQLite пишет без микросекунд, SQLAlchemy — с ними
+            bounds = ((3, "2026-01-01 00:00:00"), (4, "2026-01-01 23:59:59.500000"), (5, "2026-01-02 00:00:00"))
+            session.add_all([User(telegram_id=telegram_id, full_name="Bound") for telegram_id, _ in bounds])
+            await session.flush()
+            for telegram_id, created_at in bounds:
+                await session.execute(
+                    text("UPDATE users SET created_at = :created_at WHERE telegram_id = :telegram_id"),
+                    {"created_at": created_at, "telegram_id": telegram_id}
+                )
+            await session.commit()
+
+            for query in _rollup_queries(date(2026, 1, 1), date(2026, 1, 1)):
+                sql = query.compile(compile_kwargs={"literal_binds": True})
+                plan = (await session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+                self.assertRegex(plan[0][-1], r"^SEARCH \w+ USING INDEX ix_\w+_(created|approved|completed)_at")
+
+        await DailyStatsRepository.rebuild(date(2026, 1, 1), date(2026, 1, 2))
+        self.assertEqual(await DailyStatsRepository.get_total(DailyMetric.NEW_USERS, date(2026, 1, 1), date(2026, 1, 1)), 2)
+        self.assertEqual(await DailyStatsRepository.get_total(DailyMetric.NEW_USERS, date(2026, 1, 2), date(2026, 1, 2)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+"""
+Тесты для потоковой выгрузки данных
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import literal, text, tuple_, update
+
+from database.db_manager import get_session
+from database.models import DeletedRecord, Game, Player, Team, TeamStatus, Tournament, User
+from database.repositories import TeamRepository, TournamentRepository
+from database.repositories.export_repository import ExportRepository
+from openpyxl import load_workbook
+
+from services.export_service import EXPORTS, ExportFormat, ExportService, shutdown_process_pool
+from tests.db_helpers import use_in_memory_database
+
+
+class TestExportService(unittest.IsolatedAsyncioTestCase):
+    """Тесты порционного чтения и формата gzip CSV/NDJSON"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        self.service = ExportService()
+        now = datetime.utcnow()
+
+        async with get_session() as session:
+            users = [User(telegram_id=index, full_name=f"User {index}") for index in range(1, 6)]
+            game = Game(name="Dota 2", short_name="dota", max_players=5)
+            session.add_all(users + [game])
+            await session.flush()
+
+            tournament = Tournament(
+                game_id=game.id, name="Cup", format="single_elimination", max_teams=8,
+                created_by=users[0].id, registration_start=now, registration_end=now,
+                tournament_start=now, edit_deadline=now,
+            )
+            session.add(tournament)
+            await session.flush()
+
+            team = Team(tournament_id=tournament.id, name="Alpha", captain_id=users[1].id,
+                        status=TeamStatus.APPROVED.value)
+            session.add(team)
+            await session.flush()
+            session.add_all([
+                Player(team_id=team.id, nickname=f"p{index}", game_id=str(index), position=index)
+                for index in range(3)
+            ])
+            await session.commit()
+
+    async def asyncTearDown(self):
+        shutdown_process_pool()
+        await self.engine.dispose()
+
+    async def read_export(self, name: str, export_format: ExportFormat, chunk_size: int = 1000):
+        result = await self.service.export_to_file(name, export_format, chunk_size=chunk_size)
+        try:
+            with gzip.open(result.path, "rt", encoding="utf-8-sig") as archive:
+                return result, archive.read()
+        finally:
+            os.remove(result.path)
+
+    async def test_users_csv_in_chunks(self):
+        """Все строки попадают в файл при чтении порциями меньше таблицы"""
+        result, content = await self.read_export("users", ExportFormat.CSV, chunk_size=2)
+        rows = list(csv.reader(io.StringIO(content), delimiter=';'))
+
+        self.assertEqual(result.rows, 5)
+        self.assertTrue(result.filename.endswith(".csv.gz"))
+        self.assertEqual(rows[0][:2], ["ID", "Telegram ID"])
+        self.assertEqual([row[0] for row in rows[1:]], ["1", "2", "3", "4", "5"])
+        self.assertEqual(rows[1][7], "Нет")
+
+    async def test_teams_ndjson(self):
+        """Связанные поля и счетчики берутся из JOIN и подзапросов"""
+        result, content = await self.read_export("teams", ExportFormat.NDJSON)
+        records = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(result.rows, 1)
+        self.assertEqual(records[0]["tournament_name"], "Cup")
+        self.assertEqual(records[0]["captain_name"], "User 2")
+        self.assertEqual(records[0]["players_count"], 3)
+
+    async def test_tournaments_ndjson(self):
+        """Выгрузка турниров использует реальные поля модели"""
+        _, content = await self.read_export("tournaments", ExportFormat.NDJSON)
+        record = json.loads(content.splitlines()[0])
+
+        self.assertEqual(record["game"], "Dota 2")
+        self.assertEqual(record["approved_teams"], 1)
+        self.assertIn("tournament_start", record)
+
+    async def test_excel_built_in_worker_process(self):
+        """Книга собирается в процессе-воркере, прогресс сообщается по листам"""
+        steps = []
+
+        async def progress(step):
+            steps.append(step)
+
+        result = await self.service.export_excel(progress=progress, chunk_size=2)
+        try:
+            workbook = load_workbook(result.path, read_only=True)
+            self.assertEqual(workbook.sheetnames, ["Пользователи", "Команды", "Турниры", "Статистика"])
+            users = list(workbook["Пользователи"].values)
+            self.assertEqual(len(users), 6)
+            self.assertEqual(users[1][0], 1)
+            workbook.close()
+        finally:
+            os.remove(result.path)
+
+        self.assertEqual(result.rows, 7)
+        self.assertEqual(steps[0], "Пользователи: 5 строк")
+
+
+    async def read_delta(self, consumer: str, name: str):
+        result = await self.service.export_delta(consumer, name, chunk_size=2)
+        try:
+            with gzip.open(result.path, "rt", encoding="utf-8") as archive:
+                return result, [json.loads(line) for line in archive.read().splitlines()]
+        finally:
+            os.remove(result.path)
+
+    async def backdate(self, model, delta: timedelta, *where):
+        """Сдвинуть updated_at строк в прошлое (server_default ставит текущее время)"""
+        async with get_session() as session:
+            await session.execute(
+                update(model).where(*where).values(updated_at=datetime.utcnow().replace(microsecond=0) - delta)
+            )
+            await session.commit()
+
+    async def test_delta_since_watermark(self):
+        """Дельта содержит только измененные после отметки строки; отметка у каждого потребителя своя"""
+        await self.backdate(User, timedelta(hours=1))
+
+        result, records = await self.read_delta("reporting", "users")
+        self.assertEqual(result.rows, 5)
+        self.assertTrue(all(record["op"] == "upsert" for record in records))
+        self.assertTrue(result.filename.endswith(".ndjson.gz"))
+        self.assertIsNone(await ExportRepository.get_watermark("reporting", "users"))
+
+        await self.service.acknowledge_delta("reporting", "users", result)
+        self.assertEqual(await ExportRepository.get_watermark("reporting", "users"), result.watermark)
+        result, records = await self.read_delta("reporting", "users")
+        self.assertEqual((result.rows, records), (0, []))
+
+        # Пользователь 3 изменился после отметки (но раньше защитного отставания)
+        await ExportRepository.set_watermark("reporting", "users", datetime.utcnow() - timedelta(minutes=30))
+        await self.backdate(User, timedelta(minutes=10), User.telegram_id == 3)
+        result, records = await self.read_delta("reporting", "users")
+        self.assertEqual([record["telegram_id"] for record in records], [3])
+
+        # Новый потребитель начинает с полной выгрузки
+        result, _ = await self.read_delta("archive", "users")
+        self.assertEqual(result.rows, 5)
+
+    async def test_delta_excludes_derived_columns(self):
+        """В дельте только столбцы самой таблицы: связи передаются ID"""
+        await self.backdate(Team, timedelta(hours=1))
+        await self.backdate(Tournament, timedelta(hours=1))
+        _, records = await self.read_delta("reporting", "teams")
+        self.assertEqual(records[0]["tournament_id"], 1)
+        self.assertEqual(records[0]["captain_id"], 2)
+        for key in ("tournament_name", "captain_name", "players_count"):
+            self.assertNotIn(key, records[0])
+
+        _, records = await self.read_delta("reporting", "tournaments")
+        self.assertEqual(records[0]["game_id"], 1)
+        self.assertNotIn("game", records[0])
+        self.assertNotIn("approved_teams", records[0])
+
+    async def test_delta_pages_by_updated_at_and_id(self):
+        """Порции идут по (updated_at, id) по индексу; строки одной секунды не теряются"""
+        async with get_session() as session:
+            # Формат func.now() SQLite, как у строк, измененных ботом
+            for telegram_id, updated_at in ((1, "2026-01-01 12:00:02"), (2, "2026-01-01 12:00:01"),
+                                            (3, "2026-01-01 12:00:01"), (4, "2026-01-01 12:00:01"),
+                                            (5, "2026-01-01 11:00:00")):
+                await session.execute(
+                    text("UPDATE users SET updated_at = :updated_at WHERE telegram_id = :telegram_id"),
+                    {"updated_at": updated_at, "telegram_id": telegram_id}
+                )
+            await session.commit()
+        await ExportRepository.set_watermark("reporting", "users", datetime(2026, 1, 1, 11, 30))
+
+        _, records = await self.read_delta("reporting", "users")
+        self.assertEqual([record["telegram_id"] for record in records], [2, 3, 4, 1])
+
+        stmt = EXPORTS["users"].delta_statement().order_by(User.updated_at, User.id).where(
+            tuple_(User.updated_at, User.id) > tuple_(literal("2026-01-01 12:00:01"), literal(3))
+        ).limit(2)
+        async with get_session() as session:
+            plan = (await session.execute(text(f"EXPLAIN QUERY PLAN {stmt.compile(compile_kwargs={'literal_binds': True})}"))).all()
+        details = " ".join(row[-1] for row in plan)
+        self.assertIn("ix_users_updated_at", details)
+        self.assertNotIn("TEMP B-TREE", details)
+
+    async def test_delta_tombstones(self):
+        """Удаление турнира оставляет надгробия для него и его команд; они идут перед upsert"""
+        await self.backdate(Team, timedelta(hours=1))
+        await self.backdate(Tournament, timedelta(hours=1))
+        for name in ("teams", "tournaments"):
+            await ExportRepository.set_watermark("reporting", name, datetime.utcnow() - timedelta(minutes=30))
+
+        self.assertTrue(await TournamentRepository.delete_tournament(1))
+        async with get_session() as session:
+            await session.execute(
+                update(DeletedRecord).values(deleted_at=datetime.utcnow() - timedelta(minutes=10))
+            )
+            await session.commit()
+
+        result, records = await self.read_delta("reporting", "teams")
+        self.assertEqual((result.rows, result.deleted), (0, 1))
+        self.assertEqual(records[0]["op"], "delete")
+        self.assertEqual(records[0]["id"], 1)
+
+        result, records = await self.read_delta("reporting", "tournaments")
+        self.assertEqual(records, [{"op": "delete", "id": 1, "deleted_at": records[0]["deleted_at"]}])
+
+    async def test_delete_team_records_tombstone(self):
+        """Удаление команды через репозиторий пишет надгробие"""
+        self.assertTrue(await TeamRepository.delete_team(1))
+        async with get_session() as session:
+            tombstone = await session.get(DeletedRecord, 1)
+        self.assertEqual((tombstone.entity, tombstone.entity_id), ("teams", 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Тесты для хранилища состояний FSM с отложенной записью
+"""
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import event, func, select, update
+
+from database.db_manager import get_session
+from database.models import FSMRecord
+from database.repositories import FSMRepository
+from handlers.user.states import UserStates
+from services.fsm_storage import DatabaseStorage
+from tests.db_helpers import use_in_memory_database
+
+
+def make_storage(**kwargs) -> DatabaseStorage:
+    options = dict(flush_interval=60, batch_size=100, ttl=timedelta(hours=24), cache_idle=1800)
+    options.update(kwargs)
+    return DatabaseStorage(**options)
+
+
+def user_key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+class TestFSMStorage(unittest.IsolatedAsyncioTestCase):
+    """Тесты записи пачками, загрузки после перезапуска и TTL"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        self.writes = 0
+
+        def count_writes(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith(("INSERT INTO fsm_states", "UPDATE fsm_states", "DELETE FROM fsm_states")):
+                self.writes += 1
+
+        event.listen(self.engine.sync_engine, "before_cursor_execute", count_writes)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def rows(self) -> int:
+        async with get_session() as session:
+            return (await session.execute(select(func.count()).select_from(FSMRecord))).scalar()
+
+    async def test_state_survives_restart(self):
+        """Шаги регистрации копятся в памяти, пишутся пачкой и подгружаются после перезапуска"""
+        storage = make_storage()
+        deadline = datetime(2026, 11, 1, 18, 0)
+        for user_id in range(1, 51):
+            context = FSMContext(storage, user_key(user_id))
+            await context.set_state(UserStates.registering_team_entering_name)
+            await context.update_data(tournament_id=7, deadline=deadline)
+            await context.update_data(team_name=f"Team {user_id}")
+
+        self.assertEqual(self.writes, 0)
+        await storage.close()
+        self.assertEqual(await self.rows(), 50)
+        self.assertEqual(self.writes, 1)  # один многострочный INSERT
+
+        restarted = make_storage()
+        context = FSMContext(restarted, user_key(7))
+        self.assertEqual(await context.get_state(), UserStates.registering_team_entering_name.state)
+        self.assertEqual(
+            await context.get_data(), {"tournament_id": 7, "deadline": deadline, "team_name": "Team 7"}
+        )
+        # Повторные чтения не ходят в базу
+        await context.get_data()
+        self.assertEqual((restarted.loads, restarted.hits), (1, 2))
+
+    async def test_close_during_flush_keeps_states(self):
+        """Остановка посреди фонового сброса не теряет снятые с очереди ключи"""
+        storage = make_storage(flush_interval=0.01)
+        save_records = FSMRepository.save_records
+        started = asyncio.Event()
+
+        async def slow_save_records(rows, deleted):
+            started.set()
+            await asyncio.sleep(0.1)
+            await save_records(rows, deleted)
+
+        with mock.patch.object(FSMRepository, "save_records", side_effect=slow_save_records):
+            await storage.start()
+            await FSMContext(storage, user_key(1)).set_state(UserStates.registering_team_entering_name)
+            await started.wait()
+            await storage.close()
+
+        self.assertEqual(storage.get_stats()["dirty"], 0)
+        restarted = make_storage()
+        self.assertEqual(
+            await FSMContext(restarted, user_key(1)).get_state(), UserStates.registering_team_entering_name.state
+        )
+
+    async def test_clear_deletes_row(self):
+        """Завершенный сценарий (state.clear) удаляет строку при следующем сбросе"""
+        storage = make_storage()
+        context = FSMContext(storage, user_key(1))
+        await context.set_state(UserStates.registering_team_entering_name)
+        await storage.flush()
+        self.assertEqual(await self.rows(), 1)
+
+        await context.clear()
+        await storage.flush()
+        self.assertEqual(await self.rows(), 0)
+        self.assertIsNone(await context.get_state())
+
+    async def test_abandoned_state_expires(self):
+        """Брошенное состояние не загружается и удаляется, свежее остается"""
+        storage = make_storage()
+        for user_id in (1, 2):
+            await FSMContext(storage, user_key(user_id)).set_state(UserStates.registering_team_entering_name)
+        await storage.close()
+
+        async with get_session() as session:
+            await session.execute(
+                update(FSMRecord)
+                .where(FSMRecord.key.like("%:1:1:%"))
+                .values(updated_at=datetime.utcnow() - timedelta(hours=25))
+            )
+            await session.commit()
+
+        restarted = make_storage()
+        self.assertIsNone(await FSMContext(restarted, user_key(1)).get_state())
+        self.assertIsNotNone(await FSMContext(restarted, user_key(2)).get_state())
+
+        self.assertEqual(await restarted.expire(), 1)
+        self.assertEqual(await self.rows(), 1)
+
+    async def test_idle_entries_evicted_from_memory(self):
+        """Неизмененные записи без обращений вытесняются из памяти, измененные — нет"""
+        storage = make_storage(cache_idle=0)
+        await FSMContext(storage, user_key(1)).set_state(UserStates.registering_team_entering_name)
+        await storage.expire()
+        self.assertEqual(storage.get_stats()["cached"], 1)  # еще не записано
+
+        await storage.flush()
+        await storage.expire()
+        self.assertEqual(storage.get_stats()["cached"], 0)
+        self.assertEqual(
+            await FSMContext(storage, user_key(1)).get_state(), UserStates.registering_team_entering_name.state
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
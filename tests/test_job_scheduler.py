@@ -0,0 +1,217 @@
+"""
+Тесты для планировщика отложенных задач
+"""
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from unittest import mock
+
+import services.scheduled_jobs as scheduled_jobs
+from database.models import JobStatus
+from database.repositories import ScheduledJobRepository
+from services.broadcast_service import run_broadcast
+from services.job_scheduler import INTERRUPTED_ERROR, JobScheduler
+from tests.db_helpers import use_in_memory_database
+
+
+class FakeBot:
+    """Бот рассылки: после stall_after отправок зависает, пока не прервут"""
+
+    def __init__(self, stall_after=None):
+        self.sent = []
+        self.stall_after = stall_after
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if self.stall_after is not None and len(self.sent) >= self.stall_after:
+            await asyncio.Event().wait()
+        self.sent.append(chat_id)
+
+
+class TestJobScheduler(unittest.IsolatedAsyncioTestCase):
+    """Тесты кучи задач, персистентности и перепланирования"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        self.scheduler = JobScheduler()
+        self.executed = []
+
+        @self.scheduler.register("test_job")
+        async def handler(bot, name: str):
+            self.executed.append(name)
+
+    async def asyncTearDown(self):
+        await self.scheduler.stop()
+        await self.engine.dispose()
+
+    async def wait_executed(self, count: int, timeout: float = 3.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while len(self.executed) < count:
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail(f"Выполнено {len(self.executed)} задач из {count}")
+            await asyncio.sleep(0.02)
+
+    async def test_jobs_run_in_deadline_order(self):
+        """Задачи выполняются по времени запуска, а не по порядку добавления"""
+        await self.scheduler.start(bot=None)
+        now = datetime.utcnow()
+        await self.scheduler.schedule("test_job", now + timedelta(seconds=0.4), {"name": "late"})
+        await self.scheduler.schedule("test_job", now + timedelta(seconds=0.2), {"name": "early"})
+
+        await self.wait_executed(2)
+        self.assertEqual(self.executed, ["early", "late"])
+
+    async def test_job_marked_done(self):
+        """Выполненная задача получает статус done"""
+        await self.scheduler.start(bot=None)
+        job = await self.scheduler.schedule("test_job", datetime.utcnow(), {"name": "now"})
+
+        await self.wait_executed(1)
+        await asyncio.sleep(0.05)
+        stored = await ScheduledJobRepository.get_by_id(job.id)
+        self.assertEqual(stored.status, JobStatus.DONE.value)
+
+    async def test_heap_rebuilt_on_start(self):
+        """Просроченные задачи из базы выполняются после перезапуска"""
+        await ScheduledJobRepository.create_job("test_job", datetime.utcnow() - timedelta(minutes=5), {"name": "missed"})
+
+        await self.scheduler.start(bot=None)
+        await self.wait_executed(1)
+        self.assertEqual(self.executed, ["missed"])
+
+    async def test_reschedule_by_key(self):
+        """Повторное планирование с тем же ключом переносит задачу"""
+        await self.scheduler.start(bot=None)
+        now = datetime.utcnow()
+        first = await self.scheduler.schedule("test_job", now + timedelta(seconds=0.1), {"name": "a"}, key="k")
+        second = await self.scheduler.schedule("test_job", now + timedelta(seconds=0.3), {"name": "b"}, key="k")
+
+        self.assertEqual(first.id, second.id)
+        await asyncio.sleep(0.2)
+        self.assertEqual(self.executed, [])
+        await self.wait_executed(1)
+        self.assertEqual(self.executed, ["b"])
+
+    async def test_cancelled_job_not_executed(self):
+        """Отмененная задача не выполняется"""
+        await self.scheduler.start(bot=None)
+        job = await self.scheduler.schedule("test_job", datetime.utcnow() + timedelta(seconds=0.1), {"name": "x"})
+        await self.scheduler.cancel(job.id)
+
+        await asyncio.sleep(0.3)
+        self.assertEqual(self.executed, [])
+
+    async def test_job_rescheduling_itself_stays_pending(self):
+        """Задача, перепланировавшая себя по тому же ключу, не помечается выполненной"""
+        @self.scheduler.register("periodic_job")
+        async def periodic(bot):
+            self.executed.append("tick")
+            await self.scheduler.schedule("periodic_job", datetime.utcnow() + timedelta(minutes=5), {}, key="periodic")
+
+        await self.scheduler.start(bot=None)
+        job = await self.scheduler.schedule("periodic_job", datetime.utcnow(), {}, key="periodic")
+
+        await self.wait_executed(1)
+        await asyncio.sleep(0.05)
+        stored = await ScheduledJobRepository.get_by_id(job.id)
+        self.assertEqual(stored.status, JobStatus.PENDING.value)
+        self.assertGreater(stored.run_at, datetime.utcnow())
+
+    async def wait_status(self, job_id: int, status: JobStatus, timeout: float = 3.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while (await ScheduledJobRepository.get_by_id(job_id)).status != status.value:
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail(f"Задача {job_id} не перешла в {status.value}")
+            await asyncio.sleep(0.02)
+
+    async def test_job_claimed_once(self):
+        """Задачу берет в работу только один запуск: pending -> running одним UPDATE"""
+        job = await ScheduledJobRepository.create_job("test_job", datetime.utcnow(), {"name": "once"})
+        await asyncio.gather(self.scheduler._execute(job.id), self.scheduler._execute(job.id))
+
+        self.assertEqual(self.executed, ["once"])
+        stored = await ScheduledJobRepository.get_by_id(job.id)
+        self.assertEqual(stored.status, JobStatus.DONE.value)
+
+    async def test_interrupted_jobs_on_stop_and_restart(self):
+        """При остановке resumable-задача возвращается с прогрессом, прочие помечаются failed"""
+        @self.scheduler.register("resumable_job", resumable=True)
+        async def resumable(bot, step: int = 0):
+            if step:
+                self.executed.append(f"resumed from {step}")
+                return
+            await self.scheduler.save_progress(step=3)
+            await asyncio.Event().wait()
+
+        @self.scheduler.register("once_job")
+        async def once(bot):
+            await asyncio.Event().wait()
+
+        await self.scheduler.start(bot=None)
+        resumable_job = await self.scheduler.schedule("resumable_job", datetime.utcnow(), {})
+        once_job = await self.scheduler.schedule("once_job", datetime.utcnow(), {})
+        await self.wait_status(resumable_job.id, JobStatus.RUNNING)
+        await self.wait_status(once_job.id, JobStatus.RUNNING)
+        await asyncio.sleep(0.05)
+
+        await self.scheduler.stop(timeout=0.05)
+        stored = await ScheduledJobRepository.get_by_id(resumable_job.id)
+        self.assertEqual((stored.status, stored.payload_dict), (JobStatus.PENDING.value, {"step": 3}))
+        stored = await ScheduledJobRepository.get_by_id(once_job.id)
+        self.assertEqual((stored.status, stored.error), (JobStatus.FAILED.value, INTERRUPTED_ERROR))
+
+        await self.scheduler.start(bot=None)
+        await self.wait_executed(1)
+        self.assertEqual(self.executed, ["resumed from 3"])
+
+    async def test_running_jobs_recovered_on_start(self):
+        """Задачи, оставшиеся в running после падения процесса, разбираются при запуске"""
+        @self.scheduler.register("resumable_job", resumable=True)
+        async def resumable(bot):
+            self.executed.append("resumed")
+
+        first = await ScheduledJobRepository.create_job("resumable_job", datetime.utcnow(), {})
+        second = await ScheduledJobRepository.create_job("test_job", datetime.utcnow(), {"name": "lost"})
+        await ScheduledJobRepository.claim(first.id)
+        await ScheduledJobRepository.claim(second.id)
+
+        await self.scheduler.start(bot=None)
+        await self.wait_executed(1)
+        self.assertEqual(self.executed, ["resumed"])
+        stored = await ScheduledJobRepository.get_by_id(second.id)
+        self.assertEqual(stored.status, JobStatus.FAILED.value)
+
+    async def test_interrupted_broadcast_resumes_without_duplicates(self):
+        """Прерванная рассылка продолжается с оставшихся получателей"""
+        recipients = list(range(1, 11))
+
+        @self.scheduler.register("broadcast_job", resumable=True)
+        async def broadcast(bot, delivered=None):
+            async with scheduled_jobs.broadcast_progress(delivered) as attempted:
+                await run_broadcast(bot, recipients, "text", concurrency=1, attempted=attempted)
+            self.executed.append("done")
+
+        patcher = mock.patch.object(scheduled_jobs, "job_scheduler", self.scheduler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        first_bot = FakeBot(stall_after=4)
+        await self.scheduler.start(bot=first_bot)
+        job = await self.scheduler.schedule("broadcast_job", datetime.utcnow(), {})
+        while len(first_bot.sent) < 4:
+            await asyncio.sleep(0.02)
+        await self.scheduler.stop(timeout=0.05)
+
+        stored = await ScheduledJobRepository.get_by_id(job.id)
+        # Пятому получателю отправка начата, но не подтверждена — повторять ее нельзя
+        self.assertEqual(stored.payload_dict["delivered"], [1, 2, 3, 4, 5])
+
+        second_bot = FakeBot()
+        await self.scheduler.start(bot=second_bot)
+        await self.wait_executed(1)
+        self.assertEqual(first_bot.sent + second_bot.sent, [1, 2, 3, 4] + list(range(6, 11)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Тесты для профилей логирования, выборки и ограничения частоты записей
+"""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from loguru import logger as loguru_logger
+
+from config.settings import settings
+from utils.logger import LogThrottle, complete_logging, parse_sample_rates, setup_logger
+
+
+def make_record(name: str, level: int, lineno: int = 10) -> logging.LogRecord:
+    return logging.LogRecord(name, level, "/app/handlers/user/menu.py", lineno, "сообщение", None, None)
+
+
+class TestLogThrottle(unittest.TestCase):
+    """Тесты выборки по логгерам и лимита на место кода"""
+
+    def test_parse_sample_rates(self):
+        """Пустые и неполные элементы пропускаются, доля ограничена [0, 1]"""
+        self.assertEqual(
+            parse_sample_rates("handlers.user=0.1, aiogram=2,,broken"),
+            {"handlers.user": 0.1, "aiogram": 1.0}
+        )
+        self.assertEqual(parse_sample_rates(""), {})
+
+    def test_sampling_uses_nearest_parent(self):
+        """Выборка идет по ближайшему родителю и не трогает WARNING и выше"""
+        throttle = LogThrottle({"handlers.user": 0.0, "handlers": 1.0}, per_minute=0)
+        self.assertEqual(throttle.rate_for("handlers.user.menu"), 0.0)
+        self.assertEqual(throttle.rate_for("handlers.admin.menu"), 1.0)
+        self.assertEqual(throttle.rate_for("services.metrics"), 1.0)
+
+        self.assertIsNone(throttle.check(make_record("handlers.user.menu", logging.INFO)))
+        self.assertIsNone(throttle.check(make_record("handlers.user.menu", logging.DEBUG)))
+        self.assertEqual(throttle.check(make_record("handlers.user.menu", logging.WARNING)), 0)
+        self.assertEqual(throttle.check(make_record("handlers.admin.menu", logging.INFO)), 0)
+        self.assertEqual(throttle.sampled_out, 2)
+
+    def test_rate_limit_per_call_site(self):
+        """Одно место кода — не больше лимита за окно, затем счетчик пропущенных"""
+        throttle = LogThrottle({}, per_minute=3)
+        now = [1000.0]
+        with mock.patch("utils.logger.time.monotonic", side_effect=lambda: now[0]):
+            results = [throttle.check(make_record("handlers.user.menu", logging.WARNING)) for _ in range(5)]
+            self.assertEqual(results, [0, 0, 0, None, None])
+            # Другая строка и ошибки лимитом не задеваются
+            self.assertEqual(throttle.check(make_record("handlers.user.menu", logging.WARNING, lineno=11)), 0)
+            self.assertEqual(throttle.check(make_record("handlers.user.menu", logging.ERROR)), 0)
+
+            now[0] += 61
+            self.assertEqual(throttle.check(make_record("handlers.user.menu", logging.WARNING)), 2)
+        self.assertEqual(throttle.suppressed, 2)
+
+
+class TestProductionProfile(unittest.IsolatedAsyncioTestCase):
+    """Тесты профиля production: JSON lines, порог уровня и фоновая запись"""
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.previous_cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        self.root_level = logging.getLogger().level
+        self.levels = {name: logging.getLogger(name).level for name in ("aiogram", "aiohttp", "sqlalchemy")}
+        for name, value in (("log_level", "INFO"), ("log_sample_rates", ""), ("log_rate_limit_per_minute", 2)):
+            patcher = mock.patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await complete_logging()
+        loguru_logger.remove()
+        loguru_logger.configure(patcher=None)
+        loguru_logger.add(sys.stderr)
+        logging.basicConfig(handlers=[], level=self.root_level, force=True)
+        for name, level in self.levels.items():
+            logging.getLogger(name).setLevel(level)
+        os.chdir(self.previous_cwd)
+        self.directory.cleanup()
+
+    def log_registration(self, log: logging.Logger, team: str) -> None:
+        log.info(f"Команда {team} зарегистрирована")
+
+    async def test_json_lines_with_stdlib_origin(self):
+        """Записи stdlib пишутся JSON с местом вызова; DEBUG не создается, лимит отсекает повторы"""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            setup_logger("production")
+        log = logging.getLogger("handlers.user.team_registration")
+        self.assertFalse(log.isEnabledFor(logging.DEBUG))
+
+        log.debug("Данные FSM")
+        for team in ("Alpha", "Beta", "Gamma"):
+            self.log_registration(log, team)
+        await complete_logging()
+
+        lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        entries = [entry for entry in lines if entry["logger"] == "handlers.user.team_registration"]
+        self.assertEqual([entry["msg"] for entry in entries], [
+            "Команда Alpha зарегистрирована", "Команда Beta зарегистрирована"
+        ])
+        self.assertEqual(entries[0]["level"], "INFO")
+        self.assertEqual(entries[0]["func"], "log_registration")
+
+        with open(os.path.join("logs", "bot.log"), encoding="utf-8") as file:
+            self.assertEqual(file.read().splitlines(), stdout.getvalue().splitlines())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Тесты для монитора задержки event loop
+"""
+
+import asyncio
+import time
+import unittest
+
+from services.loop_monitor import LoopMonitor
+
+
+def build_report_synchronously(seconds: float) -> None:
+    """Имитация тяжелой синхронной работы (openpyxl, большой JSON)"""
+    time.sleep(seconds)
+
+
+class TestLoopMonitor(unittest.IsolatedAsyncioTestCase):
+    """Тесты замера задержки и снятия стека при блокировке"""
+
+    async def asyncSetUp(self):
+        self.monitor = LoopMonitor(interval_ms=10, threshold_ms=50)
+        self.monitor.start()
+
+    async def asyncTearDown(self):
+        await self.monitor.stop()
+
+    async def test_idle_loop_has_no_stalls(self):
+        """Без блокировок задержка мала, стеки не снимаются"""
+        await asyncio.sleep(0.2)
+        stats = self.monitor.get_stats()
+        self.assertGreater(stats["samples"], 5)
+        self.assertLess(stats["p50_ms"], 50)
+        self.assertEqual(stats["stalls"], 0)
+
+    async def test_stall_is_attributed_to_task_and_frame(self):
+        """Блокировка замеряется, а стек и имя задачи снимаются во время нее"""
+        async def export_teams():
+            build_report_synchronously(0.3)
+
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(export_teams(), name="export-teams")
+        await asyncio.sleep(0.05)
+
+        stats = self.monitor.get_stats()
+        self.assertEqual(stats["stalls"], 1)
+        self.assertGreaterEqual(stats["max_ms"], 250)
+        stall = stats["recent_stalls"][0]
+        self.assertEqual(stall["task"], "export-teams")
+        self.assertIn("in build_report_synchronously", stall["culprit"])
+        self.assertTrue(any("export_teams" in line for line in self.monitor.recent[0].stack))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Тесты для обслуживания базы данных
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database.db_manager import _configure_sqlite, db_manager, get_session
+from database.models import ActionLog, Base, Notification, User
+from services.maintenance import MaintenanceService, next_maintenance_time
+from tests.db_helpers import use_in_memory_database
+
+
+class TestMaintenanceService(unittest.IsolatedAsyncioTestCase):
+    """Тесты порционной очистки, incremental_vacuum и бюджета времени"""
+
+    async def asyncSetUp(self):
+        # Файловая база с настройками соединения бота: WAL и auto_vacuum = INCREMENTAL
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(self.tmp.name, 'bot.db')}",
+            poolclass=StaticPool,
+        )
+        event.listen(self.engine.sync_engine, "connect", _configure_sqlite)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        db_manager.engine = self.engine
+        db_manager.async_session = async_sessionmaker(bind=self.engine, class_=AsyncSession, expire_on_commit=False)
+
+        now = datetime.utcnow()
+        async with get_session() as session:
+            user = User(telegram_id=1, full_name="Admin")
+            session.add(user)
+            await session.flush()
+            session.add_all(
+                [ActionLog(user_id=user.id, action="old", details="x" * 2000, created_at=now - timedelta(days=120))
+                 for _ in range(200)]
+                + [ActionLog(user_id=user.id, action="new", created_at=now) for _ in range(3)]
+                + [Notification(user_id=user.id, title="old", message="m", created_at=now - timedelta(days=40))
+                   for _ in range(5)]
+                + [Notification(user_id=user.id, title="new", message="m", created_at=now)]
+            )
+            await session.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.tmp.cleanup()
+
+    async def count(self, model) -> int:
+        async with get_session() as session:
+            return (await session.execute(select(func.count()).select_from(model))).scalar()
+
+    async def test_run_reclaims_pages(self):
+        """Старые строки удаляются порциями, освобожденные страницы возвращаются"""
+        service = MaintenanceService(chunk_size=7)
+        report = await service.run()
+
+        self.assertTrue(report.completed)
+        self.assertEqual(report.deleted, {"action_logs": 200, "notifications": 5})
+        self.assertEqual((await self.count(ActionLog), await self.count(Notification)), (3, 1))
+        self.assertGreater(report.pages_reclaimed, 0)
+        async with get_session() as session:
+            self.assertEqual((await session.execute(text("PRAGMA freelist_count"))).scalar(), 0)
+        self.assertEqual(set(report.durations), {"retention", "optimize", "vacuum", "checkpoint"})
+        self.assertIs(service.last_report, report)
+        self.assertIn("освобождено страниц", report.summary())
+
+    async def test_time_budget(self):
+        """При исчерпанном бюджете обслуживание останавливается и доделывается в следующий раз"""
+        report = await MaintenanceService(chunk_size=7, time_budget=timedelta(0)).run()
+
+        self.assertFalse(report.completed)
+        self.assertEqual(await self.count(ActionLog), 203)
+
+
+class TestMaintenanceSchedule(unittest.IsolatedAsyncioTestCase):
+    """Тесты расписания и очистки логов без файловой базы"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    def test_next_maintenance_time(self):
+        """Запуск — в ближайший час обслуживания строго после текущего момента"""
+        from config.settings import settings
+
+        hour = settings.maintenance_hour_utc
+        before = datetime(2026, 10, 19, hour, 0, 0) - timedelta(minutes=1)
+        self.assertEqual(next_maintenance_time(before), datetime(2026, 10, 19, hour))
+        self.assertEqual(next_maintenance_time(datetime(2026, 10, 19, hour)), datetime(2026, 10, 20, hour))
+
+    async def test_delete_old_logs_in_chunks(self):
+        """delete_old_logs удаляет порциями без загрузки строк в память"""
+        from database.repositories import ActionLogRepository
+
+        async with get_session() as session:
+            user = User(telegram_id=1, full_name="Admin")
+            session.add(user)
+            await session.flush()
+            session.add_all([
+                ActionLog(user_id=user.id, action="old", created_at=datetime.utcnow() - timedelta(days=100))
+                for _ in range(5)
+            ])
+            await session.commit()
+
+        self.assertEqual(await ActionLogRepository.delete_old_logs(days=90, chunk_size=2), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
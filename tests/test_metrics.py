@@ -0,0 +1,147 @@
+"""
+Тесты для метрик хендлеров и экрана диагностики
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import CallbackQuery, Update
+from aiohttp.test_utils import TestClient, TestServer
+
+import middlewares.metrics as metrics_middleware
+from database.repositories import UserRepository
+from handlers.admin.diagnostics import build_diagnostics_text
+from middlewares.metrics import MetricsMiddleware
+from services.metrics import Histogram, MetricsRegistry, TelegramTimingMiddleware, install_db_timing
+from services.update_executor import LaneExecutor
+from services.webhook_server import create_app
+from tests.db_helpers import use_in_memory_database
+
+
+def callback_update(update_id: int, data: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": 42, "is_bot": False, "first_name": "Admin"},
+            "chat_instance": "c",
+            "data": data,
+        },
+    })
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    """Тесты гистограмм, разбивки времени по видам и выдачи метрик"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        install_db_timing(self.engine.sync_engine)
+        self.registry = MetricsRegistry()
+        patcher = mock.patch.object(metrics_middleware, "metrics", self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.bot = Bot(token="123456:TEST")
+        self.bot.session.middleware(TelegramTimingMiddleware())
+
+        async def make_request(bot, method, timeout=None):
+            await asyncio.sleep(0.03)
+            return True
+
+        self.bot.session.make_request = make_request
+
+    async def asyncTearDown(self):
+        await self.bot.session.close()
+        await self.engine.dispose()
+
+    def test_histogram_quantiles(self):
+        """Квантили оцениваются внутри корзины, выход за последнюю — ее граница"""
+        histogram = Histogram()
+        for _ in range(90):
+            histogram.observe(0.003)
+        for _ in range(10):
+            histogram.observe(0.3)
+
+        self.assertLess(histogram.quantile(0.5), 0.005)
+        self.assertTrue(0.25 < histogram.quantile(0.95) <= 0.5)
+        self.assertEqual(histogram.counts[0], 90)
+
+        histogram.observe(60)
+        self.assertEqual(histogram.quantile(1.0), 10.0)
+        self.assertEqual(Histogram().quantile(0.95), 0.0)
+
+    async def test_time_is_split_by_kind(self):
+        """Время хендлера раскладывается на базу, Bot API и внешние API; ошибки считаются"""
+        from services.metrics import metrics
+
+        dispatcher = Dispatcher()
+        dispatcher.callback_query.middleware(MetricsMiddleware())
+        router = Router()
+
+        @router.callback_query(F.data == "sync")
+        async def sync_matches(callback: CallbackQuery):
+            await UserRepository.get_by_telegram_id(42)
+            with metrics.measure("external"):
+                await asyncio.sleep(0.06)
+            await callback.answer()
+
+        @router.callback_query(F.data == "broken")
+        async def broken(callback: CallbackQuery):
+            raise RuntimeError("boom")
+
+        dispatcher.include_router(router)
+        await dispatcher.feed_update(self.bot, callback_update(1, "sync"))
+        await dispatcher.feed_update(self.bot, callback_update(2, "sync"))
+        with self.assertRaises(RuntimeError):
+            await dispatcher.feed_update(self.bot, callback_update(3, "broken"))
+
+        stats = self.registry.handlers[f"{sync_matches.__module__}.{sync_matches.__qualname__}"]
+        self.assertEqual((stats.calls, stats.errors), (2, 0))
+        histograms = stats.histograms
+        self.assertGreater(histograms["db"].total, 0)
+        self.assertGreaterEqual(histograms["telegram"].total, 0.06)
+        self.assertGreaterEqual(histograms["external"].total, 0.12)
+        self.assertGreater(histograms["wall"].total, histograms["external"].total + histograms["telegram"].total)
+
+        top = self.registry.top(5)
+        self.assertEqual(top[0]["calls"], 2)
+        self.assertEqual(top[-1]["error_rate"], 1.0)
+        self.assertGreater(top[0]["external_p95_ms"], 50)
+
+        # Вне хендлера время никуда не записывается
+        await UserRepository.get_by_telegram_id(42)
+        self.assertEqual(stats.calls, 2)
+
+    async def test_prometheus_endpoint_and_diag_text(self):
+        """GET /metrics отдает гистограммы, экран диагностики собирается"""
+        from services.metrics import UpdateTimings
+
+        timings = UpdateTimings()
+        timings.db = 0.02
+        self.registry.record('handlers.admin.teams.view "x"', 0.2, timings, error=True)
+
+        executor = LaneExecutor(lambda update: None, lanes=2, concurrency=2, max_pending=10)
+        with mock.patch("services.webhook_server.metrics", self.registry):
+            for enabled, status in ((False, 404), (True, 200)):
+                app = create_app(executor, self.bot, "/webhook", "s3cret", metrics_endpoint=enabled)
+                async with TestClient(TestServer(app)) as client:
+                    response = await client.get("/metrics")
+                    self.assertEqual(response.status, status)
+                    body = await response.text()
+
+        labels = 'handler="handlers.admin.teams.view \\"x\\"",kind="wall"'
+        self.assertIn(f'bot_handler_seconds_bucket{{{labels},le="0.25"}} 1', body)
+        self.assertIn(f'bot_handler_seconds_bucket{{{labels},le="0.1"}} 0', body)
+        self.assertIn('bot_handler_errors_total{handler="handlers.admin.teams.view \\"x\\""} 1', body)
+        self.assertIn("bot_updates_pending 0", body)
+
+        with mock.patch("handlers.admin.diagnostics.metrics", self.registry):
+            text = build_diagnostics_text()
+        self.assertIn("admin.teams.view &quot;x&quot;", text)
+        self.assertIn("ошибок 100.0%", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Тесты для планировщика исходящих запросов
+"""
+
+import asyncio
+import time
+import unittest
+
+from services.outbound_scheduler import OutboundScheduler, Priority, outbound_priority, current_priority
+
+
+class TestOutboundScheduler(unittest.IsolatedAsyncioTestCase):
+    """Тесты приоритетов и лимитов планировщика"""
+
+    async def asyncTearDown(self):
+        await self.scheduler.stop()
+
+    async def test_interactive_overtakes_bulk(self):
+        """Интерактивный запрос обгоняет очередь рассылки"""
+        self.scheduler = OutboundScheduler(global_rate=50, global_burst=1, chat_interval=0)
+        order = []
+
+        async def send(priority, chat_id):
+            await self.scheduler.acquire(priority, chat_id)
+            order.append(priority)
+
+        bulk = [asyncio.create_task(send(Priority.BULK, chat_id)) for chat_id in range(5)]
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(send(Priority.INTERACTIVE, 999))
+        await asyncio.gather(*bulk, interactive)
+
+        self.assertLess(order.index(Priority.INTERACTIVE), 3)
+
+    async def test_priority_order_when_queued_together(self):
+        """Очередь обслуживается в порядке классов приоритета"""
+        self.scheduler = OutboundScheduler(global_rate=100, global_burst=1, chat_interval=0)
+        self.scheduler._bucket.tokens = 0
+        order = []
+
+        async def send(priority, chat_id):
+            await self.scheduler.acquire(priority, chat_id)
+            order.append(priority)
+
+        tasks = [
+            asyncio.create_task(send(Priority.BULK, 1)),
+            asyncio.create_task(send(Priority.TRANSACTIONAL, 2)),
+            asyncio.create_task(send(Priority.INTERACTIVE, 3)),
+        ]
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(order, [Priority.INTERACTIVE, Priority.TRANSACTIONAL, Priority.BULK])
+
+    async def test_chat_interval_for_bulk(self):
+        """Рассылка соблюдает интервал между сообщениями в один чат"""
+        self.scheduler = OutboundScheduler(global_rate=1000, global_burst=1000, chat_interval=0.1)
+
+        started = time.monotonic()
+        for _ in range(3):
+            await self.scheduler.acquire(Priority.BULK, 42)
+        elapsed = time.monotonic() - started
+
+        self.assertGreaterEqual(elapsed, 0.18)
+
+    async def test_stats_count_granted_requests(self):
+        """Метрики учитывают выданные слоты"""
+        self.scheduler = OutboundScheduler(global_rate=1000, global_burst=1000, chat_interval=0)
+
+        await self.scheduler.acquire(Priority.INTERACTIVE, 1)
+        await self.scheduler.acquire(Priority.BULK, 2)
+        stats = self.scheduler.get_stats()
+
+        self.assertEqual(stats["interactive"]["granted"], 1)
+        self.assertEqual(stats["bulk"]["granted"], 1)
+        self.assertEqual(stats["bulk"]["queued"], 0)
+
+    async def test_priority_context(self):
+        """Контекст приоритета восстанавливается после выхода из блока"""
+        self.scheduler = OutboundScheduler()
+        self.assertEqual(current_priority(), Priority.INTERACTIVE)
+        with outbound_priority(Priority.BULK):
+            self.assertEqual(current_priority(), Priority.BULK)
+        self.assertEqual(current_priority(), Priority.INTERACTIVE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Тесты для SQL-профилировщика и поиска N+1
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import CallbackQuery, Update
+
+import middlewares.sql_profiler as sql_profiler_middleware
+from database.repositories import UserRepository
+from middlewares.sql_profiler import SqlProfilerMiddleware
+from services.sql_profiler import BACKGROUND, SqlProfiler, statement_shape
+from tests.db_helpers import use_in_memory_database
+
+
+def callback_update(update_id: int, data: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": 42, "is_bot": False, "first_name": "Admin"},
+            "chat_instance": "c",
+            "data": data,
+        },
+    })
+
+
+class TestSqlProfiler(unittest.IsolatedAsyncioTestCase):
+    """Тесты формы запросов, N+1 по апдейтам, медленных запросов и включения на время"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        self.profiler = SqlProfiler(n_plus_one_threshold=5, slow_query_ms=10_000, duration_minutes=5)
+        self.profiler.install(self.engine.sync_engine)
+        patcher = mock.patch.object(sql_profiler_middleware, "sql_profiler", self.profiler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.bot = Bot(token="123456:TEST")
+        self.dispatcher = Dispatcher()
+        self.dispatcher.callback_query.middleware(SqlProfilerMiddleware())
+        router = Router()
+
+        @router.callback_query(F.data == "search")
+        async def search_pagination(callback: CallbackQuery):
+            for user_id in range(1, 8):
+                await UserRepository.get_by_id(user_id)
+
+        @router.callback_query(F.data == "profile")
+        async def profile(callback: CallbackQuery):
+            await UserRepository.get_by_telegram_id(42)
+            await UserRepository.get_by_telegram_id(43)
+
+        self.dispatcher.include_router(router)
+
+    async def asyncTearDown(self):
+        self.profiler.disable()
+        await self.bot.session.close()
+        await self.engine.dispose()
+
+    def test_statement_shape(self):
+        """Пробелы нормализуются, списки IN схлопываются"""
+        self.assertEqual(
+            statement_shape("SELECT teams.id\n  FROM teams WHERE teams.id IN (?, ?, ?) AND teams.status = ?"),
+            "SELECT teams.id FROM teams WHERE teams.id IN (?…) AND teams.status = ?"
+        )
+        self.assertEqual(statement_shape("SELECT 1 WHERE x IN (?)"), "SELECT 1 WHERE x IN (?)")
+
+    async def test_n_plus_one_is_attributed_to_handler(self):
+        """Запрос в цикле находится и относится к хендлеру; выключенный профилировщик ничего не пишет"""
+        await self.dispatcher.feed_update(self.bot, callback_update(1, "search"))
+        self.assertEqual(self.profiler.statements, 0)
+
+        self.profiler.enable()
+        for update_id, data in enumerate(["search", "profile", "search"], start=2):
+            await self.dispatcher.feed_update(self.bot, callback_update(update_id, data))
+
+        report = self.profiler.get_report()
+        self.assertEqual((report["updates"], report["statements"]), (3, 16))
+        self.assertEqual(len(report["n_plus_one"]), 1)
+        finding = report["n_plus_one"][0]
+        self.assertTrue(finding["handler"].endswith("search_pagination"))
+        self.assertIn("FROM users WHERE users.id = ?", finding["statement"])
+        self.assertEqual((finding["updates"], finding["max_repeats"], finding["statements"]), (2, 7, 14))
+        self.assertIn("search_pagination: до 7 раз за апдейт, в 2 апд.", self.profiler.format_report())
+
+    async def test_slow_queries_and_background(self):
+        """Медленные запросы хранятся с хендлером, запросы вне апдейтов — как фоновые"""
+        self.profiler.slow_query = 0
+        self.profiler.enable()
+        await self.dispatcher.feed_update(self.bot, callback_update(1, "profile"))
+        await UserRepository.get_by_telegram_id(44)
+
+        handlers = [item["handler"] for item in self.profiler.get_report()["slow_queries"]]
+        self.assertEqual(len(handlers), 3)
+        self.assertEqual(handlers.count(BACKGROUND), 1)
+
+        for _ in range(30):
+            self.profiler.observe("SELECT 1", 1.0)
+        self.assertEqual(len(self.profiler.slow_queries), 20)
+
+    async def test_disables_itself(self):
+        """Профилировщик сам выключается по таймеру и пишет отчет в лог"""
+        self.profiler.enable(minutes=0.05 / 60)
+        self.assertTrue(self.profiler.enabled)
+        with self.assertLogs("services.sql_profiler", level="INFO") as logs:
+            await asyncio.sleep(0.1)
+        self.assertFalse(self.profiler.enabled)
+        self.assertIn("SQL-профиль за", logs.output[-1])
+
+        await self.dispatcher.feed_update(self.bot, callback_update(1, "search"))
+        self.assertEqual(self.profiler.get_report()["updates"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Тесты для репозитория агрегированной статистики
+"""
+
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from database.db_manager import get_session
+from database.models import Game, Team, Tournament, TournamentStatus, User, UserRole
+from database.repositories import ActivityRepository, StatisticsRepository
+from tests.db_helpers import use_in_memory_database
+
+
+class TestStatisticsRepository(unittest.IsolatedAsyncioTestCase):
+    """Тесты значений снимков и количества SQL-запросов на экран"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        now = datetime.utcnow()
+
+        async with get_session() as session:
+            users = [
+                User(telegram_id=1, full_name="Admin", role=UserRole.ADMIN.value, language="ru", region="kg"),
+                User(telegram_id=2, full_name="Player", language="ky", region="kg"),
+                User(telegram_id=3, full_name="Blocked", language="ru", region="kz", is_blocked=True,
+                     created_at=now - timedelta(days=60)),
+            ]
+            game = Game(name="Dota 2", short_name="dota", max_players=5)
+            session.add_all(users + [game])
+            await session.flush()
+
+            tournaments = []
+            for status, created_ago in [
+                (TournamentStatus.REGISTRATION, 1),
+                (TournamentStatus.IN_PROGRESS, 10),
+                (TournamentStatus.COMPLETED, 40),
+            ]:
+                tournaments.append(Tournament(
+                    game_id=game.id, name=f"Cup {status.value}", format="single_elimination",
+                    max_teams=8, status=status.value, created_by=users[0].id,
+                    registration_start=now, registration_end=now, tournament_start=now, edit_deadline=now,
+                    created_at=now - timedelta(days=created_ago),
+                ))
+            session.add_all(tournaments)
+            await session.flush()
+
+            session.add_all([
+                Team(tournament_id=tournaments[0].id, name="A", captain_id=users[1].id),
+                Team(tournament_id=tournaments[0].id, name="B", captain_id=users[0].id),
+                Team(tournament_id=tournaments[1].id, name="C", captain_id=users[1].id),
+            ])
+            await session.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    @contextmanager
+    def count_queries(self):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(self.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(self.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    async def test_general_stats(self):
+        """Общая статистика: 2 запроса"""
+        with self.count_queries() as statements:
+            stats = await StatisticsRepository.get_general_stats()
+
+        self.assertEqual(len(statements), 2)
+        self.assertEqual((stats.total_users, stats.total_tournaments, stats.total_teams), (3, 3, 3))
+        self.assertEqual((stats.users_30d, stats.tournaments_30d, stats.tournaments_7d), (2, 2, 1))
+        self.assertEqual(stats.languages, {"ru": 1, "ky": 1})
+        self.assertEqual(stats.regions, {"kg": 2})
+
+    async def test_user_stats(self):
+        """Статистика пользователей: 4 запроса, без загрузки списков"""
+        await ActivityRepository.add_activity(datetime.utcnow().date(), [2, 3])
+
+        with self.count_queries() as statements:
+            stats = await StatisticsRepository.get_user_stats(top_limit=5)
+
+        self.assertEqual(len(statements), 4)
+        self.assertEqual((stats.total, stats.active, stats.admins, stats.blocked), (3, 2, 1, 1))
+        self.assertEqual(len(stats.daily_registrations), 7)
+        self.assertEqual(sum(stats.daily_registrations.values()), 2)
+        self.assertEqual((stats.dau, stats.wau, stats.mau), (2, 2, 2))
+        self.assertEqual(stats.most_active, [("Player", 1)])
+
+    async def test_tournament_screens(self):
+        """Все экраны турнирной статистики: 1 запрос на снимок + 1 на топ"""
+        with self.count_queries() as statements:
+            stats = await StatisticsRepository.get_tournament_stats()
+            top = await StatisticsRepository.get_top_tournaments_by_teams(5)
+
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(stats.total, 3)
+        self.assertEqual((stats.active, stats.completed, stats.upcoming), (1, 1, 1))
+        self.assertEqual(stats.created_30d, 2)
+        self.assertAlmostEqual(stats.completion_rate, 100 / 3)
+        self.assertEqual(stats.by_game, {"Dota 2": 3})
+        self.assertEqual(top[0], ("Cup registration", 2))
+
+    async def test_team_stats(self):
+        """Статистика команд: 3 запроса"""
+        with self.count_queries() as statements:
+            stats = await StatisticsRepository.get_team_stats()
+
+        self.assertEqual(len(statements), 3)
+        self.assertEqual((stats.total, stats.pending, stats.approved), (3, 3, 0))
+        self.assertEqual(stats.by_tournament, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
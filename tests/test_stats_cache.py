@@ -0,0 +1,73 @@
+"""
+Тесты для кэша снимков статистики
+"""
+
+import asyncio
+import unittest
+
+from database.stats_cache import StatsCache, TEAMS, USERS
+
+
+class TestStatsCache(unittest.IsolatedAsyncioTestCase):
+    """Тесты TTL, инвалидации по тегам и фонового пересчета"""
+
+    async def asyncSetUp(self):
+        self.cache = StatsCache(ttl=60, max_stale=600)
+        self.calls = 0
+
+    async def loader(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.calls
+
+    async def test_fresh_entry_is_hit(self):
+        """Свежий снимок отдается без пересчета"""
+        self.assertEqual(await self.cache.get_or_compute("k", self.loader, (TEAMS,)), 1)
+        self.assertEqual(await self.cache.get_or_compute("k", self.loader, (TEAMS,)), 1)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual((self.cache.stats.hits, self.cache.stats.misses), (1, 1))
+
+    async def test_concurrent_misses_share_one_computation(self):
+        """Параллельные промахи по одному ключу считают снимок один раз"""
+        results = await asyncio.gather(*[
+            self.cache.get_or_compute("k", self.loader, (TEAMS,)) for _ in range(5)
+        ])
+        self.assertEqual(results, [1] * 5)
+        self.assertEqual(self.calls, 1)
+
+    async def test_invalidated_entry_served_stale_then_refreshed(self):
+        """После записи отдается старый снимок, а в фоне считается новый"""
+        await self.cache.get_or_compute("k", self.loader, (TEAMS,))
+        self.cache.invalidate(USERS)
+        self.assertEqual(await self.cache.get_or_compute("k", self.loader, (TEAMS,)), 1)
+        self.assertEqual(self.cache.stats.hits, 1)
+
+        self.cache.invalidate(TEAMS)
+        self.assertEqual(await self.cache.get_or_compute("k", self.loader, (TEAMS,)), 1)
+        await asyncio.sleep(0.05)
+        self.assertEqual(await self.cache.get_or_compute("k", self.loader, (TEAMS,)), 2)
+        self.assertEqual(self.cache.stats.stale_hits, 1)
+        self.assertEqual(self.cache.stats.refreshes, 1)
+
+    async def test_write_during_computation_keeps_entry_stale(self):
+        """Запись во время пересчета не теряется: снимок остается устаревшим"""
+        async def slow_loader():
+            self.calls += 1
+            self.cache.invalidate(TEAMS)
+            return self.calls
+
+        await self.cache.get_or_compute("k", slow_loader, (TEAMS,))
+        await self.cache.get_or_compute("k", slow_loader, (TEAMS,))
+        self.assertEqual(self.cache.stats.stale_hits, 1)
+
+    async def test_too_old_entry_recomputed(self):
+        """Снимок старше max_stale не отдается"""
+        self.cache.ttl = 0
+        self.cache.max_stale = 0
+        await self.cache.get_or_compute("k", self.loader, (TEAMS,))
+        self.assertEqual(await self.cache.get_or_compute("k", self.loader, (TEAMS,)), 2)
+        self.assertEqual(self.cache.stats.misses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
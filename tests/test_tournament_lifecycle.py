@@ -0,0 +1,107 @@
+"""
+Тесты для сервиса жизненного цикла турнира
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from database.db_manager import get_session
+from database.models import Game, Match, MatchStatus, Tournament, TournamentStatus, User
+from database.repositories import TournamentRepository
+from services.tournament_lifecycle import TournamentLifecycle, LifecycleEvent
+from tests.db_helpers import use_in_memory_database
+
+
+class TestTournamentLifecycle(unittest.IsolatedAsyncioTestCase):
+    """Тесты переходов статусов и событий"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        self.lifecycle = TournamentLifecycle()
+        self.events = []
+
+        for event in LifecycleEvent:
+            @self.lifecycle.on(event)
+            async def record(bot, tournament, late, event=event):
+                self.events.append((event, tournament.id, late))
+
+        now = datetime.utcnow()
+        async with get_session() as session:
+            user = User(telegram_id=1, full_name="Admin")
+            game = Game(name="Dota 2", short_name="dota", max_players=5)
+            session.add_all([user, game])
+            await session.flush()
+            self.tournament = Tournament(
+                game_id=game.id,
+                name="Cup",
+                format="single_elimination",
+                max_teams=8,
+                region="kg",
+                status=TournamentStatus.REGISTRATION.value,
+                registration_start=now - timedelta(days=2),
+                registration_end=now - timedelta(minutes=1),
+                tournament_start=now + timedelta(days=1),
+                edit_deadline=now + timedelta(hours=12),
+                created_by=user.id,
+            )
+            session.add(self.tournament)
+            await session.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def test_close_registration_fires_once(self):
+        """Закрытие регистрации меняет статус и рассылает событие один раз"""
+        self.assertTrue(await self.lifecycle.close_registration(None, self.tournament.id))
+        self.assertFalse(await self.lifecycle.close_registration(None, self.tournament.id))
+
+        stored = await TournamentRepository.get_by_id(self.tournament.id)
+        self.assertEqual(stored.status, TournamentStatus.REGISTRATION_CLOSED.value)
+        self.assertEqual(self.events, [(LifecycleEvent.REGISTRATION_CLOSED, self.tournament.id, False)])
+
+    async def test_active_list_filters_by_status(self):
+        """Турнир с закрытой регистрацией пропадает из списка активных"""
+        active = await TournamentRepository.get_active_tournaments("kg")
+        self.assertEqual([t.id for t in active], [self.tournament.id])
+
+        await self.lifecycle.close_registration(None, self.tournament.id)
+        self.assertEqual(await TournamentRepository.get_active_tournaments("kg"), [])
+
+    async def test_late_transition_is_flagged(self):
+        """Переход, выполненный спустя часы после дедлайна, помечается как запоздалый"""
+        await TournamentRepository.update_field(
+            self.tournament.id, "registration_end", datetime.utcnow() - timedelta(days=1)
+        )
+        await self.lifecycle.close_registration(None, self.tournament.id)
+        self.assertTrue(self.events[0][2])
+
+    async def test_completion_after_last_match(self):
+        """Турнир завершается, только когда не осталось несыгранных матчей"""
+        await self.lifecycle.start_tournament(None, self.tournament.id)
+        async with get_session() as session:
+            session.add_all([
+                Match(tournament_id=self.tournament.id, round_number=1, match_number=1,
+                      status=MatchStatus.COMPLETED.value),
+                Match(tournament_id=self.tournament.id, round_number=2, match_number=1,
+                      status=MatchStatus.PENDING.value),
+            ])
+            await session.commit()
+
+        self.assertFalse(await self.lifecycle.complete_if_finished(None, self.tournament.id))
+
+        async with get_session() as session:
+            match = await session.get(Match, 2)
+            match.status = MatchStatus.COMPLETED.value
+            await session.commit()
+
+        self.assertTrue(await self.lifecycle.complete_if_finished(None, self.tournament.id))
+        stored = await TournamentRepository.get_by_id(self.tournament.id)
+        self.assertEqual(stored.status, TournamentStatus.COMPLETED.value)
+        self.assertEqual(
+            [event for event, _, _ in self.events],
+            [LifecycleEvent.TOURNAMENT_STARTED, LifecycleEvent.TOURNAMENT_COMPLETED]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
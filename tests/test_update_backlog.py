@@ -0,0 +1,143 @@
+"""
+Тесты для разбора накопившихся апдейтов после перезапуска
+"""
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from aiogram import Bot
+from aiogram.types import Update, WebhookInfo
+
+from database.repositories import UpdateCursorRepository
+from middlewares.backlog import StaleCallbackMiddleware
+from services.update_backlog import UpdateBacklog
+import middlewares.backlog as backlog_middleware
+from services.update_executor import LaneExecutor
+from tests.db_helpers import use_in_memory_database
+
+
+def callback_update(update_id: int, user_id: int) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": "Captain", "language_code": "ky"},
+            "chat_instance": "c",
+            "data": "confirm_registration",
+            "message": {
+                "message_id": 1,
+                "date": 1760000000,
+                "chat": {"id": user_id, "type": "private"},
+                "text": "Подтвердите регистрацию",
+            },
+        },
+    })
+
+
+class TestUpdateBacklog(unittest.IsolatedAsyncioTestCase):
+    """Тесты отметки update_id, разбора очереди и устаревших нажатий"""
+
+    async def asyncSetUp(self):
+        self.engine = await use_in_memory_database()
+        self.bot = Bot(token="123456:TEST")
+        self.handled = []
+        self.backlogs = []
+
+    async def asyncTearDown(self):
+        for backlog in self.backlogs:
+            await backlog.stop()
+        await self.bot.session.close()
+        await self.engine.dispose()
+
+    def executor(self, release: asyncio.Event = None) -> LaneExecutor:
+        async def process(update: Update):
+            if release and update.update_id % 2:
+                await release.wait()
+            self.handled.append(update.update_id)
+
+        return LaneExecutor(process, lanes=4, concurrency=4, max_pending=100)
+
+    async def start_backlog(self, executor: LaneExecutor, pending: int, **kwargs) -> UpdateBacklog:
+        options = dict(save_interval=60, callback_max_age=30)
+        options.update(kwargs)
+        backlog = UpdateBacklog(**options)
+        info = WebhookInfo(url="", has_custom_certificate=False, pending_update_count=pending)
+        with mock.patch.object(Bot, "get_webhook_info", mock.AsyncMock(return_value=info)):
+            await backlog.start(self.bot, executor)
+        self.backlogs.append(backlog)
+        return backlog
+
+    async def test_committed_id_waits_for_earlier_updates(self):
+        """Отметка не перескакивает через необработанные апдейты"""
+        release = asyncio.Event()
+        executor = self.executor(release)
+        executor.start()
+        for update_id in range(100, 106):
+            executor.submit_nowait(callback_update(update_id, update_id))
+        await asyncio.sleep(0.01)
+
+        # Четные обработаны, 101 еще висит
+        self.assertEqual(executor.committed_update_id, 100)
+        release.set()
+        await executor.stop()
+        self.assertEqual(executor.committed_update_id, 105)
+
+    async def test_restart_skips_processed_and_measures_drain(self):
+        """После перезапуска повторы отбрасываются, а разбор очереди замеряется"""
+        executor = self.executor()
+        executor.start()
+        backlog = await self.start_backlog(executor, pending=0)
+        for update_id in range(1, 6):
+            executor.submit_nowait(callback_update(update_id, update_id))
+        await executor.stop()
+        await backlog.stop()
+        self.assertEqual((await UpdateCursorRepository.get_cursor(self.bot.id))[0], 5)
+
+        # Telegram присылает заново 4 и 5 (получение не подтверждено) и три новых
+        self.handled = []
+        restarted = self.executor()
+        restarted.start()
+        backlog = await self.start_backlog(restarted, pending=5)
+        self.assertEqual(restarted.skip_through, 5)
+        for update_id in range(4, 9):
+            restarted.submit_nowait(callback_update(update_id, update_id))
+        await restarted.stop()
+        backlog._check_drained()
+
+        self.assertEqual(sorted(self.handled), [6, 7, 8])
+        stats = backlog.get_stats()
+        self.assertEqual((stats["backlog_size"], stats["duplicates"], stats["drained"]), (5, 2, True))
+        self.assertEqual(stats["committed_update_id"], 8)
+
+    async def test_stale_callbacks_get_retry_reply(self):
+        """Нажатия из очереди после долгого простоя не обрабатываются, новые — обрабатываются"""
+        await UpdateCursorRepository.save_cursor(self.bot.id, 10)
+        executor = self.executor()
+        backlog = await self.start_backlog(executor, pending=2)
+        backlog.offline_since = datetime.utcnow() - timedelta(minutes=5)
+        for update_id in (11, 12, 13):
+            executor.submit_nowait(callback_update(update_id, 42))
+
+        middleware = StaleCallbackMiddleware()
+        handled = []
+
+        async def handler(event, data):
+            handled.append(data["event_update"].update_id)
+
+        send_message = mock.AsyncMock()
+        with mock.patch.object(backlog_middleware, "update_backlog", backlog), \
+                mock.patch.object(Bot, "send_message", send_message):
+            for update_id in (11, 12, 13):
+                update = callback_update(update_id, 42)
+                await middleware(handler, update.callback_query, {"event_update": update, "bot": self.bot})
+
+        self.assertEqual(handled, [13])
+        self.assertEqual(backlog.stale_callbacks, 2)
+        self.assertEqual(send_message.await_count, 2)
+        self.assertIn("Баскычты", send_message.await_args.args[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+Тесты для полос апдейтов с порядком внутри пользователя
+"""
+
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from aiogram import Bot, Router
+from aiogram.fsm.context import FSMContext
+from aiogram.methods import SendMessage
+from aiogram.types import Message, Update
+
+import handlers.admin.broadcast as broadcast
+from services.update_executor import LaneDispatcher, LaneExecutor
+
+
+def message_update(update_id: int, user_id: int, text: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760000000,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Captain"},
+            "text": text,
+        },
+    })
+
+
+def album_photo_update(update_id: int, user_id: int, media_group_id: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760000000,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Admin"},
+            "media_group_id": media_group_id,
+            "photo": [{"file_id": f"photo{update_id}", "file_unique_id": f"u{update_id}", "width": 1, "height": 1}],
+        },
+    })
+
+
+class TestUpdateExecutor(unittest.IsolatedAsyncioTestCase):
+    """Тесты порядка, параллельности, лимита одновременности и backpressure"""
+
+    async def test_order_within_user_parallel_between_users(self):
+        """Апдейты пользователя идут строго по очереди, разные пользователи — параллельно"""
+        active = {}
+        overlaps = []
+        seen = {}
+        concurrent = 0
+        max_concurrent = 0
+
+        async def process(update: Update):
+            nonlocal concurrent, max_concurrent
+            user_id = update.message.from_user.id
+            if active.get(user_id):
+                overlaps.append(user_id)
+            active[user_id] = True
+            concurrent += 1
+            max_concurrent = max(max_concurrent, concurrent)
+            await asyncio.sleep(0.001 * (update.update_id % 3))
+            seen.setdefault(user_id, []).append(update.update_id)
+            concurrent -= 1
+            active[user_id] = False
+
+        executor = LaneExecutor(process, lanes=8, concurrency=4, max_pending=1000)
+        executor.start()
+        for update_id in range(200):
+            executor.submit_nowait(message_update(update_id, update_id % 20, "x"))
+        await executor.stop()
+
+        self.assertEqual(overlaps, [])
+        for user_id, update_ids in seen.items():
+            self.assertEqual(update_ids, sorted(update_ids))
+        self.assertEqual(max_concurrent, 4)
+        stats = executor.get_stats()
+        self.assertEqual((stats["processed"], stats["pending"], stats["in_flight"]), (200, 0, 0))
+        self.assertGreater(stats["max_lane_depth"], 1)
+
+    async def test_submit_waits_for_space(self):
+        """При заполнении submit ждет места, а submit_nowait отказывает"""
+        release = asyncio.Event()
+
+        async def process(update: Update):
+            await release.wait()
+
+        executor = LaneExecutor(process, lanes=2, concurrency=2, max_pending=2)
+        executor.start()
+        await executor.submit(message_update(1, 1, "a"))
+        await executor.submit(message_update(2, 2, "b"))
+        self.assertFalse(executor.submit_nowait(message_update(3, 3, "c")))
+
+        waiting = asyncio.create_task(executor.submit(message_update(4, 4, "d")))
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiting.done())
+
+        release.set()
+        await asyncio.wait_for(waiting, 1)
+        await executor.stop()
+        stats = executor.get_stats()
+        self.assertEqual((stats["processed"], stats["rejected"], stats["max_pending"]), (3, 1, 2))
+
+    async def test_dispatcher_routes_through_lanes(self):
+        """LaneDispatcher обрабатывает апдейты в полосах, ошибки хендлера не останавливают полосу"""
+        bot = Bot(token="123456:TEST")
+        self.addAsyncCleanup(bot.session.close)
+        dispatcher = LaneDispatcher()
+        handled = []
+        router = Router()
+
+        @router.message()
+        async def on_message(message: Message):
+            if message.text == "boom":
+                raise RuntimeError("boom")
+            handled.append(message.text)
+
+        dispatcher.include_router(router)
+        executor = dispatcher.start_lanes(bot, lanes=4, concurrency=2, max_pending=10)
+
+        for update_id, text in enumerate(["first", "boom", "second"]):
+            self.assertIsNone(await dispatcher.feed_update(bot, message_update(update_id, 42, text)))
+        await dispatcher.stop_lanes()
+
+        self.assertEqual(handled, ["first", "second"])
+        self.assertEqual((executor.processed, executor.failed), (2, 1))
+        self.assertIsNone(dispatcher.lane_executor)
+
+    async def test_album_is_collected_without_holding_the_lane(self):
+        """Файлы альбома проходят полосу сразу, ответ администратору — один, после паузы"""
+        bot = Bot(token="123456:TEST")
+        self.addAsyncCleanup(bot.session.close)
+        replies = []
+
+        async def make_request(bot, method, timeout=None):
+            replies.append(method.text)
+            return Message.model_validate({
+                "message_id": 1000, "date": 1760000000, "chat": {"id": method.chat_id, "type": "private"},
+                "text": method.text,
+            })
+
+        bot.session.make_request = make_request
+        patcher = mock.patch.object(broadcast, "ALBUM_COLLECT_DELAY", 0.2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        dispatcher = LaneDispatcher()
+        router = Router()
+
+        @router.message()
+        async def on_album_item(message: Message, state: FSMContext):
+            await broadcast._collect_album_item(message, state)
+
+        dispatcher.include_router(router)
+        dispatcher.start_lanes(bot, lanes=4, concurrency=2, max_pending=20)
+
+        started = time.monotonic()
+        for update_id in range(12):
+            await dispatcher.feed_update(bot, album_photo_update(update_id, 42, "album"))
+        await dispatcher.stop_lanes()
+        self.assertLess(time.monotonic() - started, 0.2)
+        self.assertEqual(replies, [])
+
+        await asyncio.sleep(0.3)
+        self.assertEqual(len(replies), 1)
+        self.assertIn("Файлов: 10/10", replies[0])
+        self.assertIn("Не добавлено сверх лимита: 2", replies[0])
+        data = await dispatcher.fsm.get_context(bot, chat_id=42, user_id=42).get_data()
+        self.assertEqual([item["file_id"] for item in data["attachment"]["media"]], [f"photo{i}" for i in range(10)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Тесты для приема апдейтов через webhook
+"""
+
+import asyncio
+import socket
+import unittest
+from unittest import mock
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestClient, TestServer
+
+from config.settings import settings
+from services.update_executor import LaneDispatcher, LaneExecutor
+from services.webhook_server import SECRET_HEADER, create_app, run_webhook
+
+SECRET = "s3cret"
+
+
+def message_update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760000000,
+            "chat": {"id": 42, "type": "private"},
+            "from": {"id": 42, "is_bot": False, "first_name": "Captain"},
+            "text": text,
+        },
+    }
+
+
+class TestWebhookServer(unittest.IsolatedAsyncioTestCase):
+    """Тесты проверки токена, полос с backpressure и разбора воркерами"""
+
+    async def asyncSetUp(self):
+        self.bot = Bot(token="123456:TEST")
+        self.dispatcher = Dispatcher()
+        self.handled = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+        router = Router()
+
+        @router.message()
+        async def on_message(message: Message):
+            await self.release.wait()
+            self.handled.append(message.text)
+
+        self.dispatcher.include_router(router)
+
+    async def asyncTearDown(self):
+        await self.bot.session.close()
+
+    def executor(self, concurrency: int, max_pending: int) -> LaneExecutor:
+        return LaneExecutor(
+            lambda update: self.dispatcher.feed_update(self.bot, update),
+            lanes=4,
+            concurrency=concurrency,
+            max_pending=max_pending
+        )
+
+    async def client(self, executor: LaneExecutor) -> TestClient:
+        client = TestClient(TestServer(create_app(executor, self.bot, "/webhook", SECRET)))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+        return client
+
+    async def test_rejects_wrong_secret(self):
+        """Без верного секретного токена апдейт не принимается"""
+        executor = self.executor(concurrency=1, max_pending=10)
+        client = await self.client(executor)
+
+        response = await client.post("/webhook", json=message_update(1, "hi"), headers={SECRET_HEADER: "wrong"})
+        self.assertEqual(response.status, 401)
+        response = await client.post("/webhook", json=message_update(1, "hi"))
+        self.assertEqual(response.status, 401)
+        self.assertEqual(executor.get_stats()["received"], 0)
+
+    async def test_acknowledges_and_processes(self):
+        """Ответ 200 приходит сразу, апдейты обрабатываются воркерами полос"""
+        executor = self.executor(concurrency=2, max_pending=10)
+        executor.start()
+        client = await self.client(executor)
+        self.release.clear()
+
+        for update_id in range(3):
+            response = await client.post(
+                "/webhook", json=message_update(update_id, f"m{update_id}"), headers={SECRET_HEADER: SECRET}
+            )
+            self.assertEqual(response.status, 200)
+        # Хендлеры еще заблокированы, а Telegram уже получил ответ
+        self.assertEqual(self.handled, [])
+
+        self.release.set()
+        await executor.stop()
+        self.assertEqual(sorted(self.handled), ["m0", "m1", "m2"])
+        stats = executor.get_stats()
+        self.assertEqual((stats["processed"], stats["failed"], stats["pending"]), (3, 0, 0))
+
+    async def test_backpressure_when_full(self):
+        """Переполненные полосы отвечают 503, чтобы Telegram повторил доставку"""
+        executor = self.executor(concurrency=1, max_pending=2)
+        client = await self.client(executor)
+
+        statuses = []
+        for update_id in range(4):
+            response = await client.post(
+                "/webhook", json=message_update(update_id, "x"), headers={SECRET_HEADER: SECRET}
+            )
+            statuses.append(response.status)
+
+        self.assertEqual(statuses, [200, 200, 503, 503])
+        response = await client.get("/healthz")
+        stats = await response.json()
+        self.assertEqual((stats["pending"], stats["max_pending"], stats["rejected"]), (2, 2, 2))
+
+    async def test_webhook_set_after_server_listens(self):
+        """Webhook ставится после хуков запуска, когда порт уже принимает апдейты"""
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        for name, value in (("webhook_host", "127.0.0.1"), ("webhook_port", port), ("webhook_path", "/webhook"),
+                            ("webhook_secret", SECRET), ("webhook_url", "https://bot.example.org/"),
+                            ("drop_pending_updates", False), ("metrics_endpoint", False)):
+            patcher = mock.patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        dispatcher = LaneDispatcher()
+        events = []
+
+        async def on_startup():
+            events.append("startup")
+
+        async def on_message(message: Message):
+            self.handled.append(message.text)
+
+        async def set_webhook(url, **kwargs):
+            # Накопившийся апдейт Telegram шлет сразу после setWebhook
+            async with ClientSession() as session:
+                async with session.post(f"http://127.0.0.1:{port}/webhook", json=message_update(1, "backlog"),
+                                        headers={SECRET_HEADER: SECRET}) as response:
+                    events.append((url, kwargs["allowed_updates"], response.status))
+            raise asyncio.CancelledError
+
+        dispatcher.startup.register(on_startup)
+        dispatcher.message.register(on_message)
+        dispatcher.start_lanes(self.bot, lanes=2, concurrency=1, max_pending=10)
+        with mock.patch.object(self.bot, "set_webhook", side_effect=set_webhook):
+            with self.assertRaises(asyncio.CancelledError):
+                await asyncio.wait_for(run_webhook(dispatcher, self.bot, allowed_updates=["message"]), 10)
+
+        self.assertEqual(events, ["startup", ("https://bot.example.org/webhook", ["message"], 200)])
+        self.assertEqual(self.handled, ["backlog"])
+
+
+if __name__ == '__main__':
+    unittest.main()
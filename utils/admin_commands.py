@@ -19,7 +19,8 @@ USER_COMMANDS = [
 # Команды для администраторов
 ADMIN_COMMANDS = [
     BotCommand(command="start", description="Запуск бота"),
-    BotCommand(command="admin", description="Админ-панель")
+    BotCommand(command="admin", description="Админ-панель"),
+    BotCommand(command="diag", description="Диагностика")
 ]
 
 
@@ -0,0 +1,41 @@
+"""
+Типизированные callback data
+
+Вместо строк вида admin:remove_player_15_7, которые хендлеры разбирают
+через split("_"), кнопка хранит упакованный объект CallbackData:
+prefix:поле:поле. aiogram сам проверяет и приводит типы полей, а
+CallbackIndex индексирует такие хендлеры по префиксу "prefix:".
+
+Новые кнопки с несколькими параметрами стоит описывать здесь.
+"""
+from enum import Enum
+
+from aiogram.filters.callback_data import CallbackData
+
+
+class RosterAction(str, Enum):
+    REMOVE = "remove"
+
+
+class BlockScope(str, Enum):
+    TOURNAMENT = "tournament"
+    GLOBAL = "global"
+
+
+class AdminRosterCallback(CallbackData, prefix="adm_roster"):
+    """Действие с игроком в составе команды"""
+    action: RosterAction
+    player_id: int
+    team_id: int
+
+
+class AdminTeamStatusCallback(CallbackData, prefix="adm_status"):
+    """Смена статуса команды"""
+    status: str  # pending / approved / rejected
+    team_id: int
+
+
+class AdminTeamBlockCallback(CallbackData, prefix="adm_block"):
+    """Область блокировки команды"""
+    scope: BlockScope
+    team_id: int
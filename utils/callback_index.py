@@ -0,0 +1,225 @@
+"""
+Индекс хендлеров callback_query по значению и префиксу callback data
+
+aiogram перебирает хендлеры роутера по порядку и для каждого вычисляет
+фильтры, поэтому нажатие пользовательской кнопки сначала проходит сотни
+фильтров админских роутеров. Индекс один раз разбирает фильтры хендлеров:
+
+    F.data == "admin:panel"              -> точное значение
+    F.data.in_({...})                    -> несколько точных значений
+    F.data.startswith("admin:team_")     -> префикс
+    F.data.regexp(r"^admin:team_\\d+$")   -> литеральное начало шаблона
+    SomeCallback.filter()                -> префикс "prefix:" типизированной data
+
+и строит словари значение -> хендлеры и префикс -> хендлеры (по длине
+префикса). По data нажатия кандидаты находятся несколькими обращениями к
+словарям еще до обхода роутеров, и каждый роутер проверяет фильтры только у
+своих кандидатов — в исходном порядке, так что поведение не меняется.
+Хендлеры без фильтра по data (только StateFilter и т.п.) остаются
+кандидатами всегда.
+"""
+import operator
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from aiogram import Router
+from aiogram.dispatcher.event.bases import UNHANDLED, SkipHandler
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.filters.callback_data import CallbackQueryFilter
+from aiogram.types import CallbackQuery, TelegramObject
+from magic_filter.operations import CallOperation, ComparatorOperation, FunctionOperation, GetAttributeOperation
+
+# Ключ в данных апдейта, под которым outer middleware передает кандидатов роутерам
+CANDIDATES_KEY = "callback_candidates"
+
+# Символы, на которых заканчивается литеральное начало регулярного выражения
+_REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+
+# (точные значения, префиксы); None — по фильтру ключ не извлекается
+FilterKeys = Tuple[Set[str], Set[str]]
+
+
+def regex_prefix(pattern: "re.Pattern[str]", anchored: bool) -> Optional[str]:
+    """Литеральное начало шаблона, с которого обязана начинаться подходящая строка"""
+    if pattern.flags & (re.IGNORECASE | re.MULTILINE | re.VERBOSE):
+        return None
+    source = pattern.pattern
+    if source.startswith("^"):
+        source = source[1:]
+    elif not anchored:
+        return None
+
+    # Альтернатива на верхнем уровне («a|b») не дает общего начала
+    depth = 0
+    escaped = False
+    for char in source:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return None
+
+    prefix = []
+    for index, char in enumerate(source):
+        if char in _REGEX_SPECIAL:
+            # Квантификатор «может не быть» относится к предыдущему символу
+            if char in "?*{" and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+    return "".join(prefix)
+
+
+def filter_keys(event_filter: Any) -> Optional[FilterKeys]:
+    """Точные значения и префиксы callback data, которые пропускает фильтр"""
+    callback = getattr(event_filter, "magic", None) or getattr(event_filter, "callback", None)
+
+    if isinstance(callback, CallbackQueryFilter):
+        data_class = callback.callback_data
+        return set(), {f"{data_class.__prefix__}{data_class.__separator__}"}
+
+    operations = getattr(callback, "_operations", None)
+    if not operations or not isinstance(operations[0], GetAttributeOperation) or operations[0].name != "data":
+        return None
+    rest = operations[1:]
+
+    if len(rest) == 1 and isinstance(rest[0], ComparatorOperation):
+        if rest[0].comparator is operator.eq and isinstance(rest[0].right, str):
+            return {rest[0].right}, set()
+        return None
+
+    if len(rest) == 1 and isinstance(rest[0], FunctionOperation):
+        function = rest[0].function
+        pattern = getattr(function, "__self__", None)
+        if isinstance(pattern, re.Pattern):
+            prefix = regex_prefix(pattern, anchored=function.__name__ in ("match", "fullmatch"))
+            return (set(), {prefix}) if prefix is not None else None
+        if function.__name__ == "in_op" and rest[0].args and isinstance(rest[0].args[0], (set, frozenset, list, tuple)):
+            values = rest[0].args[0]
+            if all(isinstance(value, str) for value in values):
+                return set(values), set()
+        return None
+
+    if (
+        len(rest) == 2
+        and isinstance(rest[0], GetAttributeOperation)
+        and rest[0].name == "startswith"
+        and isinstance(rest[1], CallOperation)
+        and len(rest[1].args) == 1
+        and not rest[1].kwargs
+    ):
+        prefixes = rest[1].args[0]
+        prefixes = (prefixes,) if isinstance(prefixes, str) else prefixes
+        if isinstance(prefixes, tuple) and all(isinstance(prefix, str) for prefix in prefixes):
+            return set(), set(prefixes)
+    return None
+
+
+def handler_keys(handler: HandlerObject) -> Optional[FilterKeys]:
+    """Ключи первого фильтра хендлера по data (фильтры объединяются по И, хватает одного)"""
+    for event_filter in handler.filters or ():
+        keys = filter_keys(event_filter)
+        if keys is not None:
+            return keys
+    return None
+
+
+class CallbackIndex:
+    """Словари кандидатов по callback data для всех роутеров дерева"""
+
+    def __init__(self, root: Router):
+        self.root = root
+        self.observers: List[TelegramEventObserver] = []
+        self._sizes: Dict[int, int] = {}
+        self._exact: Dict[str, List[Tuple[int, TelegramEventObserver, HandlerObject]]] = defaultdict(list)
+        self._prefixes: Dict[int, Dict[str, List[Tuple[int, TelegramEventObserver, HandlerObject]]]] = {}
+        self._always: List[Tuple[int, TelegramEventObserver, HandlerObject]] = []
+        self.indexed = 0
+        self.lookups = 0
+
+        position = 0
+        for router in self._routers(root):
+            observer = router.callback_query
+            self.observers.append(observer)
+            self._sizes[id(observer)] = len(observer.handlers)
+            for handler in observer.handlers:
+                entry = (position, observer, handler)
+                position += 1
+                keys = handler_keys(handler)
+                if keys is None:
+                    self._always.append(entry)
+                    continue
+                self.indexed += 1
+                exact, prefixes = keys
+                for value in exact:
+                    self._exact[value].append(entry)
+                for prefix in prefixes:
+                    self._prefixes.setdefault(len(prefix), defaultdict(list))[prefix].append(entry)
+        self._lengths = sorted(self._prefixes)
+
+    @property
+    def total(self) -> int:
+        return sum(self._sizes.values())
+
+    def lookup(self, data: Optional[str]) -> Dict[TelegramEventObserver, List[HandlerObject]]:
+        """Кандидаты по роутерам в порядке регистрации"""
+        self.lookups += 1
+        entries = list(self._always)
+        if data is not None:
+            entries.extend(self._exact.get(data, ()))
+            for length in self._lengths:
+                if length > len(data):
+                    break
+                entries.extend(self._prefixes[length].get(data[:length], ()))
+        entries.sort(key=lambda entry: entry[0])
+
+        candidates: Dict[TelegramEventObserver, List[HandlerObject]] = {}
+        for _, observer, handler in entries:
+            candidates.setdefault(observer, []).append(handler)
+        return candidates
+
+    def install(self) -> None:
+        """Подменить trigger callback_query у всех роутеров дерева"""
+        for observer in self.observers:
+            observer.trigger = self._make_trigger(observer, observer.trigger)
+
+    def _make_trigger(self, observer: TelegramEventObserver, original):
+        size = self._sizes[id(observer)]
+
+        async def trigger(event: TelegramObject, **kwargs: Any) -> Any:
+            # Хендлеры, добавленные после построения индекса, проверяются обычным перебором
+            if len(observer.handlers) != size or not isinstance(event, CallbackQuery):
+                return await original(event, **kwargs)
+            candidates = kwargs.get(CANDIDATES_KEY)
+            if candidates is None:
+                candidates = self.lookup(event.data)
+
+            for handler in candidates.get(observer, ()):
+                kwargs["handler"] = handler
+                result, data = await handler.check(event, **kwargs)
+                if result:
+                    kwargs.update(data)
+                    try:
+                        wrapped_inner = observer.outer_middleware.wrap_middlewares(
+                            observer._resolve_middlewares(),
+                            handler.call,
+                        )
+                        return await wrapped_inner(event, kwargs)
+                    except SkipHandler:
+                        continue
+            return UNHANDLED
+
+        return trigger
+
+    @staticmethod
+    def _routers(router: Router):
+        yield router
+        for sub_router in router.sub_routers:
+            yield from CallbackIndex._routers(sub_router)
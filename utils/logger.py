@@ -1,21 +1,291 @@
 """
 Настройка логирования для бота
+
+Два профиля (LOG_PROFILE):
+
+- development — цветной текст в консоль и в файл, запись в вызывающем
+  потоке, backtrace/diagnose везде;
+- production — JSON lines в консоль и в файл, diagnose только в файле
+  ошибок. Записи стандартного logging ниже LOG_LEVEL не создаются вовсе
+  (уровень корневого логгера), место вызова берется из LogRecord без обхода
+  кадров, DEBUG/INFO прореживаются по LOG_SAMPLE_RATES, а одно место кода
+  пишет не больше LOG_RATE_LIMIT_PER_MINUTE записей в минуту (ERROR и
+  выше — всегда).
+
+В production вызывающий поток только кладет поля записи в очередь, а JSON и
+запись в консоль и файл делает фоновый поток пачками (BackgroundLogWriter).
+enqueue=True loguru для этого не подходит: он сериализует каждую запись
+pickle и пишет ее в pipe multiprocessing, что медленнее синхронной записи;
+он оставлен только для редкого файла ошибок.
 """
 
+import json
 import logging
+import queue
+import random
 import sys
+import threading
+import time
+import traceback
 from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple
+
 from loguru import logger
 
 from config.settings import settings as config
 
 
-def setup_logger():
+class InterceptHandler(logging.Handler):
+    """Перенаправление стандартного логирования Python в loguru"""
+
+    def emit(self, record):
+        # Получаем соответствующий уровень Loguru
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+
+        # Находим caller из которого был вызван лог
+        frame, depth = logging.currentframe(), 2
+        while frame.f_code.co_filename == logging.__file__:
+            frame = frame.f_back
+            depth += 1
+
+        logger.opt(depth=depth, exception=record.exc_info).log(
+            level, record.getMessage()
+        )
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Разбор LOG_SAMPLE_RATES: "handlers.user=0.1,aiogram=0.01" """
+    rates = {}
+    for item in value.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class LogThrottle:
+    """Выборка DEBUG/INFO по логгерам и ограничение частоты записей из одного места кода"""
+
+    def __init__(self, sample_rates: Dict[str, float], per_minute: int, window: float = 60.0):
+        self.sample_rates = sample_rates
+        self.per_minute = per_minute
+        self.window = window
+        self.sampled_out = 0
+        self.suppressed = 0
+        self._rates: Dict[str, float] = {}
+        # место вызова -> [начало окна, записей в окне, отброшено в окне]
+        self._windows: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def rate_for(self, name: str) -> float:
+        """Доля записей логгера: ближайший заданный родитель, иначе 1"""
+        rate = self._rates.get(name)
+        if rate is None:
+            rate = 1.0
+            parts = name.split(".")
+            for index in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:index])
+                if prefix in self.sample_rates:
+                    rate = self.sample_rates[prefix]
+                    break
+            self._rates[name] = rate
+        return rate
+
+    def check(self, record: logging.LogRecord) -> Optional[int]:
+        """None — запись отбросить; иначе сколько похожих было отброшено до нее"""
+        if record.levelno >= logging.ERROR:
+            return 0
+        if record.levelno < logging.WARNING:
+            rate = self.rate_for(record.name)
+            if rate < 1.0 and random.random() >= rate:
+                self.sampled_out += 1
+                return None
+        if self.per_minute <= 0:
+            return 0
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window:
+                skipped = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                return skipped
+            if window[1] >= self.per_minute:
+                window[2] += 1
+                self.suppressed += 1
+                return None
+            window[1] += 1
+            return 0
+
+
+# Место вызова для текущей записи stdlib (подставляется патчером loguru)
+_origin = threading.local()
+
+
+def _patch_origin(record) -> None:
+    origin = getattr(_origin, "record", None)
+    if origin is not None:
+        record["name"] = origin.name
+        record["function"] = origin.funcName
+        record["line"] = origin.lineno
+
+
+class FastInterceptHandler(logging.Handler):
+    """
+    Перенаправление stdlib в loguru без обхода кадров: записи ниже порога
+    отбрасываются сразу, место вызова берется из LogRecord.
+    """
+
+    def __init__(self, min_level: int, throttle: LogThrottle):
+        super().__init__()
+        self.min_level = min_level
+        self.throttle = throttle
+
+    def emit(self, record):
+        if record.levelno < self.min_level:
+            return
+        skipped = self.throttle.check(record)
+        if skipped is None:
+            return
+        message = record.getMessage()
+        if skipped:
+            message += f" [пропущено похожих записей: {skipped}]"
+
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        _origin.record = record
+        try:
+            logger.opt(exception=record.exc_info).log(level, message)
+        finally:
+            _origin.record = None
+
+
+def json_line(time_, level: str, name: str, function: str, line: int, message: str, exc: Optional[str]) -> str:
+    """Запись в формате JSON lines"""
+    entry = {
+        "ts": time_.isoformat(timespec="milliseconds"),
+        "level": level,
+        "logger": name,
+        "func": function,
+        "line": line,
+        "msg": message,
+    }
+    if exc:
+        entry["exc"] = exc
+    return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# Признак пачки строк от BackgroundLogWriter в extra записи loguru
+_BATCH = "_log_batch"
+
+
+def _not_batch(record) -> bool:
+    return _BATCH not in record["extra"]
+
+
+class BackgroundLogWriter:
+    """
+    Sink loguru: поля записи — в очередь, JSON и запись в консоль и файл —
+    в фоновом потоке пачками. Файл пишется через обычный sink loguru
+    (ротация, хранение и сжатие как раньше), одним сообщением на пачку.
+    """
+
+    def __init__(self, stream: Optional[TextIO], batch_size: int = 512):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.written = 0
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._file_logger = logger.bind(**{_BATCH: True})
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def __call__(self, message) -> None:
+        record = message.record
+        exc = None
+        if record["exception"] is not None:
+            # Трассировку форматируем сразу: объекты кадров дальше меняются
+            type_, value, tb = record["exception"]
+            exc = "".join(traceback.format_exception(type_, value, tb))
+        self._queue.put((
+            record["time"], record["level"].name, record["name"],
+            record["function"], record["line"], record["message"], exc
+        ))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[tuple] = []
+            stop = False
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                stop = True
+            if batch:
+                self._write([json_line(*fields) for fields in batch])
+            if stop:
+                return
+
+    def _write(self, lines: List[str]) -> None:
+        text = "\n".join(lines)
+        try:
+            if self.stream is not None:
+                self.stream.write(text + "\n")
+                self.stream.flush()
+            self._file_logger.info(text)
+            self.written += len(lines)
+        except Exception as e:
+            print(f"Ошибка записи логов: {e}", file=sys.stderr)
+
+    def stop(self, timeout: float = 5) -> None:
+        """Дописать очередь и остановить поток"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+# Фоновый писатель профиля production
+_writer: Optional[BackgroundLogWriter] = None
+
+
+def setup_logger(profile: Optional[str] = None):
     """Настройка системы логирования"""
-    
+    profile = profile or config.log_profile
+    if profile == "production":
+        _setup_production()
+    else:
+        _setup_development()
+
+    # Устанавливаем уровень для конкретных логгеров
+    for logger_name in ["aiogram", "aiohttp", "sqlalchemy"]:
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+
+    logger.info(f"Система логирования настроена (профиль {profile})")
+
+
+def _stop_writer() -> None:
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+def _setup_development():
     # Удаляем стандартный handler loguru
+    _stop_writer()
     logger.remove()
-    
+    logger.configure(patcher=None)
+
     # Настраиваем формат логов
     log_format = (
         "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
@@ -23,7 +293,7 @@ def setup_logger():
         "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
         "<level>{message}</level>"
     )
-    
+
     # Добавляем вывод в консоль
     logger.add(
         sys.stdout,
@@ -33,15 +303,15 @@ def setup_logger():
         backtrace=True,
         diagnose=True
     )
-    
+
     # Добавляем вывод в файл
     # Создаем папку logs если её нет
     logs_dir = Path("logs")
     logs_dir.mkdir(exist_ok=True)
-    
+
     # Определяем путь к основному лог-файлу
     log_file = logs_dir / "bot.log"
-    
+
     logger.add(
         log_file,
         format=log_format,
@@ -52,7 +322,7 @@ def setup_logger():
         backtrace=True,
         diagnose=True
     )
-    
+
     # Добавляем отдельный файл для ошибок
     error_log_file = logs_dir / "errors.log"
     logger.add(
@@ -65,36 +335,70 @@ def setup_logger():
         backtrace=True,
         diagnose=True
     )
-    
-    # Перенаправляем стандартное логирование Python в loguru
-    class InterceptHandler(logging.Handler):
-        def emit(self, record):
-            # Получаем соответствующий уровень Loguru
-            try:
-                level = logger.level(record.levelname).name
-            except ValueError:
-                level = record.levelno
-
-            # Находим caller из которого был вызван лог
-            frame, depth = logging.currentframe(), 2
-            while frame.f_code.co_filename == logging.__file__:
-                frame = frame.f_back
-                depth += 1
-
-            logger.opt(depth=depth, exception=record.exc_info).log(
-                level, record.getMessage()
-            )
 
     # Настраиваем стандартное логирование Python
     logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
-    
-    # Устанавливаем уровень для конкретных логгеров
-    for logger_name in ["aiogram", "aiohttp", "sqlalchemy"]:
-        logging.getLogger(logger_name).setLevel(logging.WARNING)
-    
-    logger.info("Система логирования настроена")
+
+
+def _setup_production():
+    global _writer
+    _stop_writer()
+    logger.remove()
+    # Место вызова записей stdlib подставляется из LogRecord
+    logger.configure(patcher=_patch_origin)
+    level = logger.level(config.log_level.upper()).no
+
+    # JSON lines в консоль и файл пишет фоновый поток
+    _writer = BackgroundLogWriter(sys.stdout)
+    logger.add(
+        _writer,
+        format="{message}",
+        level=level,
+        filter=_not_batch,
+        backtrace=False,
+        diagnose=False
+    )
+
+    logs_dir = Path("logs")
+    logs_dir.mkdir(exist_ok=True)
+    # Сюда приходят только пачки строк от фонового потока
+    logger.add(
+        logs_dir / "bot.log",
+        format="{message}",
+        level=0,
+        filter=lambda record: not _not_batch(record),
+        rotation="1 day",
+        retention="1 month",
+        compression="zip",
+        backtrace=False,
+        diagnose=False
+    )
+
+    # Ошибки редки: для них — текст со значениями переменных
+    logger.add(
+        logs_dir / "errors.log",
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} | {message}",
+        level="ERROR",
+        filter=_not_batch,
+        rotation="5 MB",
+        retention="1 month",
+        compression="zip",
+        enqueue=True,
+        backtrace=True,
+        diagnose=True
+    )
+
+    # Записи ниже порога stdlib не создает (isEnabledFor), выше — без обхода кадров
+    throttle = LogThrottle(parse_sample_rates(config.log_sample_rates), config.log_rate_limit_per_minute)
+    logging.basicConfig(handlers=[FastInterceptHandler(level, throttle)], level=level, force=True)
+
+
+async def complete_logging():
+    """Дописать логи из фоновых очередей (профиль production)"""
+    _stop_writer()
+    await logger.complete()
 
 
 def get_logger(name: str):
     """Получить логгер с указанным именем"""
-    return logger.bind(name=name)
\ No newline at end of file
+    return logger.bind(name=name)